@@ -212,7 +212,8 @@ def logout(db_session: Session = Depends(db.get_session),
     
     service.OTPRepo.add_to_blacklist(db_session, access_token)
     #   Delete refresh token of the current_user => successfully logout
-    current_user.refresh_token = None
+    user_db = service.AuthRequestRepository.get_user_by_id(db_session, current_user.id)
+    user_db.refresh_token = None
     db.commit_rollback(db_session)
     
     #   Delete cookie
@@ -286,6 +287,8 @@ def reset_forgot_password(data: schema.ForgotPassword,
                           db_session: Session = Depends(db.get_session),
                           credentials: HTTPAuthorizationCredentials = Security(security_bearer)):        
     _, current_user = get_current_active_user(db_session, credentials)
+    #   The cached principal has no OTP state
+    current_user = service.AuthRequestRepository.get_user_by_id(db_session, current_user.id)
     if not current_user:
         raise HTTPException(status_code=404, detail="User could not be found")
         
@@ -386,6 +389,7 @@ def upate_user_info(
     
     # Get curent active user
     _, current_user = get_current_active_user(db_session, credentials)
+    current_user = service.AuthRequestRepository.get_user_by_id(db_session, current_user.id)
     
     #   Update user info
     if data_form.fullname:
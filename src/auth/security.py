@@ -1,11 +1,64 @@
 import random
 import os
+import threading
+import anyio
+from typing import Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from jose import jwt
 from datetime import timedelta, datetime
 from passlib.context import CryptContext
-from config import ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_EXPIRE_MINUTES
+from fastapi import HTTPException, status
+from config import (ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_EXPIRE_MINUTES,
+                    BCRYPT_ROUNDS, BCRYPT_WORKERS, BCRYPT_QUEUE_SIZE)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+
+class PasswordHasher:
+    """
+    bcrypt runs in its own pool of BCRYPT_WORKERS threads (it releases the GIL while hashing): a login spike uses
+    those cores only, instead of every threadpool thread of the worker. At most BCRYPT_QUEUE_SIZE hashes are
+    admitted at a time (running + waiting), the others are refused with 503 instead of queueing without bound.
+    A waiting hash holds a threadpool thread of the sync handler, so admission is also capped at half the threadpool
+    tokens: a spike cannot take every thread away from the other requests.
+    """
+    _executor: Optional[ThreadPoolExecutor] = None
+    _pending: int = 0
+    _limit: int = BCRYPT_QUEUE_SIZE
+    _lock = threading.Lock()
+
+    @classmethod
+    def startup(cls):
+        #   Called on the event loop at app startup, the lazy start from a worker thread keeps the current limit
+        try:
+            cls._limit = max(1, min(BCRYPT_QUEUE_SIZE, anyio.to_thread.current_default_thread_limiter().total_tokens // 2))
+        except RuntimeError:
+            pass
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS or max(1, (os.cpu_count() or 1) // 2),
+                                                   thread_name_prefix="bcrypt")
+
+    @classmethod
+    def shutdown(cls):
+        with cls._lock:
+            if cls._executor is not None:
+                cls._executor.shutdown(wait=False, cancel_futures=True)
+                cls._executor = None
+
+    @classmethod
+    def run(cls, function, *args):
+        #   Called from the threadpool (sync handlers): waits for the pool without holding the GIL
+        with cls._lock:
+            if cls._pending >= cls._limit:
+                raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Too many sign-ins are being processed, please retry later!")
+            cls._pending += 1
+        try:
+            cls.startup()
+            return cls._executor.submit(function, *args).result()
+        finally:
+            with cls._lock:
+                cls._pending -= 1
 
 def random_otp(n: int):
     string = ''
@@ -16,11 +69,16 @@ def random_otp(n: int):
 
 
 def get_password_hash(password: str):
-    return pwd_context.hash(password)
+    return PasswordHasher.run(pwd_context.hash, password)
 
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return PasswordHasher.run(pwd_context.verify, plain_password, hashed_password)
+
+
+def verify_and_update_password(plain_password, hashed_password) -> Tuple[bool, Optional[str]]:
+    """Whether the password matches, and its hash with BCRYPT_ROUNDS when the stored one has another cost"""
+    return PasswordHasher.run(pwd_context.verify_and_update, plain_password, hashed_password)
 
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
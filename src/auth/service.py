@@ -1,15 +1,14 @@
 import model
 from fastapi import HTTPException
 from sqlalchemy import select
-import smtplib
-import ssl
 from config import db
 from passlib.context import CryptContext
-from email.message import EmailMessage
 from auth import schema, security
 from datetime import timedelta, datetime
 from pydantic import BaseModel, EmailStr
 from sqlmodel import Session
+from token_revocation import TokenRevocations, token_expiry
+from email_outbox import EmailOutbox
 
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -37,28 +36,10 @@ class AuthRequestRepository:
 
     @staticmethod
     def OTP_GOOGLE(otp: str, input_email="example@gmail.com"):
-        port = 587  # For starttls
-        smtp_server = "smtp.gmail.com"
-        sender_email = "hiep200326@gmail.com"
-        receiver_email = input_email
-        password = "aghs ypya luzd seut"
-        
-        em=EmailMessage()
-        em['From']=sender_email
-        em['To']=input_email
-        em['subject']="AUTHORIZED REGISTER"
-        body="HERE IS YOUR OTP CODE "+ otp
-        em.set_content(body)
-
-        context = ssl.create_default_context()
-        with smtplib.SMTP(smtp_server, port) as server:
-            server.ehlo()  # Can be omitted
-            server.starttls(context=context)
-            server.ehlo()  # Can be omitted
-            server.login(sender_email, password)
-            server.sendmail(sender_email, receiver_email, em.as_string())
-
-        print("Sent!")
+        #   Queued in the outbox, sent by the email sender over its SMTP session
+        EmailOutbox.enqueue(recipient=input_email,
+                            subject="AUTHORIZED REGISTER",
+                            body="HERE IS YOUR OTP CODE "+ otp)
         json_otp={"otp": otp}
         return json_otp
     
@@ -70,8 +51,13 @@ class AuthRequestRepository:
         user = AuthRequestRepository.get_user_by_email(db_session, email)
         if not user:
             return False
-        if not security.verify_password(password, user.password):
+        valid, new_hash = security.verify_and_update_password(password, user.password)
+        if not valid:
             return False
+        #   Stored with another bcrypt cost: replaced while the password is known
+        if new_hash:
+            user.password = new_hash
+            db.commit_rollback(db_session)
         return user
     
     @staticmethod
@@ -144,9 +130,11 @@ class OTPRepo:
     
     @staticmethod
     def add_to_blacklist(db_session: Session, token: str):
-        result = model.JWTModel(token=token, created_at=datetime.now())
+        #   created_at comes from the database clock (server default): revocation syncs compare it with the database now()
+        result = model.JWTModel(token=token, expires_at=token_expiry(token))
         db_session.add(result)
         db.commit_rollback(db_session)
+        TokenRevocations.add(token, result.expires_at)
         return {"detail": "Thêm vào Blacklist.",
                 "data": result,
                 "metadata": None, 
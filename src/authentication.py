@@ -1,10 +1,12 @@
 import os
 from config import db
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from postjob import schema, service
 from fastapi import status, Depends, Security, HTTPException
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import jwt
+from principal_cache import Principal, PrincipalCache
 
 security_bearer = HTTPBearer()
 
@@ -16,15 +18,52 @@ def get_current_active_user(
     if service.OTPRepo.check_token(db_session, token):
         raise HTTPException(status_code=401, detail="Authentication is required!")
     
+    #   Principal of a recent request with this token
+    current_user = PrincipalCache.get(token)
+    if current_user:
+        return token, current_user
+    generation = PrincipalCache.generation
+    
+    #   Decode
+    payload = jwt.decode(token, os.environ.get("SECRET_KEY"), algorithms=os.environ.get("ALGORITHM"))
+    email = payload.get("sub")
+        
+    user = service.AuthRequestRepository.get_user_by_email(db_session, email)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Unauthorized, could not validate credentials.",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    current_user = Principal.of(user)
+    PrincipalCache.put(token, current_user, payload.get("exp"), generation)
+    return token, current_user
+
+
+async def get_current_active_user_async(
+                db_session: AsyncSession = Depends(db.get_async_session),
+                credentials: HTTPAuthorizationCredentials = Security(security_bearer)):
+    #   Same checks as get_current_active_user, on the async session (no threadpool hop)
+    token = credentials.credentials  
+    if await service.OTPRepo.check_token_async(db_session, token):
+        raise HTTPException(status_code=401, detail="Authentication is required!")
+    
+    current_user = PrincipalCache.get(token)
+    if current_user:
+        return token, current_user
+    generation = PrincipalCache.generation
+    
     #   Decode
     payload = jwt.decode(token, os.environ.get("SECRET_KEY"), algorithms=os.environ.get("ALGORITHM"))
     email = payload.get("sub")
         
-    current_user = service.AuthRequestRepository.get_user_by_email(db_session, email)
-    if not current_user:
+    user = await service.AuthRequestRepository.get_user_by_email_async(db_session, email)
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Unauthorized, could not validate credentials.",
             headers={"WWW-Authenticate": "Bearer"}
         )
-    return token, current_user
\ No newline at end of file
+    current_user = Principal.of(user)
+    PrincipalCache.put(token, current_user, payload.get("exp"), generation)
+    return token, current_user
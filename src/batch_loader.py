@@ -0,0 +1,72 @@
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Set
+from sqlmodel import Session
+from sqlalchemy import select
+import model
+from read_models import Slim
+
+
+class BatchLoader:
+    """
+    Request-scoped loader of related rows by key, DataLoader style.
+    A listing primes the keys of its page, then reads each row with `get`: the keys of a kind that are not loaded yet
+    are fetched together with one IN query, so a page costs one query per kind whatever its size.
+    """
+    #   kind => (model, key column, columns read), rows are slim read models: lists only show a few columns of each
+    kinds = {
+        "resume": (model.Resume, model.Resume.id, Slim.Resume),
+        "job": (model.JobDescription, model.JobDescription.id, Slim.JobDescription),
+        "user": (model.User, model.User.id, Slim.User),
+        "company_by_user": (model.Company, model.Company.user_id, Slim.Company),
+        "valuation_by_resume": (model.ValuationInfo, model.ValuationInfo.cv_id, Slim.ValuationInfo),
+        "package_by_resume": (model.RecruitResumeJoin, model.RecruitResumeJoin.resume_id, Slim.RecruitResumeJoin),
+    }
+
+    def __init__(self, db_session: Session):
+        self.db_session = db_session
+        self._pending: Dict[str, Set[Any]] = defaultdict(set)
+        self._loaded: Dict[str, Dict[Any, Any]] = defaultdict(dict)
+
+    def prime(self, kind: str, keys: Iterable[Any]):
+        """Register keys to load with the next query of this kind"""
+        loaded = self._loaded[kind]
+        self._pending[kind].update(key for key in keys if key is not None and key not in loaded)
+        return self
+
+    def _dispatch(self, kind: str):
+        keys = self._pending.pop(kind, None)
+        if not keys:
+            return
+        table, column, columns = self.kinds[kind]
+        loaded = self._loaded[kind]
+        for key in keys:
+            loaded[key] = None
+        #   Primary key order: a key matching several rows gives the first one, as the single-row lookups did
+        rows = self.db_session.execute(select(columns).where(column.in_(keys)).order_by(*table.__table__.primary_key.columns)).scalars().all()
+        for row in rows:
+            key = getattr(row, column.key)
+            if loaded[key] is None:
+                loaded[key] = row
+
+    def get(self, kind: str, key: Any):
+        """Row of this kind for key (None if there is none)"""
+        if key is None:
+            return None
+        loaded = self._loaded[kind]
+        if key not in loaded:
+            self._pending[kind].add(key)
+            self._dispatch(kind)
+        return loaded[key]
+
+    def job_of_resume(self, cv_id: int):
+        """Job a resume was referred to, None for resumes uploaded to SearchCV"""
+        resume = self.get("resume", cv_id)
+        if resume is None or resume.job_id is None:
+            return None
+        #   Jobs of every resume loaded so far come in the same query
+        self.prime("job", (loaded.job_id for loaded in self._loaded["resume"].values() if loaded is not None))
+        return self.get("job", resume.job_id)
+
+    def job_service(self, cv_id: int):
+        job = self.job_of_resume(cv_id)
+        return job.job_service if job else "SearchCV"
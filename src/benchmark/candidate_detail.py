@@ -0,0 +1,85 @@
+import os
+import sys
+import time
+import argparse
+import statistics
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlmodel import Session, and_
+from sqlalchemy import create_engine, event, select
+import model
+from config import DATABASE_URL
+from candidate_detail import CandidateDetail
+
+
+#   Candidate detail: round-trips and latency of the former one-query-per-table reads against CandidateDetail.load.
+#   `python src/benchmark/candidate_detail.py [--cv-id 12 --cv-id 15] [--recruiter-id 3] [--repeat 50]` from the
+#   project root, on the database of DATABASE_URL (nothing is written).
+
+def detail_before(cv_id: int, db_session: Session, recruiter_id: int):
+    resume_result = db_session.execute(select(model.Resume, model.ResumeVersion)
+                                        .join(model.ResumeVersion, model.ResumeVersion.cv_id == cv_id)
+                                        .filter(model.Resume.id == cv_id)).first()
+    db_session.execute(select(model.JobDescription).where(model.JobDescription.id == resume_result.Resume.job_id)).scalars().first()
+    if recruiter_id is not None:
+        db_session.execute(select(model.RecruitResumeJoin).where(and_(model.RecruitResumeJoin.user_id == recruiter_id,
+                                                                      model.RecruitResumeJoin.resume_id == cv_id))).scalars().first()
+    for child in CandidateDetail.children.values():
+        db_session.execute(select(child).where(child.cv_id == cv_id)).scalars().all()
+    db_session.execute(select(model.ValuationInfo).where(model.ValuationInfo.cv_id == cv_id)).scalars().first()
+
+
+def detail_after(cv_id: int, db_session: Session, recruiter_id: int):
+    CandidateDetail.load(cv_id, db_session, recruiter_id=recruiter_id)
+
+
+def measure(engine, read, cv_ids, recruiter_id, repeat):
+    queries = [0]
+    def count(*args):
+        queries[0] += 1
+    event.listen(engine, "before_cursor_execute", count)
+    timings = []
+    try:
+        for _ in range(repeat):
+            for cv_id in cv_ids:
+                #   New session each time: nothing is served from the identity map
+                with Session(engine) as db_session:
+                    start = time.perf_counter()
+                    read(cv_id, db_session, recruiter_id)
+                    timings.append((time.perf_counter() - start) * 1000)
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    timings.sort()
+    return {
+        "queries/detail": queries[0] / len(timings),
+        "mean ms": statistics.mean(timings),
+        "p50 ms": timings[len(timings) // 2],
+        "p95 ms": timings[int(len(timings) * 0.95) - 1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Candidate detail read benchmark")
+    parser.add_argument("--cv-id", type=int, action="append", help="resume to read (default: the 20 latest)")
+    parser.add_argument("--recruiter-id", type=int, default=None, help="also read the join row of this recruiter")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(DATABASE_URL)
+    cv_ids = args.cv_id
+    if not cv_ids:
+        with Session(engine) as db_session:
+            cv_ids = db_session.execute(select(model.ResumeVersion.cv_id).order_by(model.ResumeVersion.id.desc()).limit(20)).scalars().all()
+    if not cv_ids:
+        print(" >>> No resume to read")
+        return
+    #   Warm up connections and statement caches
+    measure(engine, detail_before, cv_ids[:1], args.recruiter_id, 1)
+    measure(engine, detail_after, cv_ids[:1], args.recruiter_id, 1)
+    for name, read in (("before", detail_before), ("after", detail_after)):
+        result = measure(engine, read, cv_ids, args.recruiter_id, args.repeat)
+        print(f" >>> {name:6} " + "  ".join(f"{key}: {value:.2f}" for key, value in result.items()))
+
+
+if __name__ == '__main__':
+    main()
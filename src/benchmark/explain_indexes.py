@@ -0,0 +1,94 @@
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime
+from sqlalchemy import create_engine, select, text, and_
+import model
+from config import DATABASE_URL
+from candidate_detail import CandidateDetail
+
+
+#   Index regression check: EXPLAIN of the hot query shapes must use the expected index, not a sequential scan.
+#   `python src/benchmark/explain_indexes.py` from the project root on a migrated Postgres database (DATABASE_URL),
+#   exits with 1 when a plan regressed. Sequential scans are disabled so that small tables still show the index choice.
+
+#   (description, query, table, expected index)
+SHAPES = [
+    ("sign in by email", select(model.User).where(model.User.email == "user@sharecv.vn"), "users", "ix_users_email"),
+    ("revoked token", select(model.JWTModel).where(model.JWTModel.token == "token"), "blacklisted_jwt", "blacklisted_jwt_token_key"),
+    ("expired revoked tokens",
+        select(model.JWTModel).where(model.JWTModel.expires_at <= datetime(2000, 1, 1)),
+        "blacklisted_jwt", "ix_blacklisted_jwt_expires_at"),
+    ("latest resume version",
+        select(model.ResumeVersion).where(model.ResumeVersion.cv_id == 1, model.ResumeVersion.is_lastest == True),
+        "resume_versions", "ix_resume_versions_cv_id_is_lastest"),
+    ("resumes by status",
+        select(model.ResumeVersion).where(model.ResumeVersion.status.in_(["pricing_approved", "ai_matched"]), model.ResumeVersion.is_lastest == True),
+        "resume_versions", "ix_resume_versions_status_is_lastest"),
+    ("matching of a resume for a job",
+        select(model.ResumeMatching).where(model.ResumeMatching.cv_id == 1, model.ResumeMatching.job_id == 1),
+        "matching_results", "ix_matching_results_cv_id_job_id"),
+    ("matching of a resume", select(model.ResumeMatching).where(model.ResumeMatching.cv_id == 1), "matching_results", "ix_matching_results_cv_id_job_id"),
+    ("jobs of a recruiter", select(model.JobDescription).where(model.JobDescription.user_id == 1), "job_descriptions", "ix_job_descriptions_user_id"),
+    ("jobs by status", select(model.JobDescription).where(model.JobDescription.status == "pending"), "job_descriptions", "ix_job_descriptions_status"),
+    ("resumes of a job", select(model.Resume).where(model.Resume.job_id == 1), "resumes", "ix_resumes_job_id"),
+    ("resumes of a collaborator", select(model.Resume).where(model.Resume.user_id == 1), "resumes", "ix_resumes_user_id"),
+    ("valuation of a resume", select(model.ValuationInfo).where(model.ValuationInfo.cv_id == 1), "valuation_infos", "ix_valuation_infos_cv_id"),
+    ("transaction by OTP",
+        select(model.TransactionHistory).where(model.TransactionHistory.transaction_otp == "123456"),
+        "transaction_histories", "ix_transaction_histories_transaction_otp"),
+    ("recruiters of a resume",
+        select(model.RecruitResumeJoin).where(model.RecruitResumeJoin.resume_id == 1),
+        "recruit_resume_joins", "ix_recruit_resume_joins_resume_id"),
+    ("recruiter join row",
+        select(model.RecruitResumeJoin).where(and_(model.RecruitResumeJoin.user_id == 1, model.RecruitResumeJoin.resume_id == 1)),
+        "recruit_resume_joins", "recruit_resume_joins_pkey"),
+    ("candidate listing",
+        select(model.CandidateOverview).order_by(model.CandidateOverview.created_at.desc(), model.CandidateOverview.id.desc()).limit(20),
+        "candidate_overviews", "ix_candidate_overviews_created_at_id"),
+    ("candidates by status",
+        select(model.CandidateOverview).where(model.CandidateOverview.status == "candidate_accepted")
+            .order_by(model.CandidateOverview.created_at.desc(), model.CandidateOverview.id.desc()).limit(20),
+        "candidate_overviews", "ix_candidate_overviews_status_created_at_id"),
+    ("candidates of a collaborator",
+        select(model.CandidateOverview).where(model.CandidateOverview.collaborator_id == 1, model.CandidateOverview.is_draft == False)
+            .order_by(model.CandidateOverview.created_at.desc(), model.CandidateOverview.id.desc()).limit(20),
+        "candidate_overviews", "ix_candidate_overviews_collaborator_id_is_draft_created_at_id"),
+    ("due emails of the outbox",
+        select(model.OutboxEmail.id).where(model.OutboxEmail.status == "queued", model.OutboxEmail.next_run_at <= datetime(2024, 1, 1))
+            .order_by(model.OutboxEmail.next_run_at, model.OutboxEmail.id).limit(20),
+        "email_outbox", "ix_email_outbox_claim"),
+] + [
+    (f"{name} of a resume", select(child).where(child.cv_id == 1), child.__tablename__, f"ix_{child.__tablename__}_cv_id")
+    for name, child in CandidateDetail.children.items()
+]
+
+
+def plan_nodes(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def main():
+    engine = create_engine(DATABASE_URL)
+    if engine.dialect.name != "postgresql":
+        print(" >>> The index check runs on Postgres only")
+        return 0
+    failures = 0
+    with engine.connect() as connection:
+        connection.execute(text("SET enable_seqscan = off"))
+        for description, query, table, index in SHAPES:
+            sql = str(query.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+            plan = connection.exec_driver_sql("EXPLAIN (FORMAT JSON) " + sql).scalar()[0]["Plan"]
+            scans = [node for node in plan_nodes(plan) if node.get("Relation Name") == table or node.get("Index Name") == index]
+            used = {node.get("Index Name") for node in scans}
+            ok = index in used and not any(node["Node Type"] == "Seq Scan" for node in scans)
+            failures += not ok
+            print(f" >>> {'ok  ' if ok else 'FAIL'} {description}: {', '.join(sorted(str(name) for name in used))}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,54 @@
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from passlib.context import CryptContext
+from config import BCRYPT_ROUNDS, BCRYPT_WORKERS
+
+
+#   Login hashing: password verifications per second, per core, for some bcrypt costs, inline and through a pool
+#   of hashing threads as PasswordHasher runs them. `python src/benchmark/password_hashing.py [--rounds 10 --rounds 12]
+#   [--workers 4] [--logins 64]` from the project root (no database needed).
+
+PASSWORD = "correct horse battery staple"
+
+
+def measure(context: CryptContext, hashed: str, logins: int, workers: int):
+    start = time.perf_counter()
+    if workers:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(lambda _: context.verify(PASSWORD, hashed), range(logins)))
+    else:
+        results = [context.verify(PASSWORD, hashed) for _ in range(logins)]
+    elapsed = time.perf_counter() - start
+    assert all(results)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="bcrypt login throughput benchmark")
+    parser.add_argument("--rounds", type=int, action="append", help=f"bcrypt cost (default: BCRYPT_ROUNDS={BCRYPT_ROUNDS})")
+    parser.add_argument("--workers", type=int, default=BCRYPT_WORKERS or max(1, (os.cpu_count() or 1) // 2),
+                        help="hashing threads of the pool run")
+    parser.add_argument("--logins", type=int, default=32)
+    args = parser.parse_args()
+
+    print(f" >>> {os.cpu_count()} cores, pool of {args.workers} threads, {args.logins} logins per run")
+    for rounds in args.rounds or [BCRYPT_ROUNDS]:
+        context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+        hashed = context.hash(PASSWORD)
+        #   Warm up
+        measure(context, hashed, 1, 0)
+        inline = measure(context, hashed, args.logins, 0)
+        pooled = measure(context, hashed, args.logins, args.workers)
+        cores = min(args.workers, os.cpu_count() or 1)
+        print(f" >>> rounds {rounds:2}  ms/login: {inline / args.logins * 1000:.1f}  "
+              f"logins/s/core: {args.logins / inline:.1f}  "
+              f"pool logins/s: {args.logins / pooled:.1f}  pool logins/s/core: {args.logins / pooled / cores:.1f}")
+
+
+if __name__ == '__main__':
+    main()
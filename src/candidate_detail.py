@@ -0,0 +1,85 @@
+import json
+from typing import Any, Dict, List, Optional
+from sqlmodel import Session, func, and_
+from sqlalchemy import select, literal
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from fastapi import HTTPException
+import model
+
+
+class ChildRow(dict):
+    """A child row read from its JSON form, its columns are readable as attributes like on the model"""
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+class CandidateDetail:
+    """
+    Everything a candidate detail page shows, read in one query: the resume with its version, job, valuation and
+    (for a recruiter) the join row, plus each child collection aggregated as a JSON array by a correlated subquery.
+    """
+    #   attribute => child model, all linked by cv_id to the resume
+    children = {
+        "educations": model.ResumeEducation,
+        "experience": model.ResumeExperience,
+        "projects": model.ResumeProject,
+        "awards": model.ResumeAward,
+        "lang_certs": model.LanguageResumeCertificate,
+        "other_certs": model.OtherResumeCertificate,
+    }
+
+    def __init__(self, row, children: Dict[str, List[ChildRow]]):
+        self.Resume = row.Resume
+        self.ResumeVersion = row.ResumeVersion
+        self.JobDescription = row.JobDescription
+        self.ValuationInfo = row.ValuationInfo
+        self.RecruitResumeJoin = getattr(row, "RecruitResumeJoin", None)
+        for name, rows in children.items():
+            setattr(self, name, rows)
+
+    @staticmethod
+    def _json_array(db_session: Session, child):
+        #   Correlated subquery: JSON array of the child rows of the resume, in id order
+        table = child.__table__
+        if db_session.get_bind().dialect.name == "postgresql":
+            row = func.json_build_object(*[part for column in table.columns for part in (literal(column.name), column)])
+            array = func.coalesce(func.json_agg(aggregate_order_by(row, table.c.id)), func.json_build_array())
+        else:
+            #   SQLite (local runs and benchmark)
+            row = func.json_object(*[part for column in table.columns for part in (literal(column.name), column)])
+            array = func.json_group_array(row)
+        return select(array).where(table.c.cv_id == model.Resume.id).scalar_subquery()
+
+    @classmethod
+    def load(cls, cv_id: int, db_session: Session, recruiter_id: Optional[int] = None, with_children: bool = True):
+        """Detail of resume cv_id, None if it doesn't exist"""
+        entities = [model.Resume, model.ResumeVersion, model.JobDescription, model.ValuationInfo]
+        if recruiter_id is not None:
+            entities.append(model.RecruitResumeJoin)
+        names = list(cls.children) if with_children else []
+        query = select(*entities, *[cls._json_array(db_session, cls.children[name]).label(name) for name in names])   \
+                    .join(model.ResumeVersion, model.ResumeVersion.cv_id == model.Resume.id)   \
+                    .outerjoin(model.JobDescription, model.JobDescription.id == model.Resume.job_id)   \
+                    .outerjoin(model.ValuationInfo, model.ValuationInfo.cv_id == model.Resume.id)   \
+                    .where(model.Resume.id == cv_id)
+        if recruiter_id is not None:
+            query = query.outerjoin(model.RecruitResumeJoin, and_(model.RecruitResumeJoin.resume_id == model.Resume.id,
+                                                                  model.RecruitResumeJoin.user_id == recruiter_id))
+        row = db_session.execute(query).first()
+        if not row:
+            return None
+        children = {}
+        for name in names:
+            rows: Any = row._mapping[name]
+            if isinstance(rows, str):
+                rows = json.loads(rows)
+            children[name] = [ChildRow(child) for child in rows or []]
+        return cls(row, children)
+
+    def valuation(self):
+        if not self.ValuationInfo:
+            raise HTTPException(status_code=404, detail="This resume has not been valuated!")
+        return self.ValuationInfo
@@ -0,0 +1,113 @@
+from typing import Iterable, Set
+from sqlmodel import Session, func, and_
+from sqlalchemy import select, delete, case, event, inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import aliased, Session as OrmSession
+import model
+
+
+class CandidateOverviewSync:
+    """
+    Maintains candidate_overviews, the denormalized row each candidate listing reads: latest version of the resume,
+    service of its job and total point of its valuation. Listings become one indexed scan of that table.
+    Rows are refreshed in the transaction that changes their sources, from the after_flush event of every session:
+    a status transition committed by a service is in the overview when the commit returns.
+    """
+    #   Source columns shown by the overview, a flush that only touches other columns doesn't refresh it
+    tracked = {
+        model.Resume: ("user_id", "job_id"),
+        model.ResumeVersion: ("cv_id", "is_lastest", "name", "current_job", "industry", "status", "is_draft", "is_ai_matched"),
+        model.ValuationInfo: ("cv_id", "total_point"),
+        model.JobDescription: ("job_service",),
+    }
+
+    @staticmethod
+    def source(cv_ids: Iterable[int] = None):
+        """Overview rows computed from the source tables, for some resumes or all of them"""
+        latest = aliased(model.ResumeVersion)
+        latest_version_id = select(func.max(latest.id))    \
+                            .where(and_(latest.cv_id == model.Resume.id, latest.is_lastest == True))  \
+                            .scalar_subquery()
+        #   First valuation of the resume, as BatchLoader picks it
+        first = aliased(model.ValuationInfo)
+        valuation_id = select(func.min(first.id))    \
+                        .where(first.cv_id == model.Resume.id)  \
+                        .scalar_subquery()
+        query = select(model.Resume.id.label("cv_id"),
+                       model.ResumeVersion.id.label("id"),
+                       model.Resume.user_id.label("collaborator_id"),
+                       model.Resume.job_id.label("job_id"),
+                       case((model.JobDescription.id == None, "SearchCV"), else_=model.JobDescription.job_service).label("job_service"),
+                       model.ResumeVersion.name.label("name"),
+                       model.ResumeVersion.current_job.label("current_job"),
+                       model.ResumeVersion.industry.label("industry"),
+                       model.ResumeVersion.status.label("status"),
+                       model.ResumeVersion.is_draft.label("is_draft"),
+                       model.ResumeVersion.is_ai_matched.label("is_ai_matched"),
+                       model.ValuationInfo.total_point.label("total_point"),
+                       model.ResumeVersion.created_at.label("created_at"))    \
+                .select_from(model.Resume)  \
+                .join(model.ResumeVersion, model.ResumeVersion.id == latest_version_id)   \
+                .outerjoin(model.JobDescription, model.JobDescription.id == model.Resume.job_id)  \
+                .outerjoin(model.ValuationInfo, model.ValuationInfo.id == valuation_id)
+        if cv_ids is not None:
+            query = query.where(model.Resume.id.in_(cv_ids))
+        return query
+
+    @staticmethod
+    def refresh(connection, cv_ids: Iterable[int]):
+        """Recompute the overview rows of these resumes (a deleted resume loses its row)"""
+        cv_ids = sorted(set(cv_ids))
+        if not cv_ids:
+            return
+        table = model.CandidateOverview.__table__
+        query = CandidateOverviewSync.source(cv_ids)
+        columns = [column.name for column in query.selected_columns]
+        #   Rows are updated in place (no delete + insert churning the table and its indexes), only the resumes gone
+        #   from the source (deleted, or without a latest version) lose theirs
+        connection.execute(delete(table).where(table.c.cv_id.in_(cv_ids),
+                                               table.c.cv_id.notin_(select(query.subquery().c.cv_id))))
+        dialect = postgresql if connection.dialect.name == "postgresql" else sqlite
+        statement = dialect.insert(table).from_select(columns, query)
+        connection.execute(statement.on_conflict_do_update(index_elements=["cv_id"],
+                                                           set_={column: statement.excluded[column] for column in columns if column != "cv_id"}))
+
+    @staticmethod
+    def changed(instance, columns) -> bool:
+        state = inspect(instance)
+        return any(state.attrs[column].history.has_changes() for column in columns)
+
+    @staticmethod
+    def affected(session: Session) -> Set[int]:
+        #   Resumes whose overview row may differ after this flush
+        cv_ids, job_ids = set(), set()
+        for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+            columns = CandidateOverviewSync.tracked.get(type(instance))
+            if columns is None:
+                continue
+            if instance in session.dirty and not CandidateOverviewSync.changed(instance, columns):
+                continue
+            if isinstance(instance, model.Resume):
+                cv_ids.add(instance.id)
+            elif isinstance(instance, model.JobDescription):
+                #   A new job has no resume yet
+                if instance not in session.new:
+                    job_ids.add(instance.id)
+            else:
+                cv_ids.add(instance.cv_id)
+                #   A version or valuation moved to another resume leaves the previous one to refresh too
+                cv_ids.update(inspect(instance).attrs.cv_id.history.deleted or ())
+        if job_ids:
+            cv_ids.update(session.connection().execute(select(model.Resume.id).where(model.Resume.job_id.in_(job_ids))).scalars())
+        cv_ids.discard(None)
+        return cv_ids
+
+    @staticmethod
+    def after_flush(session: Session, flush_context):
+        CandidateOverviewSync.refresh(session.connection(), CandidateOverviewSync.affected(session))
+
+
+def track_changes():
+    """Keep candidate_overviews in sync with the flushes of every session (sync, or under an AsyncSession)"""
+    if not event.contains(OrmSession, "after_flush", CandidateOverviewSync.after_flush):
+        event.listen(OrmSession, "after_flush", CandidateOverviewSync.after_flush)
@@ -319,8 +319,7 @@ class General:
         return cv_result
     
     def background_send_email(input_data):
-        for recipient in input_data.values():
-            GoogleService.CONTENT_GOOGLE(recipient["content"], recipient["email"])
+        GoogleService.CONTENT_GOOGLE_BATCH((recipient["content"], recipient["email"]) for recipient in input_data.values())
         
     @staticmethod
     def get_jd_file(request, job_id, db_session):
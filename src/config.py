@@ -1,8 +1,14 @@
 
 import os
-from sqlmodel import SQLModel, Session
+from sqlmodel import Session
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import OperationalError
+from alembic import command
+from alembic.config import Config
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 from dotenv import load_dotenv
 
 
@@ -16,6 +22,7 @@ CV_SAVED_DIR = "static/resume/cv/uploaded_cvs"
 CV_PARSE_PROMPT = "src/postjob/resources/prompts/cv_parsing.txt"
 JD_PARSE_PROMPT = "src/postjob/resources/prompts/jd_parsing.txt"
 MATCHING_PROMPT = "src/postjob/resources/prompts/matching.txt"
+BATCH_MATCHING_PROMPT = "src/postjob/resources/prompts/batch_matching.txt"
 OPENAI_MODEL = "gpt-3.5-turbo-16k"
 CV_EXTRACTION_PATH = "static/resume/cv/extracted_cvs"
 JD_EXTRACTION_PATH = "static/job/extracted_jds"
@@ -26,27 +33,281 @@ MATCHING_DIR = "static/matching"
 JD_SAVED_TEMP_DIR = "static/job/temp"
 CV_SAVED_TEMP_DIR = "static/resume/cv/temp"
 PAYMENT_DIR = 'static/payment/user_trans'
+ALEMBIC_CONFIG = "alembic.ini"
+#   Postgres advisory lock key held while migrating
+MIGRATION_LOCK_KEY = 720141
 
 load_dotenv()
 DATABASE_URL = os.environ.get("DATABASE_URL")
 
+#   LLM client: max in-flight requests (process wide), keep-alive pool size and per-call timeout (seconds)
+OPENAI_MAX_CONCURRENCY = int(os.environ.get("OPENAI_MAX_CONCURRENCY", 8))
+OPENAI_POOL_SIZE = int(os.environ.get("OPENAI_POOL_SIZE", 16))
+OPENAI_TIMEOUT = float(os.environ.get("OPENAI_TIMEOUT", 90))
+#   GPT response cache: location, time-to-live (seconds), max number of kept responses and interval of the eviction sweeps (seconds)
+LLM_CACHE_DIR = os.environ.get("LLM_CACHE_DIR", "static/llm_cache")
+LLM_CACHE_TTL = int(os.environ.get("LLM_CACHE_TTL", 60 * 60 * 24 * 30))
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", 50000))
+LLM_CACHE_SWEEP_SECONDS = int(os.environ.get("LLM_CACHE_SWEEP_SECONDS", 600))
+#   Batch matching: prompt size budget (estimated tokens) and max number of resumes packed in one request
+MATCHING_BATCH_TOKEN_BUDGET = int(os.environ.get("MATCHING_BATCH_TOKEN_BUDGET", 9000))
+MATCHING_BATCH_MAX_SIZE = int(os.environ.get("MATCHING_BATCH_MAX_SIZE", 5))
+#   Local pre-scoring before GPT matching: a resume is rejected under the min score / skill overlap or over the max level distance
+PRESCORE_ENABLED = os.environ.get("PRESCORE_ENABLED", "true").lower() == "true"
+PRESCORE_MIN_SCORE = int(os.environ.get("PRESCORE_MIN_SCORE", 25))
+PRESCORE_MIN_SKILL_OVERLAP = float(os.environ.get("PRESCORE_MIN_SKILL_OVERLAP", 0.1))
+PRESCORE_MAX_LEVEL_DISTANCE = int(os.environ.get("PRESCORE_MAX_LEVEL_DISTANCE", 3))
+#   Max number of PDF texts / extraction JSONs memoized in each process
+TEXT_CACHE_SIZE = int(os.environ.get("TEXT_CACHE_SIZE", 256))
+#   PDF texts kept on disk (.text/ of each upload folder): age (seconds) and size (MB) limits, interval of the eviction sweeps (seconds)
+TEXT_CACHE_DISK_TTL = int(os.environ.get("TEXT_CACHE_DISK_TTL", 60 * 60 * 24 * 90))
+TEXT_CACHE_DISK_MAX_MB = int(os.environ.get("TEXT_CACHE_DISK_MAX_MB", 512))
+TEXT_CACHE_SWEEP_SECONDS = int(os.environ.get("TEXT_CACHE_SWEEP_SECONDS", 600))
+#   PDF extraction pool: processes (0 = one per core), max admitted documents, per-document timeout (seconds) and page limit
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", 0))
+PDF_QUEUE_SIZE = int(os.environ.get("PDF_QUEUE_SIZE", 64))
+PDF_TIMEOUT = float(os.environ.get("PDF_TIMEOUT", 30))
+PDF_MAX_PAGES = int(os.environ.get("PDF_MAX_PAGES", 20))
+#   Resume search index snapshot and how often (seconds) each worker pulls resumes written by the others
+SEARCH_INDEX_PATH = os.environ.get("SEARCH_INDEX_PATH", "static/search_index/resumes.pkl")
+SEARCH_INDEX_REFRESH_SECONDS = int(os.environ.get("SEARCH_INDEX_REFRESH_SECONDS", 30))
+#   Bulk ZIP ingestion: progress files, CVs processed at the same time, max PDFs per archive, max size (bytes) of one PDF
+#   and how often (seconds) the progress file is written while a batch runs
+BULK_INGEST_DIR = os.environ.get("BULK_INGEST_DIR", "static/resume/cv/bulk_uploads")
+BULK_INGEST_CONCURRENCY = int(os.environ.get("BULK_INGEST_CONCURRENCY", 4))
+BULK_INGEST_MAX_FILES = int(os.environ.get("BULK_INGEST_MAX_FILES", 500))
+BULK_INGEST_MAX_FILE_SIZE = int(os.environ.get("BULK_INGEST_MAX_FILE_SIZE", 20 * 1024 * 1024))
+BULK_INGEST_PROGRESS_SECONDS = float(os.environ.get("BULK_INGEST_PROGRESS_SECONDS", 2))
+#   Background jobs: queue DB (DATABASE_URL by default, a "sqlite:///..." URL works for tests), jobs run at once by a worker process,
+#   workers started inside each API process (0 = jobs only run in `python src/worker.py`) and idle poll interval (seconds)
+JOBQUEUE_DATABASE_URL = os.environ.get("JOBQUEUE_DATABASE_URL", DATABASE_URL)
+JOBQUEUE_CONCURRENCY = int(os.environ.get("JOBQUEUE_CONCURRENCY", 4))
+JOBQUEUE_INPROCESS_WORKERS = int(os.environ.get("JOBQUEUE_INPROCESS_WORKERS", 0))
+JOBQUEUE_POLL_SECONDS = float(os.environ.get("JOBQUEUE_POLL_SECONDS", 1))
+#   Job retries: attempts before a job fails, backoff base and cap (seconds), and how long (seconds) a job may stay locked by a lost worker
+JOBQUEUE_MAX_ATTEMPTS = int(os.environ.get("JOBQUEUE_MAX_ATTEMPTS", 3))
+JOBQUEUE_BACKOFF_SECONDS = int(os.environ.get("JOBQUEUE_BACKOFF_SECONDS", 10))
+JOBQUEUE_BACKOFF_MAX_SECONDS = int(os.environ.get("JOBQUEUE_BACKOFF_MAX_SECONDS", 600))
+JOBQUEUE_LOCK_TIMEOUT = int(os.environ.get("JOBQUEUE_LOCK_TIMEOUT", 900))
+#   List endpoints: max page size, and how long (seconds) / how many COUNT(*) totals are reused between page requests
+PAGINATION_MAX_LIMIT = int(os.environ.get("PAGINATION_MAX_LIMIT", 100))
+PAGINATION_COUNT_CACHE_SECONDS = int(os.environ.get("PAGINATION_COUNT_CACHE_SECONDS", 10))
+PAGINATION_COUNT_CACHE_SIZE = int(os.environ.get("PAGINATION_COUNT_CACHE_SIZE", 1024))
+#   SQL log: "off", "slow" (statements over SQL_SLOW_QUERY_MS), "sampled" (SQL_LOG_SAMPLE_RATE of the statements and the slow ones)
+#   or "all", with statements cut at SQL_LOG_MAX_CHARS. A request running more than SQL_QUERY_ALERT_COUNT statements is reported
+SQL_LOG_MODE = os.environ.get("SQL_LOG_MODE", "slow").lower()
+SQL_SLOW_QUERY_MS = float(os.environ.get("SQL_SLOW_QUERY_MS", 200))
+SQL_LOG_SAMPLE_RATE = float(os.environ.get("SQL_LOG_SAMPLE_RATE", 0.01))
+SQL_LOG_MAX_CHARS = int(os.environ.get("SQL_LOG_MAX_CHARS", 1000))
+SQL_QUERY_ALERT_COUNT = int(os.environ.get("SQL_QUERY_ALERT_COUNT", 50))
+#   Connection pool of each engine (per process): kept connections, extra ones under load, max wait for a connection (seconds),
+#   age (seconds) after which a connection is replaced, and liveness check on checkout
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "true").lower() == "true"
+#   Read replica for the read-only endpoints (unset = everything on DATABASE_URL). A client reads from the primary for
+#   REPLICA_READ_YOUR_WRITES_SECONDS after its own writes, and an unreachable replica is skipped for REPLICA_RETRY_SECONDS
+DATABASE_REPLICA_URL = os.environ.get("DATABASE_REPLICA_URL")
+REPLICA_READ_YOUR_WRITES_SECONDS = float(os.environ.get("REPLICA_READ_YOUR_WRITES_SECONDS", 5))
+REPLICA_RETRY_SECONDS = float(os.environ.get("REPLICA_RETRY_SECONDS", 30))
+#   Revoked JWTs kept in memory: how often (seconds) each worker pulls the logouts done on the others (a token revoked on
+#   another worker is accepted for up to that long), how often (seconds) expired entries are deleted, and the Bloom filter
+#   sizing (expected revoked tokens, false positive rate). Each sync reads the rows created in the last
+#   TOKEN_REVOCATION_SYNC_OVERLAP_SECONDS again: a logout committed after a later one (higher id) is still picked up
+TOKEN_REVOCATION_SYNC_SECONDS = float(os.environ.get("TOKEN_REVOCATION_SYNC_SECONDS", 5))
+TOKEN_REVOCATION_SYNC_OVERLAP_SECONDS = float(os.environ.get("TOKEN_REVOCATION_SYNC_OVERLAP_SECONDS", 60))
+TOKEN_REVOCATION_PRUNE_SECONDS = int(os.environ.get("TOKEN_REVOCATION_PRUNE_SECONDS", 3600))
+TOKEN_REVOCATION_BLOOM_CAPACITY = int(os.environ.get("TOKEN_REVOCATION_BLOOM_CAPACITY", 100000))
+TOKEN_REVOCATION_BLOOM_ERROR_RATE = float(os.environ.get("TOKEN_REVOCATION_BLOOM_ERROR_RATE", 0.001))
+#   Authenticated users cached by token: lifetime (seconds) of an entry, the staleness of a point balance, role or active
+#   flag changed by another worker, and max number of cached tokens per process
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.environ.get("PRINCIPAL_CACHE_TTL_SECONDS", 30))
+PRINCIPAL_CACHE_SIZE = int(os.environ.get("PRINCIPAL_CACHE_SIZE", 10000))
+#   Password hashing: bcrypt cost (a stored hash of another cost is replaced at the next login), threads hashing at once
+#   (0 = half the cores, the other requests of the worker keep the rest) and max hashes admitted (running + waiting).
+#   Each admitted hash holds a thread of the sync handlers' threadpool (40 tokens by default): the admission is capped
+#   at half of its tokens at startup, keep BCRYPT_QUEUE_SIZE below that
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", 12))
+BCRYPT_WORKERS = int(os.environ.get("BCRYPT_WORKERS", 0))
+BCRYPT_QUEUE_SIZE = int(os.environ.get("BCRYPT_QUEUE_SIZE", 16))
+#   Outgoing email server (STARTTLS, no login when SMTP_USER is empty: a local stand-in for tests), From address of the emails.
+#   The credentials come from the environment only
+#   and connect/command timeout (seconds)
+SMTP_HOST = os.environ.get("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", 587))
+SMTP_USER = os.environ.get("SMTP_USER")
+SMTP_PASSWORD = os.environ.get("SMTP_PASSWORD")
+SMTP_SENDER = os.environ.get("SMTP_SENDER", SMTP_USER or "noreply@sharecv.vn")
+SMTP_STARTTLS = os.environ.get("SMTP_STARTTLS", "true").lower() == "true"
+SMTP_TIMEOUT = float(os.environ.get("SMTP_TIMEOUT", 30))
+#   Email outbox: emails sent per claim, idle poll interval and how long (seconds) the SMTP connection stays open without
+#   email, attempts before an email fails, retry backoff base and cap (seconds), and how long (seconds) a lost sender keeps its claim
+EMAIL_OUTBOX_BATCH_SIZE = int(os.environ.get("EMAIL_OUTBOX_BATCH_SIZE", 20))
+EMAIL_OUTBOX_POLL_SECONDS = float(os.environ.get("EMAIL_OUTBOX_POLL_SECONDS", 1))
+EMAIL_OUTBOX_IDLE_SECONDS = float(os.environ.get("EMAIL_OUTBOX_IDLE_SECONDS", 60))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.environ.get("EMAIL_OUTBOX_MAX_ATTEMPTS", 5))
+EMAIL_OUTBOX_BACKOFF_SECONDS = int(os.environ.get("EMAIL_OUTBOX_BACKOFF_SECONDS", 30))
+EMAIL_OUTBOX_BACKOFF_MAX_SECONDS = int(os.environ.get("EMAIL_OUTBOX_BACKOFF_MAX_SECONDS", 3600))
+EMAIL_OUTBOX_LOCK_TIMEOUT = int(os.environ.get("EMAIL_OUTBOX_LOCK_TIMEOUT", 300))
+#   Email bodies: template directory, locale used when a template has no variant for the requested one, and front-end URL of the links
+EMAIL_TEMPLATE_DIR = os.environ.get("EMAIL_TEMPLATE_DIR", "src/postjob/resources/emails")
+EMAIL_DEFAULT_LOCALE = os.environ.get("EMAIL_DEFAULT_LOCALE", "vi")
+EMAIL_APP_URL = os.environ.get("EMAIL_APP_URL", "http://localhost:3000")
+
+
+def async_database_url(url: str):
+    #   Same database through an async driver: asyncpg for Postgres, aiosqlite for SQLite (tests, local runs)
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    for prefix in ("sqlite+pysqlite://", "sqlite://"):
+        if url.startswith(prefix):
+            return "sqlite+aiosqlite://" + url[len(prefix):]
+    #   The async handlers (authentication, listings) can't run without one: fail at startup, not on each request
+    raise ValueError(f"No async driver for the {url.split(':')[0]} database")
+
+
+def pool_options(url: str):
+    #   SQLite (tests) keeps the default pool of its dialect
+    if url.startswith("sqlite"):
+        return {}
+    return dict(pool_size=DB_POOL_SIZE,
+                max_overflow=DB_MAX_OVERFLOW,
+                pool_timeout=DB_POOL_TIMEOUT,
+                pool_recycle=DB_POOL_RECYCLE,
+                pool_pre_ping=DB_POOL_PRE_PING)
+
 
 class DatabaseSession:
 
     def __init__(self) -> None:
         self.session = None
         self.engine = None
+        self.async_engine = None
+        self.replica_engine = None
+        self.async_replica_engine = None
+
+    @staticmethod
+    def create_engines(url: str):
+        #   query_stats reads its settings from this module
+        from query_stats import instrument, TimedQueuePool, TimedAsyncQueuePool
+        options = pool_options(url)
+        engine = create_engine(url, poolclass=TimedQueuePool, **options) if options else create_engine(url)
+        instrument(engine)
+        async_url = async_database_url(url)
+        async_engine = create_async_engine(async_url, poolclass=TimedAsyncQueuePool, **options) if options else create_async_engine(async_url)
+        instrument(async_engine.sync_engine)
+        return engine, async_engine
 
     def init(self):
-        self.engine = create_engine(DATABASE_URL, echo=True)
+        from candidate_overview import track_changes
+        from principal_cache import track_changes as track_principal_changes
+        self.engine, self.async_engine = self.create_engines(DATABASE_URL)
+        #   Candidate listings read candidate_overviews, refreshed by the flushes that change a resume
+        track_changes()
+        #   Cached principals are dropped by the flushes that change their user
+        track_principal_changes()
+        if DATABASE_REPLICA_URL:
+            from replica import track_writes
+            self.replica_engine, self.async_replica_engine = self.create_engines(DATABASE_REPLICA_URL)
+            #   Writes on the primary keep their client on it for a while
+            track_writes(self.engine)
+            track_writes(self.async_engine.sync_engine)
         
-    def create_all(self):
-        SQLModel.metadata.create_all(self.engine)
+    def migrate(self):
+        #   Upgrade the schema to the latest migration (src/migrations), tables are no longer created from the models
+        alembic_config = Config(ALEMBIC_CONFIG)
+        #   Keep the logging setup of the app
+        alembic_config.attributes["configure_logger"] = False
+        if self.engine.dialect.name != "postgresql":
+            command.upgrade(alembic_config, "head")
+            return
+        #   API workers start together: one migrates, the others wait then find nothing to do
+        with self.engine.connect() as connection:
+            connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            try:
+                command.upgrade(alembic_config, "head")
+            finally:
+                connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+    def pool_status(self):
+        from query_stats import pool_status
+        engines = {
+            "sync": self.engine,
+            "async": self.async_engine.sync_engine if self.async_engine is not None else None,
+            "replica": self.replica_engine,
+            "async_replica": self.async_replica_engine.sync_engine if self.async_replica_engine is not None else None,
+        }
+        return {name: pool_status(engine) for name, engine in engines.items() if engine is not None}
+
+    def release(self, session: Session):
+        #   End the transaction before a slow external call (LLM) so that its connection goes back to the pool.
+        #   Loaded objects stay readable, the next query checks out a connection again
+        expire_on_commit = session.expire_on_commit
+        session.expire_on_commit = False
+        try:
+            self.commit_rollback(session)
+        finally:
+            session.expire_on_commit = expire_on_commit
 
     def get_session(self):
         with Session(self.engine) as session:
             yield session
 
+    async def get_async_session(self):
+        #   Sync service code runs on it with `await session.run_sync(fn)`: queries still go through asyncpg on the event loop.
+        #   Loaded objects stay readable after commit without another round-trip
+        async with AsyncSession(self.async_engine, expire_on_commit=False) as session:
+            yield session
+
+    def get_read_session(self):
+        #   Session of read-only handlers: on the replica, unless this client wrote recently or the replica is down
+        from replica import ReplicaRouter
+        if self.replica_engine is not None and ReplicaRouter.use_replica():
+            session = Session(self.replica_engine)
+            try:
+                session.connection()
+            except OperationalError as e:
+                session.close()
+                ReplicaRouter.mark_down(e)
+            else:
+                with session:
+                    yield session
+                return
+        with Session(self.engine) as session:
+            yield session
+
+    async def get_async_read_session(self):
+        from replica import ReplicaRouter
+        if self.async_replica_engine is not None and ReplicaRouter.use_replica():
+            session = AsyncSession(self.async_replica_engine, expire_on_commit=False)
+            try:
+                await session.connection()
+            except OperationalError as e:
+                await session.close()
+                ReplicaRouter.mark_down(e)
+            else:
+                async with session:
+                    yield session
+                return
+        async with AsyncSession(self.async_engine, expire_on_commit=False) as session:
+            yield session
+
+    def upsert(self, session: Session, table, rows, keys):
+        #   INSERT .. ON CONFLICT (keys) DO UPDATE the other columns, on Postgres and SQLite (a unique index covers the keys)
+        if not rows:
+            return
+        #   A statement may not update the same row twice: the last values of a key win
+        rows = list({tuple(row[key] for key in keys): row for row in rows}.values())
+        dialect = postgresql if session.get_bind().dialect.name == "postgresql" else sqlite
+        statement = dialect.insert(table)
+        values = {column: statement.excluded[column] for column in rows[0] if column not in keys}
+        if "updated_at" in table.c:
+            values["updated_at"] = func.now()
+        session.execute(statement.on_conflict_do_update(index_elements=keys, set_=values), rows)
+
     def commit_rollback(self, session: Session):
         try:
             session.commit()
@@ -54,4 +315,11 @@ class DatabaseSession:
             session.rollback()
             raise e
 
-db = DatabaseSession()
\ No newline at end of file
+    async def async_commit_rollback(self, session: AsyncSession):
+        try:
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            raise e
+
+db = DatabaseSession()
@@ -0,0 +1,298 @@
+import os
+import ssl
+import time
+import socket
+import asyncio
+import smtplib
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from typing import Dict, Iterable, List, Optional
+from sqlmodel import Session
+from sqlalchemy import select, update, insert, func, and_, or_
+from starlette.concurrency import run_in_threadpool
+import model
+from config import (db,
+                    SMTP_HOST,
+                    SMTP_PORT,
+                    SMTP_USER,
+                    SMTP_PASSWORD,
+                    SMTP_SENDER,
+                    SMTP_STARTTLS,
+                    SMTP_TIMEOUT,
+                    EMAIL_OUTBOX_BATCH_SIZE,
+                    EMAIL_OUTBOX_POLL_SECONDS,
+                    EMAIL_OUTBOX_IDLE_SECONDS,
+                    EMAIL_OUTBOX_MAX_ATTEMPTS,
+                    EMAIL_OUTBOX_BACKOFF_SECONDS,
+                    EMAIL_OUTBOX_BACKOFF_MAX_SECONDS,
+                    EMAIL_OUTBOX_LOCK_TIMEOUT)
+
+
+class SMTPConnection:
+    """One authenticated SMTP session reused for every email, opened on demand and reopened when the server drops it"""
+    def __init__(self):
+        self.server: Optional[smtplib.SMTP] = None
+        self.last_used = 0.0
+
+    def open(self):
+        server = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+        try:
+            server.ehlo()
+            if SMTP_STARTTLS:
+                server.starttls(context=ssl.create_default_context())
+                server.ehlo()
+            if SMTP_USER:
+                server.login(SMTP_USER, SMTP_PASSWORD)
+        except Exception:
+            server.close()
+            raise
+        self.server = server
+
+    def close(self):
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except Exception:
+            self.server.close()
+        self.server = None
+
+    def close_if_idle(self):
+        if self.server is not None and time.monotonic() - self.last_used > EMAIL_OUTBOX_IDLE_SECONDS:
+            self.close()
+
+    def send(self, message: EmailMessage):
+        reused = self.server is not None
+        if not reused:
+            self.open()
+        try:
+            self.server.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            #   Closed by the server while idle: once more on a new session
+            self.server = None
+            if not reused:
+                raise
+            self.open()
+            self.server.send_message(message)
+        except (OSError, smtplib.SMTPException) as e:
+            #   The session may be in the middle of a transaction, start over on the next email
+            if not isinstance(e, (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)):
+                self.close()
+            raise
+        self.last_used = time.monotonic()
+
+
+class OutboxStats:
+    """Sends of this process: counters and the latencies of the last emails"""
+    def __init__(self, keep: int = 1000):
+        self.lock = threading.Lock()
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.send_ms = deque(maxlen=keep)       #   SMTP time of an email
+        self.wait_ms = deque(maxlen=keep)       #   From due to claimed
+
+    def record(self, send_ms: Optional[float], wait_ms: float, outcome: str):
+        with self.lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            self.wait_ms.append(wait_ms)
+            if send_ms is not None:
+                self.send_ms.append(send_ms)
+
+    @staticmethod
+    def summary(values: Iterable[float]):
+        values = sorted(values)
+        if not values:
+            return {"mean": 0, "p95": 0, "max": 0}
+        return {"mean": round(sum(values) / len(values), 2),
+                "p95": round(values[max(0, int(len(values) * 0.95) - 1)], 2),
+                "max": round(values[-1], 2)}
+
+    def status(self):
+        with self.lock:
+            return {"sent": self.sent,
+                    "retried": self.retried,
+                    "failed": self.failed,
+                    "send_ms": self.summary(self.send_ms),
+                    "wait_ms": self.summary(self.wait_ms)}
+
+
+class EmailOutbox:
+    """
+    Outgoing emails, stored in the email_outbox table by the handlers and sent by a sender task of each API process.
+    A sender claims due emails by batch (SELECT .. FOR UPDATE SKIP LOCKED on Postgres, a guarded UPDATE elsewhere) and
+    sends them over one SMTP session kept open between batches, instead of a connection and a login per email.
+    Failed sends are retried with exponential backoff, refused recipients and missing attachments fail at once.
+    """
+    connection = SMTPConnection()
+    stats = OutboxStats()
+    sender_id = f"{socket.gethostname()}:{os.getpid()}"
+
+    @staticmethod
+    def enqueue_many(emails: List[Dict], max_attempts: int = EMAIL_OUTBOX_MAX_ATTEMPTS):
+        """Queue emails given as {"recipient", "subject", "body", "attachment" (optional path)}, in one insert"""
+        if not emails:
+            return
+        now = datetime.utcnow()
+        values = [{"recipient": email["recipient"],
+                   "subject": email["subject"],
+                   "body": email["body"],
+                   "attachment": email.get("attachment"),
+                   "status": "queued",
+                   "attempts": 0,
+                   "max_attempts": max_attempts,
+                   "next_run_at": now} for email in emails]
+        with Session(db.engine) as session:
+            session.execute(insert(model.OutboxEmail.__table__), values)
+            session.commit()
+
+    @staticmethod
+    def enqueue(recipient: str, subject: str, body: str, attachment: Optional[str] = None):
+        EmailOutbox.enqueue_many([{"recipient": recipient, "subject": subject, "body": body, "attachment": attachment}])
+
+    @staticmethod
+    def _stale(now: datetime):
+        #   Emails claimed by a sender silent for longer than the lock timeout
+        return and_(model.OutboxEmail.status == "sending", model.OutboxEmail.locked_at < now - timedelta(seconds=EMAIL_OUTBOX_LOCK_TIMEOUT))
+
+    @classmethod
+    def _claimable(cls, now: datetime):
+        #   Due queued emails, and stale claims with attempts left (claiming counts an attempt)
+        return or_(
+                and_(model.OutboxEmail.status == "queued", model.OutboxEmail.next_run_at <= now),
+                and_(cls._stale(now), model.OutboxEmail.attempts < model.OutboxEmail.max_attempts))
+
+    @classmethod
+    def claim(cls, limit: int = EMAIL_OUTBOX_BATCH_SIZE) -> List[model.OutboxEmail]:
+        """Lock the next due emails for this sender"""
+        with Session(db.engine) as session:
+            now = datetime.utcnow()
+            #   A sender lost during the last attempt of an email: failed, instead of sending forever
+            exhausted = session.execute(update(model.OutboxEmail)
+                                            .where(cls._stale(now), model.OutboxEmail.attempts >= model.OutboxEmail.max_attempts)
+                                            .values(status="failed", locked_by=None, error="Sender lost during the last attempt")
+                                            .execution_options(synchronize_session=False))
+            if exhausted.rowcount:
+                session.commit()
+            query = select(model.OutboxEmail.id).where(cls._claimable(now)).order_by(model.OutboxEmail.next_run_at, model.OutboxEmail.id).limit(limit)
+            if db.engine.dialect.name == "postgresql":
+                query = query.with_for_update(skip_locked=True)
+            email_ids = session.execute(query).scalars().all()
+            if not email_ids:
+                return []
+            #   Without row locks (SQLite) another sender may take some of them first: the guard leaves those out
+            session.execute(update(model.OutboxEmail)
+                                .where(model.OutboxEmail.id.in_(email_ids), cls._claimable(now))
+                                .values(status="sending",
+                                        attempts=model.OutboxEmail.attempts + 1,
+                                        locked_by=cls.sender_id,
+                                        locked_at=now)
+                                .execution_options(synchronize_session=False))
+            session.commit()
+            session.expire_on_commit = False
+            return session.execute(select(model.OutboxEmail)
+                                    .where(model.OutboxEmail.id.in_(email_ids),
+                                           model.OutboxEmail.status == "sending",
+                                           model.OutboxEmail.locked_by == cls.sender_id,
+                                           model.OutboxEmail.locked_at == now)
+                                    .order_by(model.OutboxEmail.id)).scalars().all()
+
+    @staticmethod
+    def build(email: model.OutboxEmail):
+        message = EmailMessage()
+        message["From"] = SMTP_SENDER
+        message["To"] = email.recipient
+        message["Subject"] = email.subject
+        message.set_content(email.body or "")
+        if email.attachment:
+            with open(email.attachment, "rb") as file:
+                message.add_attachment(file.read(), maintype="application", subtype="pdf", filename=os.path.basename(email.attachment))
+        return message
+
+    @staticmethod
+    def retriable(error: Exception):
+        #   Refused recipient, permanent (5xx) answer or missing attachment: the same email fails again
+        if isinstance(error, (smtplib.SMTPRecipientsRefused, FileNotFoundError)):
+            return False
+        if isinstance(error, smtplib.SMTPResponseException) and 500 <= error.smtp_code < 600 and not isinstance(error, smtplib.SMTPAuthenticationError):
+            return False
+        return True
+
+    @classmethod
+    def send_batch(cls) -> int:
+        """Claim and send one batch, return the number of emails claimed"""
+        emails = cls.claim()
+        now = datetime.utcnow()
+        sent, retry, failed = [], [], []
+        for email in emails:
+            wait_ms = max(0.0, (now - email.next_run_at).total_seconds() * 1000) if email.next_run_at else 0.0
+            start = time.perf_counter()
+            try:
+                cls.connection.send(cls.build(email))
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                if cls.retriable(e) and email.attempts < email.max_attempts:
+                    retry.append((email, error))
+                    cls.stats.record(None, wait_ms, "retried")
+                else:
+                    failed.append((email, error))
+                    cls.stats.record(None, wait_ms, "failed")
+                print(f" >>> Email {email.id} to {email.recipient} attempt {email.attempts}: {error}")
+                continue
+            sent.append(email.id)
+            cls.stats.record((time.perf_counter() - start) * 1000, wait_ms, "sent")
+        with Session(db.engine) as session:
+            finished_at = datetime.utcnow()
+            if sent:
+                session.execute(update(model.OutboxEmail)
+                                    .where(model.OutboxEmail.id.in_(sent))
+                                    .values(status="sent", locked_by=None, sent_at=finished_at, error=None)
+                                    .execution_options(synchronize_session=False))
+            for email, error in retry:
+                delay = min(EMAIL_OUTBOX_BACKOFF_MAX_SECONDS, EMAIL_OUTBOX_BACKOFF_SECONDS * 2 ** (email.attempts - 1))
+                session.execute(update(model.OutboxEmail)
+                                    .where(model.OutboxEmail.id == email.id)
+                                    .values(status="queued", locked_by=None, error=error, next_run_at=finished_at + timedelta(seconds=delay))
+                                    .execution_options(synchronize_session=False))
+            for email, error in failed:
+                session.execute(update(model.OutboxEmail)
+                                    .where(model.OutboxEmail.id == email.id)
+                                    .values(status="failed", locked_by=None, error=error)
+                                    .execution_options(synchronize_session=False))
+            session.commit()
+        return len(emails)
+
+    @classmethod
+    async def run_sender(cls):
+        """Drain the outbox until cancelled"""
+        print(f" >>> Email sender {cls.sender_id} started")
+        try:
+            while True:
+                try:
+                    claimed = await run_in_threadpool(cls.send_batch)
+                except Exception as e:
+                    print(f" >>> Email outbox unavailable: {e}")
+                    claimed = 0
+                if claimed:
+                    continue
+                await run_in_threadpool(cls.connection.close_if_idle)
+                await asyncio.sleep(EMAIL_OUTBOX_POLL_SECONDS)
+        finally:
+            cls.connection.close()
+
+    @classmethod
+    def metrics(cls):
+        """Queue depth by status (all processes) and the sends of this process"""
+        with Session(db.engine) as session:
+            counts = dict(session.execute(select(model.OutboxEmail.status, func.count()).group_by(model.OutboxEmail.status)).all())
+            due = session.execute(select(func.count()).where(model.OutboxEmail.status == "queued",
+                                                             model.OutboxEmail.next_run_at <= datetime.utcnow())).scalar()
+        return {"queued": counts.get("queued", 0),
+                "due": due,
+                "sending": counts.get("sending", 0),
+                "failed": counts.get("failed", 0),
+                "sent": counts.get("sent", 0),
+                "connected": cls.connection.server is not None,
+                "process": cls.stats.status()}
@@ -0,0 +1,76 @@
+import os
+import html
+import threading
+from string import Template
+from typing import Dict, Iterable, Optional, Tuple
+from config import EMAIL_TEMPLATE_DIR, EMAIL_DEFAULT_LOCALE, EMAIL_APP_URL
+
+
+class EmailTemplates:
+    """
+    Email bodies of src/postjob/resources/emails, compiled once per process into string.Template objects.
+    `<name>.<locale>.<html|txt>` is the variant of a template for a locale. `_<name>.<ext>` files are shared fragments
+    (layout, hotline, ...) pre-rendered into every template at load time, so a render only substitutes the values
+    of the email. Values are HTML-escaped in .html templates.
+    Several locales of an HTML template render as one bilingual email, separated by a rule, inside the _layout fragment.
+    """
+    lock = threading.Lock()
+    templates: Optional[Dict[Tuple[str, str], Template]] = None     #   (name, locale) -> compiled template
+    layout: Optional[Template] = None
+    html_names = set()                                              #   Templates written in HTML
+    static: Dict[Tuple[str, Tuple[str, ...]], str] = {}             #   Renders of templates without values
+
+    @staticmethod
+    def _read(path: str):
+        with open(path, "r", encoding="utf-8") as file:
+            return file.read()
+
+    @classmethod
+    def load(cls):
+        """Read and compile every template, fragments substituted (at the first render, or at startup)"""
+        with cls.lock:
+            if cls.templates is not None:
+                return
+            files = sorted(os.listdir(EMAIL_TEMPLATE_DIR))
+            fragments = {"app_url": EMAIL_APP_URL}
+            for filename in files:
+                if filename.startswith("_"):
+                    fragments[filename[1:].split(".")[0]] = cls._read(os.path.join(EMAIL_TEMPLATE_DIR, filename)).rstrip("\n")
+            templates = {}
+            for filename in files:
+                parts = filename.split(".")
+                if filename.startswith("_") or len(parts) != 3:
+                    continue
+                name, locale, _ = parts
+                #   Placeholders left after the fragments are the values of each email
+                source = Template(cls._read(os.path.join(EMAIL_TEMPLATE_DIR, filename)).rstrip("\n")).safe_substitute(fragments)
+                templates[(name, locale)] = Template(source)
+            cls.layout = Template(fragments.get("layout", "${content}"))
+            cls.html_names = {name for name, locale in templates if os.path.exists(os.path.join(EMAIL_TEMPLATE_DIR, f"{name}.{locale}.html"))}
+            cls.templates = templates
+            print(f" >>> Email templates loaded: {len(templates)} variants")
+
+    @classmethod
+    def get(cls, name: str, locale: str) -> Template:
+        if cls.templates is None:
+            cls.load()
+        template = cls.templates.get((name, locale)) or cls.templates.get((name, EMAIL_DEFAULT_LOCALE))
+        if template is None:
+            raise KeyError(f"No email template {name} for locale {locale}")
+        return template
+
+    @classmethod
+    def render(cls, template: str, locales: Iterable[str] = (EMAIL_DEFAULT_LOCALE,), **values):
+        """Body of the email `template` in these locales (one after the other)"""
+        locales = tuple(locales)
+        if not values and (template, locales) in cls.static:
+            return cls.static[(template, locales)]
+        variants = [cls.get(template, locale) for locale in locales]
+        is_html = template in cls.html_names
+        if is_html:
+            values = {key: html.escape(str(value)) for key, value in values.items()}
+        parts = [variant.substitute(values) for variant in variants]
+        body = cls.layout.substitute(content="\n        <hr>\n".join(parts)) if is_html else "\n".join(parts)
+        if not values:
+            cls.static[(template, locales)] = body
+        return body
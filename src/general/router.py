@@ -1,9 +1,12 @@
 import os, math
+from typing import Optional
 from config import db
 from sqlmodel import Session
 from fastapi import UploadFile
 from starlette.requests import Request
 from general import schema, service
+from pagination import Pagination
+from email_outbox import EmailOutbox
 from authentication import get_current_active_user
 from fastapi import APIRouter, status, Depends, Security, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -23,24 +26,19 @@ security_bearer = HTTPBearer()
 def list_interview_schedule(
                 limit: int, 
                 page_index: int,
-                db_session: Session = Depends(db.get_session),
+                cursor: Optional[str] = None,
+                db_session: Session = Depends(db.get_read_session),
                 credentials: HTTPAuthorizationCredentials = Security(security_bearer)):
     
     # Get curent active user
     _, current_user = get_current_active_user(db_session, credentials)
 
-    results = service.Recruiter.Resume.list_interview_schedule(db_session, current_user)
-     #   Pagination
-    total_items = len(results)
-    total_pages = math.ceil(total_items/limit)
+    page = Pagination(page_index, limit, cursor)
+    results, total_items = service.Recruiter.Resume.list_interview_schedule(page, db_session, current_user)
 
     return schema.CustomResponse(
                         message="List interview schedule successfully!",
-                        data={
-                            "total_items": total_items,
-                            "total_pages": total_pages,
-                            "item_lst": results[(page_index-1)*limit: (page_index-1)*limit + limit]
-                        }
+                        data=page.response(results, total_items)
     )
     
     
@@ -50,25 +48,19 @@ def list_interview_schedule(
 def transaction_history(
                 limit: int, 
                 page_index: int,
-                db_session: Session = Depends(db.get_session),
+                cursor: Optional[str] = None,
+                db_session: Session = Depends(db.get_read_session),
                 credentials: HTTPAuthorizationCredentials = Security(security_bearer)):
     
     # Get curent active user
     _, current_user = get_current_active_user(db_session, credentials)
 
-    user_point, results = service.Recruiter.Resume.transaction_history(db_session, current_user)
-     #   Pagination
-    total_items = len(results)
-    total_pages = math.ceil(total_items/limit)
+    page = Pagination(page_index, limit, cursor)
+    user_point, results, total_items = service.Recruiter.Resume.transaction_history(page, db_session, current_user)
 
     return schema.CustomResponse(
                         message="Get list transaction history successfully!",
-                        data={
-                            "total_items": total_items,
-                            "total_pages": total_pages,
-                            "wallet_point": user_point,
-                            "item_lst": results[(page_index-1)*limit: (page_index-1)*limit + limit]
-                        }
+                        data=page.response(results, total_items, wallet_point=user_point)
     )
     
     
@@ -84,24 +76,19 @@ def list_interview_schedule(
                 limit: int, 
                 page_index: int,
                 request: Request,
-                db_session: Session = Depends(db.get_session),
+                cursor: Optional[str] = None,
+                db_session: Session = Depends(db.get_read_session),
                 credentials: HTTPAuthorizationCredentials = Security(security_bearer)):
     
     # Get curent active user
     _, current_user = get_current_active_user(db_session, credentials)
 
-    results = service.Collaborator.Resume.list_interview_schedule(request, db_session, current_user)
-     #   Pagination
-    total_items = len(results)
-    total_pages = math.ceil(total_items/limit)
+    page = Pagination(page_index, limit, cursor)
+    results, total_items = service.Collaborator.Resume.list_interview_schedule(request, page, db_session, current_user)
 
     return schema.CustomResponse(
                         message="List interview schedule successfully!",
-                        data={
-                            "total_items": total_items,
-                            "total_pages": total_pages,
-                            "item_lst": results[(page_index-1)*limit: (page_index-1)*limit + limit]
-                        }
+                        data=page.response(results, total_items)
     )
     
     
@@ -111,25 +98,21 @@ def list_interview_schedule(
 def referral_histrory(
                 limit: int, 
                 page_index: int,
-                db_session: Session = Depends(db.get_session),
+                cursor: Optional[str] = None,
+                db_session: Session = Depends(db.get_read_session),
                 credentials: HTTPAuthorizationCredentials = Security(security_bearer)):    
     # Get curent active user
     _, current_user = get_current_active_user(db_session, credentials)
-    results = service.Collaborator.Resume.referral_history(db_session, current_user)
-     #   Pagination
-    total_items = len(results)
-    total_pages = math.ceil(total_items/limit)
+    page = Pagination(page_index, limit, cursor)
+    results, total_items = service.Collaborator.Resume.referral_history(page, db_session, current_user)
 
     return schema.CustomResponse(
                         message="Get referral history successfully!",
-                        data={
-                            "total_items": total_items,
-                            "total_pages": total_pages,
-                            "current_wallet_point": current_user.point,
-                            "max_drawed_point": current_user.point - current_user.warranty_point,
-                            "warranty_point": current_user.warranty_point,
-                            "referral_list": results[(page_index-1)*limit: (page_index-1)*limit + limit]
-                        }
+                        data=page.response(results, total_items,
+                                           current_wallet_point=current_user.point,
+                                           max_drawed_point=current_user.point - current_user.warranty_point,
+                                           warranty_point=current_user.warranty_point,
+                                           key="referral_list")
     )
     
     
@@ -156,22 +139,17 @@ def draw_point(
 def draw_history(
             page_index: int,
             limit: int,
-            db_session: Session = Depends(db.get_session),
+            cursor: Optional[str] = None,
+            db_session: Session = Depends(db.get_read_session),
             credentials: HTTPAuthorizationCredentials = Security(security_bearer)):    
     # Get curent active user
     _, current_user = get_current_active_user(db_session, credentials)
-    results = service.Collaborator.Resume.draw_history(db_session, current_user)
-     #   Pagination
-    total_items = len(results)
-    total_pages = math.ceil(total_items/limit)
+    page = Pagination(page_index, limit, cursor)
+    results, total_items = service.Collaborator.Resume.draw_history(page, db_session, current_user)
 
     return schema.CustomResponse(
                         message="List draw money history successfully!",
-                        data={
-                            "total_items": total_items,
-                            "total_pages": total_pages,
-                            "item_lst": results[(page_index-1)*limit: (page_index-1)*limit + limit]
-                        }
+                        data=page.response(results, total_items)
     )    
     
 
@@ -186,18 +164,13 @@ def list_interview_schedule(
                 limit: int, 
                 page_index: int,
                 request: Request,
-                db_session: Session = Depends(db.get_session)):
-    results = service.Admin.Resume.list_interview_schedule(request, db_session)
-     #   Pagination
-    total_items = len(results)
-    total_pages = math.ceil(total_items/limit)
+                cursor: Optional[str] = None,
+                db_session: Session = Depends(db.get_read_session)):
+    page = Pagination(page_index, limit, cursor)
+    results, total_items = service.Admin.Resume.list_interview_schedule(request, page, db_session)
     return schema.CustomResponse(
                         message="List interview schedule successfully!",
-                        data={
-                            "total_items": total_items,
-                            "total_pages": total_pages,
-                            "item_lst": results[(page_index-1)*limit: (page_index-1)*limit + limit]
-                        }
+                        data=page.response(results, total_items)
     )
     
 @router.get("/admin/purchase-point-history",
@@ -207,18 +180,13 @@ def purchase_point_history(
                 limit: int, 
                 page_index: int,
                 request: Request,
-                db_session: Session = Depends(db.get_session)):
-    results = service.Admin.Resume.purchase_point_history(request, db_session)
-     #   Pagination
-    total_items = len(results)
-    total_pages = math.ceil(total_items/limit)
+                cursor: Optional[str] = None,
+                db_session: Session = Depends(db.get_read_session)):
+    page = Pagination(page_index, limit, cursor)
+    results, total_items = service.Admin.Resume.purchase_point_history(request, page, db_session)
     return schema.CustomResponse(
                         message="Get list transaction successfully!",
-                        data={
-                            "total_items": total_items,
-                            "total_pages": total_pages,
-                            "item_lst": results[(page_index-1)*limit: (page_index-1)*limit + limit]
-                        }
+                        data=page.response(results, total_items)
     )
     
     
@@ -228,19 +196,14 @@ def purchase_point_history(
 def list_required_draw(
             page_index: int,
             limit: int,
-            db_session: Session = Depends(db.get_session)):
-    results = service.Admin.Resume.list_required_draw(db_session)
-     #   Pagination
-    total_items = len(results)
-    total_pages = math.ceil(total_items/limit)
+            cursor: Optional[str] = None,
+            db_session: Session = Depends(db.get_read_session)):
+    page = Pagination(page_index, limit, cursor)
+    results, total_items = service.Admin.Resume.list_required_draw(page, db_session)
 
     return schema.CustomResponse(
                         message="List draw money history successfully!",
-                        data={
-                            "total_items": total_items,
-                            "total_pages": total_pages,
-                            "item_lst": results[(page_index-1)*limit: (page_index-1)*limit + limit]
-                        }
+                        data=page.response(results, total_items)
     )
     
     
@@ -250,19 +213,14 @@ def list_required_draw(
 def list_required_draw(
             page_index: int,
             limit: int,
-            db_session: Session = Depends(db.get_session)):
-    results = service.Admin.Resume.list_required_draw(db_session)
-     #   Pagination
-    total_items = len(results)
-    total_pages = math.ceil(total_items/limit)
+            cursor: Optional[str] = None,
+            db_session: Session = Depends(db.get_read_session)):
+    page = Pagination(page_index, limit, cursor)
+    results, total_items = service.Admin.Resume.list_required_draw(page, db_session)
 
     return schema.CustomResponse(
                         message="List draw money history successfully!",
-                        data={
-                            "total_items": total_items,
-                            "total_pages": total_pages,
-                            "item_lst": results[(page_index-1)*limit: (page_index-1)*limit + limit]
-                        }
+                        data=page.response(results, total_items)
     )
     
     
@@ -314,6 +272,28 @@ def money_transfer_history(
     )
     
     
+@router.get("/admin/db-pool",
+             status_code=status.HTTP_200_OK, 
+             response_model=schema.CustomResponse)
+def db_pool_status():
+    #   No session here: the endpoint must answer even when the pool is exhausted
+    return schema.CustomResponse(
+                        message="Get database pool status successfully!",
+                        data=db.pool_status()
+    )
+
+
+
+@router.get("/admin/email-outbox",
+             status_code=status.HTTP_200_OK, 
+             response_model=schema.CustomResponse)
+def email_outbox_status():
+    return schema.CustomResponse(
+                        message="Get email outbox status successfully!",
+                        data=EmailOutbox.metrics()
+    )
+    
+    
 @router.post("/get-resume-status",
              status_code=status.HTTP_200_OK, 
              response_model=schema.CustomResponse)
@@ -6,6 +6,9 @@ from sqlmodel import Session, func, and_, or_, not_
 from sqlalchemy import select
 from fastapi import HTTPException, Request
 from postjob.gg_service.gg_service import GoogleService
+from pagination import Pagination, paginate
+from batch_loader import BatchLoader
+from read_models import Slim
 
 
 
@@ -80,8 +83,7 @@ class General:
     
     @staticmethod
     def background_send_email(input_data):
-        for recipient in input_data.values():
-            GoogleService.CONTENT_GOOGLE(recipient["content"], recipient["email"])
+        GoogleService.CONTENT_GOOGLE_BATCH((recipient["content"], recipient["email"]) for recipient in input_data.values())
         
     @staticmethod
     def get_jd_file(request, job_id, db_session):
@@ -117,30 +119,32 @@ class Recruiter:
     class Resume:
         
         @staticmethod
-        def list_interview_schedule(db_session: Session, current_user):
-            query = select(model.Resume, model.ResumeVersion, model.InterviewSchedule)  \
+        def list_interview_schedule(page: Pagination, db_session: Session, current_user):
+            query = select(Slim.Resume, Slim.ResumeVersion, Slim.InterviewSchedule)  \
                         .join(model.Resume, model.Resume.id == model.ResumeVersion.cv_id)   \
                         .outerjoin(model.InterviewSchedule, model.InterviewSchedule.candidate_id == model.ResumeVersion.cv_id)   \
                         .filter(model.InterviewSchedule.user_id == current_user.id)
-            results = db_session.execute(query).all()
+            #   A resume version is on one row per schedule (recruiter) of its candidate
+            results, total_items = paginate(db_session, query, page, model.ResumeVersion, tiebreak=(model.InterviewSchedule.user_id,))
+            loader = BatchLoader(db_session).prime("resume", [result.ResumeVersion.cv_id for result in results])
             return [{
                 "candidate_id": result.InterviewSchedule.candidate_id,
                 "candidate_name": result.ResumeVersion.name,
                 "job_title": result.ResumeVersion.current_job,
-                "job_service": General.get_job_from_resume(result.Resume.id, db_session).job_service if result.Resume.job_id else "SearchCV",
+                "job_service": loader.job_service(result.ResumeVersion.cv_id),
                 "status": result.ResumeVersion.status,
                 "interview_date": result.InterviewSchedule.date,
                 "interview_time": f"{result.InterviewSchedule.start_time} - {result.InterviewSchedule.end_time}",
                 "interview_location": result.InterviewSchedule.location
-            } for result in results]
+            } for result in results], total_items
             
             
         @staticmethod
-        def transaction_history(db_sessioin: Session, current_user):
-            query = select(model.TransactionHistory).where(model.TransactionHistory.user_id == current_user.id)
-            results = db_sessioin.execute(query).scalars().all()
-            user_point = db_sessioin.execute(select(model.User).where(model.User.id == current_user.id)).scalars().first()
-            return user_point.point, [{
+        def transaction_history(page: Pagination, db_sessioin: Session, current_user):
+            query = select(Slim.TransactionHistory).where(model.TransactionHistory.user_id == current_user.id)
+            results, total_items = paginate(db_sessioin, query, page, model.TransactionHistory, scalars=True)
+            user_point = db_sessioin.execute(select(model.User.point).where(model.User.id == current_user.id)).scalar()
+            return user_point, [{
                    "transation_id": result.id,
                    "point_package_name": result.point,
                    "price": result.price,
@@ -148,7 +152,7 @@ class Recruiter:
                    "total_price": result.total_price,
                    "transaction_form": result.transaction_form,
                    "transaction_date": result.created_at
-            } for result in results]
+            } for result in results], total_items
             
         
         
@@ -157,42 +161,50 @@ class Collaborator:
     class Resume:
         
         @staticmethod
-        def list_interview_schedule(request: Request, db_session: Session, current_user):
-            query = select(model.Resume, model.ResumeVersion, model.InterviewSchedule)  \
+        def list_interview_schedule(request: Request, page: Pagination, db_session: Session, current_user):
+            query = select(Slim.Resume, Slim.ResumeVersion, Slim.InterviewSchedule)  \
                         .join(model.Resume, model.Resume.id == model.ResumeVersion.cv_id)   \
                         .outerjoin(model.InterviewSchedule, model.InterviewSchedule.candidate_id == model.ResumeVersion.cv_id)   \
                         .filter(model.InterviewSchedule.collaborator_id == current_user.id)
-            results = db_session.execute(query).all()
+            #   A resume version is on one row per schedule (recruiter) of its candidate
+            results, total_items = paginate(db_session, query, page, model.ResumeVersion, tiebreak=(model.InterviewSchedule.user_id,))
+            loader = BatchLoader(db_session)    \
+                            .prime("resume", [result.ResumeVersion.cv_id for result in results])    \
+                            .prime("company_by_user", [result.InterviewSchedule.user_id for result in results])
             return [{
                 "candidate_id": result.InterviewSchedule.candidate_id,
-                "company_logo": os.path.join(str(request.base_url), General.get_company_from_interview(result.InterviewSchedule.user_id, db_session).logo),
-                "company_name": General.get_company_from_interview(result.InterviewSchedule.user_id, db_session).company_name,
+                "company_logo": os.path.join(str(request.base_url), loader.get("company_by_user", result.InterviewSchedule.user_id).logo),
+                "company_name": loader.get("company_by_user", result.InterviewSchedule.user_id).company_name,
                 "candidate_name": result.ResumeVersion.name,
                 "job_title": result.ResumeVersion.current_job,
-                "job_service": General.get_job_from_resume(result.Resume.id, db_session).job_service if result.Resume.job_id else "SearchCV",
+                "job_service": loader.job_service(result.ResumeVersion.cv_id),
                 "status": result.ResumeVersion.status,
                 "interview_date": result.InterviewSchedule.date,
                 "interview_time": f"{result.InterviewSchedule.start_time} - {result.InterviewSchedule.end_time}",
                 "interview_location": result.InterviewSchedule.location
-            } for result in results]
+            } for result in results], total_items
         
         @staticmethod
-        def referral_history(db_session: Session, current_user):
-            query = select(model.Resume, model.ResumeVersion)  \
+        def referral_history(page: Pagination, db_session: Session, current_user):
+            query = select(Slim.Resume, Slim.ResumeVersion)  \
                             .join(model.ResumeVersion, model.Resume.id == model.ResumeVersion.cv_id)    \
-                            .filter(model.User.id == current_user.id)
-            results = db_session.execute(query).all() 
-            if not results:
+                            .filter(model.Resume.user_id == current_user.id)
+            results, total_items = paginate(db_session, query, page, model.ResumeVersion) 
+            loader = BatchLoader(db_session)    \
+                            .prime("resume", [result.ResumeVersion.cv_id for result in results])    \
+                            .prime("package_by_resume", [result.ResumeVersion.cv_id for result in results])    \
+                            .prime("valuation_by_resume", [result.ResumeVersion.cv_id for result in results])
+            if not total_items:
                 raise HTTPException(status_code=404, detail="Could not find any referrals!")       
             return [{
-                'job_service': General.get_job_from_resume(result.Resume.id, db_session).job_service if result.Resume.job_id else "SearchCV",
-                'package_name': General.get_package_from_resume(result.Resume.id, db_session),
+                'job_service': loader.job_service(result.ResumeVersion.cv_id),
+                'package_name': getattr(loader.get("package_by_resume", result.ResumeVersion.cv_id), "package", None),
                 'candidate_name': result.ResumeVersion.name,
                 'job_name': result.ResumeVersion.current_job,
                 'industry': result.ResumeVersion.industry,
-                'point': General.get_valuation_from_resume(result.Resume.id, db_session),
+                'point': getattr(loader.get("valuation_by_resume", result.ResumeVersion.cv_id), "total_point", None),
                 'point_recieved_time': result.ResumeVersion.point_recieved_time,
-            } for result in results]
+            } for result in results], total_items
         
         @staticmethod
         def require_draw_point(data: schema.DrawMoney, db_session: Session, current_user):
@@ -205,15 +217,15 @@ class Collaborator:
             db.commit_rollback(db_session)
             
         @staticmethod
-        def draw_history(db_session: Session, current_user):
-            draw_results = db_session.execute(select(model.DrawHistory).where(model.DrawHistory.user_id == current_user.id)).scalars().all()
+        def draw_history(page: Pagination, db_session: Session, current_user):
+            draw_results, total_items = paginate(db_session, select(Slim.DrawHistory).where(model.DrawHistory.user_id == current_user.id), page, model.DrawHistory, scalars=True)
             return [{
                 "point": result.point,
                 "price": result.point*100000,
                 "transaction_form": result.transaction_form,
                 "created_at": result.created_at
                 
-            } for result in draw_results]
+            } for result in draw_results], total_items
             
             
         
@@ -223,50 +235,55 @@ class Admin:
     class Resume:
         
         @staticmethod
-        def list_interview_schedule(request: Request, db_session: Session):
-            query = select(model.Resume, model.ResumeVersion, model.InterviewSchedule)  \
+        def list_interview_schedule(request: Request, page: Pagination, db_session: Session):
+            query = select(Slim.Resume, Slim.ResumeVersion, Slim.InterviewSchedule)  \
                         .join(model.Resume, model.Resume.id == model.ResumeVersion.cv_id)   \
                         .filter(model.InterviewSchedule.candidate_id == model.ResumeVersion.cv_id)
-            results = db_session.execute(query).all()
+            #   A resume version is on one row per schedule (recruiter) of its candidate
+            results, total_items = paginate(db_session, query, page, model.ResumeVersion, tiebreak=(model.InterviewSchedule.user_id,))
+            loader = BatchLoader(db_session)    \
+                            .prime("company_by_user", [result.InterviewSchedule.user_id for result in results])    \
+                            .prime("user", [result.Resume.user_id for result in results])
             return [{
                 "candidate_id": result.InterviewSchedule.candidate_id,
-                "company_logo": os.path.join(str(request.base_url), General.get_company_from_interview(result.InterviewSchedule.user_id, db_session).logo),
-                "company_name": General.get_company_from_interview(result.InterviewSchedule.user_id, db_session).company_name,
-                "collaborator_name": db_session.execute(select(model.User).where(model.User.id==result.Resume.user_id)).scalars().first().fullname,
-                "collaborator_phone": db_session.execute(select(model.User).where(model.User.id==result.Resume.user_id)).scalars().first().phone,
+                "company_logo": os.path.join(str(request.base_url), loader.get("company_by_user", result.InterviewSchedule.user_id).logo),
+                "company_name": loader.get("company_by_user", result.InterviewSchedule.user_id).company_name,
+                "collaborator_name": loader.get("user", result.Resume.user_id).fullname,
+                "collaborator_phone": loader.get("user", result.Resume.user_id).phone,
                 "candidate_name": result.ResumeVersion.name,
                 "job_title": result.ResumeVersion.current_job,
                 "status": result.ResumeVersion.status,
                 "interview_date": result.InterviewSchedule.date,
                 "interview_time": f"{result.InterviewSchedule.start_time} - {result.InterviewSchedule.end_time}",
                 "interview_location": result.InterviewSchedule.location
-            } for result in results]
+            } for result in results], total_items
             
             
         @staticmethod
-        def purchase_point_history(request: Request, db_session: Session):
-            transactions = db_session.execute(select(model.TransactionHistory)).scalars().all()
-            if not transactions:
+        def purchase_point_history(request: Request, page: Pagination, db_session: Session):
+            transactions, total_items = paginate(db_session, select(Slim.TransactionHistory), page, model.TransactionHistory, scalars=True)
+            loader = BatchLoader(db_session).prime("company_by_user", [result.user_id for result in transactions])
+            if not total_items:
                 raise HTTPException(status_code=404, detail="Could not find any transactions!")        
             return [{
                 "transaction_id": result.id,
-                "company_logo": os.path.join(str(request.base_url), General.get_company_from_interview(result.user_id, db_session).logo),
-                "company_name": General.get_company_from_interview(result.user_id, db_session).company_name,
+                "company_logo": os.path.join(str(request.base_url), loader.get("company_by_user", result.user_id).logo),
+                "company_name": loader.get("company_by_user", result.user_id).company_name,
                 "point_package_name": result.point,
                 "price": result.price,
                 "quantity": result.quantity,
                 "total_price": result.total_price,
                 "transaction_form": result.transaction_form,
                 "transaction_date": result.created_at
-            } for result in transactions]
+            } for result in transactions], total_items
             
             
         @staticmethod
-        def list_required_draw(db_session: Session):
-            query = select(model.User, model.DrawHistory, model.Bank)   \
+        def list_required_draw(page: Pagination, db_session: Session):
+            query = select(Slim.User, Slim.DrawHistory, Slim.Bank)   \
                         .join(model.User, model.User.id == model.DrawHistory.user_id)   \
                         .outerjoin(model.Bank, model.User.id == model.Bank.user_id)
-            results = db_session.execute(query).all()
+            results, total_items = paginate(db_session, query, page, model.DrawHistory)
             return [{
                 "id": result.DrawHistory.id,
                 "account_info": [result.User.fullname, result.User.email, result.User.phone],
@@ -275,7 +292,7 @@ class Admin:
                 "price": result.DrawHistory.point*100000,
                 "created_at": result.DrawHistory.created_at,
                 "draw_status": result.DrawHistory.draw_status,
-            } for result in results]
+            } for result in results], total_items
             
         @staticmethod
         def cancel_required_draw(draw_id, db_session): 
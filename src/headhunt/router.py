@@ -1,11 +1,16 @@
-import os, math, json
+import os, json
+from typing import Optional
 from config import db
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from fastapi import UploadFile
 from starlette.requests import Request
 from headhunt import schema, service
-from authentication import get_current_active_user
-from fastapi import APIRouter, status, Depends, BackgroundTasks, Security, HTTPException
+from pagination import Pagination
+from authentication import get_current_active_user, get_current_active_user_async
+from jobqueue.service import JobQueue
+from config import JD_SAVED_TEMP_DIR, CV_SAVED_TEMP_DIR
+from fastapi import APIRouter, status, Depends, BackgroundTasks, Security, HTTPException, Header
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt
 
@@ -18,17 +23,20 @@ security_bearer = HTTPBearer()
 # ===========================================================
 
 @router.post("/recruiter/upload-jd",
-             status_code=status.HTTP_201_CREATED, 
+             status_code=status.HTTP_202_ACCEPTED, 
              response_model=schema.CustomResponse)
-def upload_jd(uploaded_file: UploadFile):
+def upload_jd(
+            uploaded_file: UploadFile,
+            idempotency_key: Optional[str] = Header(None)):
 
     if uploaded_file.content_type != 'application/pdf':
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Must be PDF file")
 
-    extracted_result, _ = service.Recruiter.Job.jd_parsing(uploaded_file)
+    #   Save file as temporarily, it is parsed by a job worker
+    job = JobQueue.enqueue_upload("headhunt.jd_parsing", {}, uploaded_file, JD_SAVED_TEMP_DIR, client_key=idempotency_key, temporary=True)
     return schema.CustomResponse(
-                    message="Extract JD successfully!",
-                    data=extracted_result
+                    message="JD is being extracted, poll the job for the result",
+                    data=JobQueue.info(job)
                 )
 
 
@@ -109,63 +117,51 @@ def is_active_job(data: schema.RecruitPauseJob, db_session: Session = Depends(db
 @router.post("/recruiter/list-job",
              status_code=status.HTTP_200_OK, 
              response_model=schema.CustomResponse)
-def list_created_job(
+async def list_created_job(
                 data: schema.RecruitListJob,
-                db_session: Session = Depends(db.get_session),
+                db_session: AsyncSession = Depends(db.get_async_read_session),
                 credentials: HTTPAuthorizationCredentials = Security(security_bearer)):
     
     # Get curent active user
-    _, current_user = get_current_active_user(db_session, credentials)
-
-    jobs = service.Recruiter.Job.list_created_job(data.is_draft, db_session, current_user)
+    _, current_user = await get_current_active_user_async(db_session, credentials)
 
-    total_items = len(jobs)
-    total_pages = math.ceil(total_items/data.limit)
+    page = Pagination(data.page_index, data.limit, data.cursor)
+    jobs, total_items = await db_session.run_sync(lambda session: service.Recruiter.Job.list_created_job(data.is_draft, page, session, current_user))
 
     return schema.CustomResponse(
                     message=None,
-                    data={
-                        "total_items": total_items,
-                        "total_pages": total_pages,
-                        "item_lst": jobs[(data.page_index-1)*data.limit: (data.page_index-1)*data.limit + data.limit]
-                    }
+                    data=page.response(jobs, total_items)
             )
     
     
 @router.post("/recruiter/list-candidate",
              status_code=status.HTTP_200_OK, 
              response_model=schema.CustomResponse)
-def list_candidate(
+async def list_candidate(
                 data: schema.RecruitListCandidate,
-                db_session: Session = Depends(db.get_session)):
-    results = service.Recruiter.Resume.list_candidate(data.state, db_session)
-     #   Pagination
-    total_items = len(results)
-    total_pages = math.ceil(total_items/data.limit)
+                db_session: AsyncSession = Depends(db.get_async_read_session)):
+    page = Pagination(data.page_index, data.limit, data.cursor)
+    results, total_items = await db_session.run_sync(lambda session: service.Recruiter.Resume.list_candidate(data.state, page, session))
 
     return schema.CustomResponse(
                         message="Get list candidate successfully!",
-                        data={
-                            "total_items": total_items,
-                            "total_pages": total_pages,
-                            "item_lst": results[(data.page_index-1)*data.limit: (data.page_index-1)*data.limit + data.limit]
-                        }
+                        data=page.response(results, total_items)
     )
     
     
 @router.post("/recruiter/get-detail-candidate",
              status_code=status.HTTP_200_OK, 
              response_model=schema.CustomResponse)
-def get_detail_candidate(
+async def get_detail_candidate(
                 request: Request,
                 data: schema.ResumeIndex,  # cv_id
-                db_session: Session = Depends(db.get_session),
+                db_session: AsyncSession = Depends(db.get_async_read_session),
                 credentials: HTTPAuthorizationCredentials = Security(security_bearer)):
     
     # Get curent active user
-    _, current_user = get_current_active_user(db_session, credentials)
+    _, current_user = await get_current_active_user_async(db_session, credentials)
 
-    jobs = service.Recruiter.Resume.get_detail_candidate(request, data.cv_id, db_session, current_user)
+    jobs = await db_session.run_sync(lambda session: service.Recruiter.Resume.get_detail_candidate(request, data.cv_id, session, current_user))
     return schema.CustomResponse(
                     message=None,
                     data=jobs
@@ -301,28 +297,21 @@ def get_candidate_reply_interview(
 @router.post("/collaborator/list-job",
              status_code=status.HTTP_200_OK, 
              response_model=schema.CustomResponse)
-def list_job(
+async def list_job(
         request: Request,
         data: schema.CollabListJob,
-        db_session: Session = Depends(db.get_session),
+        db_session: AsyncSession = Depends(db.get_async_read_session),
         credentials: HTTPAuthorizationCredentials = Security(security_bearer)):
     
     # Get curent active user
-    _, current_user = get_current_active_user(db_session, credentials)
-
-    results = service.Collaborator.Job.list_job(request, data.job_status, db_session, current_user)    
+    _, current_user = await get_current_active_user_async(db_session, credentials)
 
-    #   Pagination
-    total_items = len(results)
-    total_pages = math.ceil(total_items/data.limit)
+    page = Pagination(data.page_index, data.limit, data.cursor)
+    results, total_items = await db_session.run_sync(lambda session: service.Collaborator.Job.list_job(request, data.job_status, page, session, current_user))
 
     return schema.CustomResponse(
                         message="Get list job successfully!",
-                        data={
-                            "total_items": total_items,
-                            "total_pages": total_pages,
-                            "item_lst": results[(data.page_index-1)*data.limit: (data.page_index-1)*data.limit + data.limit]
-                        }
+                        data=page.response(results, total_items)
     )
 
 
@@ -377,16 +366,19 @@ def get_general_info(
 
 #   Add preliminary information to the table
 @router.post("/collaborator/add-candidate",
-             status_code=status.HTTP_201_CREATED, 
+             status_code=status.HTTP_202_ACCEPTED, 
              response_model=schema.CustomResponse)
 def add_candidate(
-        background_task: BackgroundTasks,
         data_form: schema.AddCandidate = Depends(schema.AddCandidate.as_form),
-        db_session: Session = Depends(db.get_session)):
-    result = service.Collaborator.Resume.add_candidate(background_task, data_form, db_session)
-    return schema.CustomResponse(
-                    message="Add candidate successfully",
-                    data=result
+        idempotency_key: Optional[str] = Header(None)):
+    #   PDF uploaded file validation        
+    if data_form.cv_pdf.content_type != 'application/pdf':
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Must be PDF file") 
+    #   Save CV file as temporary, it is parsed by a job worker
+    job = JobQueue.enqueue_upload("headhunt.add_candidate", {}, data_form.cv_pdf, CV_SAVED_TEMP_DIR, client_key=idempotency_key, temporary=True)
+    return schema.CustomResponse(
+                    message="Candidate is being extracted, poll the job for the result",
+                    data=JobQueue.info(job)
     )
 
 #   Get information filled from User => Check duplicate (by email & phone) => Save to DB 
@@ -505,11 +497,11 @@ def get_resume_valuate(
 @router.put("/collaborator/update-resume-valuate",
              status_code=status.HTTP_200_OK, 
              response_model=schema.CustomResponse)
-def update_resume_valuate(
+async def update_resume_valuate(
                     data: schema.UpdateResumeValuation,
                     db_session: Session = Depends(db.get_session)):
 
-    result = service.Collaborator.Resume.update_valuate(data, db_session)
+    result = await service.Collaborator.Resume.update_valuate(data, db_session)
     return schema.CustomResponse(
                     message="Resume re-valuated successfully",
                     data={
@@ -526,49 +518,27 @@ def update_resume_valuate(
 
 
 @router.post("/collaborator/resume-matching",
-             status_code=status.HTTP_201_CREATED, 
+             status_code=status.HTTP_202_ACCEPTED, 
              response_model=schema.CustomResponse)
 def resume_matching(
         data: schema.ResumeIndex,
-        background_task: BackgroundTasks,
+        idempotency_key: Optional[str] = Header(None),
         db_session: Session = Depends(db.get_session),
         credentials: HTTPAuthorizationCredentials = Security(security_bearer)):
     
     # Get curent active user
     _, current_user = get_current_active_user(db_session, credentials)
 
-    matching_result, saved_dir, cv_id = service.Collaborator.Resume.cv_jd_matching(data.cv_id, db_session, background_task, current_user)
+    #   GPT matching runs in a job worker, a retried request gets the same job
+    task = "headhunt.resume_matching"
+    job = JobQueue.enqueue(
+                    task,
+                    {"cv_id": data.cv_id, "user_id": current_user.id},
+                    user_id=current_user.id,
+                    idempotency_key=JobQueue.make_key(task, current_user.id, idempotency_key, f"cv:{data.cv_id}"))
     return schema.CustomResponse(
-                    message="CV-JD matching completed.",
-                    data={
-                        "resume id": cv_id,
-                        "match data": {
-                            "job_title": {
-                                    "score": matching_result["job_title"]["score"],
-                                    "explanation": matching_result["job_title"]["explanation"]
-                                },
-                            "experience": {
-                                    "score": matching_result["experience"]["score"],
-                                    "explanation": matching_result["experience"]["explanation"]
-                                },
-                            "skill": {
-                                    "score": matching_result["skill"]["score"],
-                                    "explanation": matching_result["skill"]["explanation"]
-                                },
-                            "education": {
-                                    "score": matching_result["education"]["score"],
-                                    "explanation": matching_result["education"]["explanation"]
-                                },
-                            "orientation": {
-                                    "score": matching_result["orientation"]["score"],
-                                    "explanation": matching_result["orientation"]["explanation"]
-                                },
-                            "overall": {
-                                    "score": matching_result["overall"]["score"],
-                                    "explanation": matching_result["overall"]["explanation"]
-                                }
-                        }       
-                    }
+                    message="CV-JD matching queued, poll the job for the result",
+                    data=JobQueue.info(job)
     )
 
 
@@ -611,39 +581,33 @@ def get_matching_result(
 @router.post("/collaborator/list-candidate",
              status_code=status.HTTP_201_CREATED, 
              response_model=schema.CustomResponse)
-def list_candidate(
+async def list_candidate(
             data: schema.CollabListResume,
-            db_session: Session = Depends(db.get_session),
+            db_session: AsyncSession = Depends(db.get_async_read_session),
             credentials: HTTPAuthorizationCredentials = Security(security_bearer)):
     
     
     # Get curent active user
-    _, current_user = get_current_active_user(db_session, credentials)
-
-    results = service.Collaborator.Resume.list_candidate(data.is_draft, db_session, current_user)
+    _, current_user = await get_current_active_user_async(db_session, credentials)
 
-    total_items = len(results)
-    total_pages = math.ceil(total_items/data.limit)
+    page = Pagination(data.page_index, data.limit, data.cursor)
+    results, total_items = await db_session.run_sync(lambda session: service.Collaborator.Resume.list_candidate(data.is_draft, page, session, current_user))
 
     return schema.CustomResponse(
                     message=None,
-                    data={
-                        "total_items": total_items,
-                        "total_pages": total_pages,
-                        "item_lst": results[(data.page_index-1)*data.limit: (data.page_index-1)*data.limit + data.limit]
-                    }
+                    data=page.response(results, total_items)
             )
     
     
 @router.post("/collaborator/get-detail-candidate",
              status_code=status.HTTP_200_OK, 
              response_model=schema.CustomResponse)
-def get_detailed_candidate(
+async def get_detailed_candidate(
                 request: Request,
                 data: schema.ResumeIndex,
-                db_session: Session = Depends(db.get_session)):
+                db_session: AsyncSession = Depends(db.get_async_read_session)):
 
-    resume_info = service.Collaborator.Resume.get_detail_candidate(request, data.cv_id, db_session)
+    resume_info = await db_session.run_sync(lambda session: service.Collaborator.Resume.get_detail_candidate(request, data.cv_id, session))
     return schema.CustomResponse(
                     message="Get resume information successfully!",
                     data=resume_info
@@ -698,23 +662,17 @@ def reschedule(data: schema.Reschedule, db_session: Session = Depends(db.get_ses
 @router.post("/admin/list-job",
              status_code=status.HTTP_200_OK, 
              response_model=schema.CustomResponse)
-def list_job_status(
+async def list_job_status(
                 request: Request,
                 data: schema.AdminListJob,
-                db_session: Session = Depends(db.get_session)):
+                db_session: AsyncSession = Depends(db.get_async_read_session)):
     
-    jobs = service.Admin.Job.list_job_status(request, data.job_status, db_session)  
-    #   Pagination
-    total_items = len(jobs)
-    total_pages = math.ceil(total_items/data.limit)
+    page = Pagination(data.page_index, data.limit, data.cursor)
+    jobs, total_items = await db_session.run_sync(lambda session: service.Admin.Job.list_job_status(request, data.job_status, page, session))
 
     return schema.CustomResponse(
                         message="Get list job successfully!",
-                        data={
-                            "total_items": total_items,
-                            "total_pages": total_pages,
-                            "item_lst": jobs[(data.page_index-1)*data.limit: (data.page_index-1)*data.limit + data.limit]
-                        }
+                        data=page.response(jobs, total_items)
     )
     
 
@@ -789,23 +747,16 @@ def edit_job_info(
              status_code=status.HTTP_200_OK, 
              response_model=schema.CustomResponse,
              summary="Admin views resume valuation results.")
-def list_candidate(
+async def list_candidate(
             data: schema.AdminListCandidate,
-            db_session: Session = Depends(db.get_session)):
-
-    results = service.Admin.Resume.list_candidate(data.candidate_status, db_session)
+            db_session: AsyncSession = Depends(db.get_async_read_session)):
 
-    #   Pagination
-    total_items = len(results)
-    total_pages = math.ceil(total_items/data.limit)
+    page = Pagination(data.page_index, data.limit, data.cursor)
+    results, total_items = await db_session.run_sync(lambda session: service.Admin.Resume.list_candidate(data.candidate_status, page, session))
 
     return schema.CustomResponse(
                         message="Get list job successfully!",
-                        data={
-                            "total_items": total_items,
-                            "total_pages": total_pages,
-                            "item_lst": results[(data.page_index-1)*data.limit: (data.page_index-1)*data.limit + data.limit]
-                        }
+                        data=page.response(results, total_items)
     )
     
     
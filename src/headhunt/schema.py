@@ -173,6 +173,7 @@ class CandidateState(str, Enum):
 class RecruitListCandidate(BaseModel):
     page_index: int
     limit: int
+    cursor: Optional[str] = None
     state: CandidateState
     
     
@@ -996,27 +997,32 @@ class ResumeValuateResult(BaseModel):
 class RecruitListJob(BaseModel):
     page_index: int
     limit: int 
+    cursor: Optional[str] = None
     is_draft: bool
 
 
 class CollabListResume(BaseModel):
     page_index: int
     limit: int 
+    cursor: Optional[str] = None
     is_draft: bool
 
 class CollabListJob(BaseModel):
     page_index: int
     limit: int
+    cursor: Optional[str] = None
     job_status: CollaborateJobStatus
 
 class AdminListJob(BaseModel):
     page_index: int
     limit: int
+    cursor: Optional[str] = None
     job_status: JobStatus
 
 class AdminListCandidate(BaseModel):
     page_index: int
     limit: int
+    cursor: Optional[str] = None
     candidate_status: CandidateStatus
 
 
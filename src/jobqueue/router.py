@@ -0,0 +1,55 @@
+from typing import Optional
+from config import db
+from sqlmodel import Session
+from jobqueue import schema
+from jobqueue.service import JobQueue
+from authentication import get_current_active_user
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi import APIRouter, status, Depends, Security, HTTPException
+
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+#   Jobs enqueued by anonymous endpoints (JD upload) are polled without a token
+security_bearer = HTTPBearer(auto_error=False)
+
+
+def get_user_id(db_session: Session, credentials: Optional[HTTPAuthorizationCredentials]):
+    if credentials is None:
+        return None
+    _, current_user = get_current_active_user(db_session, credentials)
+    return current_user.id
+
+
+@router.get("/{job_id}",
+             status_code=status.HTTP_200_OK, 
+             response_model=schema.CustomResponse)
+def get_job_status(
+            job_id: str,
+            db_session: Session = Depends(db.get_session),
+            credentials: Optional[HTTPAuthorizationCredentials] = Security(security_bearer)):
+    
+    job = JobQueue.get(job_id, get_user_id(db_session, credentials))
+    return schema.CustomResponse(
+                    message="Get job status successfully",
+                    data=JobQueue.info(job)
+                )
+
+
+@router.get("/{job_id}/result",
+             status_code=status.HTTP_200_OK, 
+             response_model=schema.CustomResponse)
+def get_job_result(
+            job_id: str,
+            db_session: Session = Depends(db.get_session),
+            credentials: Optional[HTTPAuthorizationCredentials] = Security(security_bearer)):
+    
+    job = JobQueue.get(job_id, get_user_id(db_session, credentials))
+    if job.status == schema.JobStatus.failed:
+        #   Same error as the endpoint would have answered synchronously
+        raise HTTPException(status_code=job.result["status_code"], detail=job.result["detail"])
+    if job.status != schema.JobStatus.succeeded:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Job is not finished yet!")
+    return schema.CustomResponse(
+                    message="Get job result successfully",
+                    data=job.result
+                )
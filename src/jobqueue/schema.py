@@ -0,0 +1,33 @@
+from datetime import datetime
+from typing import Optional, Any
+from enum import Enum
+from pydantic import BaseModel
+
+
+class CustomResponse(BaseModel):
+    message: str = None
+    data: Any = None
+
+
+class JobStatus(str, Enum):
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
+
+class JobPriority(int, Enum):
+    low = 0
+    normal = 5
+    high = 10
+
+
+class JobInfo(BaseModel):
+    job_id: str
+    task: str
+    status: JobStatus
+    attempts: int
+    created_at: Optional[datetime]
+    next_run_at: Optional[datetime]
+    finished_at: Optional[datetime]
+    error: Optional[str]
@@ -0,0 +1,341 @@
+import os
+import uuid
+import hashlib
+import socket
+import asyncio
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from sqlmodel import Session
+from sqlalchemy import create_engine, select, update, and_, or_
+from sqlalchemy.exc import IntegrityError
+from fastapi import HTTPException, UploadFile, status
+from starlette.concurrency import run_in_threadpool
+import model
+from jobqueue import schema
+from postjob.api_service.extraction_service import Extraction
+from postjob.db_service.db_service import DatabaseService
+from query_stats import instrument
+from config import (db,
+                    DATABASE_URL,
+                    JOBQUEUE_DATABASE_URL,
+                    JOBQUEUE_CONCURRENCY,
+                    JOBQUEUE_POLL_SECONDS,
+                    JOBQUEUE_MAX_ATTEMPTS,
+                    JOBQUEUE_BACKOFF_SECONDS,
+                    JOBQUEUE_BACKOFF_MAX_SECONDS,
+                    JOBQUEUE_LOCK_TIMEOUT)
+
+
+class JobQueue:
+    """
+    Durable job queue stored in the background_jobs table.
+    API handlers `enqueue` a task and answer with the job id, worker processes (`python src/worker.py`) claim due jobs
+    by priority, run the registered task and store its result. A job is claimed with SELECT .. FOR UPDATE SKIP LOCKED
+    on Postgres and with a compare-and-set UPDATE elsewhere (SQLite), failed attempts are retried with exponential backoff.
+    """
+    engine = None
+    tasks: Dict[str, Callable[[Dict[str, Any], Session], Awaitable[Any]]] = {}
+    #   (job id, worker id) of the job run by the current task
+    current: ContextVar[Optional[Tuple[int, str]]] = ContextVar("current_job", default=None)
+
+    @classmethod
+    def init(cls):
+        if cls.engine is not None:
+            return
+        if JOBQUEUE_DATABASE_URL == DATABASE_URL:
+            cls.engine = db.engine
+        else:
+            cls.engine = create_engine(JOBQUEUE_DATABASE_URL)
+            instrument(cls.engine)
+        #   The queue DB may be a separate one, create the table there too
+        model.BackgroundJob.__table__.create(cls.engine, checkfirst=True)
+
+    @classmethod
+    def session(cls):
+        cls.init()
+        return Session(cls.engine)
+
+    @classmethod
+    def task(cls, name: str):
+        """Register `async def handler(payload, db_session)` as the task `name`"""
+        def register(handler):
+            cls.tasks[name] = handler
+            return handler
+        return register
+
+    @classmethod
+    def enqueue(cls,
+                task: str,
+                payload: Dict[str, Any],
+                user_id: Optional[int] = None,
+                priority: int = schema.JobPriority.normal,
+                idempotency_key: Optional[str] = None,
+                max_attempts: int = JOBQUEUE_MAX_ATTEMPTS):
+        """Add a job, or return the job already enqueued with the same idempotency key (a failed one is queued again)"""
+        with cls.session() as session:
+            if idempotency_key:
+                job = session.execute(select(model.BackgroundJob).where(model.BackgroundJob.idempotency_key == idempotency_key)).scalars().first()
+                if job:
+                    if job.status == schema.JobStatus.failed:
+                        cls._requeue(job, session)
+                    return job
+            job = model.BackgroundJob(
+                                public_id=uuid.uuid4().hex,
+                                task=task,
+                                payload=payload,
+                                user_id=user_id,
+                                priority=int(priority),
+                                status=schema.JobStatus.queued,
+                                max_attempts=max_attempts,
+                                next_run_at=datetime.utcnow(),
+                                idempotency_key=idempotency_key)
+            session.add(job)
+            try:
+                session.commit()
+            except IntegrityError:
+                #   The same key was enqueued concurrently
+                session.rollback()
+                return session.execute(select(model.BackgroundJob).where(model.BackgroundJob.idempotency_key == idempotency_key)).scalars().one()
+            session.refresh(job)
+            return job
+
+    @staticmethod
+    def make_key(task: str, user_id: Optional[int], client_key: Optional[str], content: str):
+        """Idempotency key: the client one (Idempotency-Key header) if given, else derived from what the job works on"""
+        digest = hashlib.sha256()
+        for part in (task, str(user_id), client_key or content):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    @classmethod
+    def enqueue_upload(cls,
+                       task: str,
+                       payload: Dict[str, Any],
+                       upload: UploadFile,
+                       directory: str,
+                       user_id: Optional[int] = None,
+                       client_key: Optional[str] = None,
+                       priority: int = schema.JobPriority.high,
+                       temporary: bool = False):
+        """
+        Save an uploaded file in directory and enqueue its processing, the same file uploaded again maps to the same job.
+        The payload gets the cleaned client name ("filename") and the name the file is saved under ("saved_filename"):
+        a temporary copy is consumed (removed) by its job, so each upload gets its own; a kept file is named after its
+        content, uploads of the same content share it.
+        """
+        filename = DatabaseService.clean_filename(upload.filename)
+        temp_path = os.path.join(directory, f".{uuid.uuid4().hex}.part")
+        digest = hashlib.sha256()
+        with open(temp_path, "wb") as file:
+            for chunk in iter(lambda: upload.file.read(1 << 20), b""):
+                digest.update(chunk)
+                file.write(chunk)
+        content_hash = digest.hexdigest()
+        saved_filename = (uuid.uuid4().hex if temporary else content_hash[:12]) + "_" + filename
+        saved_path = os.path.join(directory, saved_filename)
+        os.replace(temp_path, saved_path)
+        #   Text extraction doesn't need to read the file again for its hash
+        Extraction.hash_cache.put(Extraction.file_key(saved_path), content_hash)
+        job = cls.enqueue(task,
+                          dict(payload, filename=filename, saved_filename=saved_filename),
+                          user_id,
+                          priority,
+                          cls.make_key(task, user_id, client_key, filename + ":" + content_hash))
+        if temporary and job.payload.get("saved_filename") != saved_filename:
+            #   An earlier upload has the job, and its own copy: nothing will consume (and remove) this one
+            os.remove(saved_path)
+        return job
+
+    @staticmethod
+    def _requeue(job: model.BackgroundJob, session: Session):
+        job.status = schema.JobStatus.queued
+        job.attempts = 0
+        job.error = None
+        job.result = None
+        job.finished_at = None
+        job.next_run_at = datetime.utcnow()
+        session.commit()
+        session.refresh(job)
+
+    @classmethod
+    def get(cls, public_id: str, user_id: Optional[int] = None):
+        with cls.session() as session:
+            job = session.execute(select(model.BackgroundJob).where(model.BackgroundJob.public_id == public_id)).scalars().first()
+        #   Jobs of a user are only visible to that user
+        if not job or (job.user_id is not None and job.user_id != user_id):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job doesn't exist!")
+        return job
+
+    @staticmethod
+    def info(job: model.BackgroundJob):
+        return schema.JobInfo(
+                    job_id=job.public_id,
+                    task=job.task,
+                    status=job.status,
+                    attempts=job.attempts,
+                    created_at=job.created_at,
+                    next_run_at=job.next_run_at,
+                    finished_at=job.finished_at,
+                    error=job.error)
+
+    @staticmethod
+    def _claimable(now: datetime):
+        #   Due queued jobs, and running jobs whose worker has been silent longer than the lock timeout
+        return or_(
+                and_(model.BackgroundJob.status == schema.JobStatus.queued, model.BackgroundJob.next_run_at <= now),
+                and_(model.BackgroundJob.status == schema.JobStatus.running, model.BackgroundJob.locked_at < now - timedelta(seconds=JOBQUEUE_LOCK_TIMEOUT)))
+
+    @classmethod
+    def claim(cls, worker_id: str):
+        """Lock the next due job for this worker, None when the queue is empty"""
+        order = (model.BackgroundJob.priority.desc(), model.BackgroundJob.next_run_at, model.BackgroundJob.id)
+        with cls.session() as session:
+            now = datetime.utcnow()
+            if cls.engine.dialect.name == "postgresql":
+                job = session.execute(select(model.BackgroundJob)
+                                        .where(cls._claimable(now))
+                                        .order_by(*order)
+                                        .limit(1)
+                                        .with_for_update(skip_locked=True)).scalars().first()
+                if not job:
+                    return None
+                job.status = schema.JobStatus.running
+                job.attempts += 1
+                job.locked_by = worker_id
+                job.locked_at = now
+                session.commit()
+                session.refresh(job)
+                return job
+            #   No row locks: pick a candidate then take it only if nobody changed it in between
+            for _ in range(5):
+                job_id = session.execute(select(model.BackgroundJob.id).where(cls._claimable(now)).order_by(*order).limit(1)).scalar()
+                if job_id is None:
+                    return None
+                claimed = session.execute(update(model.BackgroundJob)
+                                            .where(model.BackgroundJob.id == job_id, cls._claimable(now))
+                                            .values(status=schema.JobStatus.running,
+                                                    attempts=model.BackgroundJob.attempts + 1,
+                                                    locked_by=worker_id,
+                                                    locked_at=now))
+                session.commit()
+                if claimed.rowcount == 1:
+                    return session.get(model.BackgroundJob, job_id)
+            return None
+
+    @classmethod
+    def heartbeat(cls, job_id: int, worker_id: str):
+        """Extend the lock of a long running job, False when it was taken over by another worker"""
+        with cls.session() as session:
+            extended = session.execute(update(model.BackgroundJob)
+                                            .where(model.BackgroundJob.id == job_id,
+                                                   model.BackgroundJob.status == schema.JobStatus.running,
+                                                   model.BackgroundJob.locked_by == worker_id)
+                                            .values(locked_at=datetime.utcnow())
+                                            .execution_options(synchronize_session=False))
+            session.commit()
+            return extended.rowcount == 1
+
+    @classmethod
+    async def keep_alive(cls):
+        """Heartbeat of the job run by the calling task (tasks that may outlive JOBQUEUE_LOCK_TIMEOUT call it regularly)"""
+        current = cls.current.get()
+        if current is None:
+            return True
+        return await run_in_threadpool(cls.heartbeat, *current)
+
+    @classmethod
+    def complete(cls, job_id: int, worker_id: str, result: Any):
+        """Store the result, unless the lock expired and the job was claimed again meanwhile (False then)"""
+        with cls.session() as session:
+            completed = session.execute(update(model.BackgroundJob)
+                                            .where(model.BackgroundJob.id == job_id,
+                                                   model.BackgroundJob.status == schema.JobStatus.running,
+                                                   model.BackgroundJob.locked_by == worker_id)
+                                            .values(status=schema.JobStatus.succeeded,
+                                                    result=result,
+                                                    error=None,
+                                                    locked_by=None,
+                                                    finished_at=datetime.utcnow())
+                                            .execution_options(synchronize_session=False))
+            session.commit()
+            return completed.rowcount == 1
+
+    @classmethod
+    def fail(cls, job_id: int, worker_id: str, status_code: int, detail: str, retry: bool):
+        """Queue the job again or mark it failed, None when another worker holds it now"""
+        with cls.session() as session:
+            query = select(model.BackgroundJob).where(model.BackgroundJob.id == job_id,
+                                                      model.BackgroundJob.status == schema.JobStatus.running,
+                                                      model.BackgroundJob.locked_by == worker_id)
+            if cls.engine.dialect.name == "postgresql":
+                query = query.with_for_update()
+            job = session.execute(query).scalars().first()
+            if job is None:
+                return None
+            job.error = detail
+            job.result = {"status_code": status_code, "detail": detail}
+            job.locked_by = None
+            if retry and job.attempts < job.max_attempts:
+                job.status = schema.JobStatus.queued
+                job.next_run_at = datetime.utcnow() + timedelta(seconds=min(JOBQUEUE_BACKOFF_MAX_SECONDS, JOBQUEUE_BACKOFF_SECONDS * 2 ** (job.attempts - 1)))
+            else:
+                job.status = schema.JobStatus.failed
+                job.finished_at = datetime.utcnow()
+            session.commit()
+            return job.status
+
+    @classmethod
+    async def run_job(cls, job: model.BackgroundJob):
+        worker_id = job.locked_by
+        handler = cls.tasks.get(job.task)
+        if handler is None:
+            await run_in_threadpool(cls.fail, job.id, worker_id, status.HTTP_500_INTERNAL_SERVER_ERROR, f"Unknown task {job.task}", False)
+            return
+        if job.attempts > job.max_attempts:
+            #   Reclaimed after its worker was lost on the last attempt
+            await run_in_threadpool(cls.fail, job.id, worker_id, status.HTTP_500_INTERNAL_SERVER_ERROR, "Job was interrupted!", False)
+            return
+        #   Tasks run their queries through run_in_threadpool, closing the session (connection back to the pool) too
+        db_session = Session(db.engine)
+        cls.current.set((job.id, worker_id))
+        try:
+            result = await handler(job.payload, db_session)
+        except HTTPException as e:
+            #   Client errors (bad file, duplicate, ...) won't get better with a retry
+            job_status = await run_in_threadpool(cls.fail, job.id, worker_id, e.status_code, str(e.detail), e.status_code >= 500)
+            print(f" >>> Job {job.public_id} ({job.task}) attempt {job.attempts}: {e.detail} => {job_status or 'lock lost'}")
+            return
+        except Exception as e:
+            job_status = await run_in_threadpool(cls.fail, job.id, worker_id, status.HTTP_500_INTERNAL_SERVER_ERROR, "Job failed!", True)
+            print(f" >>> Job {job.public_id} ({job.task}) attempt {job.attempts}: {e!r} => {job_status or 'lock lost'}")
+            return
+        finally:
+            await run_in_threadpool(db_session.close)
+        if await run_in_threadpool(cls.complete, job.id, worker_id, result):
+            print(f" >>> Job {job.public_id} ({job.task}) succeeded")
+        else:
+            #   Ran longer than JOBQUEUE_LOCK_TIMEOUT: the result of the worker holding it now is kept
+            print(f" >>> Job {job.public_id} ({job.task}) finished after its lock was taken over, result dropped")
+
+    @classmethod
+    async def run_slot(cls, worker_id: str):
+        while True:
+            try:
+                job = await run_in_threadpool(cls.claim, worker_id)
+            except Exception as e:
+                print(f" >>> Job queue unavailable: {e}")
+                job = None
+            if job is None:
+                await asyncio.sleep(JOBQUEUE_POLL_SECONDS)
+                continue
+            await cls.run_job(job)
+
+    @classmethod
+    async def run_worker(cls, concurrency: int = JOBQUEUE_CONCURRENCY):
+        """Run `concurrency` jobs at a time until cancelled"""
+        cls.init()
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        print(f" >>> Job worker {worker_id} started ({concurrency} slots, tasks: {', '.join(sorted(cls.tasks))})")
+        await asyncio.gather(*[cls.run_slot(f"{worker_id}:{slot}") for slot in range(concurrency)])
@@ -0,0 +1,90 @@
+from typing import Any, Dict
+from sqlmodel import Session
+from fastapi import BackgroundTasks
+from starlette.concurrency import run_in_threadpool
+from jobqueue.service import JobQueue
+from postjob import service as postjob_service
+from headhunt import service as headhunt_service
+from searchcv import service as searchcv_service
+from searchcv.bulk_ingestion import BulkIngestion
+
+
+#   Tasks run by the job workers, registered by name on import.
+#   A task gets the JSON payload given to `JobQueue.enqueue` and a DB session, and returns the JSON result of the job.
+#   Tasks run on the event loop of the worker (of the API with JOBQUEUE_INPROCESS_WORKERS): queries go through run_in_threadpool.
+
+def matching_response(matching_result: Dict[str, Any], cv_id: int):
+    return {
+        "resume id": cv_id,
+        "match data": {
+            field: {
+                "score": matching_result[field]["score"],
+                "explanation": matching_result[field]["explanation"]
+            } for field in ("job_title", "experience", "skill", "education", "orientation", "overall")
+        }
+    }
+
+
+async def resume_matching(service, payload: Dict[str, Any], db_session: Session):
+    current_user = await run_in_threadpool(service.AuthRequestRepository.get_user_by_id, db_session, payload["user_id"])
+    #   Emails queued by the matching are sent once it is done
+    background_task = BackgroundTasks()
+    matching_result, _, cv_id = await service.Collaborator.Resume.cv_jd_matching(payload["cv_id"], db_session, background_task, current_user)
+    await background_task()
+    return matching_response(matching_result, cv_id)
+
+
+@JobQueue.task("postjob.resume_matching")
+async def postjob_resume_matching(payload: Dict[str, Any], db_session: Session):
+    return await resume_matching(postjob_service, payload, db_session)
+
+
+@JobQueue.task("headhunt.resume_matching")
+async def headhunt_resume_matching(payload: Dict[str, Any], db_session: Session):
+    return await resume_matching(headhunt_service, payload, db_session)
+
+
+@JobQueue.task("postjob.jd_parsing")
+async def postjob_jd_parsing(payload: Dict[str, Any], db_session: Session):
+    extracted_result, _ = await postjob_service.Recruiter.Job.jd_parsing(payload["filename"], payload["saved_filename"])
+    return extracted_result
+
+
+@JobQueue.task("headhunt.jd_parsing")
+async def headhunt_jd_parsing(payload: Dict[str, Any], db_session: Session):
+    extracted_result, _ = await headhunt_service.Recruiter.Job.jd_parsing(payload["filename"], payload["saved_filename"])
+    return extracted_result
+
+
+@JobQueue.task("postjob.add_candidate")
+async def postjob_add_candidate(payload: Dict[str, Any], db_session: Session):
+    return await postjob_service.Collaborator.Resume.add_candidate(payload["filename"], payload["saved_filename"], db_session)
+
+
+@JobQueue.task("headhunt.add_candidate")
+async def headhunt_add_candidate(payload: Dict[str, Any], db_session: Session):
+    return await headhunt_service.Collaborator.Resume.add_candidate(payload["filename"], payload["saved_filename"], db_session)
+
+
+@JobQueue.task("searchcv.jd_parsing")
+async def searchcv_jd_parsing(payload: Dict[str, Any], db_session: Session):
+    current_user = await run_in_threadpool(searchcv_service.AuthRequestRepository.get_user_by_id, db_session, payload["user_id"])
+    _, job_db = await searchcv_service.Recruiter.Job.jd_parsing(payload["saved_filename"], db_session, current_user)
+    return {"job_id": job_db.id}
+
+
+@JobQueue.task("searchcv.cv_parsing")
+async def searchcv_cv_parsing(payload: Dict[str, Any], db_session: Session):
+    current_user = await run_in_threadpool(searchcv_service.AuthRequestRepository.get_user_by_id, db_session, payload["user_id"])
+    _, version_db = await searchcv_service.Collaborator.Resume.cv_parsing(payload["industry"], payload["saved_filename"], db_session, current_user)
+    #   Resume valuation, the front-end shows it temporarily to the user
+    valuate_result = await run_in_threadpool(searchcv_service.Collaborator.Resume.resume_valuate, version_db, db_session)
+    return {
+        "cv_id": version_db.cv_id,
+        "valuate_result": valuate_result
+    }
+
+
+@JobQueue.task("searchcv.bulk_upload")
+async def searchcv_bulk_upload(payload: Dict[str, Any], db_session: Session):
+    return await BulkIngestion.run(payload["batch_id"], payload["zip_path"], payload["industry"], payload["user_id"])
@@ -1,7 +1,20 @@
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from config import db
+from config import db, JOBQUEUE_INPROCESS_WORKERS
+from query_stats import query_stats_middleware
+from replica import client_key_middleware
+import asyncio
+from starlette.concurrency import run_in_threadpool
+from postjob.api_service.openai_service import OpenAIService
+from postjob.api_service.pdf_service import PDFExtractionService
+from searchcv.search_index import SearchIndex
+from token_revocation import TokenRevocations
+from auth.security import PasswordHasher
+from email_outbox import EmailOutbox
+from email_templates import EmailTemplates
+from jobqueue.service import JobQueue
+import jobqueue.tasks
 from auth.router import router as auth_router 
 from postjob.router import router as postjob_router 
 from money2point.router import router as money2point_router
@@ -9,6 +22,7 @@ from searchcv.router import router as searchcv_router
 from company.router import router as company_router
 from headhunt.router import router as headhunt_router
 from general.router import router as general_router
+from jobqueue.router import router as jobqueue_router
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi_events.middleware import EventHandlerASGIMiddleware
@@ -27,13 +41,46 @@ def init_app():
         allow_origins=["*"],
         allow_credentials=True,
         allow_methods=["*"],
-        allow_headers=["*"]
+        allow_headers=["*"],
+        expose_headers=["X-DB-Queries", "X-DB-Time-Ms"]
     )
+    app.middleware("http")(query_stats_middleware)
+    if db.replica_engine is not None:
+        app.middleware("http")(client_key_middleware)
 
     # Start the app
     @app.on_event("startup")
-    def on_startup():
-        db.create_all()
+    async def on_startup():
+        await run_in_threadpool(db.migrate)
+        await OpenAIService.startup()
+        PDFExtractionService.startup()
+        PasswordHasher.startup()
+        EmailTemplates.load()
+        await run_in_threadpool(SearchIndex.startup)
+        app.state.search_index_refresher = asyncio.create_task(SearchIndex.run_refresher())
+        await run_in_threadpool(TokenRevocations.startup)
+        app.state.token_revocation_refresher = asyncio.create_task(TokenRevocations.run_refresher())
+        #   Each API process drains the email outbox over its own SMTP session
+        app.state.email_sender = asyncio.create_task(EmailOutbox.run_sender())
+        await run_in_threadpool(JobQueue.init)
+        #   Jobs normally run in `python src/worker.py` processes, a worker can also live in the API process
+        app.state.job_worker = asyncio.create_task(JobQueue.run_worker(JOBQUEUE_INPROCESS_WORKERS)) if JOBQUEUE_INPROCESS_WORKERS else None
+
+    @app.on_event("shutdown")
+    async def on_shutdown():
+        await OpenAIService.shutdown()
+        PDFExtractionService.shutdown()
+        PasswordHasher.shutdown()
+        app.state.search_index_refresher.cancel()
+        app.state.token_revocation_refresher.cancel()
+        app.state.email_sender.cancel()
+        if app.state.job_worker:
+            app.state.job_worker.cancel()
+        SearchIndex.save()
+        if db.async_engine is not None:
+            await db.async_engine.dispose()
+        if db.async_replica_engine is not None:
+            await db.async_replica_engine.dispose()
    
     app.include_router(auth_router)
     app.include_router(company_router)
@@ -42,14 +89,17 @@ def init_app():
     app.include_router(headhunt_router)
     app.include_router(general_router)
     app.include_router(money2point_router)
+    app.include_router(jobqueue_router)
     
     return app
 
 
-app = init_app()
-app.mount("/static", StaticFiles(directory="static"), name="static")
-app.add_middleware(EventHandlerASGIMiddleware, 
-                   handlers=[local_handler])  
+#   The PDF pool processes ("spawn") import the main module again as __mp_main__: no app (engines, routers) in them
+if __name__ != "__mp_main__":
+    app = init_app()
+    app.mount("/static", StaticFiles(directory="static"), name="static")
+    app.add_middleware(EventHandlerASGIMiddleware, 
+                       handlers=[local_handler])  
 
 if __name__ == '__main__':    
     uvicorn.run(
@@ -0,0 +1,453 @@
+"""Baseline: the tables as created by db.create_all() before migrations
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-18 17:54:02.553908
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    #   Databases created by db.create_all() already have these tables: they are only stamped with this revision
+    if not context.is_offline_mode() and sa.inspect(op.get_bind()).has_table('users'):
+        return
+    op.create_table('background_jobs',
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=True),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('error', sa.TEXT(), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('public_id', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('task', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('priority', sa.Integer(), nullable=False),
+    sa.Column('status', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('next_run_at', sa.DateTime(), nullable=True),
+    sa.Column('locked_by', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('locked_at', sa.DateTime(), nullable=True),
+    sa.Column('idempotency_key', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('idempotency_key'),
+    sa.UniqueConstraint('public_id')
+    )
+    op.create_index('ix_background_jobs_claim', 'background_jobs', ['status', 'priority', 'next_run_at'], unique=False)
+    op.create_table('blacklisted_jwt',
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('token', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('token')
+    )
+    op.create_table('point_packages',
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('point', sa.Integer(), nullable=True),
+    sa.Column('price', sa.Float(), nullable=True),
+    sa.Column('currency', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('users',
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('address', sa.TEXT(), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('fullname', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('email', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('phone', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('role', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('point', sa.Float(), nullable=False),
+    sa.Column('warranty_point', sa.Float(), nullable=False),
+    sa.Column('avatar', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('country', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('city', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('password', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('last_signed_in', sa.DateTime(), nullable=True),
+    sa.Column('refresh_token', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=True),
+    sa.Column('otp_token', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('is_verify', sa.Boolean(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('is_verify_forgot_password', sa.Boolean(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('banks',
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('bank_name', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('branch_name', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('account_owner', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('account_number', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('companies',
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('description', sa.TEXT(), nullable=True),
+    sa.Column('address', sa.TEXT(), nullable=True),
+    sa.Column('company_images', postgresql.ARRAY(sa.String()), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('company_name', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('industry', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('phone', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('email', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('founded_year', sa.Integer(), nullable=True),
+    sa.Column('company_size', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('tax_code', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('city', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('country', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('logo', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('cover_image', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('company_video', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('linkedin', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('website', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('facebook', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('instagram', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('draw_histories',
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('point', sa.Integer(), nullable=True),
+    sa.Column('transaction_form', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('draw_status', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('transaction_histories',
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('point', sa.Integer(), nullable=True),
+    sa.Column('price', sa.Float(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('total_price', sa.Float(), nullable=False),
+    sa.Column('transaction_form', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('transaction_otp', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('job_descriptions',
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('industries', postgresql.ARRAY(sa.String()), nullable=True),
+    sa.Column('skills', postgresql.ARRAY(sa.String()), nullable=True),
+    sa.Column('descriptions', sa.TEXT(), nullable=True),
+    sa.Column('requirements', sa.TEXT(), nullable=True),
+    sa.Column('benefits', sa.TEXT(), nullable=True),
+    sa.Column('levels', postgresql.ARRAY(sa.String()), nullable=True),
+    sa.Column('roles', postgresql.ARRAY(sa.String()), nullable=True),
+    sa.Column('admin_decline_reason', sa.TEXT(), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('company_id', sa.Integer(), nullable=True),
+    sa.Column('status', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('job_service', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('job_title', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('gender', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('job_type', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('received_job_time', sa.DateTime(), nullable=True),
+    sa.Column('working_time', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('yoe', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('num_recruit', sa.Integer(), nullable=True),
+    sa.Column('min_salary', sa.Float(), nullable=True),
+    sa.Column('max_salary', sa.Float(), nullable=True),
+    sa.Column('currency', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('address', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('city', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('country', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('headhunt_point', sa.Integer(), nullable=True),
+    sa.Column('correspone_price', sa.Float(), nullable=True),
+    sa.Column('warranty_time', sa.Integer(), nullable=True),
+    sa.Column('jd_file', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('is_draft', sa.Boolean(), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('is_admin_approved', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('collab_job_joins',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('job_id', sa.Integer(), nullable=False),
+    sa.Column('is_favorite', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['job_id'], ['job_descriptions.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'job_id')
+    )
+    op.create_table('job_educations',
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('job_id', sa.Integer(), nullable=True),
+    sa.Column('degree', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('major', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('gpa', sa.Float(), nullable=True),
+    sa.Column('start_time', sa.DateTime(), nullable=True),
+    sa.Column('end_time', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['job_id'], ['job_descriptions.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('language_job_certificates',
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('job_id', sa.Integer(), nullable=True),
+    sa.Column('certificate_language', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('certificate_name', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('certificate_point_level', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('start_time', sa.DateTime(), nullable=True),
+    sa.Column('end_time', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['job_id'], ['job_descriptions.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('other_job_certificates',
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('job_id', sa.Integer(), nullable=True),
+    sa.Column('certificate_name', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('certificate_point_level', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('start_time', sa.DateTime(), nullable=True),
+    sa.Column('end_time', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['job_id'], ['job_descriptions.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('resumes',
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('job_id', sa.Integer(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['job_id'], ['job_descriptions.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('interview_schedules',
+    sa.Column('location', sa.TEXT(), nullable=True),
+    sa.Column('note', sa.TEXT(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('candidate_id', sa.Integer(), nullable=False),
+    sa.Column('collaborator_id', sa.Integer(), nullable=True),
+    sa.Column('date', sa.DateTime(), nullable=True),
+    sa.Column('start_time', sa.Time(), nullable=True),
+    sa.Column('end_time', sa.Time(), nullable=True),
+    sa.ForeignKeyConstraint(['candidate_id'], ['resumes.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'candidate_id')
+    )
+    op.create_table('language_resume_certificates',
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('cv_id', sa.Integer(), nullable=True),
+    sa.Column('certificate_language', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('certificate_name', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('certificate_point_level', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('start_time', sa.DateTime(), nullable=True),
+    sa.Column('end_time', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['cv_id'], ['resumes.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('matching_results',
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('title_explain', sa.TEXT(), nullable=True),
+    sa.Column('exper_explain', sa.TEXT(), nullable=True),
+    sa.Column('skill_explain', sa.TEXT(), nullable=True),
+    sa.Column('education_explain', sa.TEXT(), nullable=True),
+    sa.Column('orientation_explain', sa.TEXT(), nullable=True),
+    sa.Column('overall_explain', sa.TEXT(), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('job_id', sa.Integer(), nullable=True),
+    sa.Column('cv_id', sa.Integer(), nullable=True),
+    sa.Column('title_score', sa.Integer(), nullable=True),
+    sa.Column('exper_score', sa.Integer(), nullable=True),
+    sa.Column('skill_score', sa.Integer(), nullable=True),
+    sa.Column('education_score', sa.Integer(), nullable=True),
+    sa.Column('orientation_score', sa.Integer(), nullable=True),
+    sa.Column('overall_score', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['cv_id'], ['resumes.id'], ),
+    sa.ForeignKeyConstraint(['job_id'], ['job_descriptions.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('other_resume_certificates',
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('cv_id', sa.Integer(), nullable=True),
+    sa.Column('certificate_name', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('certificate_point_level', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('start_time', sa.DateTime(), nullable=True),
+    sa.Column('end_time', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['cv_id'], ['resumes.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('recruit_resume_joins',
+    sa.Column('decline_reason', sa.TEXT(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('resume_id', sa.Integer(), nullable=False),
+    sa.Column('package', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('is_rejected', sa.Boolean(), nullable=False),
+    sa.Column('remain_warantty_time', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['resume_id'], ['resumes.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'resume_id')
+    )
+    op.create_table('resume_versions',
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('skills', postgresql.ARRAY(sa.String()), nullable=True),
+    sa.Column('address', sa.TEXT(), nullable=True),
+    sa.Column('descriptions', sa.TEXT(), nullable=True),
+    sa.Column('objectives', postgresql.ARRAY(sa.String()), nullable=True),
+    sa.Column('matching_decline_reason', sa.TEXT(), nullable=True),
+    sa.Column('interview_decline_reason', sa.TEXT(), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('cv_id', sa.Integer(), nullable=True),
+    sa.Column('filename', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('is_lastest', sa.Boolean(), nullable=False),
+    sa.Column('cv_file', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('name', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('avatar', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('level', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('gender', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('industry', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('current_job', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('email', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('phone', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('city', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('country', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('birthday', sa.DateTime(), nullable=True),
+    sa.Column('identification_code', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('linkedin', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('website', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('facebook', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('instagram', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('status', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('is_draft', sa.Boolean(), nullable=False),
+    sa.Column('is_ai_matched', sa.Boolean(), nullable=False),
+    sa.Column('point_recieved_time', sa.DateTime(), nullable=True),
+    sa.Column('point_draw_status', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.ForeignKeyConstraint(['cv_id'], ['resumes.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('identification_code')
+    )
+    op.create_table('valuation_infos',
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('degrees', postgresql.ARRAY(sa.String()), nullable=True),
+    sa.Column('certificates', postgresql.ARRAY(sa.String()), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('cv_id', sa.Integer(), nullable=True),
+    sa.Column('hard_item', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('hard_point', sa.Float(), nullable=True),
+    sa.Column('degree_point', sa.Float(), nullable=True),
+    sa.Column('certificates_point', sa.Float(), nullable=True),
+    sa.Column('total_point', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['cv_id'], ['resumes.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('resume_awards',
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('description', sa.TEXT(), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('cv_id', sa.Integer(), nullable=True),
+    sa.Column('name', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('time', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.ForeignKeyConstraint(['cv_id'], ['resume_versions.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('resume_educations',
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('cv_id', sa.Integer(), nullable=True),
+    sa.Column('degree', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('institute_name', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('major', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('gpa', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('start_time', sa.DateTime(), nullable=True),
+    sa.Column('end_time', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['cv_id'], ['resume_versions.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('resume_experiences',
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('cv_id', sa.Integer(), nullable=True),
+    sa.Column('company_name', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('job_title', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('working_industry', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('levels', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('roles', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('start_time', sa.DateTime(), nullable=True),
+    sa.Column('end_time', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['cv_id'], ['resume_versions.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('resume_projects',
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('descriptions', postgresql.ARRAY(sa.String()), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('cv_id', sa.Integer(), nullable=True),
+    sa.Column('project_name', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('start_time', sa.DateTime(), nullable=True),
+    sa.Column('end_time', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['cv_id'], ['resume_versions.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('resume_projects')
+    op.drop_table('resume_experiences')
+    op.drop_table('resume_educations')
+    op.drop_table('resume_awards')
+    op.drop_table('valuation_infos')
+    op.drop_table('resume_versions')
+    op.drop_table('recruit_resume_joins')
+    op.drop_table('other_resume_certificates')
+    op.drop_table('matching_results')
+    op.drop_table('language_resume_certificates')
+    op.drop_table('interview_schedules')
+    op.drop_table('resumes')
+    op.drop_table('other_job_certificates')
+    op.drop_table('language_job_certificates')
+    op.drop_table('job_educations')
+    op.drop_table('collab_job_joins')
+    op.drop_table('job_descriptions')
+    op.drop_table('transaction_histories')
+    op.drop_table('draw_histories')
+    op.drop_table('companies')
+    op.drop_table('banks')
+    op.drop_table('users')
+    op.drop_table('point_packages')
+    op.drop_table('blacklisted_jwt')
+    op.drop_index('ix_background_jobs_claim', table_name='background_jobs')
+    op.drop_table('background_jobs')
@@ -0,0 +1,52 @@
+"""Indexes on the columns filtered by the hot queries
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 18:20:41.113062
+
+"""
+from alembic import op
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+#   (name, table, columns), declared on the models in src/model.py
+INDEXES = [
+    ('ix_users_email', 'users', ['email']),
+    ('ix_resume_versions_cv_id_is_lastest', 'resume_versions', ['cv_id', 'is_lastest']),
+    ('ix_resume_versions_status_is_lastest', 'resume_versions', ['status', 'is_lastest']),
+    ('ix_matching_results_cv_id_job_id', 'matching_results', ['cv_id', 'job_id']),
+    ('ix_job_descriptions_user_id', 'job_descriptions', ['user_id']),
+    ('ix_job_descriptions_status', 'job_descriptions', ['status']),
+    ('ix_resumes_user_id', 'resumes', ['user_id']),
+    ('ix_resumes_job_id', 'resumes', ['job_id']),
+    ('ix_valuation_infos_cv_id', 'valuation_infos', ['cv_id']),
+    ('ix_recruit_resume_joins_resume_id', 'recruit_resume_joins', ['resume_id']),
+    ('ix_transaction_histories_transaction_otp', 'transaction_histories', ['transaction_otp']),
+    ('ix_transaction_histories_user_id', 'transaction_histories', ['user_id']),
+    ('ix_draw_histories_user_id', 'draw_histories', ['user_id']),
+    ('ix_resume_educations_cv_id', 'resume_educations', ['cv_id']),
+    ('ix_resume_experiences_cv_id', 'resume_experiences', ['cv_id']),
+    ('ix_resume_awards_cv_id', 'resume_awards', ['cv_id']),
+    ('ix_resume_projects_cv_id', 'resume_projects', ['cv_id']),
+    ('ix_language_resume_certificates_cv_id', 'language_resume_certificates', ['cv_id']),
+    ('ix_other_resume_certificates_cv_id', 'other_resume_certificates', ['cv_id']),
+]
+
+
+def upgrade():
+    #   Postgres builds them without locking writes (CONCURRENTLY can't run in a transaction).
+    #   IF NOT EXISTS: a database created by db.create_all() from the current models already has them
+    concurrently = "CONCURRENTLY " if op.get_context().dialect.name == "postgresql" else ""
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.execute(f"CREATE INDEX {concurrently}IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.execute(f"DROP INDEX IF EXISTS {name}")
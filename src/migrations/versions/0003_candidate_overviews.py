@@ -0,0 +1,65 @@
+"""Candidate overview table read by the candidate listings
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 20:02:17.406215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+#   Same rows as CandidateOverviewSync.source() in src/candidate_overview.py, for the resumes that already exist
+BACKFILL = """
+INSERT INTO candidate_overviews (cv_id, id, collaborator_id, job_id, job_service, name, current_job, industry,
+                                 status, is_draft, is_ai_matched, total_point, created_at)
+SELECT resumes.id, resume_versions.id, resumes.user_id, resumes.job_id,
+       CASE WHEN job_descriptions.id IS NULL THEN 'SearchCV' ELSE job_descriptions.job_service END,
+       resume_versions.name, resume_versions.current_job, resume_versions.industry, resume_versions.status,
+       resume_versions.is_draft, resume_versions.is_ai_matched, valuation_infos.total_point, resume_versions.created_at
+FROM resumes
+JOIN resume_versions ON resume_versions.id = (SELECT max(latest.id) FROM resume_versions AS latest
+                                              WHERE latest.cv_id = resumes.id AND latest.is_lastest = true)
+LEFT OUTER JOIN job_descriptions ON job_descriptions.id = resumes.job_id
+LEFT OUTER JOIN valuation_infos ON valuation_infos.id = (SELECT min(valuation_infos.id) FROM valuation_infos
+                                                         WHERE valuation_infos.cv_id = resumes.id)
+"""
+
+
+def upgrade():
+    op.create_table('candidate_overviews',
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('cv_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('id', sa.Integer(), nullable=True),
+    sa.Column('collaborator_id', sa.Integer(), nullable=True),
+    sa.Column('job_id', sa.Integer(), nullable=True),
+    sa.Column('job_service', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('name', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('current_job', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('industry', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('status', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('is_draft', sa.Boolean(), nullable=False),
+    sa.Column('is_ai_matched', sa.Boolean(), nullable=False),
+    sa.Column('total_point', sa.Float(), nullable=True),
+    sa.PrimaryKeyConstraint('cv_id')
+    )
+    op.create_index('ix_candidate_overviews_created_at_id', 'candidate_overviews', ['created_at', 'id'], unique=False)
+    op.create_index('ix_candidate_overviews_status_created_at_id', 'candidate_overviews', ['status', 'created_at', 'id'], unique=False)
+    op.create_index('ix_candidate_overviews_is_ai_matched_created_at_id', 'candidate_overviews', ['is_ai_matched', 'created_at', 'id'], unique=False)
+    op.create_index('ix_candidate_overviews_collaborator_id_is_draft_created_at_id', 'candidate_overviews', ['collaborator_id', 'is_draft', 'created_at', 'id'], unique=False)
+    op.execute(BACKFILL)
+
+
+def downgrade():
+    op.drop_index('ix_candidate_overviews_collaborator_id_is_draft_created_at_id', table_name='candidate_overviews')
+    op.drop_index('ix_candidate_overviews_is_ai_matched_created_at_id', table_name='candidate_overviews')
+    op.drop_index('ix_candidate_overviews_status_created_at_id', table_name='candidate_overviews')
+    op.drop_index('ix_candidate_overviews_created_at_id', table_name='candidate_overviews')
+    op.drop_table('candidate_overviews')
@@ -0,0 +1,44 @@
+"""Expiry of the blacklisted tokens, to prune them once expired
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 21:12:40.583190
+
+"""
+import json
+import base64
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def token_expiry(token):
+    #   exp claim of the payload segment, the signature doesn't matter here
+    try:
+        payload = token.split(".")[1]
+        exp = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4))).get("exp")
+    except Exception:
+        return None
+    return datetime.utcfromtimestamp(exp) if exp is not None else None
+
+
+def upgrade():
+    op.add_column('blacklisted_jwt', sa.Column('expires_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_blacklisted_jwt_expires_at', 'blacklisted_jwt', ['expires_at'], unique=False)
+    #   Existing entries get the expiry of their token
+    bind = op.get_bind()
+    table = sa.table('blacklisted_jwt', sa.column('id', sa.Integer), sa.column('token', sa.String), sa.column('expires_at', sa.DateTime))
+    rows = bind.execute(sa.select(table.c.id, table.c.token)).all()
+    values = [{"row_id": row.id, "expires_at": expires_at} for row in rows if (expires_at := token_expiry(row.token))]
+    if values:
+        bind.execute(table.update().where(table.c.id == sa.bindparam("row_id")).values(expires_at=sa.bindparam("expires_at")), values)
+
+
+def downgrade():
+    op.drop_index('ix_blacklisted_jwt_expires_at', table_name='blacklisted_jwt')
+    op.drop_column('blacklisted_jwt', 'expires_at')
@@ -0,0 +1,42 @@
+"""Outbox of the outgoing emails, drained by the SMTP senders
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 22:05:13.274816
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('email_outbox',
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('body', sa.TEXT(), nullable=True),
+    sa.Column('error', sa.TEXT(), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('recipient', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('subject', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('attachment', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('status', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('next_run_at', sa.DateTime(), nullable=True),
+    sa.Column('locked_by', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('locked_at', sa.DateTime(), nullable=True),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_email_outbox_claim', 'email_outbox', ['status', 'next_run_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_email_outbox_claim', table_name='email_outbox')
+    op.drop_table('email_outbox')
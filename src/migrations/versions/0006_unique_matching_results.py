@@ -0,0 +1,26 @@
+"""One matching result per resume and job, so that matching again replaces it
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 09:12:37.402518
+
+"""
+from alembic import op
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    #   Keep the latest result of each pair filtered several times
+    op.execute("DELETE FROM matching_results WHERE job_id IS NOT NULL AND id NOT IN "
+               "(SELECT max(id) FROM matching_results WHERE job_id IS NOT NULL GROUP BY cv_id, job_id)")
+    op.drop_index('ix_matching_results_cv_id_job_id', table_name='matching_results')
+    op.create_index('ix_matching_results_cv_id_job_id', 'matching_results', ['cv_id', 'job_id'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_matching_results_cv_id_job_id', table_name='matching_results')
+    op.create_index('ix_matching_results_cv_id_job_id', 'matching_results', ['cv_id', 'job_id'], unique=False)
@@ -0,0 +1,44 @@
+"""Content hash of the CV file of a resume version, to find uploads of an already saved file
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 10:41:08.915273
+
+"""
+import os
+import hashlib
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from config import CV_SAVED_DIR
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def upgrade():
+    op.add_column('resume_versions', sa.Column('content_hash', sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+    op.create_index('ix_resume_versions_content_hash', 'resume_versions', ['content_hash'], unique=False)
+    #   Existing versions get the hash of their saved CV file, when it is still there
+    bind = op.get_bind()
+    table = sa.table('resume_versions', sa.column('id', sa.Integer), sa.column('filename', sa.String), sa.column('content_hash', sa.String))
+    rows = bind.execute(sa.select(table.c.id, table.c.filename).where(table.c.filename.isnot(None))).all()
+    values = [{"row_id": row.id, "content_hash": file_hash(path)} for row in rows
+                    if os.path.isfile(path := os.path.join(CV_SAVED_DIR, row.filename))]
+    if values:
+        bind.execute(table.update().where(table.c.id == sa.bindparam("row_id")).values(content_hash=sa.bindparam("content_hash")), values)
+
+
+def downgrade():
+    op.drop_index('ix_resume_versions_content_hash', table_name='resume_versions')
+    op.drop_column('resume_versions', 'content_hash')
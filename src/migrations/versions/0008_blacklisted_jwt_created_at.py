@@ -0,0 +1,21 @@
+"""Index on the creation time of the blacklisted tokens, read again by each revocation sync
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 14:32:57.408126
+
+"""
+from alembic import op
+
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_blacklisted_jwt_created_at', 'blacklisted_jwt', ['created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_blacklisted_jwt_created_at', table_name='blacklisted_jwt')
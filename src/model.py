@@ -1,7 +1,7 @@
 import os
 from fastapi import Request 
 from datetime import datetime, time
-from sqlalchemy import text, Column, TIMESTAMP
+from sqlalchemy import text, Column, Index, TIMESTAMP
 from sqlmodel import Field, SQLModel, Relationship, JSON
 from typing import List, Optional, Set, Dict
 from sqlalchemy.dialects.postgresql import TEXT
@@ -36,7 +36,7 @@ class User(TableBase, table=True):
     __tablename__ = 'users'
 
     fullname: str = Field(default=None)
-    email: str = Field(default=None)
+    email: str = Field(default=None, index=True)
     phone: str = Field(default=None)
     role: str = Field(default=None)
     point: float = Field(default=0)
@@ -56,14 +56,17 @@ class User(TableBase, table=True):
 
 class JWTModel(TableBase, table=True): # BlacklistToken
     __tablename__ = "blacklisted_jwt"
-    
+    #   Revocation syncs read the recent rows again
+    __table_args__ = (Index("ix_blacklisted_jwt_created_at", "created_at"),)
+
     token: str = Field(unique=True, nullable=False)
+    expires_at: datetime = Field(default=None, index=True)      #   exp claim of the token (UTC), the entry is pruned after it
 
 
 class JobDescription(TableBase, table=True):
     __tablename__ = 'job_descriptions'
 
-    user_id: int = Field(default=None, foreign_key="users.id")
+    user_id: int = Field(default=None, foreign_key="users.id", index=True)
     company_id: int = Field(default=None, foreign_key="companies.id")
     status: str = Field(default=None)
     job_service: str = Field(default=None)
@@ -91,7 +94,7 @@ class JobDescription(TableBase, table=True):
     correspone_price: float = Field(default=None)
     warranty_time: int = Field(default=None)
     jd_file: str = Field(default=None)
-    status: str = Field(default="pending")
+    status: str = Field(default="pending", index=True)
     is_draft: bool = Field(default=False)
     is_active: bool = Field(default=True)
     is_admin_approved: bool = Field(default=False)      # Admin filtered Job
@@ -159,14 +162,14 @@ class OtherJobCertificate(TableBase, table=True):
 
 class Resume(TableBase, table=True):
     __tablename__ = 'resumes'    
-    user_id: int = Field(default=None, foreign_key="users.id")
-    job_id: int = Field(default=None, foreign_key="job_descriptions.id")
+    user_id: int = Field(default=None, foreign_key="users.id", index=True)
+    job_id: int = Field(default=None, foreign_key="job_descriptions.id", index=True)
     is_active: bool = Field(default=True)
 
 
 class ValuationInfo(TableBase, table=True):
     __tablename__ = 'valuation_infos'
-    cv_id: int = Field(default=None, foreign_key="resumes.id")
+    cv_id: int = Field(default=None, foreign_key="resumes.id", index=True)
     hard_item: str = Field(default=None)
     hard_point: float = Field(default=None)
     degrees: List[str] = Field(default=None, sa_column=Column(postgresql.ARRAY(String())))
@@ -178,9 +181,14 @@ class ValuationInfo(TableBase, table=True):
 
 class ResumeVersion(TableBase, table=True):
     __tablename__ = 'resume_versions'
+    #   Latest version of a resume, listings by status of the latest versions, and uploads of an already saved CV file
+    __table_args__ = (Index("ix_resume_versions_cv_id_is_lastest", "cv_id", "is_lastest"),
+                      Index("ix_resume_versions_status_is_lastest", "status", "is_lastest"),
+                      Index("ix_resume_versions_content_hash", "content_hash"))
 
     cv_id: int = Field(default=None, foreign_key="resumes.id")
     filename: str = Field(default=None)
+    content_hash: Optional[str] = Field(default=None)      #   sha256 of the CV file
     is_lastest: bool = Field(default=True)
     cv_file: str = Field(default=None)
     name: str = Field(default=None)
@@ -214,7 +222,7 @@ class ResumeVersion(TableBase, table=True):
 
 class ResumeEducation(TableBase, table=True):
     __tablename__ = 'resume_educations'
-    cv_id: int = Field(default=None, foreign_key="resume_versions.id")
+    cv_id: int = Field(default=None, foreign_key="resume_versions.id", index=True)
     degree: str = Field(default=None)
     institute_name: str = Field(default=None)
     major: str = Field(default=None)
@@ -224,7 +232,7 @@ class ResumeEducation(TableBase, table=True):
 
 class ResumeExperience(TableBase, table=True):
     __tablename__ = 'resume_experiences'
-    cv_id: int = Field(default=None, foreign_key="resume_versions.id")
+    cv_id: int = Field(default=None, foreign_key="resume_versions.id", index=True)
     company_name: str = Field(default=None)
     job_title: str = Field(default=None)
     working_industry: str = Field(default=None)
@@ -235,7 +243,7 @@ class ResumeExperience(TableBase, table=True):
 
 class ResumeAward(TableBase, table=True):
     __tablename__ = 'resume_awards'
-    cv_id: int = Field(default=None, foreign_key="resume_versions.id")
+    cv_id: int = Field(default=None, foreign_key="resume_versions.id", index=True)
     name: str = Field(default=None)
     time: str = Field(default=None)
     description: str = Field(default=None, sa_column=Column(TEXT))
@@ -243,7 +251,7 @@ class ResumeAward(TableBase, table=True):
 
 class ResumeProject(TableBase, table=True):
     __tablename__ = 'resume_projects'
-    cv_id: int = Field(default=None, foreign_key="resume_versions.id")
+    cv_id: int = Field(default=None, foreign_key="resume_versions.id", index=True)
     project_name: str = Field(default=None)
     descriptions: List[str] = Field(default=None, sa_column=Column(postgresql.ARRAY(String())))
     start_time: datetime = Field(default=None)
@@ -252,7 +260,7 @@ class ResumeProject(TableBase, table=True):
     
 class LanguageResumeCertificate(TableBase, table=True):
     __tablename__ = 'language_resume_certificates'    
-    cv_id: int = Field(default=None, foreign_key="resumes.id")
+    cv_id: int = Field(default=None, foreign_key="resumes.id", index=True)
     certificate_language: str = Field(default=None)
     certificate_name: str = Field(default=None)
     certificate_point_level: str = Field(default=None)
@@ -262,7 +270,7 @@ class LanguageResumeCertificate(TableBase, table=True):
     
 class OtherResumeCertificate(TableBase, table=True):
     __tablename__ = 'other_resume_certificates'    
-    cv_id: int = Field(default=None, foreign_key="resumes.id")
+    cv_id: int = Field(default=None, foreign_key="resumes.id", index=True)
     certificate_name: str = Field(default=None)
     certificate_point_level: str = Field(default=None)
     start_time: datetime = Field(default=None)
@@ -271,6 +279,8 @@ class OtherResumeCertificate(TableBase, table=True):
 
 class ResumeMatching(TableBase, table=True):
     __tablename__ = 'matching_results'      
+    #   Results of a resume, or of a resume for one job
+    __table_args__ = (Index("ix_matching_results_cv_id_job_id", "cv_id", "job_id", unique=True),)
     job_id: int = Field(default=None, foreign_key="job_descriptions.id")
     cv_id: int = Field(default=None, foreign_key="resumes.id")
     title_score: int = Field(default=None)
@@ -313,6 +323,7 @@ class RecruitResumeJoin(SQLModel, table=True):
         default=None,
         foreign_key="resumes.id",
         primary_key=True,
+        index=True,        #   Second column of the primary key
     )
     package: str = Field(default=None)            #   Basic / Platinum
     is_rejected: bool = Field(default=False)      #   Recruiter rejects Resumes
@@ -343,6 +354,40 @@ class InterviewSchedule(SQLModel, table=True):
     
     
     
+class CandidateOverview(SQLModel, table=True):
+    """
+    One row per resume with what the candidate listings show, from its latest version, job and valuation.
+    Derived data: written by candidate_overview.py (CandidateOverviewSync) whenever a flush changes one of its sources, never edited directly.
+    """
+    __tablename__ = "candidate_overviews"
+    #   Listings: newest first, over all candidates, by status / matching result, or of a collaborator
+    __table_args__ = (Index("ix_candidate_overviews_created_at_id", "created_at", "id"),
+                      Index("ix_candidate_overviews_status_created_at_id", "status", "created_at", "id"),
+                      Index("ix_candidate_overviews_is_ai_matched_created_at_id", "is_ai_matched", "created_at", "id"),
+                      Index("ix_candidate_overviews_collaborator_id_is_draft_created_at_id", "collaborator_id", "is_draft", "created_at", "id"))
+    cv_id: Optional[int] = Field(default=None, primary_key=True, sa_column_kwargs={"autoincrement": False})   #   Resume id, no foreign key: rows follow the resume deletions
+    id: int = Field(default=None)                                   #   Latest version id
+    collaborator_id: int = Field(default=None)
+    job_id: int = Field(default=None)
+    job_service: str = Field(default=None)
+    name: str = Field(default=None)
+    current_job: str = Field(default=None)
+    industry: str = Field(default=None)
+    status: str = Field(default=None)
+    is_draft: bool = Field(default=False)
+    is_ai_matched: bool = Field(default=False)
+    total_point: float = Field(default=None)
+    #   Creation time of the latest version (referred time), then last refresh of the row
+    created_at: Optional[datetime] = Field(sa_column=Column(TIMESTAMP(timezone=True), nullable=False))
+    updated_at: Optional[datetime] = Field(
+        sa_column=Column(
+            TIMESTAMP(timezone=True),
+            nullable=False,
+            server_default=text("CURRENT_TIMESTAMP"),
+        )
+    )
+    
+    
 #   ==============================================================
 #                           Payment
 #   ==============================================================
@@ -356,18 +401,60 @@ class PointPackage(TableBase, table=True):
     
 class TransactionHistory(TableBase, table=True):    
     __tablename__ = "transaction_histories"
-    user_id: int = Field(default=None, foreign_key="users.id")  #   Recruiter
+    user_id: int = Field(default=None, foreign_key="users.id", index=True)  #   Recruiter
     point: int =  Field(default=None)   #   package_name
     price: float = Field(default=0)
     quantity: int = Field(default=0)
     total_price: float = Field(default=0)
     transaction_form: str =  Field(default='banking')
-    transaction_otp: str =  Field(default=None)
+    transaction_otp: str =  Field(default=None, index=True)
 
     
 class DrawHistory(TableBase, table=True):    
     __tablename__ = "draw_histories"
-    user_id: int = Field(default=None, foreign_key="users.id")  #   Collaborator
+    user_id: int = Field(default=None, foreign_key="users.id", index=True)  #   Collaborator
     point: int =  Field(default=None) 
     transaction_form: str =  Field(default='banking')
-    draw_status: str = Field(default='pending')
\ No newline at end of file
+    draw_status: str = Field(default='pending')
+
+#   ==============================================================
+#                         Background jobs
+#   ==============================================================
+
+class BackgroundJob(TableBase, table=True):
+    __tablename__ = "background_jobs"
+    #   Claim order of the workers: claimable jobs by priority then due time
+    __table_args__ = (Index("ix_background_jobs_claim", "status", "priority", "next_run_at"),)
+    public_id: str = Field(default=None, unique=True)       #   Id given to clients (not guessable)
+    task: str = Field(default=None)
+    payload: Dict = Field(default=None, sa_column=Column(JSON))
+    user_id: int = Field(default=None)                      #   No foreign key: the queue may live in its own DB
+    priority: int = Field(default=0)                        #   Higher first
+    status: str = Field(default="queued")
+    attempts: int = Field(default=0)
+    max_attempts: int = Field(default=3)
+    next_run_at: datetime = Field(default=None)
+    locked_by: Optional[str] = Field(default=None)
+    locked_at: Optional[datetime] = Field(default=None)
+    idempotency_key: Optional[str] = Field(default=None, unique=True)
+    result: Dict = Field(default=None, sa_column=Column(JSON))
+    error: str = Field(default=None, sa_column=Column(TEXT))
+    finished_at: Optional[datetime] = Field(default=None)
+
+
+class OutboxEmail(TableBase, table=True):
+    __tablename__ = "email_outbox"
+    #   Claim order of the senders: due queued emails, oldest first
+    __table_args__ = (Index("ix_email_outbox_claim", "status", "next_run_at"),)
+    recipient: str = Field(default=None)
+    subject: str = Field(default=None)
+    body: str = Field(default=None, sa_column=Column(TEXT))
+    attachment: Optional[str] = Field(default=None)         #   Path of a file sent along (PDF)
+    status: str = Field(default="queued")                   #   queued, sending, sent, failed
+    attempts: int = Field(default=0)
+    max_attempts: int = Field(default=5)
+    next_run_at: datetime = Field(default=None)
+    locked_by: Optional[str] = Field(default=None)
+    locked_at: Optional[datetime] = Field(default=None)
+    sent_at: Optional[datetime] = Field(default=None)
+    error: str = Field(default=None, sa_column=Column(TEXT))
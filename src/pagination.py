@@ -0,0 +1,129 @@
+import math
+import time
+import base64
+import threading
+from datetime import datetime
+from collections import OrderedDict
+from typing import Optional, Tuple
+from sqlmodel import Session, func
+from sqlalchemy import select, tuple_
+from fastapi import HTTPException, status
+from config import (PAGINATION_MAX_LIMIT,
+                    PAGINATION_COUNT_CACHE_SECONDS,
+                    PAGINATION_COUNT_CACHE_SIZE)
+
+
+class Pagination:
+    """
+    Page requested by a list endpoint.
+    Pages are read with LIMIT/OFFSET from `page_index`, or from `cursor` (the `next_cursor` of the previous page)
+    with a keyset condition on (created_at, id, tie-breakers), which stays fast however deep the page is.
+    """
+    def __init__(self, page_index: int = 1, limit: int = 20, cursor: Optional[str] = None):
+        if page_index < 1 or limit < 1:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="page_index and limit must be positive!")
+        self.page_index = page_index
+        self.limit = min(limit, PAGINATION_MAX_LIMIT)
+        self.cursor = cursor
+        self.next_cursor = None
+
+    @property
+    def offset(self):
+        return (self.page_index - 1) * self.limit
+
+    @staticmethod
+    def encode_cursor(created_at: datetime, id: int, *tiebreak: int):
+        cursor = "|".join([created_at.isoformat(), str(id), *map(str, tiebreak)])
+        return base64.urlsafe_b64encode(cursor.encode("utf-8")).decode("utf-8")
+
+    def decode_cursor(self, size: int = 2):
+        try:
+            created_at, *ids = base64.urlsafe_b64decode(self.cursor.encode("utf-8")).decode("utf-8").split("|")
+            if len(ids) != size - 1:
+                raise ValueError(self.cursor)
+            return (datetime.fromisoformat(created_at), *map(int, ids))
+        except Exception:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor!")
+
+    def response(self, items, total_items: int, key: str = "item_lst", **extra):
+        return {
+            "total_items": total_items,
+            "total_pages": math.ceil(total_items/self.limit),
+            **extra,
+            key: items,
+            "next_cursor": self.next_cursor
+        }
+
+
+#   COUNT(*) results by (SQL, parameters): browsing pages of the same list doesn't count the rows again each time
+_count_lock = threading.Lock()
+_count_cache: "OrderedDict[Tuple[str, str], Tuple[float, int]]" = OrderedDict()
+
+
+def count_rows(db_session: Session, query):
+    """Number of rows of a select, reused for PAGINATION_COUNT_CACHE_SECONDS"""
+    compiled = query.compile(dialect=db_session.get_bind().dialect)
+    key = (str(compiled), repr(sorted(compiled.params.items())))
+    now = time.monotonic()
+    with _count_lock:
+        cached = _count_cache.get(key)
+        if cached and cached[0] > now:
+            _count_cache.move_to_end(key)
+            return cached[1]
+    total_items = db_session.execute(select(func.count()).select_from(query.order_by(None).subquery())).scalar()
+    with _count_lock:
+        _count_cache[key] = (now + PAGINATION_COUNT_CACHE_SECONDS, total_items)
+        _count_cache.move_to_end(key)
+        while len(_count_cache) > PAGINATION_COUNT_CACHE_SIZE:
+            _count_cache.popitem(last=False)
+    return total_items
+
+
+def _column_value(row, query, column):
+    #   Value of a model column in a result row (KeyError when the query doesn't select it)
+    mapping = row._mapping
+    entity = column.class_
+    #   The entity, or its slim read model (read_models.Slim), a bundle named after it
+    for key in (entity, entity.__name__):
+        if key in mapping:
+            return getattr(mapping[key], column.key)
+    for selected, value in zip(query.selected_columns, row):
+        #   Columns may be selected under a label (JobDescription.id.label("job_id"))
+        if getattr(selected, "element", selected).compare(column.expression):
+            return value
+    raise KeyError(column.key)
+
+
+def _keyset(row, query, entity, scalars: bool, tiebreak):
+    #   (created_at, id, tie-breakers) of a result row, None when the query doesn't select them
+    if scalars:
+        return (row.created_at, row.id)
+    try:
+        return tuple(_column_value(row, query, column) for column in (entity.created_at, entity.id, *tiebreak))
+    except KeyError:
+        return None
+
+
+def paginate(db_session: Session, query, page: Pagination, entity, scalars: bool = False, tiebreak: Tuple = ()):
+    """
+    Run one page of `query`, newest `entity` rows first, and return (rows, total_items).
+    `entity` is the model whose (created_at, id) orders the list, it must be in the FROM clause of the query.
+    When a join repeats an entity row (a resume version on each of its interview schedules), `tiebreak` gives the
+    integer columns that make (created_at, id, *tiebreak) unique: they order the rows and go into the cursor too.
+    """
+    total_items = count_rows(db_session, query)
+    if not total_items:
+        return [], 0
+    keys = (entity.created_at, entity.id, *tiebreak)
+    query = query.order_by(*[key.desc() for key in keys])
+    if page.cursor:
+        query = query.where(tuple_(*keys) < tuple_(*page.decode_cursor(len(keys))))
+    else:
+        query = query.offset(page.offset)
+    result = db_session.execute(query.limit(page.limit))
+    rows = result.scalars().all() if scalars else result.all()
+    if len(rows) == page.limit:
+        keyset = _keyset(rows[-1], query, entity, scalars, tiebreak)
+        if keyset and all(value is not None for value in keyset):
+            page.next_cursor = Pagination.encode_cursor(*keyset)
+    return rows, total_items
@@ -0,0 +1,181 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from typing import Any, Callable, Dict
+from starlette.concurrency import run_in_threadpool
+from config import OPENAI_MODEL, LLM_CACHE_DIR, LLM_CACHE_TTL, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_SWEEP_SECONDS
+from postjob.api_service.openai_service import OpenAIService
+
+logger = logging.getLogger(__name__)
+
+
+def _has_score(result: Any):
+    return isinstance(result, dict) and isinstance(result.get("overall"), dict) and "score" in result["overall"]
+
+
+class Abandoned(Exception):
+    """The GPT call shared by identical prompts was cancelled with the request that made it"""
+
+
+class LLMCache:
+    """
+    Content-addressed cache of GPT responses.
+    An entry is keyed by sha256(model, prompt version, prompt) so two different PDFs sharing a filename never
+    collide, while the same content uploaded twice is answered from disk. Each response is stored as
+    <key>.json under LLM_CACHE_DIR, the file mtime is its age and its atime (set on each hit) its last use: there is
+    no shared index, so the workers of every process read and write entries independently. Expired and surplus
+    (least recently used first) entries are removed by a sweep run at most every LLM_CACHE_SWEEP_SECONDS across
+    all processes.
+    """
+    _inflight: Dict[str, asyncio.Future] = {}
+    _last_sweep = 0.0
+
+    #   Shape a response must have to be cached, by prompt version (any non-empty JSON object otherwise)
+    validators: Dict[str, Callable[[Any], bool]] = {
+        "matching": _has_score,
+        #   Results by resume id
+        "batch_matching": lambda result: isinstance(result, dict) and bool(result) and all(_has_score(value) for value in result.values()),
+        "percent_estimate": lambda result: isinstance(result, dict) and isinstance(result.get("point"), (int, float)),
+    }
+
+    @staticmethod
+    def make_key(prompt: str, prompt_version: str, model: str = OPENAI_MODEL):
+        digest = hashlib.sha256()
+        for part in (model, prompt_version, prompt):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    @classmethod
+    def _entry_path(cls, key: str):
+        return os.path.join(LLM_CACHE_DIR, key + ".json")
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            #   Removed by another process
+            pass
+
+    @classmethod
+    def get(cls, key: str):
+        path = cls._entry_path(key)
+        try:
+            now = time.time()
+            mtime = os.stat(path).st_mtime
+            if now - mtime > LLM_CACHE_TTL:
+                cls._remove(path)
+                return None
+            with open(path, "r") as file:
+                value = json.load(file)
+            #   Last use for the sweep, the age (mtime) is kept
+            os.utime(path, (now, mtime))
+            return value
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            cls._remove(path)
+            return None
+
+    @classmethod
+    def put(cls, key: str, value: Any):
+        os.makedirs(LLM_CACHE_DIR, exist_ok=True)
+        #   Unique temporary name, the rename is atomic even with several writers of the same key
+        temp_path = f"{cls._entry_path(key)}.{os.getpid()}.{id(value)}.tmp"
+        with open(temp_path, "w") as file:
+            json.dump(value, file)
+        os.replace(temp_path, cls._entry_path(key))
+        cls.sweep()
+
+    @classmethod
+    def sweep(cls, force: bool = False):
+        """Remove the expired entries, then the least recently used ones over LLM_CACHE_MAX_ENTRIES"""
+        now = time.time()
+        if not force and now - cls._last_sweep < LLM_CACHE_SWEEP_SECONDS:
+            return
+        cls._last_sweep = now
+        #   The mtime of the marker tells the other processes a sweep just ran
+        marker = os.path.join(LLM_CACHE_DIR, ".sweep")
+        try:
+            if not force and now - os.stat(marker).st_mtime < LLM_CACHE_SWEEP_SECONDS:
+                return
+        except FileNotFoundError:
+            pass
+        with open(marker, "a"):
+            os.utime(marker, None)
+        entries = []
+        with os.scandir(LLM_CACHE_DIR) as scan:
+            for entry in scan:
+                if entry.name.startswith("."):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                mtime = stat.st_mtime
+                #   Left by a crashed writer, or the index of the previous cache layout
+                if entry.name.endswith(".tmp") or entry.name == "index.json":
+                    if now - mtime > 60:
+                        cls._remove(entry.path)
+                    continue
+                if now - mtime > LLM_CACHE_TTL:
+                    cls._remove(entry.path)
+                else:
+                    entries.append((max(stat.st_atime, mtime), entry.path))
+        if len(entries) > LLM_CACHE_MAX_ENTRIES:
+            entries.sort()
+            for _, path in entries[:len(entries) - LLM_CACHE_MAX_ENTRIES]:
+                cls._remove(path)
+
+    @classmethod
+    def is_valid(cls, result: Any, prompt_version: str):
+        validator = cls.validators.get(prompt_version)
+        if validator is not None:
+            return bool(validator(result))
+        return isinstance(result, dict) and bool(result)
+
+    @classmethod
+    async def gpt_api(cls, prompt: str, prompt_version: str):
+        """Answer a prompt from the cache, call GPT only on a miss"""
+        key = cls.make_key(prompt, prompt_version)
+        cached = await run_in_threadpool(cls.get, key)
+        if cached is not None:
+            logger.debug("LLM cache hit (%s)", prompt_version)
+            return cached
+        #   Identical prompts arriving together share one GPT round-trip
+        while key in cls._inflight:
+            try:
+                return json.loads(json.dumps(await asyncio.shield(cls._inflight[key])))
+            except Abandoned:
+                #   Its caller is gone, the next waiter makes the call
+                continue
+        future = asyncio.get_running_loop().create_future()
+        cls._inflight[key] = future
+        try:
+            result = await OpenAIService.gpt_api(prompt)
+            #   A malformed answer is handed to the caller once but never cached
+            if cls.is_valid(result, prompt_version):
+                await run_in_threadpool(cls.put, key, result)
+            else:
+                logger.warning("Malformed GPT answer (%s) not cached", prompt_version)
+            future.set_result(result)
+        except asyncio.CancelledError:
+            future.set_exception(Abandoned())
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            #   Nobody may be waiting, avoid "exception was never retrieved"
+            future.exception()
+            raise e
+        finally:
+            cls._inflight.pop(key, None)
+            #   Interrupted otherwise (KeyboardInterrupt, SystemExit): waiters must not hang
+            if not future.done():
+                future.cancel()
+        #   Callers mutate the parsed result, hand out a private copy
+        return json.loads(json.dumps(result))
@@ -1,27 +1,161 @@
-import pdftotext
 from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
 import os, json
-from config import (JD_SAVED_DIR, 
-                    CV_SAVED_DIR, 
+import gzip
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List
+from config import (CV_SAVED_DIR, 
                     CV_SAVED_TEMP_DIR, 
                     JD_SAVED_TEMP_DIR, 
                     CV_EXTRACTION_PATH, 
-                    JD_EXTRACTION_PATH)
+                    JD_EXTRACTION_PATH,
+                    TEXT_CACHE_SIZE,
+                    TEXT_CACHE_DISK_TTL,
+                    TEXT_CACHE_DISK_MAX_MB,
+                    TEXT_CACHE_SWEEP_SECONDS)
+from postjob.api_service.pdf_service import PDFExtractionService
+
+
+class LRUCache:
+    """Small thread-safe LRU used to memoize extraction work in-process"""
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
 
 
 class Extraction:
-    
-    def text_extract(filepath):
-        with open(filepath, 'rb') as f:
-            pdf = pdftotext.PDF(f)
-        text = ''.join(pdf)
+    #   content hash -> text, (path, mtime, size) -> content hash, (path, mtime, size) -> extraction JSON
+    text_cache = LRUCache(TEXT_CACHE_SIZE)
+    hash_cache = LRUCache(TEXT_CACHE_SIZE * 4)
+    json_cache = LRUCache(TEXT_CACHE_SIZE)
+    #   .text folder -> time of its last eviction sweep in this process
+    swept_at: Dict[str, float] = {}
+
+    @staticmethod
+    def file_key(filepath: str):
+        stat = os.stat(filepath)
+        return (os.path.abspath(filepath), stat.st_mtime_ns, stat.st_size)
+
+    @staticmethod
+    def content_hash(filepath: str):
+        file_key = Extraction.file_key(filepath)
+        content_hash = Extraction.hash_cache.get(file_key)
+        if content_hash is None:
+            digest = hashlib.sha256()
+            with open(filepath, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+            content_hash = digest.hexdigest()
+            Extraction.hash_cache.put(file_key, content_hash)
+        return content_hash
+
+    @staticmethod
+    def cached_text(filepath):
+        #   (content hash, text) with text None when the PDF has never been extracted
+        content_hash = Extraction.content_hash(filepath)
+        text = Extraction.text_cache.get(content_hash)
+        if text is None:
+            cached_path = os.path.join(os.path.dirname(filepath), ".text", content_hash + ".txt.gz")
+            try:
+                with gzip.open(cached_path, "rt", encoding="utf-8") as f:
+                    text = f.read()
+                #   The mtime of a text is its last use, the sweeps remove the least recently used first
+                os.utime(cached_path, None)
+            except FileNotFoundError:
+                return content_hash, None
+            Extraction.text_cache.put(content_hash, text)
+        return content_hash, text
+
+    @staticmethod
+    def store_text(filepath, content_hash, text):
+        cached_path = os.path.join(os.path.dirname(filepath), ".text", content_hash + ".txt.gz")
+        os.makedirs(os.path.dirname(cached_path), exist_ok=True)
+        temp_path = f"{cached_path}.{os.getpid()}.tmp"
+        with gzip.open(temp_path, "wt", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(temp_path, cached_path)
+        Extraction.text_cache.put(content_hash, text)
+        Extraction.sweep_texts(os.path.dirname(cached_path))
+
+    @staticmethod
+    def sweep_texts(text_dir: str, force: bool = False):
+        """Remove the texts unused for TEXT_CACHE_DISK_TTL, then the least recently used ones over TEXT_CACHE_DISK_MAX_MB"""
+        now = time.time()
+        if not force and now - Extraction.swept_at.get(text_dir, 0) < TEXT_CACHE_SWEEP_SECONDS:
+            return
+        Extraction.swept_at[text_dir] = now
+        entries, total_size = [], 0
+        with os.scandir(text_dir) as scan:
+            for entry in scan:
+                try:
+                    stat = entry.stat()
+                    #   Expired, or left by a crashed writer
+                    if now - stat.st_mtime > TEXT_CACHE_DISK_TTL or (entry.name.endswith(".tmp") and now - stat.st_mtime > 60):
+                        os.remove(entry.path)
+                        continue
+                except FileNotFoundError:
+                    #   Removed by another process
+                    continue
+                if not entry.name.endswith(".tmp"):
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total_size += stat.st_size
+        max_size = TEXT_CACHE_DISK_MAX_MB * 1024 * 1024
+        for _, size, path in sorted(entries):
+            if total_size <= max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+
+    @staticmethod
+    async def text_extract(filepath):
+        """
+        PDF text, cached by content hash: in memory (bounded LRU) and as <upload dir>/.text/<sha256>.txt.gz,
+        so the same PDF is extracted once whatever its name or how often it is matched.
+        Misses are extracted by the process pool, file IO runs in the threadpool: the event loop never blocks.
+        """
+        content_hash, text = await run_in_threadpool(Extraction.cached_text, filepath)
+        if text is None:
+            text = await PDFExtractionService.extract(filepath)
+            await run_in_threadpool(Extraction.store_text, filepath, content_hash, text)
         return text
+
+    @staticmethod
+    def load_extraction(json_path: str):
+        #   Parsed extraction JSON memoized until the file changes (shared object: read only)
+        file_key = Extraction.file_key(json_path)
+        data = Extraction.json_cache.get(file_key)
+        if data is None:
+            with open(json_path, "r") as file:
+                data = json.load(file)
+            Extraction.json_cache.put(file_key, data)
+        return data
     
     
     @staticmethod
-    def jd_parsing_template(store_path: str, filename: str):
+    async def jd_parsing_template(store_path: str, filename: str):
         try:
-            text = Extraction.text_extract(os.path.join(store_path, filename))
+            text = await Extraction.text_extract(os.path.join(store_path, filename))
             prompt_template = f"""
             [Job Description]
             {text}
@@ -29,14 +163,16 @@ class Extraction:
             """  
             print(" >>> Getting JD parsing template.")
             return prompt_template
+        except HTTPException as e:
+            raise e
         except:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot extract JD data!")
     
     
     @staticmethod
-    def cv_parsing_template(store_path: str, filename: str):
+    async def cv_parsing_template(store_path: str, filename: str):
         try:
-            text = Extraction.text_extract(os.path.join(store_path, filename))
+            text = await Extraction.text_extract(os.path.join(store_path, filename))
             prompt_template = f"""
             [Resume]
             {text}
@@ -45,6 +181,8 @@ class Extraction:
             """  
             print(" >>> Getting CV parsing template.")
             return prompt_template
+        except HTTPException as e:
+            raise e
         except:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot extract CV data!")
     
@@ -68,16 +206,33 @@ class Extraction:
     
     
     @staticmethod
-    def matching_template(cv_file: str, jd_file: str):
-        #   Get text file
-        cv_text = Extraction.text_extract(os.path.join(CV_SAVED_DIR, cv_file))
-        jd_text = Extraction.text_extract(os.path.join(JD_SAVED_DIR, jd_file))
-        #   Extracted JSON 
-        with open(os.path.join(os.path.join(JD_EXTRACTION_PATH, jd_file.split(".")[0] + ".json")), "r") as jd:
-            jd_data = json.load(jd)
-        with open(os.path.join(os.path.join(CV_EXTRACTION_PATH, cv_file.split(".")[0] + ".json")), "r") as cv:
-            cv_data = json.load(cv)
+    def estimate_tokens(text: str):
+        #   Rough GPT token count (~4 characters per token), enough to keep prompts under the context size
+        return len(text) // 4 + 1
 
+
+    @staticmethod
+    def matching_jd_fields(jd_file: str):
+        #   Extracted JSON
+        jd_data = Extraction.load_extraction(os.path.join(JD_EXTRACTION_PATH, jd_file.split(".")[0] + ".json"))
+        jd_edu = ""
+        for data in jd_data["education"]:
+            jd_edu += f" - Degree: {data['degree'][0]} - Major: {data['major'][0]} - GPA: {data['gpa'][0]}\n"
+        return {
+            "job_title": f"""- Position: {jd_data['job_title'][0]}
+            - Level: {jd_data['levels'][0]}""",
+            "experience": f"""- Descriptions: {jd_data["descriptions"]}        
+            - Work requirements: {jd_data["requirements"]}""",
+            "skills": f"- {jd_data['skills']}",
+            "orientation": f"- {jd_data['orientation'][0]}",
+            "education": jd_edu,
+        }
+
+
+    @staticmethod
+    def matching_cv_fields(cv_file: str):
+        #   Extracted JSON
+        cv_data = Extraction.load_extraction(os.path.join(CV_EXTRACTION_PATH, cv_file.split(".")[0] + ".json"))
         cv_exper = ""
         for idx, data in enumerate(cv_data["work_experience"]):
             cv_exper += f"""\t
@@ -85,54 +240,100 @@ class Extraction:
             - Company_name: {data['company_name']} 
             - Position: {data['position']} 
             - Time: {data['start_time']} to {data['end_time']}\n"""
-        jd_edu = ""
-        for data in jd_data["education"]:
-            jd_edu += f" - Degree: {data['degree'][0]} - Major: {data['major'][0]} - GPA: {data['gpa'][0]}\n"
         cv_edu = ""
         for data in cv_data["education"]:
             cv_edu += f""" 
             - Institution_name: {data['institution_name']} - Degree: {data['degree']} - Major: {data['major']} - GPA: {data['gpa']} - Time: {data['start_time']} to {data['end_time']}\n"""
-        
+        return {
+            "job_title": f"- {cv_data['job_title'][0]}",
+            "experience": f"- {cv_exper}",
+            "skills": f"""- Programming Language
+            {cv_data['skills']['programming_language']}
+            - Soft skill
+            {cv_data['skills']['soft_skill']}
+            - Hard skill
+            {cv_data['skills']['hard_skill']}""",
+            "orientation": f"- {cv_data['orientation'][0]}",
+            "education": cv_edu,
+        }
+
+
+    @staticmethod
+    def matching_template(cv_file: str, jd_file: str):
+        jd_fields = Extraction.matching_jd_fields(jd_file)
+        cv_fields = Extraction.matching_cv_fields(cv_file)
         template = f"""
             [JOB DESCRIPTION - Job Title]
-            - Position: {jd_data['job_title'][0]}
-            - Level: {jd_data['levels'][0]}
+            {jd_fields["job_title"]}
             [RESUME - Job Title]
-            - {cv_data['job_title'][0]}
+            {cv_fields["job_title"]}
             
             [JOB DESCRIPTION - Experience]
-            - Descriptions: {jd_data["descriptions"]}        
-            - Work requirements: {jd_data["requirements"]}    
+            {jd_fields["experience"]}
             [RESUME - Experience]
-            - {cv_exper}    
+            {cv_fields["experience"]}
 
             [JOB DESCRIPTION - Skills]
-            - {jd_data["skills"]}
+            {jd_fields["skills"]}
             [RESUME - Skills]
-            - Programming Language
-            {cv_data['skills']['programming_language']}
-            - Soft skill
-            {cv_data['skills']['soft_skill']}
-            - Hard skill
-            {cv_data['skills']['hard_skill']}  
+            {cv_fields["skills"]}
 
             [JOB DESCRIPTION - Orientation]
-            - {jd_data["orientation"][0]}
+            {jd_fields["orientation"]}
             [RESUME - Orientation]
-            - {cv_data["orientation"][0]}
+            {cv_fields["orientation"]}
 
             [JOB DESCRIPTION - Education]
-            {jd_edu}
+            {jd_fields["education"]}
             [RESUME - Education]
-            {cv_edu}
+            {cv_fields["education"]}
         """
         print(" >>> Getting matching template.")
         return template
+
+
+    @staticmethod
+    def matching_jd_block(jd_fields: Dict[str, str]):
+        return f"""
+            [JOB DESCRIPTION - Job Title]
+            {jd_fields["job_title"]}
+            [JOB DESCRIPTION - Experience]
+            {jd_fields["experience"]}
+            [JOB DESCRIPTION - Skills]
+            {jd_fields["skills"]}
+            [JOB DESCRIPTION - Orientation]
+            {jd_fields["orientation"]}
+            [JOB DESCRIPTION - Education]
+            {jd_fields["education"]}
+        """
+
+
+    @staticmethod
+    def matching_cv_block(resume_key: str, cv_fields: Dict[str, str]):
+        return f"""
+            [RESUME {resume_key} - Job Title]
+            {cv_fields["job_title"]}
+            [RESUME {resume_key} - Experience]
+            {cv_fields["experience"]}
+            [RESUME {resume_key} - Skills]
+            {cv_fields["skills"]}
+            [RESUME {resume_key} - Orientation]
+            {cv_fields["orientation"]}
+            [RESUME {resume_key} - Education]
+            {cv_fields["education"]}
+        """
+
+
+    @staticmethod
+    def batch_matching_template(jd_block: str, cv_blocks: List[str]):
+        """One JD against several resumes, each resume block is labelled with its own key"""
+        print(f" >>> Getting batch matching template ({len(cv_blocks)} resumes).")
+        return jd_block + "".join(cv_blocks)
     
     
     @staticmethod
-    def resume_percent_estimate(filename: str):
-        text = Extraction.text_extract(os.path.join(CV_SAVED_DIR, filename))
+    async def resume_percent_estimate(filename: str):
+        text = await Extraction.text_extract(os.path.join(CV_SAVED_DIR, filename))
         prompt_template = f"""
         [Resume]
         {text}
@@ -1,31 +1,68 @@
 import openai
 import os
-from config import OPENAI_MODEL
+import asyncio
+import aiohttp
+from config import OPENAI_MODEL, OPENAI_MAX_CONCURRENCY, OPENAI_POOL_SIZE, OPENAI_TIMEOUT
 import time, json
-from typing import Any
+import logging
+from typing import Any, Optional
+from fastapi import HTTPException, status
 
 openai.api_key = os.getenv("OPENAI_API_KEY")
+logger = logging.getLogger(__name__)
 
 
 class OpenAIService:
-    @staticmethod
-    def gpt_api(text: str):
+    """
+    Non-blocking GPT client shared by the whole process.
+    Requests reuse one keep-alive connection pool and at most OPENAI_MAX_CONCURRENCY of them are in flight
+    at the same time, the others wait for a free slot instead of piling up on the OpenAI rate limit.
+    """
+    _session: Optional[aiohttp.ClientSession] = None
+    _semaphore: Optional[asyncio.Semaphore] = None
+
+    @classmethod
+    async def startup(cls):
+        if cls._session is None or cls._session.closed:
+            connector = aiohttp.TCPConnector(limit=OPENAI_POOL_SIZE, keepalive_timeout=60)
+            cls._session = aiohttp.ClientSession(connector=connector)
+        if cls._semaphore is None:
+            cls._semaphore = asyncio.Semaphore(OPENAI_MAX_CONCURRENCY)
+
+    @classmethod
+    async def shutdown(cls):
+        if cls._session is not None and not cls._session.closed:
+            await cls._session.close()
+        cls._session = None
+
+    @classmethod
+    async def gpt_api(cls, text: str, timeout: float = OPENAI_TIMEOUT):
+        """Request gpt api with a prompt"""
         model: str = OPENAI_MODEL
         temp: float = 0
 
-        print(" >>> AI Processing...")
+        #   Lazily initialize for callers living outside the app lifecycle (scripts, workers)
+        await cls.startup()
+        async with cls._semaphore:
+            logger.debug("AI processing")
+            #   openai keeps its session in a ContextVar, so bind the shared pool on every call
+            openai.aiosession.set(cls._session)
+            start = time.time()
+            try:
+                response = await asyncio.wait_for(
+                    openai.ChatCompletion.acreate(
+                        model = model,
+                        messages = [{
+                                "role": "user",
+                                "content": text
+                                        }],
+                        temperature=temp,
+                        request_timeout=timeout
+                        ),
+                    timeout=timeout)
+            except (asyncio.TimeoutError, openai.error.Timeout):
+                raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="AI service timed out!")
+            elaps_time = time.time() - start
 
-        """Request gpt api with a prompt"""
-        start = time.time()
-        response = openai.ChatCompletion.create(
-            model = model,
-            messages = [{
-                    "role": "user", 
-                    "content": text
-                            }],
-            temperature=temp
-            )        
-        elaps_time = time.time() - start
-
-        print(f" >>> Request gpt api in {elaps_time}")
+        logger.info("Request gpt api in %.2fs", elaps_time)
         return json.loads(response.choices[0].message.content)
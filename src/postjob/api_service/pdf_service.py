@@ -0,0 +1,102 @@
+import os
+import asyncio
+import threading
+import pdftotext
+import multiprocessing
+from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import HTTPException, status
+from config import PDF_WORKERS, PDF_QUEUE_SIZE, PDF_TIMEOUT, PDF_MAX_PAGES
+
+
+def extract_pages(filepath: str, max_pages: int):
+    #   Runs inside a pool process: only the first max_pages pages are extracted
+    with open(filepath, 'rb') as f:
+        pdf = pdftotext.PDF(f)
+    return ''.join(pdf[idx] for idx in range(min(len(pdf), max_pages)))
+
+
+class PDFExtractionService:
+    """
+    pdftotext runs in a pool of PDF_WORKERS processes (one per core by default) so large PDFs never hold the GIL
+    of the API worker. At most PDF_QUEUE_SIZE documents are admitted at a time (running + waiting), the others
+    are refused with 503 instead of queueing without bound. A document still running at its timeout gets its
+    pool recycled, so a hung pdftotext does not keep a process.
+    """
+    _executor: Optional[ProcessPoolExecutor] = None
+    _pending: int = 0
+    _lock = threading.Lock()
+
+    @classmethod
+    def startup(cls):
+        if cls._executor is None:
+            #   "spawn": forking a process that already runs threads (event loop, threadpool) is unsafe
+            cls._executor = ProcessPoolExecutor(max_workers=PDF_WORKERS or os.cpu_count(),
+                                                mp_context=multiprocessing.get_context("spawn"))
+
+    @classmethod
+    def shutdown(cls):
+        if cls._executor is not None:
+            cls._executor.shutdown(wait=False, cancel_futures=True)
+            cls._executor = None
+
+    @classmethod
+    def _release(cls, _):
+        #   Called when the pool is done with a document (result, error or cancelled before it started), from a pool thread
+        with cls._lock:
+            cls._pending -= 1
+
+    @classmethod
+    def _submit(cls, filepath: str, max_pages: int):
+        cls.startup()
+        with cls._lock:
+            if cls._pending >= PDF_QUEUE_SIZE:
+                raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Too many documents are being extracted, please retry later!")
+            cls._pending += 1
+        executor = cls._executor
+        try:
+            future = executor.submit(extract_pages, filepath, max_pages)
+        except BaseException:
+            cls._release(None)
+            raise
+        #   A document keeps its admission slot until its pool process is free again, not until the caller stops waiting
+        future.add_done_callback(cls._release)
+        return executor, future
+
+    @classmethod
+    def _recycle(cls, executor: ProcessPoolExecutor):
+        #   A hung pdftotext never gives its process back: the pool is replaced and its processes are killed.
+        #   The other documents it was running fail with BrokenProcessPool and are submitted again to the new pool
+        if cls._executor is not executor:
+            return
+        cls._executor = None
+        cls.startup()
+        #   No public way to kill the processes of a pool before Python 3.14
+        for process in list((executor._processes or {}).values()):
+            process.kill()
+        executor.shutdown(wait=False)
+
+    @classmethod
+    async def extract(cls, filepath: str, timeout: float = PDF_TIMEOUT, max_pages: int = PDF_MAX_PAGES):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        for _ in range(2):
+            try:
+                executor, future = cls._submit(filepath, max_pages)
+            except BrokenProcessPool:
+                cls._recycle(cls._executor)
+                executor, future = cls._submit(filepath, max_pages)
+            waiter = asyncio.wrap_future(future)
+            try:
+                return await asyncio.wait_for(asyncio.shield(waiter), timeout=max(0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                #   A document still waiting for a process is cancelled, a running one has its process killed
+                waiter.add_done_callback(lambda f: f.cancelled() or f.exception())
+                if not future.cancel():
+                    cls._recycle(executor)
+                raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="PDF extraction timed out!")
+            except BrokenProcessPool:
+                #   Its pool was recycled for another document, or its process died: one more try on a new pool
+                cls._recycle(executor)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="PDF extraction failed!")
@@ -0,0 +1,235 @@
+import os
+import re
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+from postjob.api_service.extraction_service import Extraction
+from config import (CV_EXTRACTION_PATH,
+                    JD_EXTRACTION_PATH,
+                    PRESCORE_ENABLED,
+                    PRESCORE_MIN_SCORE,
+                    PRESCORE_MIN_SKILL_OVERLAP,
+                    PRESCORE_MAX_LEVEL_DISTANCE)
+
+
+#   Seniority bands, same grouping as the valuation levels (spellings of both parsing prompts included)
+level_bands = [
+    ["executive", "senior", "engineer", "developer"],
+    ["leader", "supervisor", "senior leader", "senior supervisor", "assitant manager", "assistant manager"],
+    ["manager", "senior manager", "assitant director", "assistant director"],
+    ["vice direcctor", "deputy direcctor", "vice director", "deputy director"],
+    ["direcctor", "director"],
+    ["head"],
+    ["group"],
+    ["chief operating officer", "chief executive officer", "chief product officer", "chief financial officer", "coo", "ceo", "cpo", "cfo"],
+    ["general manager", "general director"]]
+
+degree_ranks = [
+    (4, ["ph.d", "phd", "doctor", "tiến sĩ"]),
+    (3, ["master", "mba", "thạc sĩ"]),
+    (2, ["bachelor", "engineer", "university", "cử nhân", "kỹ sư"]),
+    (1, ["college", "associate", "cao đẳng"])]
+
+weights = {"skill": 0.4, "level": 0.25, "experience": 0.2, "education": 0.15}
+
+
+class PreScoring:
+    """
+    Deterministic CV-JD scorer over the extraction JSONs (skills overlap, level distance, degree, years of experience).
+    It runs before GPT matching: clear mismatches are rejected locally and never reach the LLM.
+    """
+    _lock = threading.Lock()
+    _stats = {"scored": 0, "skipped": 0}
+
+    @staticmethod
+    def _values(value) -> List[str]:
+        #   Flatten "string" / ["string"] / {"key": ["string"]} into lower-cased values without "N/A"
+        if value is None:
+            return []
+        if isinstance(value, dict):
+            return [item for sub_value in value.values() for item in PreScoring._values(sub_value)]
+        if isinstance(value, list):
+            return [item for sub_value in value for item in PreScoring._values(sub_value)]
+        value = str(value).strip().lower()
+        return [] if value in ("", "n/a", "none") else [value]
+
+    @staticmethod
+    def _tokens(skill: str) -> Set[str]:
+        #   Words of a skill, keeping the symbols of names like "c++", "c#", "node.js" or "objective-c"
+        return {token.strip(".-") for token in re.findall(r"[\w+#.-]+", skill) if token.strip(".-")}
+
+    @staticmethod
+    def _level_band(level: str) -> Optional[int]:
+        level = re.sub(r"\(.*?\)", "", level).strip()
+        for band, names in enumerate(level_bands):
+            if level in names:
+                return band
+        return None
+
+    @staticmethod
+    def _degree_rank(degree: str) -> int:
+        for rank, names in degree_ranks:
+            if any(name in degree for name in names):
+                return rank
+        return 0
+
+    @staticmethod
+    def _years(value: str) -> Optional[int]:
+        if re.search(r"present|now|current|hiện tại", value):
+            return datetime.now().year
+        found = re.search(r"(19|20)\d{2}", value)
+        return int(found.group()) if found else None
+
+    @staticmethod
+    def skill_overlap(cv_data: Dict, jd_data: Dict) -> Optional[float]:
+        jd_skills = set(PreScoring._values(jd_data.get("skills")))
+        if not jd_skills:
+            return None
+        cv_skills = [PreScoring._tokens(skill) for skill in set(PreScoring._values(cv_data.get("skills")))]
+        cv_skills = [tokens for tokens in cv_skills if tokens]
+        #   A JD skill counts when its words are all words of a CV skill or the other way round ("python" ~ "python 3"),
+        #   whole words only: "c" or "r" must not match "react" or "docker"
+        matched = []
+        for skill in jd_skills:
+            tokens = PreScoring._tokens(skill)
+            if tokens and any(tokens <= cv_tokens or cv_tokens <= tokens for cv_tokens in cv_skills):
+                matched.append(skill)
+        return len(matched) / len(jd_skills)
+
+    @staticmethod
+    def level_distance(cv_data: Dict, jd_data: Dict) -> Optional[int]:
+        jd_bands = [PreScoring._level_band(level) for level in PreScoring._values(jd_data.get("levels"))]
+        cv_bands = [PreScoring._level_band(level) for level in PreScoring._values(cv_data.get("levels"))]
+        jd_bands = [band for band in jd_bands if band is not None]
+        cv_bands = [band for band in cv_bands if band is not None]
+        if not jd_bands or not cv_bands:
+            return None
+        return min(abs(jd_band - cv_band) for jd_band in jd_bands for cv_band in cv_bands)
+
+    @staticmethod
+    def education_score(cv_data: Dict, jd_data: Dict) -> Optional[float]:
+        required = max([PreScoring._degree_rank(degree) for edu in jd_data.get("education") or [] for degree in PreScoring._values(edu.get("degree"))] or [0])
+        if not required:
+            return None
+        achieved = max([PreScoring._degree_rank(degree) for edu in cv_data.get("education") or [] for degree in PreScoring._values(edu.get("degree"))] or [0])
+        return 1.0 if achieved >= required else achieved / required
+
+    @staticmethod
+    def experience_score(cv_data: Dict, jd_data: Dict) -> Optional[float]:
+        required = None
+        for value in PreScoring._values(jd_data.get("number_year_experience")):
+            found = re.search(r"\d+(\.\d+)?", value)
+            if found:
+                required = float(found.group())
+                break
+        if not required:
+            return None
+        years = 0
+        for experience in cv_data.get("work_experience") or []:
+            start = PreScoring._years(str(experience.get("start_time", "")).lower())
+            end = PreScoring._years(str(experience.get("end_time", "")).lower())
+            if start and end and end >= start:
+                years += end - start
+        return min(1.0, years / required)
+
+    @staticmethod
+    def score(cv_filename: str, jd_filename: str):
+        cv_data = Extraction.load_extraction(os.path.join(CV_EXTRACTION_PATH, cv_filename.split(".")[0] + ".json"))
+        jd_data = Extraction.load_extraction(os.path.join(JD_EXTRACTION_PATH, jd_filename.split(".")[0] + ".json"))
+
+        skill = PreScoring.skill_overlap(cv_data, jd_data)
+        distance = PreScoring.level_distance(cv_data, jd_data)
+        criteria = {
+            "skill": skill,
+            "level": None if distance is None else max(0.0, 1 - distance / (len(level_bands) - 1)),
+            "experience": PreScoring.experience_score(cv_data, jd_data),
+            "education": PreScoring.education_score(cv_data, jd_data),
+        }
+        #   Unknown criteria are left out and the weights of the known ones re-normalized
+        known = {name: value for name, value in criteria.items() if value is not None}
+        total_weight = sum(weights[name] for name in known)
+        overall = round(100 * sum(weights[name] * value for name, value in known.items()) / total_weight) if total_weight else None
+
+        reasons = []
+        if skill is not None and skill < PRESCORE_MIN_SKILL_OVERLAP:
+            reasons.append(f"only {round(skill * 100)}% of the required skills found")
+        if distance is not None and distance > PRESCORE_MAX_LEVEL_DISTANCE:
+            reasons.append(f"level is {distance} bands away from the required one")
+        if overall is not None and overall < PRESCORE_MIN_SCORE:
+            reasons.append(f"local score {overall} is under {PRESCORE_MIN_SCORE}")
+        return {
+            "overall": overall,
+            "criteria": criteria,
+            "level_distance": distance,
+            "rejected": bool(reasons),
+            "reasons": reasons
+        }
+
+    @staticmethod
+    def as_matching_result(prescore: Dict):
+        #   Same shape as a GPT matching answer so a local rejection is stored and shown like any other result.
+        #   The overall score is 0 whatever the local score, and "rejected" tells the callers not to treat it as a match
+        explanation = "Rejected by pre-screening: " + "; ".join(prescore["reasons"]) + "."
+        def field(name):
+            value = prescore["criteria"].get(name)
+            return {"score": 0 if value is None else round(value * 100), "explanation": explanation}
+        return {
+            "job_title": {"score": 0, "explanation": explanation},
+            "experience": field("experience"),
+            "skill": field("skill"),
+            "education": field("education"),
+            "orientation": {"score": 0, "explanation": explanation},
+            "overall": {"score": 0, "explanation": explanation},
+            "rejected": True
+        }
+
+    @staticmethod
+    def screen(cv_filename: str, jd_filename: str):
+        """Return a local matching result when the pair is a clear mismatch, None when it needs GPT"""
+        if not PRESCORE_ENABLED:
+            return None
+        try:
+            prescore = PreScoring.score(cv_filename, jd_filename)
+        except (OSError, ValueError, AttributeError, TypeError):
+            #   Missing or unexpected extraction, let GPT decide
+            return None
+        PreScoring.record(prescore["rejected"])
+        return PreScoring.as_matching_result(prescore) if prescore["rejected"] else None
+
+    @staticmethod
+    def rank(cv_filenames: Dict[int, str], jd_filename: str):
+        """Split resumes into (kept, rejected): kept ones are ordered by local score, rejected ones carry their local result"""
+        if not PRESCORE_ENABLED:
+            return cv_filenames, {}
+        kept, rejected, local_scores = {}, {}, {}
+        for cv_id, cv_filename in cv_filenames.items():
+            try:
+                prescore = PreScoring.score(cv_filename, jd_filename)
+            except (OSError, ValueError, AttributeError, TypeError):
+                kept[cv_id], local_scores[cv_id] = cv_filename, -1
+                continue
+            PreScoring.record(prescore["rejected"])
+            if prescore["rejected"]:
+                rejected[cv_id] = PreScoring.as_matching_result(prescore)
+            else:
+                kept[cv_id], local_scores[cv_id] = cv_filename, prescore["overall"] or 0
+        kept = dict(sorted(kept.items(), key=lambda item: local_scores[item[0]], reverse=True))
+        return kept, rejected
+
+    @classmethod
+    def record(cls, skipped: bool):
+        with cls._lock:
+            cls._stats["scored"] += 1
+            cls._stats["skipped"] += int(skipped)
+        report = cls.report()
+        print(f" >>> Pre-scoring skipped {report['skipped']}/{report['scored']} GPT matching calls ({report['skip_ratio']}%)")
+
+    @classmethod
+    def report(cls):
+        with cls._lock:
+            scored, skipped = cls._stats["scored"], cls._stats["skipped"]
+        return {
+            "scored": scored,
+            "skipped": skipped,
+            "skip_ratio": round(100 * skipped / scored, 2) if scored else 0
+        }
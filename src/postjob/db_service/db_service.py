@@ -73,12 +73,3 @@ class DatabaseService:
             #   Delete uploaded duplicated CV
             os.remove(os.path.join(SAVED_TEMP, filename))
             raise HTTPException(status_code=409, detail="This resume already exists in system. Please upload the other!")
-    
-    @staticmethod
-    def check_file_duplicate(file: str, path: str):
-        filename, _  = os.path.splitext(file)
-        filenames = [os.path.splitext(file)[0] for file in os.listdir(path)]
-        if filename in filenames:
-            print("This resume already exists in system. Please upload the other!") 
-            return True
- 
\ No newline at end of file
@@ -1,28 +1,35 @@
 import model
 import os, shutil, json
 from config import db
+from typing import Any, Dict, Optional
 from datetime import datetime
 from postjob import schema
 from sqlmodel import Session, func, and_, or_, not_
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy import select
-from fastapi import HTTPException, Request, BackgroundTasks, UploadFile, status
+from fastapi import HTTPException, Request, BackgroundTasks, status
+from starlette.concurrency import run_in_threadpool
 from postjob.gg_service.gg_service import GoogleService
 from postjob.api_service.extraction_service import Extraction
-from postjob.api_service.openai_service import OpenAIService
+from postjob.api_service.cache_service import LLMCache
+from postjob.api_service.prescoring_service import PreScoring
 from postjob.db_service.db_service import DatabaseService
+from pagination import Pagination, paginate
+from batch_loader import BatchLoader
+from read_models import Slim
+from candidate_detail import CandidateDetail
+from email_templates import EmailTemplates
+from token_revocation import TokenRevocations
 from config import (
                 CV_PARSE_PROMPT, 
                 JD_PARSE_PROMPT,
-                CV_EXTRACTION_PATH,
-                JD_EXTRACTION_PATH, 
                 JD_SAVED_TEMP_DIR,
                 JD_SAVED_DIR,
                 CV_SAVED_DIR,
                 CANDIDATE_AVATAR_DIR,
                 CV_SAVED_TEMP_DIR,
                 EDITED_JOB,
-                MATCHING_PROMPT,
-                MATCHING_DIR)
+                MATCHING_PROMPT)
 
 background_task_results = {}
 
@@ -71,6 +78,12 @@ class AuthRequestRepository:
         result = db_session.execute(query).scalars().first()
         return result
 
+    @staticmethod
+    async def get_user_by_email_async(db_session: AsyncSession, email: str):
+        query = select(model.User).where(model.User.email == email)
+        result = (await db_session.execute(query)).scalars().first()
+        return result
+
 
 class OTPRepo:
     @staticmethod
@@ -88,11 +101,25 @@ class OTPRepo:
         
     @staticmethod
     def check_token(db_session: Session, token: str):
+        #   In-memory revocation filter, the table is only read while it is not loaded yet
+        revoked = TokenRevocations.is_revoked(token)
+        if revoked is not None:
+            return revoked
         token = db_session.execute(select(model.JWTModel).where(model.JWTModel.token == token)).scalar_one_or_none()
         if token:
             return True
         return False
 
+    @staticmethod
+    async def check_token_async(db_session: AsyncSession, token: str):
+        revoked = TokenRevocations.is_revoked(token)
+        if revoked is not None:
+            return revoked
+        token = (await db_session.execute(select(model.JWTModel).where(model.JWTModel.token == token))).scalar_one_or_none()
+        if token:
+            return True
+        return False
+
     
 levels = [
         ["Executive", "Senior", "Engineer", "Developer"], 
@@ -322,8 +349,7 @@ class General:
         return cv_result
     
     def background_send_email(input_data):
-        for recipient in input_data.values():
-            GoogleService.CONTENT_GOOGLE(msg=recipient["content"], input_email=recipient["email"])
+        GoogleService.CONTENT_GOOGLE_BATCH((recipient["content"], recipient["email"]) for recipient in input_data.values())
         
     @staticmethod
     def get_jd_file(request, job_id, db_session):
@@ -356,32 +382,22 @@ class Recruiter:
     class Job:
 
         @staticmethod
-        def jd_parsing(uploaded_file: UploadFile):    
-            #   Save file as temporarily
-            cleaned_filename = DatabaseService.clean_filename(uploaded_file.filename)
-            with open(os.path.join(JD_SAVED_TEMP_DIR,  cleaned_filename), 'w+b') as file:
-                shutil.copyfileobj(uploaded_file.file, file)    
-            #   Check duplicated filename
-            if not DatabaseService.check_file_duplicate(cleaned_filename, JD_EXTRACTION_PATH):
-                prompt_template = Extraction.jd_parsing_template(store_path=JD_SAVED_TEMP_DIR, filename=cleaned_filename)
-
-                #   Read parsing requirements
-                with open(JD_PARSE_PROMPT, "r") as file:
-                    require = file.read()
-                prompt_template += require 
-                
-                #   Start parsing
-                extracted_result = OpenAIService.gpt_api(prompt_template)
-                
-                #   Save extracted result
-                saved_path = DatabaseService.store_jd_extraction(extracted_json=extracted_result, jd_file=cleaned_filename)
-            else:
-                #   Read available extracted result
-                saved_path = os.path.join(JD_EXTRACTION_PATH, cleaned_filename.split(".")[0] + ".json")
-                with open(saved_path) as file:
-                    extracted_result = file.read()
+        async def jd_parsing(cleaned_filename: str, saved_filename: str):    
+            #   The uploaded file was saved as temporary (under saved_filename) by the endpoint
+            prompt_template = await Extraction.jd_parsing_template(store_path=JD_SAVED_TEMP_DIR, filename=saved_filename)
+
+            #   Read parsing requirements
+            with open(JD_PARSE_PROMPT, "r") as file:
+                require = file.read()
+            prompt_template += require 
+            
+            #   Start parsing (an already parsed JD content is served from cache)
+            extracted_result = await LLMCache.gpt_api(prompt_template, prompt_version="jd_parsing")
+            
+            #   Save extracted result
+            saved_path = DatabaseService.store_jd_extraction(extracted_json=extracted_result, jd_file=cleaned_filename)
             #   Remove saved temporary file
-            os.remove(os.path.join(JD_SAVED_TEMP_DIR, cleaned_filename))
+            os.remove(os.path.join(JD_SAVED_TEMP_DIR, saved_filename))
             return extracted_result, saved_path
             
             
@@ -497,13 +513,13 @@ class Recruiter:
             
             
         @staticmethod
-        def list_created_job(is_draft, db_session, user):                   
+        def list_created_job(is_draft, page: Pagination, db_session, user):                   
             if is_draft:
-                query = select(model.JobDescription).where(
+                query = select(Slim.JobDescription).where(
                                             model.JobDescription.is_draft == is_draft,
                                             model.JobDescription.user_id == user.id)
-                results = db_session.execute(query).scalars().all()      
-                if not results:
+                results, total_items = paginate(db_session, query, page, model.JobDescription, scalars=True)      
+                if not total_items:
                     raise HTTPException(status_code=404, detail="Could not found any relevant jobs!")
                 return [{
                     "job_id": result.id,
@@ -511,9 +527,9 @@ class Recruiter:
                     "industry": result.industries,
                     "job_service": "Posting Job",  #result.job_service,
                     "created_time": result.created_at
-                } for result in results]
+                } for result in results], total_items
             else:
-                query = select(model.JobDescription, func.count(model.Resume.id).label("resume_count"))     \
+                query = select(Slim.JobDescription, func.count(model.Resume.id).label("resume_count"))     \
                                     .join(model.Resume, model.JobDescription.id == model.Resume.job_id)   \
                                     .where(model.JobDescription.is_draft == is_draft,
                                             model.JobDescription.user_id == user.id)    \
@@ -523,8 +539,8 @@ class Recruiter:
                 #             .join(model.Resume, model.JobDescription.id == model.Resume.job_id, isouter=True)   \
                 #             .group_by(model.JobDescription.id)
 
-                results = db_session.execute(query).all() 
-                if not results:
+                results, total_items = paginate(db_session, query, page, model.JobDescription) 
+                if not total_items:
                     raise HTTPException(status_code=404, detail="Could not found any relevant jobs!")
 
                 return [{
@@ -535,7 +551,7 @@ class Recruiter:
                     "job_service": result.JobDescription.job_service,
                     "status": result.JobDescription.status,
                     "num_cvs": result[1]
-                } for result in results]
+                } for result in results], total_items
             
             
         @staticmethod
@@ -704,92 +720,93 @@ class Recruiter:
     class Resume:
 
         @staticmethod
-        def list_candidate(state: schema.CandidateState, db_session: Session): 
+        def list_candidate(state: schema.CandidateState, page: Pagination, db_session: Session): 
             
             if state == schema.CandidateState.all:
-                resume_results = db_session.execute(select(model.Resume, model.ResumeVersion)    \
-                                                .join(model.ResumeVersion, model.Resume.id == model.ResumeVersion.cv_id)
-                                                .where(model.ResumeVersion.is_lastest == True)).all()
+                #   Latest version of every resume with its job service: one scan of candidate_overviews
+                resume_results, total_items = paginate(db_session, select(model.CandidateOverview), page, model.CandidateOverview, scalars=True)
                 return [{
-                        "id": result.ResumeVersion.cv_id,
-                        "fullname": result.ResumeVersion.name,
-                        "job_title": result.ResumeVersion.current_job,
-                        "industry": result.ResumeVersion.industry,
-                        "status": result.ResumeVersion.status,
-                        "job_service": General.get_job_from_resume(result.Resume.id, db_session).job_service if result.Resume.job_id else "SearchCV",
-                        "referred_time": result.ResumeVersion.created_at
-                    } for result in resume_results]
+                        "id": result.cv_id,
+                        "fullname": result.name,
+                        "job_title": result.current_job,
+                        "industry": result.industry,
+                        "status": result.status,
+                        "job_service": result.job_service,
+                        "referred_time": result.created_at
+                    } for result in resume_results], total_items
             
             elif state == schema.CandidateState.new_candidate:
-                results = db_session.execute(select(model.RecruitResumeJoin, model.ResumeVersion)    \
+                results, total_items = paginate(db_session, select(Slim.RecruitResumeJoin, Slim.ResumeVersion)    \
                                                 .join(model.ResumeVersion, not_(model.RecruitResumeJoin.resume_id == model.ResumeVersion.cv_id))    \
-                                                .filter(model.ResumeVersion.is_lastest == True)).all()
+                                                .filter(model.ResumeVersion.is_lastest == True), page, model.ResumeVersion)
+                loader = BatchLoader(db_session).prime("resume", [result.ResumeVersion.cv_id for result in results])
                 return [{
                         "id": result.ResumeVersion.cv_id,
                         "fullname": result.ResumeVersion.name,
                         "job_title": result.ResumeVersion.current_job,
                         "industry": result.ResumeVersion.industry,
                         "status": result.ResumeVersion.status,
-                        "job_service": General.get_job_from_resume(result.Resume.id, db_session).job_service if result.Resume.job_id else "SearchCV",
+                        "job_service": loader.job_service(result.ResumeVersion.cv_id),
                         "referred_time": result.ResumeVersion.created_at
-                    } for result in results]
+                    } for result in results], total_items
             elif state == schema.CandidateState.choosen_candidate:
-                results = db_session.execute(select(model.RecruitResumeJoin, model.ResumeVersion)   \
+                results, total_items = paginate(db_session, select(Slim.RecruitResumeJoin, Slim.ResumeVersion)   \
                                                 .join(model.ResumeVersion, model.ResumeVersion.cv_id == model.RecruitResumeJoin.resume_id)  \
                                                 .filter(or_(model.RecruitResumeJoin.package == schema.ResumePackage.basic,
                                                            model.RecruitResumeJoin.package == schema.ResumePackage.platinum))    \
-                                                .where(model.ResumeVersion.is_lastest == True)).all()
+                                                .where(model.ResumeVersion.is_lastest == True), page, model.ResumeVersion)
+                loader = BatchLoader(db_session).prime("resume", [result.ResumeVersion.cv_id for result in results])
                 return [{
                         "id": result.ResumeVersion.cv_id,
                         "fullname": result.ResumeVersion.name,
                         "job_title": result.ResumeVersion.current_job,
-                        "job_service": General.get_job_from_resume(result.Resume.id, db_session).job_service if result.Resume.job_id else "SearchCV",
+                        "job_service": loader.job_service(result.ResumeVersion.cv_id),
                         "status": result.ResumeVersion.status,
                         "referred_time": result.ResumeVersion.created_at
-                    } for result in results]
+                    } for result in results], total_items
             elif state == schema.CandidateState.inappro_candidate:
-                results = db_session.execute(select(model.RecruitResumeJoin, model.ResumeVersion)   \
+                results, total_items = paginate(db_session, select(Slim.RecruitResumeJoin, Slim.ResumeVersion)   \
                                                 .join(model.ResumeVersion, model.ResumeVersion.cv_id == model.RecruitResumeJoin.resume_id)  \
                                                 .filter(model.RecruitResumeJoin.is_rejected == True)    \
-                                                .where(model.ResumeVersion.is_lastest == True)).all()
+                                                .where(model.ResumeVersion.is_lastest == True), page, model.ResumeVersion)
+                loader = BatchLoader(db_session).prime("resume", [result.ResumeVersion.cv_id for result in results])
                 return [{
                         "id": result.ResumeVersion.cv_id,
                         "fullname": result.ResumeVersion.name,
                         "job_title": result.ResumeVersion.current_job,
                         "industry": result.ResumeVersion.industry,
                         "status": result.ResumeVersion.status,
-                        "job_service": General.get_job_from_resume(result.Resume.id, db_session).job_service if result.Resume.job_id else "SearchCV",
+                        "job_service": loader.job_service(result.ResumeVersion.cv_id),
                         "referred_time": result.ResumeVersion.created_at
-                    } for result in results]
+                    } for result in results], total_items
             else:
                 pass
                 
                 
         @staticmethod
         def get_detail_candidate(request: Request, candidate_id, db_session, current_user):
-            resume_result = General.get_detail_resume_by_id(candidate_id, db_session) 
+            resume_result = CandidateDetail.load(candidate_id, db_session, recruiter_id=current_user.id)
             if not resume_result:
                 raise HTTPException(status_code=404, detail="Resume doesn't exist!")
-            job_result = General.get_job_by_id(resume_result.Resume.job_id, db_session)
+            job_result = resume_result.JobDescription
             if not job_result:
                 raise HTTPException(status_code=404, detail="Job doesn't exist!")
             #   Get resume information of a specific recruiter
-            choosen_result = db_session.execute(select(model.RecruitResumeJoin).where(and_(model.RecruitResumeJoin.user_id == current_user.id,
-                                                                                           model.RecruitResumeJoin.resume_id == candidate_id))).scalars().first()
+            choosen_result = resume_result.RecruitResumeJoin
             
-            educations = db_session.execute(select(model.ResumeEducation).where(model.ResumeEducation.cv_id == candidate_id)).scalars().all()
-            experience = db_session.execute(select(model.ResumeExperience).where(model.ResumeExperience.cv_id == candidate_id)).scalars().all()
-            projects = db_session.execute(select(model.ResumeProject).where(model.ResumeProject.cv_id == candidate_id)).scalars().all()
-            awards = db_session.execute(select(model.ResumeAward).where(model.ResumeAward.cv_id == candidate_id)).scalars().all()
-            lang_certs = db_session.execute(select(model.LanguageResumeCertificate).where(model.LanguageResumeCertificate.cv_id == candidate_id)).scalars().all()
-            other_certs = db_session.execute(select(model.OtherResumeCertificate).where(model.OtherResumeCertificate.cv_id == candidate_id)).scalars().all()
+            educations = resume_result.educations
+            experience = resume_result.experience
+            projects = resume_result.projects
+            awards = resume_result.awards
+            lang_certs = resume_result.lang_certs
+            other_certs = resume_result.other_certs
             
             if not choosen_result:
                 return {
                     "cv_id": candidate_id,
                     "status": resume_result.ResumeVersion.status,
                     "job_service": job_result.job_service,
-                    "total_point": General.get_resume_valuate(candidate_id, db_session).total_point,
+                    "total_point": resume_result.valuation().total_point,
                     "avatar": os.path.join(str(request.base_url), "static/resume/avatar/default_avatar.png"),
                     "candidate_name": "Họ và tên",
                     "current_job": resume_result.ResumeVersion.current_job,
@@ -852,7 +869,7 @@ class Recruiter:
                     "cv_id": candidate_id,
                     "status": resume_result.ResumeVersion.status,
                     "job_service": job_result.job_service,
-                    "total_point": General.get_resume_valuate(candidate_id, db_session).total_point,
+                    "total_point": resume_result.valuation().total_point,
                     "avatar": os.path.join(str(request.base_url), resume_result.ResumeVersion.avatar),
                     "candidate_name": resume_result.ResumeVersion.name,
                     "current_job": resume_result.ResumeVersion.current_job,
@@ -937,6 +954,8 @@ class Recruiter:
             
         @staticmethod
         def choose_candidate_basic(cv_id: int, db_session: Session, current_user):
+            #   Checked and charged on the user row: the cached principal may be behind
+            current_user = db_session.execute(select(model.User).where(model.User.id == current_user.id)).scalars().first()
             #   Check wheather recruiter's point is available
             valuation_result = General.get_resume_valuate(cv_id, db_session)
             if current_user.point < valuation_result.total_point:
@@ -1016,6 +1035,8 @@ class Recruiter:
             
         @staticmethod
         def confirm_interview(data: schema.ResumeIndex, db_session: Session, current_user):
+            #   Checked and charged on the user row: the cached principal may be behind
+            current_user = db_session.execute(select(model.User).where(model.User.id == current_user.id)).scalars().first()
             #   Check wheather recruiter's point is available
             valuation_result = General.get_resume_valuate(data.cv_id, db_session)
             if current_user.point < valuation_result.total_point * 10:
@@ -1049,16 +1070,17 @@ class Recruiter:
         
         @staticmethod
         def list_interview_schedule(db_session: Session, current_user):
-            query = select(model.Resume, model.ResumeVersion, model.InterviewSchedule)  \
+            query = select(Slim.Resume, Slim.ResumeVersion, Slim.InterviewSchedule)  \
                         .join(model.Resume, model.Resume.id == model.ResumeVersion.cv_id)   \
                         .outerjoin(model.InterviewSchedule, model.InterviewSchedule.candidate_id == model.ResumeVersion.cv_id)   \
                         .filter(model.InterviewSchedule.user_id == current_user.id)
             results = db_session.execute(query).all()
+            loader = BatchLoader(db_session).prime("resume", [result.Resume.id for result in results])
             return [{
                 "candidate_id": result.InterviewSchedule.candidate_id,
                 "candidate_name": result.ResumeVersion.name,
                 "job_title": result.ResumeVersion.current_job,
-                "job_service": General.get_job_from_resume(result.Resume.id, db_session).job_service if result.Resume.job_id else "SearchCV",
+                "job_service": loader.job_service(result.Resume.id),
                 "status": result.ResumeVersion.status,
                 "interview_date": result.InterviewSchedule.date,
                 "interview_time": f"{result.InterviewSchedule.start_time} - {result.InterviewSchedule.end_time}",
@@ -1084,16 +1106,16 @@ class Admin:
     class Job: 
         
         @staticmethod
-        def list_job_status(request: Request, status: SystemError, db_session: Session):
-            job_query = select(model.User, model.JobDescription, model.Company, func.count(model.Resume.id).label("resume_count"))  \
+        def list_job_status(request: Request, status: SystemError, page: Pagination, db_session: Session):
+            job_query = select(Slim.User, Slim.JobDescription, Slim.Company, func.count(model.Resume.id).label("resume_count"))  \
                                 .join(model.Company, model.Company.user_id == model.User.id)    \
                                 .join(model.JobDescription, model.JobDescription.user_id == model.User.id)     \
                                 .join(model.Resume, (model.Resume.job_id == model.JobDescription.id) & (model.Resume.user_id == model.User.id), isouter=True)   \
                                 .group_by(model.User.id, model.JobDescription.id, model.Company.id)     \
                                 .where(model.JobDescription.status == status)
-            results = db_session.execute(job_query).all() 
-            if not results:
-                return []
+            results, total_items = paginate(db_session, job_query, page, model.JobDescription) 
+            if not total_items:
+                return [], 0
             if status == schema.JobStatus.pending or status == schema.JobStatus.reviewing:   #  Chờ duyệt - Đang duyệt
                 return [{
                     "job_id": result.JobDescription.id,
@@ -1104,7 +1126,7 @@ class Admin:
                     "industries": result.JobDescription.industries,
                     "status": result.JobDescription.status,
                     "job_service": result.JobDescription.job_service if result.JobDescription.job_service else "SearchCV" 
-                } for result in results]                
+                } for result in results], total_items                
             else:       #  Đang tuyen - Đã tủyển
                 return [{
                     "job_id": result.JobDescription.id,
@@ -1116,7 +1138,7 @@ class Admin:
                     "status": result.JobDescription.status,
                     "job_service": result.JobDescription.job_service if result.JobDescription.job_service else "SearchCV",
                     "num_cv": result[-1]
-                } for result in results]
+                } for result in results], total_items
             
             
         @staticmethod
@@ -1330,97 +1352,52 @@ class Admin:
             
         
         @staticmethod
-        def list_candidate(state: str, db_session: Session):
-            if state == schema.CandidateStatus.all:
-                results = db_session.execute(select(model.Resume, model.ResumeVersion)    \
-                                                .join(model.ResumeVersion, model.ResumeVersion.cv_id == model.Resume.id)    \
-                                                .filter(model.ResumeVersion.is_lastest == True)).all()
-                if not results:
-                    raise HTTPException(status_code=404, detail="Could not find any relevant candidates!")
-                return [{
-                        "id": result.ResumeVersion.cv_id,
-                        "fullname": result.ResumeVersion.name,
-                        "job_title": result.ResumeVersion.current_job,
-                        "industry": result.ResumeVersion.industry,
-                        "job_service": General.get_job_from_resume(result.Resume.id, db_session).job_service if result.Resume.job_id else "SearchCV",
-                        "status": result.ResumeVersion.status,
-                        "referred_time": result.ResumeVersion.created_at
-                    } for result in results]
-            
-            elif state == schema.CandidateStatus.pending:
-                results =  db_session.execute(select(model.Resume, model.ResumeVersion)    \
-                                                .join(model.ResumeVersion, model.ResumeVersion.cv_id == model.Resume.id)    \
-                                                .filter(and_(model.ResumeVersion.is_lastest == True,
-                                                             model.ResumeVersion.status == schema.ResumeStatus.candidate_accepted))).all()
-                if not results:
-                    raise HTTPException(status_code=404, detail="Could not find any relevant candidates!")
-                return [{
-                        "id": result.ResumeVersion.cv_id,
-                        "fullname": result.ResumeVersion.name,
-                        "job_title": result.ResumeVersion.current_job,
-                        "industry": result.ResumeVersion.industry,
-                        "status": result.ResumeVersion.status,
-                        "job_service": General.get_job_from_resume(result.Resume.id, db_session).job_service if result.Resume.job_id else "SearchCV",
-                        "referred_time": result.ResumeVersion.created_at
-                    } for result in results]
-            elif state == schema.CandidateStatus.approved:
-                results =  db_session.execute(select(model.Resume, model.ResumeVersion)    \
-                                                .join(model.ResumeVersion, model.ResumeVersion.cv_id == model.Resume.id)    \
-                                                .filter(and_(model.ResumeVersion.is_lastest == True,
-                                                             model.ResumeVersion.is_ai_matched == True))).all()
-                if not results:
-                    raise HTTPException(status_code=404, detail="Could not find any relevant candidates!")
-                return [{
-                        "id": result.ResumeVersion.cv_id,
-                        "fullname": result.ResumeVersion.name,
-                        "job_title": result.ResumeVersion.current_job,
-                        "industry": result.ResumeVersion.industry,
-                        "job_service": General.get_job_from_resume(result.Resume.id, db_session).job_service if result.Resume.job_id else "SearchCV",
-                        "status": result.ResumeVersion.status,
-                        "referred_time": result.ResumeVersion.created_at
-                    } for result in results]
-            elif state == schema.CandidateStatus.declined:
-                results =  db_session.execute(select(model.Resume, model.ResumeVersion)    \
-                                                .join(model.ResumeVersion, model.ResumeVersion.cv_id == model.Resume.id)    \
-                                                .filter(and_(model.ResumeVersion.is_lastest == True,
-                                                            model.ResumeVersion.is_ai_matched == False))).all()
-                if not results:
-                    raise HTTPException(status_code=404, detail="Could not find any relevant candidates!")
-                return [{
-                        "id": result.ResumeVersion.cv_id,
-                        "fullname": result.ResumeVersion.name,
-                        "job_title": result.ResumeVersion.current_job,
-                        "industry": result.ResumeVersion.industry,
-                        "status": result.ResumeVersion.status,
-                        "job_service": General.get_job_from_resume(result.Resume.id, db_session).job_service if result.Resume.job_id else "SearchCV",
-                        "referred_time": result.ResumeVersion.created_at
-                    } for result in results]
-            else:
-                pass
+        def list_candidate(state: str, page: Pagination, db_session: Session):
+            #   Latest version of each resume with its job service, read from candidate_overviews by one indexed scan
+            filters = {
+                schema.CandidateStatus.all: [],
+                schema.CandidateStatus.pending: [model.CandidateOverview.status == schema.ResumeStatus.candidate_accepted],
+                schema.CandidateStatus.approved: [model.CandidateOverview.is_ai_matched == True],
+                schema.CandidateStatus.declined: [model.CandidateOverview.is_ai_matched == False],
+            }
+            if state not in filters:
+                return
+            results, total_items = paginate(db_session, select(model.CandidateOverview).where(*filters[state]), page, model.CandidateOverview, scalars=True)
+            if not total_items:
+                raise HTTPException(status_code=404, detail="Could not find any relevant candidates!")
+            return [{
+                    "id": result.cv_id,
+                    "fullname": result.name,
+                    "job_title": result.current_job,
+                    "industry": result.industry,
+                    "job_service": result.job_service,
+                    "status": result.status,
+                    "referred_time": result.created_at
+                } for result in results], total_items
             
 
         @staticmethod
         def get_detail_candidate(request: Request, cv_id: int, db_session: Session):
             
-            resume_result = General.get_detail_resume_by_id(cv_id, db_session) 
+            resume_result = CandidateDetail.load(cv_id, db_session)
             if not resume_result:
                 raise HTTPException(status_code=404, detail="Resume doesn't exist!")
-            job_result = General.get_job_by_id(resume_result.Resume.job_id, db_session)
+            job_result = resume_result.JobDescription
             if not job_result:
                 raise HTTPException(status_code=404, detail="Job doesn't exist!")
             
-            educations = db_session.execute(select(model.ResumeEducation).where(model.ResumeEducation.cv_id == cv_id)).scalars().all()
-            experience = db_session.execute(select(model.ResumeExperience).where(model.ResumeExperience.cv_id == cv_id)).scalars().all()
-            projects = db_session.execute(select(model.ResumeProject).where(model.ResumeProject.cv_id == cv_id)).scalars().all()
-            awards = db_session.execute(select(model.ResumeAward).where(model.ResumeAward.cv_id == cv_id)).scalars().all()
-            lang_certs = db_session.execute(select(model.LanguageResumeCertificate).where(model.LanguageResumeCertificate.cv_id == cv_id)).scalars().all()
-            other_certs = db_session.execute(select(model.OtherResumeCertificate).where(model.OtherResumeCertificate.cv_id == cv_id)).scalars().all()
+            educations = resume_result.educations
+            experience = resume_result.experience
+            projects = resume_result.projects
+            awards = resume_result.awards
+            lang_certs = resume_result.lang_certs
+            other_certs = resume_result.other_certs
             
             return {
                     "cv_id": cv_id,
                     "status": resume_result.ResumeVersion.status,
                     "job_service": job_result.job_service,
-                    "total_point": General.get_resume_valuate(cv_id, db_session).total_point,
+                    "total_point": resume_result.valuation().total_point,
                     "avatar": os.path.join(str(request.base_url), resume_result.ResumeVersion.avatar),
                     "candidate_name": resume_result.ResumeVersion.name,
                     "current_job": resume_result.ResumeVersion.current_job,
@@ -1590,7 +1567,7 @@ class Collaborator:
 
 
         @staticmethod
-        def list_job(request, job_status, db_session, current_user):
+        def list_job(request, job_status, page: Pagination, db_session, current_user):
             #   ======================= Đã giới thiệu =======================
             if job_status == schema.CollaborateJobStatus.referred:
                 query_referred = (
@@ -1620,9 +1597,9 @@ class Collaborator:
                                 model.JobDescription.status)
                             .having(func.count(model.Resume.id) > 0)
                         )
-                result_referred = db_session.execute(query_referred).all() 
-                if not result_referred:
-                    return []
+                result_referred, total_items = paginate(db_session, query_referred, page, model.JobDescription) 
+                if not total_items:
+                    return [], 0
                 return [{
                     "job_id": result[3],
                     "company_logo": os.path.join(str(request.base_url), result[1]),
@@ -1632,7 +1609,7 @@ class Collaborator:
                     "job_service": result[7],
                     "status": result[8],
                     "num_cv": result[-1]
-                } for result in result_referred]
+                } for result in result_referred], total_items
             
             #  ======================= Favorite Jobs ======================= 
             
@@ -1653,9 +1630,9 @@ class Collaborator:
                             .join(model.CollaboratorJobJoin, and_(model.CollaboratorJobJoin.user_id == current_user.id, model.CollaboratorJobJoin.job_id == model.JobDescription.id))
                             .where(model.CollaboratorJobJoin.is_favorite == True)  # Assuming is_favorite is a boolean column
                         )
-                result_favorite = db_session.execute(query_favorite).all() 
-                if not result_favorite:
-                    return []
+                result_favorite, total_items = paginate(db_session, query_favorite, page, model.JobDescription) 
+                if not total_items:
+                    return [], 0
                 return [{
                     "job_id": result[3],
                     "company_logo": os.path.join(str(request.base_url), result[1]),
@@ -1664,7 +1641,7 @@ class Collaborator:
                     "industries": result[5],
                     "job_service": result[7],
                     "status": result[8]
-                } for result in result_favorite]
+                } for result in result_favorite], total_items
             
             #  ======================= Chưa giới thiệu =======================
             elif job_status == schema.CollaborateJobStatus.unreferred:
@@ -1697,9 +1674,9 @@ class Collaborator:
                             .having(func.count(model.Resume.id) == 0)
                             # .filter(and_(model.CollaboratorJobJoin.is_favorite == False)
                 )
-                result_unreferred = db_session.execute(query_unreferred).all() 
-                if not result_unreferred:
-                    return []
+                result_unreferred, total_items = paginate(db_session, query_unreferred, page, model.JobDescription) 
+                if not total_items:
+                    return [], 0
                 return [{
                     "job_id": result[3],
                     "company_logo": os.path.join(str(request.base_url), result[1]),
@@ -1708,59 +1685,45 @@ class Collaborator:
                     "industries": result[5],
                     "job_service": result[7],
                     "status": result[8],
-                } for result in result_unreferred]
+                } for result in result_unreferred], total_items
             else:
                 pass
     
     
     class Resume:    
         @staticmethod
-        def parse_base(store_path: str, filename: str):
-            #   Check duplicated filename
-            if not DatabaseService.check_file_duplicate(filename, CV_EXTRACTION_PATH):
-                prompt_template = Extraction.cv_parsing_template(store_path=store_path, filename=filename)
-
-                #   Read parsing requirements
-                with open(CV_PARSE_PROMPT, "r") as file:
-                    require = file.read()
-                prompt_template += require 
-                
-                #   Start parsing
-                extracted_result = OpenAIService.gpt_api(prompt_template)        
-                saved_path = DatabaseService.store_cv_extraction(extracted_json=extracted_result, cv_file=filename)
-            else:
-                #   Read available extracted result
-                saved_path = os.path.join(CV_EXTRACTION_PATH, filename.split(".")[0] + ".json")
-                with open(saved_path) as file:
-                    extracted_result = json.loads(file.read())
+        async def parse_base(store_path: str, filename: str, saved_filename: Optional[str] = None):
+            #   The extraction is named after filename, the PDF read from saved_filename when it was saved under another name
+            prompt_template = await Extraction.cv_parsing_template(store_path=store_path, filename=saved_filename or filename)
+
+            #   Read parsing requirements
+            with open(CV_PARSE_PROMPT, "r") as file:
+                require = file.read()
+            prompt_template += require 
+            
+            #   Start parsing (an already parsed CV content is served from cache)
+            extracted_result = await LLMCache.gpt_api(prompt_template, prompt_version="cv_parsing")
+            saved_path = DatabaseService.store_cv_extraction(extracted_json=extracted_result, cv_file=filename)
             return extracted_result, saved_path
 
         @staticmethod
-        def cv_parsing(cv_id: int, db_session: Session, user):
+        async def cv_parsing(cv_id: int, db_session: Session, user):
             result = General.get_detail_resume_by_id(cv_id, db_session, user)       
             if not result.ResumeVersion.filename:
                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Please upload at least 1 CV_PDF")
-            return Collaborator.Resume.parse_base(CV_SAVED_DIR, result.ResumeVersion.filename)
+            #   No connection held while waiting for GPT
+            db.release(db_session)
+            return await Collaborator.Resume.parse_base(CV_SAVED_DIR, result.ResumeVersion.filename)
     
 
         @staticmethod
-        def add_candidate(background_tasks: BackgroundTasks, data: schema.AddCandidate, db_session: Session):
-            #   PDF uploaded file validation        
-            if data.cv_pdf.content_type != 'application/pdf':
-                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Must be PDF file") 
-            cleaned_filename = DatabaseService.clean_filename(data.cv_pdf.filename)
-
-            #   Save CV file as temporary
-            with open(os.path.join(CV_SAVED_TEMP_DIR, cleaned_filename), 'w+b') as file:
-                shutil.copyfileobj(data.cv_pdf.file, file)
-            
-            background_tasks.add_task(Collaborator.Resume.parse_base, CV_SAVED_TEMP_DIR, cleaned_filename)
-            # extracted_result = background_task_results['extracted_result']
-            extracted_result, _ = Collaborator.Resume.parse_base(CV_SAVED_TEMP_DIR, cleaned_filename)
-            #   Check duplicated CVs
-            DatabaseService.check_db_duplicate(extracted_result["contact_information"], cleaned_filename, db_session)
+        async def add_candidate(cleaned_filename: str, saved_filename: str, db_session: Session):
+            #   The uploaded CV was saved as temporary (under saved_filename) by the endpoint
+            extracted_result, _ = await Collaborator.Resume.parse_base(CV_SAVED_TEMP_DIR, cleaned_filename, saved_filename)
+            #   Check duplicated CVs (a duplicate removes the temporary file)
+            await run_in_threadpool(DatabaseService.check_db_duplicate, extracted_result["contact_information"], saved_filename, db_session)
             #   Save Resume's basic information to DB
-            os.remove(os.path.join(CV_SAVED_TEMP_DIR, cleaned_filename))
+            await run_in_threadpool(os.remove, os.path.join(CV_SAVED_TEMP_DIR, saved_filename))
             return extracted_result
         
         
@@ -2193,16 +2156,16 @@ class Collaborator:
             return resume_db, version_db
         
         @staticmethod
-        def percent_estimate(filename: str):
-            prompt_template = Extraction.resume_percent_estimate(filename)      
+        async def percent_estimate(filename: str):
+            prompt_template = await Extraction.resume_percent_estimate(filename)      
             #   Start parsing
-            extracted_result = OpenAIService.gpt_api(prompt_template)
+            extracted_result = await LLMCache.gpt_api(prompt_template, prompt_version="percent_estimate")
             point = extracted_result["point"]
             return point/100
         
 
         @staticmethod
-        def update_valuate(data: schema.UpdateResumeValuation, db_session: Session):
+        def load_valuation(data: schema.UpdateResumeValuation, db_session: Session):
             result = General.get_detail_resume_by_id(data.cv_id, db_session) 
             if not result:
                 raise HTTPException(status_code=404, detail="Resume doesn't exist!")
@@ -2210,11 +2173,13 @@ class Collaborator:
             valuate_result = db_session.execute(valuation_query).scalars().first()
             if not valuate_result:
                 raise HTTPException(status_code=404, detail="This Resume has not been valuated!")
-            
+            return result, valuate_result
+
+        @staticmethod
+        def save_valuation(data: schema.UpdateResumeValuation, result, valuate_result: model.ValuationInfo, percent, db_session: Session):
             #   Point initialization
             hard_point = 0
-            if data.current_salary is not None:
-                percent = Collaborator.Resume.percent_estimate(filename=result.ResumeVersion.filename)
+            if percent is not None:
                 hard_point = round(percent*data.current_salary / 100000, 1)   # Convert money to point: 100000 (vnđ) => 1đ
                 valuate_result.hard_item = data.current_salary
                 valuate_result.hard_point = hard_point
@@ -2271,28 +2236,32 @@ class Collaborator:
             result.ResumeVersion.status = schema.ResumeStatus.pricing_approved
             db.commit_rollback(db_session)
             return valuate_result
+
+        @staticmethod
+        async def update_valuate(data: schema.UpdateResumeValuation, db_session: Session):
+            #   Queries and commits in the threadpool, only the GPT estimate is awaited on the event loop
+            result, valuate_result = await run_in_threadpool(Collaborator.Resume.load_valuation, data, db_session)
+            percent = None
+            if data.current_salary is not None:
+                #   No connection held while waiting for GPT
+                await run_in_threadpool(db.release, db_session)
+                percent = await Collaborator.Resume.percent_estimate(filename=result.ResumeVersion.filename)
+            return await run_in_threadpool(Collaborator.Resume.save_valuation, data, result, valuate_result, percent, db_session)
     
         @staticmethod
-        def matching_base(cv_filename: str, jd_filename: str):
+        async def matching_base(cv_filename: str, jd_filename: str):
             #   Create saved file name
             match_filename = jd_filename.split(".")[0] + "__" + cv_filename
-            #   Check duplicated filename
-            if not DatabaseService.check_file_duplicate(match_filename, MATCHING_DIR):
-                prompt_template = Extraction.matching_template(cv_filename, jd_filename)
-
-                #   Read parsing requirements
-                with open(MATCHING_PROMPT, "r") as file:
-                    require = file.read()
-                prompt_template += require 
-                
-                #   Start parsing
-                matching_result = OpenAIService.gpt_api(prompt_template)        
-                saved_path = DatabaseService.store_matching_result(extracted_json=matching_result, saved_name=match_filename)
-            else:
-                #   Read available extracted result
-                saved_path = os.path.join(MATCHING_DIR, match_filename.split(".")[0] + ".json")
-                with open(saved_path) as file:
-                    matching_result = json.loads(file.read())
+            prompt_template = Extraction.matching_template(cv_filename, jd_filename)
+
+            #   Read parsing requirements
+            with open(MATCHING_PROMPT, "r") as file:
+                require = file.read()
+            prompt_template += require 
+            
+            #   Start matching (an already matched CV-JD pair is served from cache)
+            matching_result = await LLMCache.gpt_api(prompt_template, prompt_version="matching")
+            saved_path = DatabaseService.store_matching_result(extracted_json=matching_result, saved_name=match_filename)
             return matching_result, saved_path
         
         
@@ -2323,7 +2292,7 @@ class Collaborator:
 
 
         @staticmethod
-        def cv_jd_matching(cv_id: int, db_session: Session, background_task: BackgroundTasks, current_user):
+        def prepare_matching(cv_id: int, db_session: Session):
             resume_result = General.get_detail_resume_by_id(cv_id, db_session)       
             if not resume_result:
                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Resume does not exist")
@@ -2337,63 +2306,20 @@ class Collaborator:
             #   Get Job by cv_id
             job_result = General.get_job_by_id(resume_result.Resume.job_id, db_session)
 
-            matching_result, saved_dir = Collaborator.Resume.matching_base(cv_filename=resume_result.ResumeVersion.filename, 
-                                                            jd_filename=job_result.jd_file.split("/")[-1])
-            
+            #   Clear mismatches are rejected locally, without a GPT call
+            matching_result = PreScoring.screen(resume_result.ResumeVersion.filename, job_result.jd_file.split("/")[-1])
+            if not matching_result:
+                #   No connection held while waiting for GPT
+                db.release(db_session)
+            return resume_result, job_result, matching_result
+
+        @staticmethod
+        def save_matching(cv_id: int, resume_result, matching_result: Dict[str, Any], db_session: Session, background_task: BackgroundTasks, current_user):
             overall_score = int(matching_result["overall"]["score"])
-            if overall_score >= 50:
-                candidate_content = f"""
-                <html>
-                    <body>
-                        <p> Dear {resume_result.ResumeVersion.name}, <br>
-                            Warm greetings from sharecv.vn !
-                            Your profile has been recommended on sharecv.vn. However, please be aware that only when we have your permission, the profile will be sent to the employer to review and evaluate. <br>
-                            Hence, please CLICK to below: <br>
-                            - <a href="http://localhost:3000/accept?id={cv_id}">"Accept"</a> Job referral acceptance letter. <br>
-                            - <a href="http://localhost:3000/decline?id={cv_id}">"Decline"</a> Job referral refusal letter. <br>
-                            Thank you for your cooperation. Should you need any further information or assistance, please do not hesitate to contact us. <br>
-                            Thanks and best regards, <br>
-                            Team ShareCV Customer Support <br>
-                            Hotline: 0888818006 – 0914171381 <br>
-                            Email: info@sharecv.vn <br>
-                            THANK YOU <br>
-                        </p>
-                            <hr>
-                        <p>
-                            Lời chào nồng nhiệt từ sharecv.vn! Hồ sơ của bạn đã được đề xuất trên nền tảng tuyển dụng sharecv.vn thông qua Cộng đồng Freelancer Headhunter của sharecv. Để đảm bảo tính bảo mật thông tin cá nhân, chỉ khi được sự đồng ý của bạn, hồ sơ của bạn mới được tiến cử đến nhà tuyển dụng để xem xét, đánh giá. <br>
-                            Vì vậy, vui lòng BẤM VÀO nút: <br>
-                            - <a href="http://localhost:3000/accept?id={cv_id}">"Accept"</a> nếu bạn đồng ý việc sự giới thiệu này. <br>
-                            - <a href="http://localhost:3000/decline?id={cv_id}">"Decline"</a> nếu bạn từ chối sự giới thiệu việc làm này. <br>
-                            Cảm ơn sự hợp tác của bạn. Nếu bạn cần thêm thông tin hoặc trợ giúp, xin vui lòng liên hệ với chúng tôi. 
-                            Xin cảm ơn và trân trọng, Team ShareCV Đường dây hỗ trợ khách hàng: 0888818006 – 0914171381. <br>
-                            Email: info@sharecv.vn. <br>
-                            CẢM ƠN BẠN 
-                        </p>
-                    </body>
-                </html>
-                """
-                collab_content = f"""
-                <html>
-                    <body>
-                        <p> 
-                            Lời chào nồng nhiệt từ SHARECV VN! <br>
-                            Cảm ơn bạn đã giới thiệu/đề cử ứng viên đến nền tảng tuyển dụng SHARECV. Lưu ý quan trọng dành cho Cộng Tác Viên - chỉ khi có sự xác nhận đồng ý từ ứng viên thì hồ sơ do bạn giới thiệu mới được xem là hợp lệ và được chuyển đến Nhà tuyển dụng lựa chọn - đánh giá - phản hồi … <br>
-                            Hồ sơ của ứng viên sẽ được lưu trong vòng 48h kể từ thời điểm bạn giới thiệu ứng viên. Vậy nên, bạn vui lòng liên lạc, nhắc nhở ứng viên của mình nhanh chóng check mail / zalo …và nhấn nút "Accept" nếu ứng viên đồng ý ứng tuyển/ kết nối công việc này nhé. <br>
-                            Chúc bạn may mắn và thành công ! <br>
-                            SHARECV -PLATFORM : Nền tảng dành cho Nhà Tuyển dụng và ứng viên gặp nhau thông qua sự kết nối - giới thiệu từ cộng đồng FREELANCER. 
-                            SHARECV - Share cơ hội - Tăng kết nối- Nhân đôi giá trị! <br>
-                            Thank you for your cooperation. <br>
-                            Team Sharecv.vn <br>
-                            Customer support <br>
-                            Phone: 0888818006 - 0914171381 <br>
-                            Email: info@sharecv.vn <br>
-                            THANK YOU 
-                        </p>
-                    </body>
-                </html>
-                """
-                mail_contents = {"candidate": candidate_content,
-                                "collaborator": collab_content}
+            if overall_score >= 50 and not matching_result.get("rejected"):
+                #   Bilingual mail to the candidate, Vietnamese one to the collaborator
+                mail_contents = {"candidate": EmailTemplates.render("referral_candidate", ("en", "vi"), name=resume_result.ResumeVersion.name, cv_id=cv_id),
+                                "collaborator": EmailTemplates.render("referral_collaborator", ("vi",))}
                 #  Send mail
                 Collaborator.Resume.send_email_request(cv_id, mail_contents, db_session, background_task, current_user)
                 #   Update resume status 
@@ -2404,25 +2330,37 @@ class Collaborator:
                 resume_result.ResumeVersion.status = schema.ResumeStatus.ai_matching_rejected
                 resume_result.ResumeVersion.is_draft = True     #   Update resume as draft if resume is not matched with JD
             
-            #   Write matching result to Database
-            matching_db = model.ResumeMatching(
-                                    job_id=resume_result.Resume.job_id,
-                                    cv_id=cv_id,
-                                    title_score=int(matching_result["job_title"]["score"]),
-                                    title_explain=matching_result["job_title"]["explanation"],
-                                    exper_score=int(matching_result["experience"]["score"]),
-                                    exper_explain=matching_result["experience"]["explanation"],
-                                    skill_score=int(matching_result["skill"]["score"]),
-                                    skill_explain=matching_result["skill"]["explanation"],
-                                    education_score=int(matching_result["education"]["score"]),
-                                    education_explain=matching_result["education"]["explanation"],
-                                    orientation_score=int(matching_result["orientation"]["score"]),
-                                    orientation_explain=matching_result["orientation"]["explanation"],
-                                    overall_score=int(matching_result["overall"]["score"]),
-                                    overall_explain=matching_result["overall"]["explanation"]
-            )
-            db_session.add(matching_db)
+            #   Write matching result to Database (matching the resume again replaces its result)
+            db.upsert(db_session,
+                      model.ResumeMatching.__table__,
+                      [dict(
+                                job_id=resume_result.Resume.job_id,
+                                cv_id=cv_id,
+                                title_score=int(matching_result["job_title"]["score"]),
+                                title_explain=matching_result["job_title"]["explanation"],
+                                exper_score=int(matching_result["experience"]["score"]),
+                                exper_explain=matching_result["experience"]["explanation"],
+                                skill_score=int(matching_result["skill"]["score"]),
+                                skill_explain=matching_result["skill"]["explanation"],
+                                education_score=int(matching_result["education"]["score"]),
+                                education_explain=matching_result["education"]["explanation"],
+                                orientation_score=int(matching_result["orientation"]["score"]),
+                                orientation_explain=matching_result["orientation"]["explanation"],
+                                overall_score=int(matching_result["overall"]["score"]),
+                                overall_explain=matching_result["overall"]["explanation"]
+                      )],
+                      keys=["cv_id", "job_id"])
             db.commit_rollback(db_session)
+
+        @staticmethod
+        async def cv_jd_matching(cv_id: int, db_session: Session, background_task: BackgroundTasks, current_user):
+            #   Queries, commits and emails in the threadpool, only the GPT matching is awaited on the event loop
+            resume_result, job_result, matching_result = await run_in_threadpool(Collaborator.Resume.prepare_matching, cv_id, db_session)
+            saved_dir = None
+            if not matching_result:
+                matching_result, saved_dir = await Collaborator.Resume.matching_base(cv_filename=resume_result.ResumeVersion.filename, 
+                                                                jd_filename=job_result.jd_file.split("/")[-1])
+            await run_in_threadpool(Collaborator.Resume.save_matching, cv_id, resume_result, matching_result, db_session, background_task, current_user)
             return matching_result, saved_dir, cv_id
 
 
@@ -2478,60 +2416,53 @@ class Collaborator:
         
     
         @staticmethod
-        def list_candidate(is_draft: bool, db_session: Session, current_user): 
+        def list_candidate(is_draft: bool, page: Pagination, db_session: Session, current_user): 
+            #   Resumes of the collaborator, read from candidate_overviews by its (collaborator_id, is_draft) index
+            query = select(model.CandidateOverview)    \
+                    .where(model.CandidateOverview.collaborator_id == current_user.id,
+                           model.CandidateOverview.is_draft == is_draft)
+            results, total_items = paginate(db_session, query, page, model.CandidateOverview, scalars=True)
             if is_draft:
-                query = select(model.Resume, model.ResumeVersion)    \
-                        .join(model.ResumeVersion, model.ResumeVersion.cv_id == model.Resume.id) \
-                        .filter(model.Resume.user_id == current_user.id,
-                                model.ResumeVersion.is_draft == True)
-                results = db_session.execute(query).all()
-                return [{
-                    "id": result.ResumeVersion.cv_id,
-                    "fullname": result.ResumeVersion.name,
-                    "job_title": result.ResumeVersion.current_job,
-                    "industry": result.ResumeVersion.industry,
-                    "job_service": General.get_job_from_resume(result.Resume.id, db_session).job_service if result.Resume.job_id else "SearchCV"
-                    } for result in results]
-            else:
-                query = select(model.Resume, model.ResumeVersion, model.JobDescription.job_service)    \
-                        .join(model.ResumeVersion, model.ResumeVersion.cv_id == model.Resume.id) \
-                        .outerjoin(model.JobDescription, and_(model.Resume.job_id == model.JobDescription.id, model.Resume.job_id == None)) \
-                        .filter(model.Resume.user_id == current_user.id,
-                                model.ResumeVersion.is_draft == False)
-                results = db_session.execute(query).all()
                 return [{
-                    "id": result.ResumeVersion.cv_id,
-                    "fullname": result.ResumeVersion.name,
-                    "job_title": result.ResumeVersion.current_job,
-                    "industry": result.ResumeVersion.industry,
-                    "job_service": General.get_job_from_resume(result.Resume.id, db_session).job_service if result.Resume.job_id else "SearchCV",
-                    "status": result.ResumeVersion.status,
-                    "referred_time": result.ResumeVersion.created_at
-                    } for result in results]
+                    "id": result.cv_id,
+                    "fullname": result.name,
+                    "job_title": result.current_job,
+                    "industry": result.industry,
+                    "job_service": result.job_service
+                    } for result in results], total_items
+            return [{
+                "id": result.cv_id,
+                "fullname": result.name,
+                "job_title": result.current_job,
+                "industry": result.industry,
+                "job_service": result.job_service,
+                "status": result.status,
+                "referred_time": result.created_at
+                } for result in results], total_items
             
 
         @staticmethod
         def get_detail_candidate(request: Request, cv_id: int, db_session: Session):
             
-            resume_result = General.get_detail_resume_by_id(cv_id, db_session) 
+            resume_result = CandidateDetail.load(cv_id, db_session)
             if not resume_result:
                 raise HTTPException(status_code=404, detail="Resume doesn't exist!")
-            job_result = General.get_job_by_id(resume_result.Resume.job_id, db_session)
+            job_result = resume_result.JobDescription
             if not job_result:
                 raise HTTPException(status_code=404, detail="Job doesn't exist!")
             
-            educations = db_session.execute(select(model.ResumeEducation).where(model.ResumeEducation.cv_id == cv_id)).scalars().all()
-            experience = db_session.execute(select(model.ResumeExperience).where(model.ResumeExperience.cv_id == cv_id)).scalars().all()
-            projects = db_session.execute(select(model.ResumeProject).where(model.ResumeProject.cv_id == cv_id)).scalars().all()
-            awards = db_session.execute(select(model.ResumeAward).where(model.ResumeAward.cv_id == cv_id)).scalars().all()
-            lang_certs = db_session.execute(select(model.LanguageResumeCertificate).where(model.LanguageResumeCertificate.cv_id == cv_id)).scalars().all()
-            other_certs = db_session.execute(select(model.OtherResumeCertificate).where(model.OtherResumeCertificate.cv_id == cv_id)).scalars().all()
+            educations = resume_result.educations
+            experience = resume_result.experience
+            projects = resume_result.projects
+            awards = resume_result.awards
+            lang_certs = resume_result.lang_certs
+            other_certs = resume_result.other_certs
             
             return {
                     "cv_id": cv_id,
                     "status": resume_result.ResumeVersion.status,
                     "job_service": job_result.job_service,
-                    "total_point": General.get_resume_valuate(cv_id, db_session).total_point,
+                    "total_point": resume_result.valuation().total_point,
                     "avatar": os.path.join(str(request.base_url), resume_result.ResumeVersion.avatar),
                     "candidate_name": resume_result.ResumeVersion.name,
                     "current_job": resume_result.ResumeVersion.current_job,
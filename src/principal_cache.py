@@ -0,0 +1,136 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Set, Tuple
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session as OrmSession
+import model
+from token_revocation import token_digest
+from config import PRINCIPAL_CACHE_TTL_SECONDS, PRINCIPAL_CACHE_SIZE
+
+
+class Principal(NamedTuple):
+    """Immutable snapshot of the authenticated user, what the handlers read from current_user"""
+    id: int
+    email: str
+    fullname: str
+    phone: str
+    role: str
+    point: float
+    warranty_point: float
+    is_active: bool
+
+    @classmethod
+    def of(cls, user: model.User):
+        return cls(id=user.id,
+                   email=user.email,
+                   fullname=user.fullname,
+                   phone=user.phone,
+                   role=user.role,
+                   point=user.point,
+                   warranty_point=user.warranty_point,
+                   is_active=user.is_active)
+
+
+class PrincipalCache:
+    """
+    Principals of the recent tokens (by digest), so that get_current_active_user skips the user query of most requests.
+    An entry lives PRINCIPAL_CACHE_TTL_SECONDS at most (and never past the expiry of its token). A flush changing a
+    column of the snapshot drops the entries of that user in this process, again when its transaction commits;
+    the other workers see the change once their entry expires.
+    """
+    #   User columns copied in a Principal, a flush that only touches other columns keeps the entries
+    tracked = Principal._fields
+
+    lock = threading.Lock()
+    entries: "OrderedDict[bytes, Tuple[float, Principal]]" = OrderedDict()     #   token digest -> (expiry, principal)
+    by_user: Dict[int, Set[bytes]] = {}                                         #   user id -> token digests
+    generation = 0                                                              #   Bumped by each invalidation
+
+    @classmethod
+    def _drop(cls, digest: bytes):
+        _, principal = cls.entries.pop(digest)
+        digests = cls.by_user.get(principal.id)
+        if digests is not None:
+            digests.discard(digest)
+            if not digests:
+                del cls.by_user[principal.id]
+
+    @classmethod
+    def get(cls, token: str) -> Optional[Principal]:
+        digest = token_digest(token)
+        with cls.lock:
+            cached = cls.entries.get(digest)
+            if cached is None:
+                return None
+            if cached[0] <= time.time():
+                cls._drop(digest)
+                return None
+            cls.entries.move_to_end(digest)
+            return cached[1]
+
+    @classmethod
+    def put(cls, token: str, principal: Principal, token_expiry: Optional[float], generation: int):
+        """Cache the principal loaded for a token, unless an invalidation happened since `generation` was read"""
+        expires_at = time.time() + PRINCIPAL_CACHE_TTL_SECONDS
+        if token_expiry is not None:
+            expires_at = min(expires_at, token_expiry)
+        digest = token_digest(token)
+        with cls.lock:
+            #   The row read may predate that change
+            if generation != cls.generation:
+                return
+            if digest in cls.entries:
+                cls._drop(digest)
+            cls.entries[digest] = (expires_at, principal)
+            cls.by_user.setdefault(principal.id, set()).add(digest)
+            while len(cls.entries) > PRINCIPAL_CACHE_SIZE:
+                cls._drop(next(iter(cls.entries)))
+
+    @classmethod
+    def invalidate(cls, user_ids):
+        """Drop the cached principals of these users (point balance, role or active flag changed)"""
+        with cls.lock:
+            cls.generation += 1
+            for user_id in user_ids:
+                for digest in list(cls.by_user.get(user_id, ())):
+                    cls._drop(digest)
+
+    @staticmethod
+    def changed_users(session: OrmSession) -> Set[int]:
+        user_ids = set()
+        for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+            if not isinstance(instance, model.User) or instance.id is None:
+                continue
+            state = inspect(instance)
+            if instance in session.dirty and not any(state.attrs[column].history.has_changes() for column in PrincipalCache.tracked):
+                continue
+            user_ids.add(instance.id)
+        return user_ids
+
+    @staticmethod
+    def after_flush(session: OrmSession, flush_context):
+        user_ids = PrincipalCache.changed_users(session)
+        if user_ids:
+            PrincipalCache.invalidate(user_ids)
+            session.info.setdefault("principal_changes", set()).update(user_ids)
+
+    @staticmethod
+    def after_commit(session: OrmSession):
+        #   A request that read the user between the flush and the commit cached the previous row
+        user_ids = session.info.pop("principal_changes", None)
+        if user_ids:
+            PrincipalCache.invalidate(user_ids)
+
+    @staticmethod
+    def after_rollback(session: OrmSession):
+        session.info.pop("principal_changes", None)
+
+
+def track_changes():
+    """Invalidate the cached principals on the flushes and commits of every session (sync, or under an AsyncSession)"""
+    for name, listener in (("after_flush", PrincipalCache.after_flush),
+                           ("after_commit", PrincipalCache.after_commit),
+                           ("after_rollback", PrincipalCache.after_rollback)):
+        if not event.contains(OrmSession, name, listener):
+            event.listen(OrmSession, name, listener)
@@ -0,0 +1,132 @@
+import re
+import time
+import random
+import threading
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from fastapi import Request
+from config import (SQL_LOG_MODE,
+                    SQL_SLOW_QUERY_MS,
+                    SQL_LOG_SAMPLE_RATE,
+                    SQL_LOG_MAX_CHARS,
+                    SQL_QUERY_ALERT_COUNT)
+
+
+class RequestStats:
+    """Statements run for the current request and their cumulative time"""
+    def __init__(self):
+        self.queries = 0
+        self.db_ms = 0.0
+
+
+#   Set by the middleware for each request. Handlers run in threads / greenlets with a copy of the context,
+#   which still points to the same RequestStats object
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def _log_statement(statement: str, elapsed_ms: float):
+    if SQL_LOG_MODE == "off":
+        return
+    if SQL_LOG_MODE == "slow" and elapsed_ms < SQL_SLOW_QUERY_MS:
+        return
+    #   Sampled mode logs a fraction of the statements, and every slow one
+    if SQL_LOG_MODE == "sampled" and elapsed_ms < SQL_SLOW_QUERY_MS and random.random() >= SQL_LOG_SAMPLE_RATE:
+        return
+    label = "Slow query" if elapsed_ms >= SQL_SLOW_QUERY_MS else "Query"
+    statement = re.sub(r"\s+", " ", statement)[:SQL_LOG_MAX_CHARS]
+    print(f" >>> {label} ({elapsed_ms:.1f} ms): {statement}")
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    #   On the execution context: a failed statement leaves nothing behind
+    context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - context._query_start) * 1000
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_ms += elapsed_ms
+    _log_statement(statement, elapsed_ms)
+
+
+def instrument(engine):
+    """Time the statements of an engine (the sync_engine of an async one) for the SQL log and the request stats"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+async def query_stats_middleware(request: Request, call_next):
+    #   Number of statements and DB time of each request, in the response headers
+    stats = RequestStats()
+    token = _request_stats.set(stats)
+    try:
+        response = await call_next(request)
+    finally:
+        _request_stats.reset(token)
+    response.headers["X-DB-Queries"] = str(stats.queries)
+    response.headers["X-DB-Time-Ms"] = f"{stats.db_ms:.1f}"
+    if stats.queries > SQL_QUERY_ALERT_COUNT:
+        print(f" >>> Too many queries: {request.method} {request.url.path} ran {stats.queries} statements ({stats.db_ms:.1f} ms in DB)")
+    return response
+
+
+class PoolStats:
+    """Connection checkouts of a pool: how many, how long callers waited for one, how many timed out"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_ms = 0.0
+        self.max_wait_ms = 0.0
+
+    def record(self, wait_ms: float, timed_out: bool):
+        with self.lock:
+            self.checkouts += 1
+            self.timeouts += timed_out
+            self.wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+
+class TimedPoolMixin:
+    #   Checkout time includes waiting for a free connection, opening a new one and the pre-ping
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.stats.record((time.perf_counter() - start) * 1000, True)
+            raise
+        self.stats.record((time.perf_counter() - start) * 1000, False)
+        return connection
+
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_status(engine):
+    """Current usage and checkout counters of an engine pool"""
+    pool = engine.pool
+    status = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(size=pool.size(), checked_out=pool.checkedout(), idle=pool.checkedin(), overflow=pool.overflow())
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        with stats.lock:
+            status.update(checkouts=stats.checkouts,
+                          timeouts=stats.timeouts,
+                          mean_wait_ms=round(stats.wait_ms / stats.checkouts, 2) if stats.checkouts else 0,
+                          max_wait_ms=round(stats.max_wait_ms, 2))
+    return status
@@ -0,0 +1,32 @@
+from sqlalchemy.orm import Bundle
+import model
+
+
+class ReadModel(Bundle):
+    def create_row_processor(self, query, procs, labels):
+        #   Keyed by column name: a column name shared by several bundles of a select gets a renamed label (id_1)
+        return super().create_row_processor(query, procs, [column.key for column in self.exprs])
+
+
+def slim(entity, *columns: str):
+    #   Named after its entity: rows keep the `result.JobDescription.job_title` access of a full entity select
+    return ReadModel(entity.__name__, *(getattr(entity, column) for column in columns))
+
+
+class Slim:
+    """
+    Column-only read models of the list endpoints: the few columns a list payload shows, without the TEXT columns
+    and the fields only detail pages use. Selecting one gives plain rows (no ORM object, nothing in the identity map).
+    Models that order a paginated list keep id and created_at, the keyset of paginate().
+    """
+    JobDescription = slim(model.JobDescription, "id", "user_id", "job_title", "industries", "job_service", "status", "created_at")
+    Company = slim(model.Company, "id", "user_id", "logo", "company_name")
+    User = slim(model.User, "id", "fullname", "email", "phone")
+    Bank = slim(model.Bank, "id", "user_id", "bank_name", "branch_name", "account_owner", "account_number")
+    Resume = slim(model.Resume, "id", "user_id", "job_id")
+    ResumeVersion = slim(model.ResumeVersion, "id", "cv_id", "name", "current_job", "industry", "status", "point_recieved_time", "created_at")
+    ValuationInfo = slim(model.ValuationInfo, "id", "cv_id", "total_point")
+    RecruitResumeJoin = slim(model.RecruitResumeJoin, "user_id", "resume_id", "package")
+    InterviewSchedule = slim(model.InterviewSchedule, "user_id", "candidate_id", "collaborator_id", "date", "location", "start_time", "end_time")
+    TransactionHistory = slim(model.TransactionHistory, "id", "user_id", "point", "price", "quantity", "total_price", "transaction_form", "created_at")
+    DrawHistory = slim(model.DrawHistory, "id", "user_id", "point", "transaction_form", "draw_status", "created_at")
@@ -0,0 +1,83 @@
+import time
+import hashlib
+import threading
+from contextvars import ContextVar
+from typing import Dict, Optional
+from sqlalchemy import event
+from fastapi import Request
+from config import REPLICA_READ_YOUR_WRITES_SECONDS, REPLICA_RETRY_SECONDS
+
+
+#   Client of the current request (hash of its Authorization header), None for anonymous requests
+_client_key: ContextVar[Optional[str]] = ContextVar("client_key", default=None)
+
+
+class ReplicaRouter:
+    """
+    Decides whether a read-only handler may read from the replica.
+    Commits that wrote on the primary are recorded for the client of the request: its reads stay on the primary for
+    REPLICA_READ_YOUR_WRITES_SECONDS, long enough for the replica to catch up. A replica that can't be reached is
+    skipped for REPLICA_RETRY_SECONDS.
+    Writes are tracked per process: a read served by another worker right after the write may still see the replica.
+    """
+    lock = threading.Lock()
+    recent_writes: Dict[str, float] = {}
+    down_until = 0.0
+
+    @classmethod
+    def use_replica(cls):
+        now = time.monotonic()
+        if now < cls.down_until:
+            return False
+        client = _client_key.get()
+        if client is None:
+            return True
+        with cls.lock:
+            return cls.recent_writes.get(client, 0) <= now
+
+    @classmethod
+    def record_write(cls):
+        client = _client_key.get()
+        if client is None:
+            return
+        now = time.monotonic()
+        with cls.lock:
+            cls.recent_writes[client] = now + REPLICA_READ_YOUR_WRITES_SECONDS
+            if len(cls.recent_writes) > 10000:
+                cls.recent_writes = {key: until for key, until in cls.recent_writes.items() if until > now}
+
+    @classmethod
+    def mark_down(cls, error: Exception):
+        print(f" >>> Read replica unavailable, reading from the primary for {REPLICA_RETRY_SECONDS}s: {error}")
+        cls.down_until = time.monotonic() + REPLICA_RETRY_SECONDS
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if statement.lstrip()[:6].upper() in ("INSERT", "UPDATE", "DELETE"):
+        conn.info["wrote"] = True
+
+
+def _commit(conn):
+    if conn.info.pop("wrote", False):
+        ReplicaRouter.record_write()
+
+
+def _rollback(conn):
+    conn.info.pop("wrote", None)
+
+
+def track_writes(engine):
+    """Record the committed writes of a primary engine (the sync_engine of an async one)"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "commit", _commit)
+    event.listen(engine, "rollback", _rollback)
+
+
+async def client_key_middleware(request: Request, call_next):
+    #   Handlers run in copies of this context, they all see the client of the request
+    authorization = request.headers.get("authorization")
+    token = _client_key.set(hashlib.sha256(authorization.encode("utf-8")).hexdigest() if authorization else None)
+    try:
+        return await call_next(request)
+    finally:
+        _client_key.reset(token)
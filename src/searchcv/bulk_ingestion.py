@@ -0,0 +1,297 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import hashlib
+import zipfile
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlmodel import Session
+from sqlalchemy import select
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+import model
+from searchcv import service
+from postjob.api_service.extraction_service import Extraction
+from postjob.api_service.cache_service import LLMCache
+from postjob.db_service.db_service import DatabaseService
+from jobqueue.service import JobQueue
+from config import (db,
+                    CV_SAVED_DIR,
+                    CV_PARSE_PROMPT,
+                    BULK_INGEST_DIR,
+                    BULK_INGEST_CONCURRENCY,
+                    BULK_INGEST_MAX_FILES,
+                    BULK_INGEST_MAX_FILE_SIZE,
+                    BULK_INGEST_PROGRESS_SECONDS,
+                    JOBQUEUE_LOCK_TIMEOUT)
+
+
+#   Parsed resumes are written by chunks of this size (one transaction each)
+insert_chunk = 50
+#   Saved PDFs are named "<first hash_prefix chars of the content sha256>_<cleaned name>"
+hash_prefix = 12
+#   Files of an interrupted batch in these states are processed again when its job is resumed
+unfinished = ("queued", "extracting", "parsing", "parsed")
+
+
+class BulkIngestion:
+    """
+    Ingestion of a ZIP of CVs uploaded in one request.
+    The archive is kept as is and its PDFs are read one entry at a time: only the unique ones (content hash not saved
+    yet) are written to CV_SAVED_DIR, at most BULK_INGEST_CONCURRENCY are extracted/parsed together, and parsed resumes
+    are bulk inserted. A batch runs as a "searchcv.bulk_upload" job: a worker lost in the middle of it leaves the job
+    to another worker, which resumes the unfinished files.
+    Per-file progress is kept in memory by the running worker and written every BULK_INGEST_PROGRESS_SECONDS to
+    <BULK_INGEST_DIR>/<batch_id>.json, so any API process can answer a progress request.
+    """
+    _lock = threading.Lock()
+    _progress: Dict[str, Dict[str, Any]] = {}
+    _changed = set()
+
+    @staticmethod
+    def progress_path(batch_id: str):
+        return os.path.join(BULK_INGEST_DIR, batch_id + ".json")
+
+    @classmethod
+    def write_progress(cls, progress: Dict[str, Any]):
+        progress["counts"] = {}
+        for file in progress["files"].values():
+            progress["counts"][file["status"]] = progress["counts"].get(file["status"], 0) + 1
+        temp_path = cls.progress_path(progress["batch_id"]) + ".tmp"
+        with open(temp_path, "w") as file:
+            json.dump(progress, file)
+        os.replace(temp_path, cls.progress_path(progress["batch_id"]))
+
+    @classmethod
+    def save_progress(cls, batch_id: str):
+        """Write the progress of a batch if it changed (in the threadpool)"""
+        with cls._lock:
+            if batch_id not in cls._changed:
+                return
+            cls._changed.discard(batch_id)
+            progress = json.loads(json.dumps(cls._progress[batch_id]))
+        cls.write_progress(progress)
+
+    @classmethod
+    def load_progress(cls, batch_id: str):
+        with open(cls.progress_path(batch_id), "r") as file:
+            progress = json.load(file)
+        with cls._lock:
+            cls._progress[batch_id] = progress
+        return progress
+
+    @classmethod
+    def set_status(cls, batch_id: str, name: str, file_status: str, **details):
+        #   Memory only, written by the progress loop of the batch
+        with cls._lock:
+            cls._progress[batch_id]["files"][name] = {"status": file_status, **details}
+            cls._changed.add(batch_id)
+
+    @classmethod
+    def finish(cls, batch_id: str, batch_status: str):
+        with cls._lock:
+            progress = cls._progress.pop(batch_id)
+            cls._changed.discard(batch_id)
+        progress["status"] = batch_status
+        progress["finished_at"] = datetime.utcnow().isoformat()
+        #   Finished batches are served from their file
+        cls.write_progress(progress)
+
+    @classmethod
+    async def track(cls, batch_id: str):
+        """Write the progress of a running batch regularly, and keep the lock of its job"""
+        heartbeat_at = time.monotonic()
+        while True:
+            await asyncio.sleep(BULK_INGEST_PROGRESS_SECONDS)
+            await run_in_threadpool(cls.save_progress, batch_id)
+            if time.monotonic() - heartbeat_at > JOBQUEUE_LOCK_TIMEOUT / 3:
+                heartbeat_at = time.monotonic()
+                await JobQueue.keep_alive()
+
+    @classmethod
+    def get_progress(cls, batch_id: str, user_id: int):
+        path = cls.progress_path(os.path.basename(batch_id))
+        if not os.path.exists(path):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload batch doesn't exist!")
+        with open(path, "r") as file:
+            progress = json.load(file)
+        if progress["user_id"] != user_id:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload batch doesn't exist!")
+        return progress
+
+    @staticmethod
+    def list_entries(zip_path: str):
+        #   PDF entries of the archive, checked from the central directory only (nothing is decompressed)
+        if not zipfile.is_zipfile(zip_path):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Must be ZIP file!")
+        with zipfile.ZipFile(zip_path) as archive:
+            entries = [info for info in archive.infolist()
+                            if not info.is_dir() and not info.filename.startswith("__MACOSX/")
+                                and not os.path.basename(info.filename).startswith(".")]
+        pdf_entries = [info for info in entries if info.filename.lower().endswith(".pdf")]
+        if not pdf_entries:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No PDF file in the ZIP file!")
+        if len(pdf_entries) > BULK_INGEST_MAX_FILES:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"A ZIP file can't contain more than {BULK_INGEST_MAX_FILES} PDF files!")
+        return entries
+
+    @classmethod
+    def start(cls, zip_file, user_id: int):
+        """Spool the uploaded archive, register its files and return the batch id (the batch is then enqueued as a job)"""
+        os.makedirs(BULK_INGEST_DIR, exist_ok=True)
+        batch_id = uuid.uuid4().hex
+        zip_path = os.path.join(BULK_INGEST_DIR, batch_id + ".zip")
+        with open(zip_path, "wb") as file:
+            for chunk in iter(lambda: zip_file.read(1 << 20), b""):
+                file.write(chunk)
+        try:
+            entries = cls.list_entries(zip_path)
+        except HTTPException as e:
+            os.remove(zip_path)
+            raise e
+        files = {}
+        for info in entries:
+            if not info.filename.lower().endswith(".pdf"):
+                files[info.filename] = {"status": "skipped", "error": "Not a PDF file"}
+            elif info.file_size > BULK_INGEST_MAX_FILE_SIZE:
+                files[info.filename] = {"status": "skipped", "error": "File is too large"}
+            else:
+                files[info.filename] = {"status": "queued"}
+        cls.write_progress({
+                "batch_id": batch_id,
+                "user_id": user_id,
+                "status": "running",
+                "total": len(files),
+                "created_at": datetime.utcnow().isoformat(),
+                "finished_at": None,
+                "files": files
+            })
+        return batch_id, zip_path
+
+    @staticmethod
+    def hash_entries(zip_path: str, names: List[str]):
+        #   sha256 of each entry, streamed from the archive by 1MB chunks
+        hashes = {}
+        with zipfile.ZipFile(zip_path) as archive:
+            for name in names:
+                digest = hashlib.sha256()
+                with archive.open(name) as entry:
+                    for chunk in iter(lambda: entry.read(1 << 20), b""):
+                        digest.update(chunk)
+                hashes[name] = digest.hexdigest()
+        return hashes
+
+    @staticmethod
+    def ingested_hashes(hashes: List[str]):
+        #   Content hashes of CV files already saved (bulk or single upload), in one indexed query
+        if not hashes:
+            return set()
+        with Session(db.engine) as db_session:
+            return set(db_session.execute(
+                                select(model.ResumeVersion.content_hash).where(
+                                        model.ResumeVersion.content_hash.in_(hashes))).scalars().all())
+
+    @staticmethod
+    def write_entry(zip_path: str, name: str, content_hash: str):
+        filename = content_hash[:hash_prefix] + "_" + DatabaseService.clean_filename(os.path.basename(name))
+        saved_path = os.path.join(CV_SAVED_DIR, filename)
+        with zipfile.ZipFile(zip_path) as archive, archive.open(name) as entry, open(saved_path, "wb") as file:
+            for chunk in iter(lambda: entry.read(1 << 20), b""):
+                file.write(chunk)
+        #   The hash is known already, text extraction doesn't need to read the file again for it
+        Extraction.hash_cache.put(Extraction.file_key(saved_path), content_hash)
+        return filename
+
+    @classmethod
+    async def parse_entry(cls, batch_id: str, zip_path: str, name: str, content_hash: str, industry: Optional[str], require: str):
+        cls.set_status(batch_id, name, "extracting")
+        filename = await run_in_threadpool(cls.write_entry, zip_path, name, content_hash)
+        prompt_template = await Extraction.cv_parsing_template(store_path=CV_SAVED_DIR, filename=filename)
+        cls.set_status(batch_id, name, "parsing")
+        #   An already parsed CV content is served from cache
+        extracted_result = await LLMCache.gpt_api(prompt_template + require, prompt_version="cv_parsing")
+        extracted_result["cv_file"] = os.path.join(CV_SAVED_DIR, filename)
+        await run_in_threadpool(DatabaseService.store_cv_extraction, extracted_json=extracted_result, cv_file=filename)
+        parsed = {
+            "name": name,
+            "version": dict(service.Collaborator.Resume.version_values(extracted_result, industry), content_hash=content_hash),
+            "children": service.Collaborator.Resume.child_values(extracted_result)
+        }
+        cls.set_status(batch_id, name, "parsed")
+        return parsed
+
+    @classmethod
+    def save_chunk(cls, batch_id: str, parsed: List[Dict[str, Any]], user_id: int):
+        with Session(db.engine) as db_session:
+            try:
+                _, versions_db = service.Collaborator.Resume.save_cv_parsed_results(parsed, user_id, db_session)
+            except Exception as e:
+                print(f" >>> Bulk upload {batch_id}: saving {len(parsed)} resumes failed: {e}")
+                for item in parsed:
+                    cls.set_status(batch_id, item["name"], "failed", error="Can't save resume")
+                return
+            for item, version_db in zip(parsed, versions_db):
+                try:
+                    service.Collaborator.Resume.resume_valuate(version_db, db_session)
+                except Exception as e:
+                    print(f" >>> Bulk upload {batch_id}: valuation of resume {version_db.cv_id} failed: {e}")
+                cls.set_status(batch_id, item["name"], "saved", cv_id=version_db.cv_id)
+
+    @classmethod
+    async def run(cls, batch_id: str, zip_path: str, industry: Optional[str], user_id: int):
+        """Job part of a bulk upload: dedupe, extract + parse with bounded concurrency, bulk insert"""
+        progress = await run_in_threadpool(cls.load_progress, batch_id)
+        tracker = asyncio.create_task(cls.track(batch_id))
+        try:
+            names = [name for name, file in progress["files"].items() if file["status"] in unfinished]
+            hashes = await run_in_threadpool(cls.hash_entries, zip_path, names)
+            ingested = await run_in_threadpool(cls.ingested_hashes, list(set(hashes.values())))
+
+            unique = {}
+            for name in names:
+                content_hash = hashes[name]
+                if content_hash in ingested:
+                    cls.set_status(batch_id, name, "duplicate", error="Already uploaded")
+                elif content_hash in unique:
+                    cls.set_status(batch_id, name, "duplicate", error=f"Same file as {unique[content_hash]}")
+                else:
+                    unique[content_hash] = name
+
+            with open(CV_PARSE_PROMPT, "r") as file:
+                require = file.read()
+            semaphore = asyncio.Semaphore(BULK_INGEST_CONCURRENCY)
+            pending: List[Dict[str, Any]] = []
+
+            async def ingest(content_hash: str, name: str):
+                async with semaphore:
+                    try:
+                        parsed = await cls.parse_entry(batch_id, zip_path, name, content_hash, industry, require)
+                    except HTTPException as e:
+                        cls.set_status(batch_id, name, "failed", error=e.detail)
+                        return
+                    except Exception as e:
+                        print(f" >>> Bulk upload {batch_id}: {name} failed: {e}")
+                        cls.set_status(batch_id, name, "failed", error="Can't parse resume")
+                        return
+                pending.append(parsed)
+                if len(pending) >= insert_chunk:
+                    chunk = pending[:]
+                    pending.clear()
+                    await run_in_threadpool(cls.save_chunk, batch_id, chunk, user_id)
+
+            await asyncio.gather(*[ingest(content_hash, name) for content_hash, name in unique.items()])
+            if pending:
+                await run_in_threadpool(cls.save_chunk, batch_id, pending, user_id)
+            batch_status = "done"
+        except Exception as e:
+            print(f" >>> Bulk upload {batch_id} failed: {e}")
+            batch_status = "failed"
+        finally:
+            tracker.cancel()
+        await run_in_threadpool(cls.finish, batch_id, batch_status)
+        if os.path.exists(zip_path):
+            os.remove(zip_path)
+        return {"batch_id": batch_id, "status": batch_status}
@@ -1,17 +1,22 @@
 import os
-import shutil
 import math
 import pickle
 from config import db
-from typing import List, Any
+from typing import List, Any, Optional
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from fastapi import UploadFile
 from starlette.requests import Request
 from searchcv import schema, service
-from postjob.db_service.db_service import DatabaseService
-from authentication import get_current_active_user
+from pagination import Pagination
+from searchcv.search_index import SearchIndex
+from searchcv.bulk_ingestion import BulkIngestion
+from jobqueue.service import JobQueue
+from jobqueue.schema import JobPriority
+from authentication import get_current_active_user, get_current_active_user_async
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi import APIRouter, status, Depends, Security, HTTPException
+from fastapi import APIRouter, status, Depends, Security, HTTPException, Header
+from starlette.concurrency import run_in_threadpool
 from config import JD_SAVED_DIR, CV_SAVED_DIR
 
 
@@ -20,20 +25,38 @@ security_bearer = HTTPBearer()
 
 
 @router.post("/recruiter/basic-search",
-             status_code=status.HTTP_201_CREATED, 
+             status_code=status.HTTP_200_OK, 
              response_model=schema.CustomResponse)
 def basic_search(
-            uploaded_file: UploadFile,
+            data: schema.BasicSearch,
             db_session: Session = Depends(db.get_session),
             credentials: HTTPAuthorizationCredentials = Security(security_bearer)):
-    pass
+    
+    # Get curent active user
+    _, current_user = get_current_active_user(db_session, credentials)
+    #   Rank resumes with the in-memory index, only the requested page is read from DB
+    ranked = SearchIndex.search(data.query, filters={"industry": data.industry, "level": data.level, "city": data.city})
+    page = ranked[(data.page_index-1)*data.limit: (data.page_index-1)*data.limit + data.limit]
+    results = service.Recruiter.Resume.list_search_result(page, db_session)
+
+    total_items = len(ranked)
+    total_pages = math.ceil(total_items/data.limit)
+    return schema.CustomResponse(
+                    message=None,
+                    data={
+                        "total_items": total_items,
+                        "total_pages": total_pages,
+                        "item_lst": results
+                    }
+            )
 
 #   Upload JD => JD Parsing
 @router.post("/recruiter/upload-jd",
-             status_code=status.HTTP_201_CREATED, 
+             status_code=status.HTTP_202_ACCEPTED, 
              response_model=schema.CustomResponse)
 def upload_jd(
             uploaded_file: UploadFile,
+            idempotency_key: Optional[str] = Header(None),
             db_session: Session = Depends(db.get_session),
             credentials: HTTPAuthorizationCredentials = Security(security_bearer)):
     
@@ -42,50 +65,33 @@ def upload_jd(
     if uploaded_file.content_type != 'application/pdf':
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Must be PDF file")
     
-    #   Extract and save results
-    cleaned_filename = DatabaseService.clean_filename(uploaded_file.filename)
-    with open(os.path.join(JD_SAVED_DIR,  cleaned_filename), 'w+b') as file:
-        shutil.copyfileobj(uploaded_file.file, file)    
-    #   JD parsing
-    _, job_db = service.Recruiter.Job.jd_parsing(uploaded_file, cleaned_filename, db_session, current_user)
-    
+    #   Saved under a name of its content, JD parsing runs in a job worker
+    job = JobQueue.enqueue_upload("searchcv.jd_parsing", 
+                                  {"user_id": current_user.id}, 
+                                  uploaded_file,
+                                  JD_SAVED_DIR, 
+                                  user_id=current_user.id, 
+                                  client_key=idempotency_key)
     return schema.CustomResponse(
-                    message="Uploaded JD successfully",
-                    data={
-                        "job_id": job_db.id
-                    }
+                    message="JD is being extracted, poll the job for the result",
+                    data=JobQueue.info(job)
     )
 
 
 #   Filter above JD with multiple CV (CV used basic_search)
-@router.post("recruiter/batch-filter",
+@router.post("/recruiter/batch-filter",
              status_code=status.HTTP_200_OK, 
              response_model=schema.CustomResponse)
-def batch_filter(
+async def batch_filter(
             data_form: schema.BatchFilter,
             db_session: Session = Depends(db.get_session)
 ):  
-    good_match = []     #   Good match save resume index that matches over 50% with relevant JD
-    for cv_id in data_form.cv_lst:
-        #   Get Resume results
-        resume_result = service.General.get_detail_resume_by_id(cv_id, db_session)
-        #   Get Job results
-        job_result = service.General.get_job_by_id(data_form.job_id, db_session)
-        matching_result, saved_dir = service.Recruiter.Resume.matching_base(
-                                                            cv_filename=resume_result.ResumeVersion.filename, 
-                                                            jd_filename=job_result.jd_file.split("/")[-1])
-        if matching_result["overall"]["score"] > 50:
-            good_match.append(cv_id)
-        #   Store matching result to DB
-        service.Recruiter.Resume.save_matching_result(
-                                                resume_result.Resume.cv_id,
-                                                job_result.id,
-                                                matching_result,
-                                                db_session)
-    #   Save good match results
-    jd_filename = job_result.jd_file.split("/")[-1].split(".") + '.pkl'
-    with open(os.path.join('static/good_match', jd_filename), 'wb') as file:
-        pickle.dump(good_match, file)
+    #   Queries and files in the threadpool, only the GPT matching is awaited on the event loop
+    job_result, cv_filenames, matching_results = await run_in_threadpool(service.Recruiter.Resume.prepare_filter, data_form, db_session)
+    matching_results.update(await service.Recruiter.Resume.batch_matching_base(
+                                                            cv_filenames=cv_filenames, 
+                                                            jd_filename=job_result.jd_file.split("/")[-1]))
+    good_match = await run_in_threadpool(service.Recruiter.Resume.save_filter, job_result, matching_results, db_session)
         
     return schema.CustomResponse(
                     message="Filter Cv-JD successfully.",
@@ -100,7 +106,7 @@ def batch_filter(
             response_model=schema.CustomResponse)
 def list_good_match(
                 data_form: schema.ListGoodMatch,
-                db_session: Session = Depends(db.get_session)
+                db_session: Session = Depends(db.get_read_session)
 ):
     #   Get Job results
     job_result = service.General.get_job_by_id(data_form.job_id, db_session)
@@ -109,18 +115,12 @@ def list_good_match(
     with open(os.path.join('static/good_match', jd_filename), 'rb') as file:
         good_match = pickle.load(file)
     #   Get information of each Resume
-    results = service.Recruiter.Resume.list_good_match(good_match, db_session)
-
-    total_items = len(results)
-    total_pages = math.ceil(total_items/data_form.limit)
+    page = Pagination(data_form.page_index, data_form.limit)
+    results, total_items = service.Recruiter.Resume.list_good_match(good_match, page, db_session)
 
     return schema.CustomResponse(
                     message=None,
-                    data={
-                        "total_items": total_items,
-                        "total_pages": total_pages,
-                        "item_lst": results[(data_form.page_index-1)*data_form.limit: (data_form.page_index-1)*data_form.limit + data_form.limit]
-                    }
+                    data=page.response(results, total_items)
             )
 
 
@@ -144,16 +144,16 @@ def get_matching_result(
 @router.get("/recruiter/get-detail-candidate",
              status_code=status.HTTP_200_OK, 
              response_model=schema.CustomResponse)
-def get_detail_candidate(
+async def get_detail_candidate(
                 request: Request,
                 cv_id: int,
-                db_session: Session = Depends(db.get_session),
+                db_session: AsyncSession = Depends(db.get_async_read_session),
                 credentials: HTTPAuthorizationCredentials = Security(security_bearer)):
     
     # Get curent active user
-    _, current_user = get_current_active_user(db_session, credentials)
+    _, current_user = await get_current_active_user_async(db_session, credentials)
 
-    jobs = service.Recruiter.Resume.get_detail_candidate(request, cv_id, db_session, current_user)
+    jobs = await db_session.run_sync(lambda session: service.Recruiter.Resume.get_detail_candidate(request, cv_id, session, current_user))
     return schema.CustomResponse(
                     message=None,
                     data=jobs
@@ -221,54 +221,44 @@ def choose_candidate_platinum(
 def list_interview_schedule(
                 limit: int, 
                 page_index: int,
-                db_session: Session = Depends(db.get_session),
+                cursor: Optional[str] = None,
+                db_session: Session = Depends(db.get_read_session),
                 credentials: HTTPAuthorizationCredentials = Security(security_bearer)):
     
     # Get curent active user
     _, current_user = get_current_active_user(db_session, credentials)
 
-    results = service.Recruiter.Resume.list_interview_schedule(db_session, current_user)
-     #   Pagination
-    total_items = len(results)
-    total_pages = math.ceil(total_items/limit)
+    page = Pagination(page_index, limit, cursor)
+    results, total_items = service.Recruiter.Resume.list_interview_schedule(page, db_session, current_user)
 
     return schema.CustomResponse(
                         message="Get list candidate successfully!",
-                        data={
-                            "total_items": total_items,
-                            "total_pages": total_pages,
-                            "item_lst": results[(page_index-1)*limit: (page_index-1)*limit + limit]
-                        }
+                        data=page.response(results, total_items)
     )
 
     
 @router.post("/recruiter/list-candidate",
              status_code=status.HTTP_200_OK, 
              response_model=schema.CustomResponse)
-def list_candidate(
+async def list_candidate(
                 data: schema.RecruitListCandidate,
-                db_session: Session = Depends(db.get_session)):
-    results = service.Recruiter.Resume.list_candidate(data.state, db_session)
-     #   Pagination
-    total_items = len(results)
-    total_pages = math.ceil(total_items/data.limit)
+                db_session: AsyncSession = Depends(db.get_async_read_session)):
+    page = Pagination(data.page_index, data.limit, data.cursor)
+    results, total_items = await db_session.run_sync(lambda session: service.Recruiter.Resume.list_candidate(data.state, page, session))
 
     return schema.CustomResponse(
                         message="Get list candidate successfully!",
-                        data={
-                            "total_items": total_items,
-                            "total_pages": total_pages,
-                            "item_lst": results[(data.page_index-1)*data.limit: (data.page_index-1)*data.limit + data.limit]
-                        }
+                        data=page.response(results, total_items)
     )
 
 
 #   Upload JD => JD Parsing
 @router.post("/collaborator/upload-cv",
-             status_code=status.HTTP_201_CREATED, 
+             status_code=status.HTTP_202_ACCEPTED, 
              response_model=schema.CustomResponse)
 def upload_cv(
             data_form: schema.UploadResume = Depends(schema.UploadResume.as_form),
+            idempotency_key: Optional[str] = Header(None),
             db_session: Session = Depends(db.get_session),
             credentials: HTTPAuthorizationCredentials = Security(security_bearer)):
     
@@ -277,20 +267,57 @@ def upload_cv(
     if data_form.cv_file.content_type != 'application/pdf':
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Must be PDF file")
     
-    #   Extract and save results
-    cleaned_filename = DatabaseService.clean_filename(data_form.cv_file.filename)
-    with open(os.path.join(CV_SAVED_DIR,  cleaned_filename), 'w+b') as file:
-        shutil.copyfileobj(data_form.cv_file.file, file)    
-    #   JD parsing
-    extracted_result, version_db = service.Collaborator.Resume.cv_parsing(data_form, cleaned_filename, db_session, current_user)
-    #   Resume valuation
-    valuate_result = service.Collaborator.Resume.resume_valuate(version_db, db_session)   #   cv_id, session
+    #   Saved under a name of its content, CV parsing and valuation run in a job worker
+    job = JobQueue.enqueue_upload("searchcv.cv_parsing", 
+                                  {"industry": data_form.industry, "user_id": current_user.id}, 
+                                  data_form.cv_file,
+                                  CV_SAVED_DIR, 
+                                  user_id=current_user.id, 
+                                  client_key=idempotency_key)
     return schema.CustomResponse(
-                    message="Uploaded resume successfully",
-                    data={
-                        "cv_id": version_db.cv_id,
-                        "valuate_result": valuate_result
-                    }     #   Front-end will use this result to show valuation temporarily to User 
+                    message="Resume is being extracted, poll the job for the result",
+                    data=JobQueue.info(job)     #   Result: cv_id and the valuation shown temporarily to User
+                )
+
+
+#   Upload a ZIP of CVs => parsed and saved in background, progress polled with the returned batch id
+@router.post("/collaborator/bulk-upload-cv",
+             status_code=status.HTTP_202_ACCEPTED, 
+             response_model=schema.CustomResponse)
+def bulk_upload_cv(
+            data_form: schema.UploadResumeZip = Depends(schema.UploadResumeZip.as_form),
+            db_session: Session = Depends(db.get_session),
+            credentials: HTTPAuthorizationCredentials = Security(security_bearer)):
+    
+    # Get curent active user
+    _, current_user = get_current_active_user(db_session, credentials)
+    if not data_form.zip_file.filename.lower().endswith(".zip"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Must be ZIP file!")
+    batch_id, zip_path = BulkIngestion.start(data_form.zip_file.file, current_user.id)
+    #   Parsed by a job worker, a batch interrupted by a restart is resumed by another one
+    JobQueue.enqueue("searchcv.bulk_upload",
+                     {"batch_id": batch_id, "zip_path": zip_path, "industry": data_form.industry, "user_id": current_user.id},
+                     user_id=current_user.id,
+                     priority=JobPriority.low)
+    return schema.CustomResponse(
+                    message="Resumes are being uploaded",
+                    data=BulkIngestion.get_progress(batch_id, current_user.id)
+                )
+
+
+@router.get("/collaborator/bulk-upload-progress/{batch_id}",
+             status_code=status.HTTP_200_OK, 
+             response_model=schema.CustomResponse)
+def bulk_upload_progress(
+            batch_id: str,
+            db_session: Session = Depends(db.get_session),
+            credentials: HTTPAuthorizationCredentials = Security(security_bearer)):
+    
+    # Get curent active user
+    _, current_user = get_current_active_user(db_session, credentials)
+    return schema.CustomResponse(
+                    message="Get upload progress successfully",
+                    data=BulkIngestion.get_progress(batch_id, current_user.id)
                 )
 
 
@@ -330,11 +357,11 @@ def get_resume_valuate(
 @router.put("/collaborator/update-resume-valuate",
              status_code=status.HTTP_200_OK, 
              response_model=schema.CustomResponse)
-def update_resume_valuate(
+async def update_resume_valuate(
                     data: schema.UpdateResumeValuation,
                     db_session: Session = Depends(db.get_session)):
 
-    result = service.Collaborator.Resume.update_valuate(data, db_session)
+    result = await service.Collaborator.Resume.update_valuate(data, db_session)
 
     level_lst = [str(level) for level in schema.Level]
     hard_item = {
@@ -359,27 +386,21 @@ def update_resume_valuate(
 @router.post("/collaborator/list-candidate",
              status_code=status.HTTP_201_CREATED, 
              response_model=schema.CustomResponse)
-def list_candidate(
+async def list_candidate(
             data: schema.CollabListResume,
-            db_session: Session = Depends(db.get_session),
+            db_session: AsyncSession = Depends(db.get_async_read_session),
             credentials: HTTPAuthorizationCredentials = Security(security_bearer)):
     
     
     # Get curent active user
-    _, current_user = get_current_active_user(db_session, credentials)
+    _, current_user = await get_current_active_user_async(db_session, credentials)
 
-    results = service.Collaborator.Resume.list_candidate(data.is_draft, db_session, current_user)
-
-    total_items = len(results)
-    total_pages = math.ceil(total_items/data.limit)
+    page = Pagination(data.page_index, data.limit, data.cursor)
+    results, total_items = await db_session.run_sync(lambda session: service.Collaborator.Resume.list_candidate(data.is_draft, page, session, current_user))
 
     return schema.CustomResponse(
                     message=None,
-                    data={
-                        "total_items": total_items,
-                        "total_pages": total_pages,
-                        "item_lst": results[(data.page_index-1)*data.limit: (data.page_index-1)*data.limit + data.limit]
-                    }
+                    data=page.response(results, total_items)
             )
     
     
@@ -461,24 +482,19 @@ def list_interview_schedule(
                 limit: int, 
                 page_index: int,
                 request: Request,
-                db_session: Session = Depends(db.get_session),
+                cursor: Optional[str] = None,
+                db_session: Session = Depends(db.get_read_session),
                 credentials: HTTPAuthorizationCredentials = Security(security_bearer)):
     
     # Get curent active user
     _, current_user = get_current_active_user(db_session, credentials)
 
-    results = service.Collaborator.Resume.list_interview_schedule(request, db_session, current_user)
-     #   Pagination
-    total_items = len(results)
-    total_pages = math.ceil(total_items/limit)
+    page = Pagination(page_index, limit, cursor)
+    results, total_items = service.Collaborator.Resume.list_interview_schedule(request, page, db_session, current_user)
 
     return schema.CustomResponse(
                         message="Get list candidate successfully!",
-                        data={
-                            "total_items": total_items,
-                            "total_pages": total_pages,
-                            "item_lst": results[(page_index-1)*limit: (page_index-1)*limit + limit]
-                        }
+                        data=page.response(results, total_items)
     )
     
 
@@ -519,23 +535,16 @@ def get_cv_file(request: Request,
              status_code=status.HTTP_200_OK, 
              response_model=schema.CustomResponse,
              summary="Admin views resume valuation results.")
-def list_candidate(
+async def list_candidate(
             data: schema.AdminListCandidate,
-            db_session: Session = Depends(db.get_session)):
-
-    results = service.Admin.Resume.list_candidate(data.candidate_status, db_session)
+            db_session: AsyncSession = Depends(db.get_async_read_session)):
 
-    #   Pagination
-    total_items = len(results)
-    total_pages = math.ceil(total_items/data.limit)
+    page = Pagination(data.page_index, data.limit, data.cursor)
+    results, total_items = await db_session.run_sync(lambda session: service.Admin.Resume.list_candidate(data.candidate_status, page, session))
 
     return schema.CustomResponse(
                         message="Get list job successfully!",
-                        data={
-                            "total_items": total_items,
-                            "total_pages": total_pages,
-                            "item_lst": results[(data.page_index-1)*data.limit: (data.page_index-1)*data.limit + data.limit]
-                        }
+                        data=page.response(results, total_items)
     )
     
     
@@ -20,6 +20,15 @@ class CustomResponse(BaseModel):
     data: Any = None
         
     
+class BasicSearch(BaseModel):
+    query: str
+    industry: Optional[str] = None
+    level: Optional[str] = None
+    city: Optional[str] = None
+    page_index: int = 1
+    limit: int = 20
+        
+    
 class BatchFilter(BaseModel):
     cv_lst: List[int]
     job_id: int
@@ -47,6 +56,7 @@ class CandidateState(str, Enum):
 class RecruitListCandidate(BaseModel):
     page_index: int
     limit: int
+    cursor: Optional[str] = None
     state: CandidateState
     
     
@@ -103,6 +113,21 @@ class UploadResume(BaseModel):
             )
     
 
+class UploadResumeZip(BaseModel):
+    industry: Optional[Industry]
+    zip_file: UploadFile
+
+    @classmethod
+    def as_form(cls, 
+                industry: Optional[Industry] = Form(None),
+                zip_file: UploadFile = File(...)):
+        
+        return cls(
+                industry=industry,
+                zip_file=zip_file,
+            )
+    
+
 class ResumeStatus(str, Enum):
     pricing_approved = "pricing_approved"
     pricing_rejected = "pricing_rejected"
@@ -165,6 +190,7 @@ class UpdateResumeValuation(BaseModel):
 class CollabListResume(BaseModel):
     page_index: int
     limit: int 
+    cursor: Optional[str] = None
     is_draft: bool
 
 
@@ -289,4 +315,5 @@ class CandidateStatus(str, Enum):
 class AdminListCandidate(BaseModel):
     page_index: int
     limit: int
+    cursor: Optional[str] = None
     candidate_status: CandidateStatus
\ No newline at end of file
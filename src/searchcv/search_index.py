@@ -0,0 +1,259 @@
+import os
+import re
+import json
+import math
+import pickle
+import asyncio
+import threading
+import numpy as np
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from sqlmodel import Session
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+import model
+from config import db, CV_EXTRACTION_PATH, SEARCH_INDEX_PATH, SEARCH_INDEX_REFRESH_SECONDS
+
+
+#   Field boosts: a hit in the job title or skills weighs more than one in the free CV text
+field_boosts = {
+    "current_job": 3.0,
+    "skills": 3.0,
+    "industry": 2.0,
+    "level": 2.0,
+    "city": 1.5,
+    "text": 1.0,
+}
+#   BM25 parameters
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    #   "\w" keeps Vietnamese letters, "+#" keep tokens like c++ / c#
+    return re.findall(r"\w[\w+#]*", text.lower())
+
+
+class SearchIndex:
+    """
+    In-memory inverted index of the latest resume versions, ranked with BM25 (field-weighted term frequencies).
+    Each resume owns a slot in dense numpy arrays, so a query scores whole posting lists at once instead of looping.
+    The index lives in the process: it is loaded from a pickle snapshot (or built from the DB) at startup, updated
+    in place when a resume is written here, and `refresh` picks up the versions written by other workers.
+    """
+    _lock = threading.RLock()
+    postings: Dict[str, Dict[int, float]] = {}      #   term -> {slot: weighted term frequency}
+    doc_terms: Dict[int, List[str]] = {}            #   cv_id -> terms, needed to remove a resume
+    slots: Dict[int, int] = {}                      #   cv_id -> slot
+    slot_cv = np.full(1024, -1, dtype=np.int64)     #   slot -> cv_id (-1 when free)
+    lengths = np.zeros(1024, dtype=np.float64)      #   slot -> weighted document length
+    free_slots: List[int] = []
+    total_len: float = 0.0
+    last_refresh: Optional[datetime] = None
+    #   term -> (slots, frequencies) arrays, rebuilt lazily after the posting list changes
+    _compiled: Dict[str, Any] = {}
+
+    @staticmethod
+    def extracted_text(filename: Optional[str]) -> str:
+        #   Free text of the CV, taken from its GPT extraction (experience, projects, awards, ...)
+        if not filename:
+            return ""
+        path = os.path.join(CV_EXTRACTION_PATH, filename.split(".")[0] + ".json")
+        if not os.path.exists(path):
+            return ""
+        try:
+            with open(path, "r") as file:
+                extracted = json.load(file)
+        except ValueError:
+            return ""
+        extracted.pop("contact_information", None)
+        values = []
+        def walk(value):
+            if isinstance(value, dict):
+                for sub_value in value.values():
+                    walk(sub_value)
+            elif isinstance(value, list):
+                for sub_value in value:
+                    walk(sub_value)
+            elif value is not None and str(value) != "N/A":
+                values.append(str(value))
+        walk(extracted)
+        return " ".join(values)
+
+    @classmethod
+    def index_resume(cls, version: model.ResumeVersion, text: Optional[str] = None):
+        """Add or replace one resume in the index"""
+        if version.is_draft or not version.is_lastest:
+            cls.remove_resume(version.cv_id)
+            return
+        fields = {
+            "current_job": version.current_job or "",
+            "skills": " ".join(version.skills or []),
+            "industry": version.industry or "",
+            "level": version.level or "",
+            "city": version.city or "",
+            "text": text if text is not None else cls.extracted_text(version.filename),
+        }
+        terms: Dict[str, float] = {}
+        for field, value in fields.items():
+            for token in tokenize(value):
+                terms[token] = terms.get(token, 0.0) + field_boosts[field]
+        length = sum(terms.values())
+        #   Exact-match filter values ("city=ha noi"), never produced by tokenize so they don't mix with BM25 terms
+        for key in ("industry", "level", "city"):
+            if fields[key]:
+                terms[f"{key}={fields[key].lower()}"] = 0.0
+        with cls._lock:
+            cls._remove(version.cv_id)
+            slot = cls._take_slot(version.cv_id)
+            for term, frequency in terms.items():
+                cls.postings.setdefault(term, {})[slot] = frequency
+                cls._compiled.pop(term, None)
+            cls.doc_terms[version.cv_id] = list(terms)
+            cls.lengths[slot] = length
+            cls.total_len += length
+
+    @classmethod
+    def _take_slot(cls, cv_id: int):
+        if cls.free_slots:
+            slot = cls.free_slots.pop()
+        else:
+            slot = len(cls.slots)
+            if slot >= len(cls.slot_cv):
+                #   Grow by doubling
+                cls.slot_cv = np.concatenate([cls.slot_cv, np.full(len(cls.slot_cv), -1, dtype=np.int64)])
+                cls.lengths = np.concatenate([cls.lengths, np.zeros(len(cls.lengths), dtype=np.float64)])
+        cls.slots[cv_id] = slot
+        cls.slot_cv[slot] = cv_id
+        return slot
+
+    @classmethod
+    def _remove(cls, cv_id: int):
+        slot = cls.slots.pop(cv_id, None)
+        if slot is None:
+            return
+        for term in cls.doc_terms.pop(cv_id, []):
+            documents = cls.postings.get(term)
+            if documents is not None:
+                documents.pop(slot, None)
+                cls._compiled.pop(term, None)
+                if not documents:
+                    del cls.postings[term]
+        cls.total_len -= cls.lengths[slot]
+        cls.lengths[slot] = 0.0
+        cls.slot_cv[slot] = -1
+        cls.free_slots.append(slot)
+
+    @classmethod
+    def remove_resume(cls, cv_id: int):
+        with cls._lock:
+            cls._remove(cv_id)
+
+    @classmethod
+    def _compile(cls, term: str):
+        compiled = cls._compiled.get(term)
+        if compiled is None:
+            documents = cls.postings.get(term)
+            if not documents:
+                return None
+            compiled = (np.fromiter(documents.keys(), dtype=np.int64, count=len(documents)),
+                        np.fromiter(documents.values(), dtype=np.float64, count=len(documents)))
+            cls._compiled[term] = compiled
+        return compiled
+
+    @classmethod
+    def search(cls, query: str, filters: Optional[Dict[str, str]] = None, top_k: int = 1000):
+        """Return [(cv_id, score)] best first"""
+        filters = {key: value.lower() for key, value in (filters or {}).items() if value}
+        with cls._lock:
+            total_docs = len(cls.slots)
+            if not total_docs:
+                return []
+            average_len = cls.total_len / total_docs
+            scores = np.zeros(len(cls.slot_cv), dtype=np.float64)
+            for term in set(tokenize(query)):
+                compiled = cls._compile(term)
+                if compiled is None:
+                    continue
+                slots, frequencies = compiled
+                idf = math.log(1 + (total_docs - len(slots) + 0.5) / (len(slots) + 0.5))
+                norm = K1 * (1 - B + B * cls.lengths[slots] / average_len)
+                scores[slots] += idf * frequencies * (K1 + 1) / (frequencies + norm)
+            for key, value in filters.items():
+                compiled = cls._compile(f"{key}={value}")
+                if compiled is None:
+                    return []
+                mask = np.zeros(len(scores), dtype=bool)
+                mask[compiled[0]] = True
+                scores[~mask] = 0.0
+            candidates = np.flatnonzero(scores > 0)
+            if len(candidates) > top_k:
+                candidates = candidates[np.argpartition(-scores[candidates], top_k)[:top_k]]
+            candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+            return [(int(cls.slot_cv[slot]), float(scores[slot])) for slot in candidates]
+
+    @classmethod
+    def refresh(cls, db_session: Session):
+        """Index the resume versions written since the last refresh (by any worker)"""
+        query = select(model.ResumeVersion)
+        if cls.last_refresh is not None:
+            #   Small overlap, re-indexing a resume twice is harmless
+            query = query.where(model.ResumeVersion.updated_at >= cls.last_refresh - timedelta(seconds=5))
+        started_at = datetime.utcnow()
+        versions = db_session.execute(query).scalars().all()
+        for version in versions:
+            if version.is_lastest and not version.is_draft:
+                cls.index_resume(version)
+            elif version.cv_id in cls.slots:
+                #   Drop the resume only if this outdated version is the one indexed
+                latest = db_session.execute(select(model.ResumeVersion.id).where(
+                                                    model.ResumeVersion.cv_id == version.cv_id,
+                                                    model.ResumeVersion.is_lastest == True,
+                                                    model.ResumeVersion.is_draft == False)).first()
+                if not latest:
+                    cls.remove_resume(version.cv_id)
+        cls.last_refresh = started_at
+        return len(versions)
+
+    @classmethod
+    def save(cls):
+        with cls._lock:
+            snapshot = (cls.postings, cls.doc_terms, cls.slots, cls.slot_cv, cls.lengths, cls.free_slots, cls.total_len, cls.last_refresh)
+            os.makedirs(os.path.dirname(SEARCH_INDEX_PATH), exist_ok=True)
+            #   Workers may save at the same time, each one writes its own temp file
+            temp_path = f"{SEARCH_INDEX_PATH}.{os.getpid()}.tmp"
+            with open(temp_path, "wb") as file:
+                pickle.dump(snapshot, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, SEARCH_INDEX_PATH)
+
+    @classmethod
+    def load(cls, db_session: Session):
+        """Restore the last snapshot then catch up with the DB (full build when there is no snapshot)"""
+        if os.path.exists(SEARCH_INDEX_PATH):
+            with open(SEARCH_INDEX_PATH, "rb") as file:
+                snapshot = pickle.load(file)
+            with cls._lock:
+                cls.postings, cls.doc_terms, cls.slots, cls.slot_cv, cls.lengths, cls.free_slots, cls.total_len, cls.last_refresh = snapshot
+                cls._compiled = {}
+        indexed = cls.refresh(db_session)
+        print(f" >>> Search index ready: {len(cls.slots)} resumes ({indexed} (re)indexed from DB)")
+        cls.save()
+
+    @classmethod
+    def startup(cls):
+        with Session(db.engine) as db_session:
+            cls.load(db_session)
+
+    @classmethod
+    def _refresh_once(cls):
+        with Session(db.engine) as db_session:
+            cls.refresh(db_session)
+
+    @classmethod
+    async def run_refresher(cls):
+        while True:
+            await asyncio.sleep(SEARCH_INDEX_REFRESH_SECONDS)
+            try:
+                await run_in_threadpool(cls._refresh_once)
+            except Exception as e:
+                print(f" >>> Search index refresh failed: {e}")
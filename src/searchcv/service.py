@@ -1,26 +1,36 @@
 import model
-import os, shutil, json
+import os, shutil
+import pickle
+import asyncio
+from collections import defaultdict
 from config import db
 from typing import List
 from datetime import datetime
 from searchcv import schema
 from typing import List, Dict, Any
-from sqlmodel import Session, func, and_, or_, not_
-from sqlalchemy import select
-from fastapi import HTTPException, Request, BackgroundTasks, UploadFile, status
+from sqlmodel import Session, func, or_, not_
+from sqlalchemy import select, insert
+from fastapi import HTTPException, Request, BackgroundTasks, status
+from starlette.concurrency import run_in_threadpool
 from postjob.api_service.extraction_service import Extraction
-from postjob.api_service.openai_service import OpenAIService
+from postjob.api_service.cache_service import LLMCache
+from postjob.api_service.prescoring_service import PreScoring
 from postjob.db_service.db_service import DatabaseService
+from searchcv.search_index import SearchIndex
+from pagination import Pagination, paginate
+from batch_loader import BatchLoader
+from read_models import Slim
+from candidate_detail import CandidateDetail
 from config import (
                 CV_PARSE_PROMPT, 
                 JD_PARSE_PROMPT,
-                CV_EXTRACTION_PATH,
-                JD_EXTRACTION_PATH, 
                 JD_SAVED_TEMP_DIR,
                 CV_SAVED_DIR,
                 JD_SAVED_DIR,
                 MATCHING_PROMPT,
-                MATCHING_DIR)
+                BATCH_MATCHING_PROMPT,
+                MATCHING_BATCH_TOKEN_BUDGET,
+                MATCHING_BATCH_MAX_SIZE)
 
 
 class AuthRequestRepository:
@@ -80,6 +90,13 @@ class General:
         query = select(model.Company).where(model.Company.user_id == recruit_id)
         return db_session.execute(query).scalars().first()
     
+    @staticmethod
+    def insert_rows(rows: Dict[Any, List[Dict[str, Any]]], db_session: Session):
+        #   {model: [column values]} => one executemany INSERT per table (multi-row VALUES pages with psycopg2), no ORM objects
+        for table, values in rows.items():
+            if values:
+                db_session.execute(insert(table.__table__), values)
+
     @staticmethod
     def give_user_point(point: float, db_session: Session, current_user):
         user_db = db_session.execute(select(model.User).where(model.User.id == current_user.id)).scalars().first()
@@ -98,6 +115,13 @@ class General:
         cv_result = db_session.execute(cv_query).first() 
         return cv_result
     
+    def get_resume_filenames(cv_lst: List[int], db_session: Session):
+        #   Latest CV file of each resume, in one query
+        filename_query = select(model.ResumeVersion.cv_id, model.ResumeVersion.filename) \
+            .where(model.ResumeVersion.cv_id.in_(cv_lst),
+                   model.ResumeVersion.is_lastest == True)
+        return {cv_id: filename for cv_id, filename in db_session.execute(filename_query).all() if filename}
+    
     @staticmethod
     def get_resume_valuate(cv_id, db_session):
         valuation_query = select(model.ValuationInfo).where(model.ValuationInfo.cv_id == cv_id)
@@ -133,9 +157,44 @@ class Recruiter:
 
     class Job:
 
+        @staticmethod
+        def first(value):
+            #   GPT gives most JD fields as one-item lists
+            return value[0] if isinstance(value, list) and value else value
+
+        @staticmethod
+        def child_values(data):
+            #   Education and certificate rows of a GPT JD extraction, by model
+            first = Recruiter.Job.first
+            return {
+                model.JobEducation: [dict(
+                                        degree=first(edu['degree']),
+                                        major=first(edu['major']),
+                                        gpa=first(edu['gpa']),
+                                        start_time=first(edu.get('start_time')),
+                                        end_time=first(edu.get('end_time'))
+                ) for edu in data['education']],
+                model.LanguageJobCertificate: [dict(
+                                        certificate_language=first(lang_cert['certificate_language']),
+                                        certificate_name=first(lang_cert['certificate_name']),
+                                        certificate_point_level=first(lang_cert['certificate_point_level']),
+                                        start_time=first(lang_cert.get('start_time')),
+                                        end_time=first(lang_cert.get('end_time'))
+                ) for lang_cert in data['certificates']['language_certificates']],
+                model.OtherJobCertificate: [dict(
+                                        certificate_name=first(other_cert['certificate_name']),
+                                        certificate_point_level=first(other_cert['certificate_point_level']),
+                                        start_time=first(other_cert.get('start_time')),
+                                        end_time=first(other_cert.get('end_time'))
+                ) for other_cert in data['certificates']['other_certificates']],
+            }
+
         @staticmethod
         def save_jd_parsed_result(data, db_session, current_user):
+            """Insert a parsed JD and its children in one transaction, each child table with one executemany INSERT"""
             company_result = db_session.execute(select(model.Company).where(model.Company.user_id == current_user.id)).scalars().first()
+            #   Malformed extraction fails here, before any write
+            children = Recruiter.Job.child_values(data)
             job_db = model.JobDescription(
                                     user_id=current_user.id,
                                     company_id=company_result.id,
@@ -162,130 +221,233 @@ class Recruiter:
                                     country=data['location']['country'][0]
             )
             db_session.add(job_db)
+            #   INSERT .. RETURNING gives the job id without committing
+            db_session.flush()
+            General.insert_rows({table: [dict(job_id=job_db.id, **values) for values in rows] for table, rows in children.items()}, db_session)
             db.commit_rollback(db_session)
-            edu_db = [model.JobEducation(
-                                    job_id=job_db.id,
-                                    degree=edu['degree'][0],
-                                    major=edu['major'][0],
-                                    gpa=edu['gpa'][0],
-                                    start_time=edu['start_time'][0],
-                                    end_time=edu['end_time'[0]]
-            ) for edu in data['education']]
-            db_session.add_all(edu_db)
-            lang_certs = [model.LanguageJobCertificate(
-                                    job_id=job_db.id,
-                                    certificate_language=lang_cert['certificate_language'],
-                                    certificate_name=lang_cert['certificate_name'],
-                                    certificate_point_level=lang_cert['certificate_point_level'],
-                                    start_time=lang_cert['start_time'],
-                                    end_time=lang_cert['end_time']
-            ) for lang_cert in data['certificates']['language_certificates']]
-            db_session.add_all(lang_certs)
-            other_certs = [model.LanguageJobCertificate(
-                                    job_id=job_db.id,
-                                    certificate_language=other_cert['certificate_language'],
-                                    certificate_point_level=other_cert['certificate_point_level'],
-                                    start_time=other_cert['start_time'],
-                                    end_time=other_cert['end_time']
-            ) for other_cert in data['certificates']['other_certificates']]
-            db_session.add_all(other_certs)
-            db.commit_rollback(db_session) 
             return job_db
 
 
         @staticmethod
-        def jd_parsing(file: UploadFile, 
-                       cleaned_filename: str, 
+        async def jd_parsing(cleaned_filename: str, 
                        db_session: Session, 
                        current_user):
-            #   Check duplicated filename
-            if not DatabaseService.check_file_duplicate(cleaned_filename, JD_EXTRACTION_PATH):
-                prompt_template = Extraction.jd_parsing_template(store_path=JD_SAVED_DIR, filename=cleaned_filename)
-                #   Read parsing requirements
-                with open(JD_PARSE_PROMPT, "r") as file:
-                    require = file.read()
-                prompt_template += require                 
-                #   Start parsing
-                extracted_result = OpenAIService.gpt_api(prompt_template)
-                extracted_result["jd_file"] = os.path.join("static/job/uploaded_jds", cleaned_filename)     
-                #   Save extracted result
-                saved_path = DatabaseService.store_jd_extraction(extracted_json=extracted_result, jd_file=cleaned_filename)
+            prompt_template = await Extraction.jd_parsing_template(store_path=JD_SAVED_DIR, filename=cleaned_filename)
+            #   Read parsing requirements
+            with open(JD_PARSE_PROMPT, "r") as file:
+                require = file.read()
+            prompt_template += require                 
+            #   Start parsing (an already parsed JD content is served from cache)
+            #   No connection held while waiting for GPT
+            await run_in_threadpool(db.release, db_session)
+            extracted_result = await LLMCache.gpt_api(prompt_template, prompt_version="jd_parsing")
+            extracted_result["jd_file"] = os.path.join("static/job/uploaded_jds", cleaned_filename)     
+            job_db = await run_in_threadpool(Recruiter.Job.save_jd_extraction, extracted_result, cleaned_filename, db_session, current_user)
+            return extracted_result, job_db
+
+        @staticmethod
+        def save_jd_extraction(extracted_result: Dict[str, Any], cleaned_filename: str, db_session: Session, current_user):
+            #   Save extracted result
+            DatabaseService.store_jd_extraction(extracted_json=extracted_result, jd_file=cleaned_filename)
+            #   Get existing database
+            job_db = db_session.execute(select(model.JobDescription).where(model.JobDescription.jd_file == extracted_result["jd_file"])).scalars().first()
+            if not job_db:
                 #   Save to database
                 job_db = Recruiter.Job.save_jd_parsed_result(extracted_result, db_session, current_user)
-            else:
-                #   Read available extracted result
-                saved_path = os.path.join(JD_EXTRACTION_PATH, cleaned_filename.split(".")[0] + ".json")
-                with open(saved_path) as file:
-                    extracted_result = file.read()
-                #   Get existing database
-                job_db = db_session.execute(select(model.JobDescription).where(model.JobDescription.jd_file == os.path.join("static/job/uploaded_jds", cleaned_filename)))
-            return extracted_result, job_db
+            return job_db
 
     class Resume: 
 
+        @staticmethod
+        def matching_values(cv_id: int, job_id: int, matching_result: Dict[str, Any]):
+            return dict(
+                    job_id=job_id,
+                    cv_id=cv_id,
+                    title_score=int(matching_result["job_title"]["score"]),
+                    title_explain=matching_result["job_title"]["explanation"],
+                    exper_score=int(matching_result["experience"]["score"]),
+                    exper_explain=matching_result["experience"]["explanation"],
+                    skill_score=int(matching_result["skill"]["score"]),
+                    skill_explain=matching_result["skill"]["explanation"],
+                    education_score=int(matching_result["education"]["score"]),
+                    education_explain=matching_result["education"]["explanation"],
+                    orientation_score=int(matching_result["orientation"]["score"]),
+                    orientation_explain=matching_result["orientation"]["explanation"],
+                    overall_score=int(matching_result["overall"]["score"]),
+                    overall_explain=matching_result["overall"]["explanation"]
+            )
+
         @staticmethod
         def save_matching_result(cv_id: int, job_id: int, matching_result: Dict[str, Any], db_session: Session):
             #   Write matching result to Database
-            matching_db = model.ResumeMatching(
-                                    job_id=job_id,
-                                    cv_id=cv_id,
-                                    title_score=int(matching_result["job_title"]["score"]),
-                                    title_explain=matching_result["job_title"]["explanation"],
-                                    exper_score=int(matching_result["experience"]["score"]),
-                                    exper_explain=matching_result["experience"]["explanation"],
-                                    skill_score=int(matching_result["skill"]["score"]),
-                                    skill_explain=matching_result["skill"]["explanation"],
-                                    education_score=int(matching_result["education"]["score"]),
-                                    education_explain=matching_result["education"]["explanation"],
-                                    orientation_score=int(matching_result["orientation"]["score"]),
-                                    orientation_explain=matching_result["orientation"]["explanation"],
-                                    overall_score=int(matching_result["overall"]["score"]),
-                                    overall_explain=matching_result["overall"]["explanation"]
-            )
-            db_session.add(matching_db)
+            db.upsert(db_session, model.ResumeMatching.__table__, [Recruiter.Resume.matching_values(cv_id, job_id, matching_result)], keys=["cv_id", "job_id"])
+            db.commit_rollback(db_session)
+
+        @staticmethod
+        def save_matching_results(job_id: int, matching_results: Dict[int, Dict[str, Any]], db_session: Session):
+            #   Write all matching results of a batch in one statement, filtering again replaces the previous results
+            if not matching_results:
+                return
+            db.upsert(db_session,
+                      model.ResumeMatching.__table__,
+                      [Recruiter.Resume.matching_values(cv_id, job_id, result) for cv_id, result in matching_results.items()],
+                      keys=["cv_id", "job_id"])
             db.commit_rollback(db_session)
     
         @staticmethod
-        def matching_base(cv_filename: str, jd_filename: str):
+        def prepare_filter(data_form: schema.BatchFilter, db_session: Session):
+            #   Get Job results
+            job_result = General.get_job_by_id(data_form.job_id, db_session)
+            if not job_result:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job does not exist!")
+            #   Get Resume files
+            cv_filenames = General.get_resume_filenames(data_form.cv_lst, db_session)
+            #   Clear mismatches are rejected locally, the others are ranked before GPT matching
+            cv_filenames, matching_results = PreScoring.rank(cv_filenames, job_result.jd_file.split("/")[-1])
+            #   No connection held while waiting for GPT
+            db.release(db_session)
+            return job_result, cv_filenames, matching_results
+
+        @staticmethod
+        def save_filter(job_result: model.JobDescription, matching_results: Dict[int, Dict[str, Any]], db_session: Session):
+            #   Good match save resume index that matches over 50% with relevant JD
+            good_match = [cv_id for cv_id, matching_result in matching_results.items()
+                          if not matching_result.get("rejected") and int(matching_result["overall"]["score"]) > 50]
+            #   Store matching results to DB
+            Recruiter.Resume.save_matching_results(job_result.id, matching_results, db_session)
+            #   Save good match results
+            jd_filename = job_result.jd_file.split("/")[-1].split(".")[0] + '.pkl'
+            os.makedirs('static/good_match', exist_ok=True)
+            with open(os.path.join('static/good_match', jd_filename), 'wb') as file:
+                pickle.dump(good_match, file)
+            return good_match
+
+        @staticmethod
+        async def matching_base(cv_filename: str, jd_filename: str):
             #   Create saved file name
             match_filename = jd_filename.split(".")[0] + "__" + cv_filename
-            #   Check duplicated filename
-            if not DatabaseService.check_file_duplicate(match_filename, MATCHING_DIR):
-                prompt_template = Extraction.matching_template(cv_filename, jd_filename)
-
-                #   Read parsing requirements
-                with open(MATCHING_PROMPT, "r") as file:
-                    require = file.read()
-                prompt_template += require 
-                
-                #   Start parsing
-                matching_result = OpenAIService.gpt_api(prompt_template)        
-                saved_path = DatabaseService.store_matching_result(extracted_json=matching_result, saved_name=match_filename)
-                #   Save matching result to DB
+            prompt_template = Extraction.matching_template(cv_filename, jd_filename)
 
-            else:
-                #   Read available extracted result
-                saved_path = os.path.join(MATCHING_DIR, match_filename.split(".")[0] + ".json")
-                with open(saved_path) as file:
-                    matching_result = json.loads(file.read())
+            #   Read parsing requirements
+            with open(MATCHING_PROMPT, "r") as file:
+                require = file.read()
+            prompt_template += require 
+            
+            #   Start matching (an already matched CV-JD pair is served from cache)
+            matching_result = await LLMCache.gpt_api(prompt_template, prompt_version="matching")
+            saved_path = DatabaseService.store_matching_result(extracted_json=matching_result, saved_name=match_filename)
             return matching_result, saved_path
         
 
         @staticmethod
-        def list_good_match(good_match: List[int], db_session: Session):
+        def pack_resumes(cv_filenames: Dict[int, str], jd_filename: str):
+            #   Read parsing requirements
+            with open(BATCH_MATCHING_PROMPT, "r") as file:
+                require = file.read()
+            jd_block = Extraction.matching_jd_block(Extraction.matching_jd_fields(jd_filename))
+            base_tokens = Extraction.estimate_tokens(jd_block + require)
+
+            #   Pack resumes under the token budget
+            packs, pack, pack_tokens = [], {}, base_tokens
+            for cv_id, cv_filename in cv_filenames.items():
+                cv_block = Extraction.matching_cv_block(str(cv_id), Extraction.matching_cv_fields(cv_filename))
+                cv_tokens = Extraction.estimate_tokens(cv_block)
+                if pack and (len(pack) >= MATCHING_BATCH_MAX_SIZE or pack_tokens + cv_tokens > MATCHING_BATCH_TOKEN_BUDGET):
+                    packs.append(pack)
+                    pack, pack_tokens = {}, base_tokens
+                pack[cv_id] = cv_block
+                pack_tokens += cv_tokens
+            if pack:
+                packs.append(pack)
+            return require, jd_block, packs
+
+        @staticmethod
+        async def batch_matching_base(cv_filenames: Dict[int, str], jd_filename: str):
+            """
+            Match several resumes against one JD.
+            The JD half of the prompt is built once, resumes are packed into requests of at most MATCHING_BATCH_MAX_SIZE
+            resumes / MATCHING_BATCH_TOKEN_BUDGET tokens and all requests are sent concurrently.
+            """
+            #   Prompt and resume files are read in the threadpool
+            require, jd_block, packs = await run_in_threadpool(Recruiter.Resume.pack_resumes, cv_filenames, jd_filename)
+
+            async def match_pack(pack: Dict[int, str]):
+                prompt_template = Extraction.batch_matching_template(jd_block, list(pack.values())) + require
+                matching_result = await LLMCache.gpt_api(prompt_template, prompt_version="batch_matching")
+                if not isinstance(matching_result, dict):
+                    return {cv_id: None for cv_id in pack}
+                #   Malformed results are matched again one by one
+                return {cv_id: matching_result.get(str(cv_id)) if LLMCache.is_valid(matching_result.get(str(cv_id)), "matching") else None
+                        for cv_id in pack}
+
+            matching_results = {}
+            for pack_result in await asyncio.gather(*[match_pack(pack) for pack in packs]):
+                matching_results.update(pack_result)
+
+            #   Resumes left out of an answer are matched one by one
+            missing = [cv_id for cv_id, result in matching_results.items() if not result]
+            if missing:
+                print(f" >>> {len(missing)} resumes missing from batch answers, matching them separately.")
+                fallbacks = await asyncio.gather(*[Recruiter.Resume.matching_base(cv_filenames[cv_id], jd_filename) for cv_id in missing])
+                for cv_id, (matching_result, _) in zip(missing, fallbacks):
+                    matching_results[cv_id] = matching_result
+            print(f" >>> Matched {len(cv_filenames)} resumes in {len(packs)} batch requests.")
+            return matching_results
+        
+
+        @staticmethod
+        def list_good_match(good_match: List[int], page: Pagination, db_session: Session):
+            #   good_match is kept in match order, only the resumes of the requested page are read (one query per table)
+            cv_ids = good_match[page.offset: page.offset + page.limit]
+            if not cv_ids:
+                return [], len(good_match)
+            version_query = select(model.ResumeVersion).where(model.ResumeVersion.cv_id.in_(cv_ids),
+                                                              model.ResumeVersion.is_lastest == True)
+            versions = {version.cv_id: version for version in db_session.execute(version_query).scalars().all()}
+            education_query = select(model.ResumeEducation).where(model.ResumeEducation.cv_id.in_(cv_ids)).order_by(model.ResumeEducation.id)
+            educations = {}
+            for education in db_session.execute(education_query).scalars().all():
+                educations.setdefault(education.cv_id, education)
             results = []
-            for cv_id in good_match:
-                result = General.get_detail_resume_by_id(cv_id, db_session)
-                education = db_session.execute(select(model.ResumeEducation).where(model.ResumeEducation.cv_id == cv_id)).scalars().first()
+            for cv_id in cv_ids:
+                version, education = versions.get(cv_id), educations.get(cv_id)
+                if version is None:
+                    continue
                 results.append({
-                    "current_job": result.Resumeversion.current_job,
-                    "degree": education.degree,
-                    "major": education.major,
-                    "level": result.Resumeversion.level,
-                    "skils": result.Resumeversion.skills
+                    "current_job": version.current_job,
+                    "degree": education.degree if education else None,
+                    "major": education.major if education else None,
+                    "level": version.level,
+                    "skils": version.skills
                 })
-            return results
+            return results, len(good_match)
     
+
+        @staticmethod
+        def list_search_result(ranked: List, db_session: Session):
+            #   ranked: [(cv_id, score)] of one result page, read in one query and kept in rank order
+            if not ranked:
+                return []
+            query = select(model.ResumeVersion.cv_id,
+                           model.ResumeVersion.name,
+                           model.ResumeVersion.current_job,
+                           model.ResumeVersion.industry,
+                           model.ResumeVersion.level,
+                           model.ResumeVersion.city,
+                           model.ResumeVersion.skills).where(
+                                            model.ResumeVersion.cv_id.in_([cv_id for cv_id, _ in ranked]),
+                                            model.ResumeVersion.is_lastest == True)
+            versions = {version.cv_id: version for version in db_session.execute(query).all()}
+            return [{
+                "id": cv_id,
+                "score": round(score, 4),
+                "fullname": versions[cv_id].name,
+                "current_job": versions[cv_id].current_job,
+                "industry": versions[cv_id].industry,
+                "level": versions[cv_id].level,
+                "city": versions[cv_id].city,
+                "skills": versions[cv_id].skills,
+            } for cv_id, score in ranked if cv_id in versions]
     
         @staticmethod
         def get_matching_result(cv_id: int, db_session: Session):
@@ -327,15 +489,14 @@ class Recruiter:
                 
         @staticmethod
         def get_detail_candidate(request: Request, candidate_id: int, db_session: Session, current_user):
-            resume_result = General.get_detail_resume_by_id(candidate_id, db_session) 
+            resume_result = CandidateDetail.load(candidate_id, db_session, recruiter_id=current_user.id, with_children=False)
             if not resume_result:
                 raise HTTPException(status_code=404, detail="Resume doesn't exist!")
-            job_result = General.get_job_by_id(resume_result.Resume.job_id, db_session)
+            job_result = resume_result.JobDescription
             if not job_result:
                 raise HTTPException(status_code=404, detail="Job doesn't exist!")
             #   Get resume information of a specific recruiter
-            choosen_result = db_session.execute(select(model.RecruitResumeJoin).where(and_(model.RecruitResumeJoin.user_id == current_user.id,
-                                                                                           model.RecruitResumeJoin.resume_id == candidate_id))).scalars().first()
+            choosen_result = resume_result.RecruitResumeJoin
             
             if not choosen_result:
                 return {
@@ -345,7 +506,7 @@ class Recruiter:
                     "current_job": resume_result.ResumeVersion.current_job,
                     "industry": resume_result.ResumeVersion.industry,
                     "status": resume_result.ResumeVersion.status,
-                    "total_point": General.get_resume_valuate(candidate_id, db_session).total_point,
+                    "total_point": resume_result.valuation().total_point,
                     "avatar": os.path.join(str(request.base_url), "static/resume/avatar/default_avatar.png"),
                     "birthday": resume_result.ResumeVersion.birthday,
                     "gender": resume_result.ResumeVersion.gender,
@@ -360,7 +521,7 @@ class Recruiter:
                     "current_job": resume_result.ResumeVersion.current_job,
                     "industry": resume_result.ResumeVersion.industry,
                     "status": resume_result.ResumeVersion.status,
-                    "total_point": General.get_resume_valuate(candidate_id, db_session).total_point,
+                    "total_point": resume_result.valuation().total_point,
                     "avatar": os.path.join(str(request.base_url), "static/resume/avatar/default_avatar.png"),
                     "birthday": resume_result.ResumeVersion.birthday,
                     "gender": resume_result.ResumeVersion.gender,
@@ -373,64 +534,66 @@ class Recruiter:
 
 
         @staticmethod
-        def list_candidate(state: schema.CandidateState, db_session: Session): 
+        def list_candidate(state: schema.CandidateState, page: Pagination, db_session: Session): 
             
             if state == schema.CandidateState.all:
-                resume_results = db_session.execute(select(model.Resume, model.ResumeVersion)    \
-                                                .join(model.ResumeVersion, model.Resume.id == model.ResumeVersion.cv_id)
-                                                .where(model.ResumeVersion.is_lastest == True)).all()
+                #   Latest version of every resume with its job service: one scan of candidate_overviews
+                resume_results, total_items = paginate(db_session, select(model.CandidateOverview), page, model.CandidateOverview, scalars=True)
                 return [{
-                        "id": result.ResumeVersion.cv_id,
-                        "fullname": result.ResumeVersion.name,
-                        "job_title": result.ResumeVersion.current_job,
-                        "industry": result.ResumeVersion.industry,
-                        "status": result.ResumeVersion.status,
-                        "job_service": General.get_job_from_resume(result.Resume.id, db_session).job_service if result.Resume.job_id else "SearchCV",
-                        "referred_time": result.ResumeVersion.created_at
-                    } for result in resume_results]
+                        "id": result.cv_id,
+                        "fullname": result.name,
+                        "job_title": result.current_job,
+                        "industry": result.industry,
+                        "status": result.status,
+                        "job_service": result.job_service,
+                        "referred_time": result.created_at
+                    } for result in resume_results], total_items
             
             elif state == schema.CandidateState.new_candidate:
-                results = db_session.execute(select(model.RecruitResumeJoin, model.ResumeVersion)    \
+                results, total_items = paginate(db_session, select(Slim.RecruitResumeJoin, Slim.ResumeVersion)    \
                                                 .join(model.ResumeVersion, not_(model.RecruitResumeJoin.resume_id == model.ResumeVersion.cv_id))    \
-                                                .filter(model.ResumeVersion.is_lastest == True)).all()
+                                                .filter(model.ResumeVersion.is_lastest == True), page, model.ResumeVersion)
+                loader = BatchLoader(db_session).prime("resume", [result.ResumeVersion.cv_id for result in results])
                 return [{
                         "id": result.ResumeVersion.cv_id,
                         "fullname": result.ResumeVersion.name,
                         "job_title": result.ResumeVersion.current_job,
                         "industry": result.ResumeVersion.industry,
                         "status": result.ResumeVersion.status,
-                        "job_service": General.get_job_from_resume(result.ResumeVersion.cv_id, db_session).job_service,
+                        "job_service": loader.job_service(result.ResumeVersion.cv_id),
                         "referred_time": result.ResumeVersion.created_at
-                    } for result in results]
+                    } for result in results], total_items
             elif state == schema.CandidateState.choosen_candidate:
-                results = db_session.execute(select(model.RecruitResumeJoin, model.ResumeVersion)   \
+                results, total_items = paginate(db_session, select(Slim.RecruitResumeJoin, Slim.ResumeVersion)   \
                                                 .join(model.ResumeVersion, model.ResumeVersion.cv_id == model.RecruitResumeJoin.resume_id)  \
                                                 .filter(or_(model.RecruitResumeJoin.package == schema.ResumePackage.basic,
                                                            model.RecruitResumeJoin.package == schema.ResumePackage.platinum))    \
-                                                .where(model.ResumeVersion.is_lastest == True)).all()
+                                                .where(model.ResumeVersion.is_lastest == True), page, model.ResumeVersion)
+                loader = BatchLoader(db_session).prime("resume", [result.ResumeVersion.cv_id for result in results])
                 return [{
                         "id": result.ResumeVersion.cv_id,
                         "fullname": result.ResumeVersion.name,
                         "job_title": result.ResumeVersion.current_job,
                         "industry": result.ResumeVersion.industry,
-                        "job_service": General.get_job_from_resume(result.ResumeVersion.cv_id, db_session).job_service,
+                        "job_service": loader.job_service(result.ResumeVersion.cv_id),
                         "status": result.ResumeVersion.status,
                         "referred_time": result.ResumeVersion.created_at
-                    } for result in results]
+                    } for result in results], total_items
             elif state == schema.CandidateState.inappro_candidate:
-                results = db_session.execute(select(model.RecruitResumeJoin, model.ResumeVersion)   \
+                results, total_items = paginate(db_session, select(Slim.RecruitResumeJoin, Slim.ResumeVersion)   \
                                                 .join(model.ResumeVersion, model.ResumeVersion.cv_id == model.RecruitResumeJoin.resume_id)  \
                                                 .filter(model.RecruitResumeJoin.is_rejected == True)    \
-                                                .where(model.ResumeVersion.is_lastest == True)).all()
+                                                .where(model.ResumeVersion.is_lastest == True), page, model.ResumeVersion)
+                loader = BatchLoader(db_session).prime("resume", [result.ResumeVersion.cv_id for result in results])
                 return [{
                         "id": result.ResumeVersion.cv_id,
                         "fullname": result.ResumeVersion.name,
                         "job_title": result.ResumeVersion.current_job,
                         "industry": result.ResumeVersion.industry,
                         "status": result.ResumeVersion.status,
-                        "job_service": General.get_job_from_resume(result.ResumeVersion.cv_id, db_session).job_service,
+                        "job_service": loader.job_service(result.ResumeVersion.cv_id),
                         "referred_time": result.ResumeVersion.created_at
-                    } for result in results]
+                    } for result in results], total_items
             else:
                 pass
 
@@ -449,6 +612,8 @@ class Recruiter:
             
         @staticmethod
         def choose_candidate_basic(cv_id: int, db_session: Session, current_user):
+            #   Checked and charged on the user row: the cached principal may be behind
+            current_user = db_session.execute(select(model.User).where(model.User.id == current_user.id)).scalars().first()
             #   Check wheather recruiter's point is available
             valuation_result = General.get_resume_valuate(cv_id, db_session)
             if current_user.point < valuation_result.total_point:
@@ -472,6 +637,8 @@ class Recruiter:
             
         @staticmethod
         def choose_candidate_platinum(data: schema.ChoosePlatinum, db_session: Session, current_user):
+            #   Checked and charged on the user row: the cached principal may be behind
+            current_user = db_session.execute(select(model.User).where(model.User.id == current_user.id)).scalars().first()
             #   Check wheather recruiter's point is available
             valuation_result = General.get_resume_valuate(data.cv_id, db_session)
             if current_user.point < valuation_result.total_point * 10:
@@ -511,22 +678,24 @@ class Recruiter:
         
         
         @staticmethod
-        def list_interview_schedule(db_session: Session, current_user):
-            query = select(model.Resume, model.ResumeVersion, model.InterviewSchedule)  \
+        def list_interview_schedule(page: Pagination, db_session: Session, current_user):
+            query = select(Slim.Resume, Slim.ResumeVersion, Slim.InterviewSchedule)  \
                         .join(model.Resume, model.Resume.id == model.ResumeVersion.cv_id)   \
                         .outerjoin(model.InterviewSchedule, model.InterviewSchedule.candidate_id == model.ResumeVersion.cv_id)   \
                         .filter(model.InterviewSchedule.user_id == current_user.id)
-            results = db_session.execute(query).all()
+            #   A resume version is on one row per schedule (recruiter) of its candidate
+            results, total_items = paginate(db_session, query, page, model.ResumeVersion, tiebreak=(model.InterviewSchedule.user_id,))
+            loader = BatchLoader(db_session).prime("resume", [result.ResumeVersion.cv_id for result in results])
             return [{
                 "candidate_id": result.InterviewSchedule.candidate_id,
                 "candidate_name": result.ResumeVersion.name,
                 "job_title": result.ResumeVersion.current_job,
-                "job_service": General.get_job_from_resume(result.Resume.id, db_session).job_service if result.Resume.job_id else "SearchCV",
+                "job_service": loader.job_service(result.ResumeVersion.cv_id),
                 "status": result.ResumeVersion.status,
                 "interview_date": result.InterviewSchedule.date,
                 "interview_time": f"{result.InterviewSchedule.start_time} - {result.InterviewSchedule.end_time}",
                 "interview_location": result.InterviewSchedule.location
-            } for result in results]
+            } for result in results], total_items
 
 
 class Collaborator:
@@ -537,129 +706,143 @@ class Collaborator:
     class Resume:
 
         @staticmethod
-        def save_cv_parsed_result(extracted_result, industry, db_session, current_user):
-            resume_db = model.Resume(user_id=current_user.id)
-            db_session.add(resume_db)
-            db.commit_rollback(db_session)
-            db_session.refresh(resume_db)
-
-            version_db = model.ResumeVersion(
-                                        cv_id=resume_db.id,
-                                        filename=extracted_result["cv_file"].split('/')[-1],
-                                        cv_file=extracted_result["cv_file"],
-                                        name=extracted_result['personal_information']['name'],
-                                        level=extracted_result['levels'][0],
-                                        gender=extracted_result['personal_information']['gender'],
-                                        industry=industry if industry else extracted_result['industry'],
-                                        current_job=extracted_result['job_title'][0],
-                                        skills=extracted_result['skills'],
-                                        email=extracted_result['contact_information']['email'],
-                                        phone=extracted_result['contact_information']['phone'],
-                                        address=extracted_result['contact_information']['address'],
-                                        city=extracted_result['contact_information']['city/province'],
-                                        country=extracted_result['contact_information']['country'],
-                                        birthday=extracted_result['personal_information']['birthday'],
-                                        linkedin=extracted_result['personal_information']['linkedin'],
-                                        website=extracted_result['personal_information']['website'],
-                                        facebook=extracted_result['personal_information']['facebook'],
-                                        instagram=extracted_result['personal_information']['instagram'],
-                                        objectives=extracted_result['objectives'][0]
+        def version_values(extracted_result, industry):
+            #   ResumeVersion columns from a GPT extraction (a malformed extraction fails here, before any write)
+            return dict(
+                        filename=extracted_result["cv_file"].split('/')[-1],
+                        cv_file=extracted_result["cv_file"],
+                        name=extracted_result['personal_information']['name'],
+                        level=extracted_result['levels'][0],
+                        gender=extracted_result['personal_information']['gender'],
+                        industry=industry if industry else extracted_result['industry'],
+                        current_job=extracted_result['job_title'][0],
+                        skills=extracted_result['skills'],
+                        email=extracted_result['contact_information']['email'],
+                        phone=extracted_result['contact_information']['phone'],
+                        address=extracted_result['contact_information']['address'],
+                        city=extracted_result['contact_information']['city/province'],
+                        country=extracted_result['contact_information']['country'],
+                        birthday=extracted_result['personal_information']['birthday'],
+                        linkedin=extracted_result['personal_information']['linkedin'],
+                        website=extracted_result['personal_information']['website'],
+                        facebook=extracted_result['personal_information']['facebook'],
+                        instagram=extracted_result['personal_information']['instagram'],
+                        objectives=extracted_result['objectives'][0]
             )
-            db_session.add(version_db)
-            db.commit_rollback(db_session)
-            db_session.refresh(version_db)
 
-            education_db = [model.ResumeEducation(
-                                        cv_id=version_db.cv_id,
+        @staticmethod
+        def child_values(extracted_result):
+            #   Education, experience, award, project and certificate rows of a GPT extraction, by model
+            return {
+                model.ResumeEducation: [dict(
                                         institute_name=result['institution_name'],
                                         major=result['major'],
                                         degree=result['degree'],
                                         gpa=result['gpa'],
                                         start_time=result['start_time'],
                                         end_time=result['end_time']
-            ) for result in extracted_result['education']]
-            db_session.add_all(education_db)
-
-            experience_db = [model.ResumeExperience(
-                                        cv_id=version_db.cv_id,
+                ) for result in extracted_result['education']],
+                model.ResumeExperience: [dict(
                                         company_name=result['company_name'],
                                         job_title=result['position'],
-                                        role=result['role'],
-                                        level=result['level'],
+                                        roles=result['role'],
+                                        levels=result['level'],
                                         working_industry=result['working_industry'],
                                         start_time=result['start_time'],
                                         end_time=result['end_time']
-            ) for result in extracted_result['work_experience']]
-            db_session.add_all(experience_db)
-
-            award_db = [model.ResumeAward(
-                                        cv_id=version_db.cv_id,
+                ) for result in extracted_result['work_experience']],
+                model.ResumeAward: [dict(
                                         name=result['award_name'],
                                         time=result['time'],
                                         description=result['description']
-            ) for result in extracted_result['awards']]
-            db_session.add_all(award_db)
-
-            project_db = [model.ResumeProject(
-                                        cv_id=version_db.cv_id,
+                ) for result in extracted_result['awards']],
+                model.ResumeProject: [dict(
                                         project_name=result['project_name'],
                                         descriptions=result['detailed_descriptions'],
                                         start_time=result['start_time'],
                                         end_time=result['end_time']
-            ) for result in extracted_result['projects']]
-            db_session.add_all(project_db)
-
-            lang_cert_db = [model.LanguageResumeCertificate(
-                                        cv_id=version_db.cv_id,
+                ) for result in extracted_result['projects']],
+                model.LanguageResumeCertificate: [dict(
                                         certificate_language=result['certificate_language'],
                                         certificate_name=result['certificate_name'],
                                         certificate_point_level=result['certificate_point_level'],
                                         start_time=result['start_time'],
                                         end_time=result['end_time']
-            ) for result in extracted_result['certificates']['language_certificates']]
-            db_session.add_all(lang_cert_db)
-
-            other_cert_db = [model.OtherResumeCertificate(
-                                        cv_id=version_db.cv_id,
+                ) for result in extracted_result['certificates']['language_certificates']],
+                model.OtherResumeCertificate: [dict(
                                         certificate_name=result['certificate_name'],
                                         certificate_point_level=result['certificate_point_level'],
                                         start_time=result['start_time'],
                                         end_time=result['end_time']
-            ) for result in extracted_result['certificates']['other_certificates']]
-            db_session.add_all(other_cert_db)
+                ) for result in extracted_result['certificates']['other_certificates']],
+            }
 
+        @staticmethod
+        def save_cv_parsed_results(parsed: List[Dict[str, Any]], user_id: int, db_session: Session):
+            """
+            Insert several parsed resumes in one transaction: resumes and versions with one flush each, which SQLAlchemy
+            sends as batched INSERT .. RETURNING statements, and child rows with one executemany INSERT per table.
+            parsed: [{"version": version_values(...), "children": child_values(...)}]
+            """
+            resumes_db = [model.Resume(user_id=user_id) for _ in parsed]
+            db_session.add_all(resumes_db)
+            db_session.flush()
+
+            versions_db = [model.ResumeVersion(cv_id=resume_db.id, **item["version"]) for resume_db, item in zip(resumes_db, parsed)]
+            db_session.add_all(versions_db)
+            db_session.flush()
+
+            #   Children are not needed as objects: one executemany INSERT per table for the whole batch
+            children = defaultdict(list)
+            for version_db, item in zip(versions_db, parsed):
+                for table, rows in item["children"].items():
+                    children[table].extend(dict(cv_id=version_db.cv_id, **values) for values in rows)
+            General.insert_rows(children, db_session)
+            version_ids = [version_db.id for version_db in versions_db]
             db.commit_rollback(db_session)
-            return resume_db, version_db
+            #   Reload the expired versions with one query rather than one refresh per object
+            db_session.execute(select(model.ResumeVersion).where(model.ResumeVersion.id.in_(version_ids))).scalars().all()
+            for version_db in versions_db:
+                #   Make the resumes searchable right away
+                SearchIndex.index_resume(version_db)
+            return resumes_db, versions_db
+
+        @staticmethod
+        def save_cv_parsed_result(extracted_result, industry, db_session, current_user, content_hash=None):
+            parsed = {
+                "version": dict(Collaborator.Resume.version_values(extracted_result, industry), content_hash=content_hash),
+                "children": Collaborator.Resume.child_values(extracted_result)
+            }
+            resumes_db, versions_db = Collaborator.Resume.save_cv_parsed_results([parsed], current_user.id, db_session)
+            return resumes_db[0], versions_db[0]
 
 
         @staticmethod
-        def cv_parsing(data: schema.UploadResume, 
+        async def cv_parsing(industry: str, 
                        cleaned_filename: str, 
                        db_session: Session, 
                        current_user):
-            #   Check duplicated filename
-            if not DatabaseService.check_file_duplicate(cleaned_filename, CV_EXTRACTION_PATH):
-                prompt_template = Extraction.cv_parsing_template(store_path=CV_SAVED_DIR, filename=cleaned_filename)
-                #   Read parsing requirements
-                with open(CV_PARSE_PROMPT, "r") as file:
-                    require = file.read()
-                prompt_template += require                 
-                #   Start parsing
-                extracted_result = OpenAIService.gpt_api(prompt_template)
-                extracted_result["cv_file"] = os.path.join("static/resume/cv/uploaded_cvs", cleaned_filename)     
-                #   Save extracted result
-                saved_path = DatabaseService.store_cv_extraction(extracted_json=extracted_result, cv_file=cleaned_filename)
-                #   Save to database
-                resume_db, version_db = Collaborator.Resume.save_cv_parsed_result(extracted_result, data.industry, db_session, current_user)
-            else:
-                #   Read available extracted result
-                saved_path = os.path.join(CV_EXTRACTION_PATH, cleaned_filename.split(".")[0] + ".json")
-                with open(saved_path) as user_file:
-                    extracted_result = user_file.read()
-                resume_db, version_db = Collaborator.Resume.save_cv_parsed_result(json.loads(extracted_result), data.industry, db_session, current_user)
-                #   Get existing database
-                version_db = db_session.execute(select(model.ResumeVersion).where(model.ResumeVersion.cv_file == os.path.join("static/resume/cv/uploaded_cvs", cleaned_filename))).scalars().first()
+            prompt_template = await Extraction.cv_parsing_template(store_path=CV_SAVED_DIR, filename=cleaned_filename)
+            #   Read parsing requirements
+            with open(CV_PARSE_PROMPT, "r") as file:
+                require = file.read()
+            prompt_template += require                 
+            #   Start parsing (an already parsed CV content is served from cache)
+            #   No connection held while waiting for GPT
+            await run_in_threadpool(db.release, db_session)
+            extracted_result = await LLMCache.gpt_api(prompt_template, prompt_version="cv_parsing")
+            extracted_result["cv_file"] = os.path.join("static/resume/cv/uploaded_cvs", cleaned_filename)     
+            version_db = await run_in_threadpool(Collaborator.Resume.save_cv_extraction, extracted_result, industry, cleaned_filename, db_session, current_user)
             return extracted_result, version_db
+
+        @staticmethod
+        def save_cv_extraction(extracted_result: Dict[str, Any], industry: str, cleaned_filename: str, db_session: Session, current_user):
+            #   Save extracted result
+            DatabaseService.store_cv_extraction(extracted_json=extracted_result, cv_file=cleaned_filename)
+            #   Save to database, with the hash bulk uploads check for duplicates (memoized since text extraction)
+            content_hash = Extraction.content_hash(os.path.join(CV_SAVED_DIR, cleaned_filename))
+            resume_db, version_db = Collaborator.Resume.save_cv_parsed_result(extracted_result, industry, db_session, current_user, content_hash)
+            return version_db
         
 
         @staticmethod
@@ -745,16 +928,16 @@ class Collaborator:
 
         
         @staticmethod
-        def percent_estimate(filename: str):
-            prompt_template = Extraction.resume_percent_estimate(filename)      
+        async def percent_estimate(filename: str):
+            prompt_template = await Extraction.resume_percent_estimate(filename)      
             #   Start parsing
-            extracted_result = OpenAIService.gpt_api(prompt_template)
+            extracted_result = await LLMCache.gpt_api(prompt_template, prompt_version="percent_estimate")
             point = extracted_result["point"]
             return point/100
         
 
         @staticmethod
-        def update_valuate(data: schema.UpdateResumeValuation, db_session: Session):
+        def load_valuation(data: schema.UpdateResumeValuation, db_session: Session):
             result = General.get_detail_resume_by_id(data.cv_id, db_session) 
             if not result:
                 raise HTTPException(status_code=404, detail="Resume doesn't exist!")
@@ -762,11 +945,13 @@ class Collaborator:
             valuate_result = db_session.execute(valuation_query).scalars().first()
             if not valuate_result:
                 raise HTTPException(status_code=404, detail="This Resume has not been valuated!")
-            
+            return result, valuate_result
+
+        @staticmethod
+        def save_valuation(data: schema.UpdateResumeValuation, result, valuate_result: model.ValuationInfo, percent, db_session: Session):
             #   Point initialization
             hard_point = 0
-            if data.current_salary is not None:
-                percent = Collaborator.Resume.percent_estimate(filename=result.ResumeVersion.filename)
+            if percent is not None:
                 hard_point = round(percent*data.current_salary / 100000, 1)   # Convert money to point: 100000 (vnđ) => 1đ
                 valuate_result.hard_item = data.current_salary
                 valuate_result.hard_point = hard_point
@@ -823,45 +1008,51 @@ class Collaborator:
             result.ResumeVersion.status = schema.ResumeStatus.pricing_approved
             db.commit_rollback(db_session)
             return valuate_result
+
+        @staticmethod
+        async def update_valuate(data: schema.UpdateResumeValuation, db_session: Session):
+            #   Queries and commits in the threadpool, only the GPT estimate is awaited on the event loop
+            result, valuate_result = await run_in_threadpool(Collaborator.Resume.load_valuation, data, db_session)
+            percent = None
+            if data.current_salary is not None:
+                #   No connection held while waiting for GPT
+                await run_in_threadpool(db.release, db_session)
+                percent = await Collaborator.Resume.percent_estimate(filename=result.ResumeVersion.filename)
+            return await run_in_threadpool(Collaborator.Resume.save_valuation, data, result, valuate_result, percent, db_session)
         
     
         @staticmethod
-        def list_candidate(is_draft: bool, db_session: Session, current_user): 
+        def list_candidate(is_draft: bool, page: Pagination, db_session: Session, current_user): 
+            #   Resumes of the collaborator, read from candidate_overviews by its (collaborator_id, is_draft) index
+            query = select(model.CandidateOverview)    \
+                    .where(model.CandidateOverview.collaborator_id == current_user.id,
+                           model.CandidateOverview.is_draft == is_draft)
+            results, total_items = paginate(db_session, query, page, model.CandidateOverview, scalars=True)
             if is_draft:
-                query = select(model.Resume, model.ResumeVersion)    \
-                        .join(model.ResumeVersion, model.ResumeVersion.cv_id == model.Resume.id) \
-                        .filter(model.Resume.user_id == current_user.id,
-                                model.ResumeVersion.is_draft == True)
-                results = db_session.execute(query).all()
-                return [{
-                    "id": result.ResumeVersion.cv_id,
-                    "fullname": result.ResumeVersion.name,
-                    "job_title": result.ResumeVersion.current_job,
-                    "industry": result.ResumeVersion.industry,
-                    "job_service": result.ResumeVersion.created_at
-                    } for result in results]
-            else:
-                query = select(model.Resume, model.ResumeVersion, model.JobDescription.job_service)    \
-                        .join(model.ResumeVersion, model.ResumeVersion.cv_id == model.Resume.id) \
-                        .outerjoin(model.JobDescription, and_(model.Resume.job_id == model.JobDescription.id, model.Resume.job_id == None)) \
-                        .filter(model.Resume.user_id == current_user.id,
-                                model.ResumeVersion.is_draft == False)
-                results = db_session.execute(query).all()
                 return [{
-                    "id": result.ResumeVersion.cv_id,
-                    "fullname": result.ResumeVersion.name,
-                    "job_title": result.ResumeVersion.current_job,
-                    "industry": result.ResumeVersion.industry,
-                    "job_service": General.get_job_from_resume(result.Resume.id, db_session).job_service if result.Resume.job_id else "SearchCV",
-                    "status": result.ResumeVersion.status,
-                    "referred_time": result.ResumeVersion.created_at
-                    } for result in results]
+                    "id": result.cv_id,
+                    "fullname": result.name,
+                    "job_title": result.current_job,
+                    "industry": result.industry,
+                    "job_service": result.created_at
+                    } for result in results], total_items
+            return [{
+                "id": result.cv_id,
+                "fullname": result.name,
+                "job_title": result.current_job,
+                "industry": result.industry,
+                "job_service": result.job_service,
+                "status": result.status,
+                "referred_time": result.created_at
+                } for result in results], total_items
         
         
         @staticmethod
-        def update_resume_info(data_form: schema.UpdateResume, db_session: Session):      
+        def update_resume_info(data_form: schema.UpdateResume, db_session: Session, current_user):      
             #   Save UploadedFile first
-            result = db_session.execute(model.ResumeVersion).where(model.ResumeVersion.cv_id == data_form.cv_id).scalars().first()
+            result = db_session.execute(select(model.ResumeVersion).where(
+                                                            model.ResumeVersion.cv_id == data_form.cv_id,
+                                                            model.ResumeVersion.is_lastest == True)).scalars().first()
             if not result:
                 raise HTTPException(status_code=404, detail="Resume doesn't exist!")
             if data_form.avatar:
@@ -896,7 +1087,7 @@ class Collaborator:
                                                 "projects",
                                                 "language_certificates",
                                                 "other_certificates"]:
-                    setattr(result.ResumeVersion, key, value) 
+                    setattr(result, key, value) 
             if data_form.education:
                 edus = [model.ResumeEducation(cv_id=data_form.cv_id, **education) for education in General.json_parse(data_form.education[0])]
                 db_session.add_all(edus)
@@ -917,15 +1108,17 @@ class Collaborator:
                 db_session.add_all(other_certs)
                 
             db.commit_rollback(db_session) 
+            #   Re-index the updated resume
+            SearchIndex.index_resume(result)
             
 
         @staticmethod
         def get_detail_candidate(request: Request, cv_id: int, db_session: Session):
             
-            resume_result = General.get_detail_resume_by_id(cv_id, db_session) 
+            resume_result = CandidateDetail.load(cv_id, db_session, with_children=False)
             if not resume_result:
                 raise HTTPException(status_code=404, detail="Resume doesn't exist!")
-            job_result = General.get_job_by_id(resume_result.Resume.job_id, db_session)
+            job_result = resume_result.JobDescription
             if not job_result:
                 raise HTTPException(status_code=404, detail="Job doesn't exist!")
             
@@ -987,24 +1180,28 @@ class Collaborator:
         
         
         @staticmethod
-        def list_interview_schedule(request: Request, db_session: Session, current_user):
-            query = select(model.Resume, model.ResumeVersion, model.InterviewSchedule)  \
+        def list_interview_schedule(request: Request, page: Pagination, db_session: Session, current_user):
+            query = select(Slim.Resume, Slim.ResumeVersion, Slim.InterviewSchedule)  \
                         .join(model.Resume, model.Resume.id == model.ResumeVersion.cv_id)   \
                         .outerjoin(model.InterviewSchedule, model.InterviewSchedule.candidate_id == model.ResumeVersion.cv_id)   \
                         .filter(model.InterviewSchedule.collaborator_id == current_user.id)
-            results = db_session.execute(query).all()
+            #   A resume version is on one row per schedule (recruiter) of its candidate
+            results, total_items = paginate(db_session, query, page, model.ResumeVersion, tiebreak=(model.InterviewSchedule.user_id,))
+            loader = BatchLoader(db_session)    \
+                            .prime("resume", [result.ResumeVersion.cv_id for result in results])    \
+                            .prime("company_by_user", [result.InterviewSchedule.user_id for result in results])
             return [{
                 "candidate_id": result.InterviewSchedule.candidate_id,
-                "company_logo": os.path.join(str(request.base_url), General.get_company_from_interview(result.InterviewSchedule.user_id, db_session).logo),
-                "company_name": General.get_company_from_interview(result.InterviewSchedule.user_id, db_session).company_name,
+                "company_logo": os.path.join(str(request.base_url), loader.get("company_by_user", result.InterviewSchedule.user_id).logo),
+                "company_name": loader.get("company_by_user", result.InterviewSchedule.user_id).company_name,
                 "candidate_name": result.ResumeVersion.name,
                 "job_title": result.ResumeVersion.current_job,
-                "job_service": General.get_job_from_resume(result.Resume.id, db_session).job_service if result.Resume.job_id else "SearchCV",
+                "job_service": loader.job_service(result.ResumeVersion.cv_id),
                 "status": result.ResumeVersion.status,
                 "interview_date": result.InterviewSchedule.date,
                 "interview_time": f"{result.InterviewSchedule.start_time} - {result.InterviewSchedule.end_time}",
                 "interview_location": result.InterviewSchedule.location
-            } for result in results]
+            } for result in results], total_items
             
         
         @staticmethod
@@ -1024,75 +1221,37 @@ class Admin:
     class Resume: 
         
         @staticmethod
-        def list_candidate(state: str, db_session: Session):
-            if state == schema.CandidateStatus.all:
-                results = db_session.execute(select(model.ResumeVersion)    \
-                                                .where(model.ResumeVersion.is_lastest == True)).scalars().all()
-                if not results:
-                    raise HTTPException(status_code=404, detail="Could not find any relevant candidates!")
-                return [{
-                        "id": result.cv_id,
-                        "fullname": result.name,
-                        "job_title": result.current_job,
-                        "industry": result.industry,
-                        "job_service": General.get_job_from_resume(result.Resume.id, db_session).job_service if result.Resume.job_id else "SearchCV",
-                        "status": result.status,
-                        "referred_time": result.created_at
-                    } for result in results]
-            
-            elif state == schema.CandidateStatus.pending:
-                results =  db_session.execute(select(model.ResumeVersion).where(and_(model.ResumeVersion.is_lastest == True,
-                                                            model.ResumeVersion.status == schema.ResumeStatus.candidate_accepted))).scalars().all()
-                if not results:
-                    raise HTTPException(status_code=404, detail="Could not find any relevant candidates!")
-                return [{
-                        "id": result.cv_id,
-                        "fullname": result.name,
-                        "job_title": result.current_job,
-                        "industry": result.industry,
-                        "status": result.status,
-                        "job_service": General.get_job_from_resume(result.Resume.id, db_session).job_service if result.Resume.job_id else "SearchCV",
-                        "referred_time": result.created_at
-                    } for result in results]
-            elif state == schema.CandidateStatus.approved:
-                results =  db_session.execute(select(model.ResumeVersion).where(and_(model.ResumeVersion.is_lastest == True,
-                                                            model.ResumeVersion.is_ai_matched == True))).scalars().all()
-                if not results:
-                    raise HTTPException(status_code=404, detail="Could not find any relevant candidates!")
-                return [{
-                        "id": result.cv_id,
-                        "fullname": result.name,
-                        "job_title": result.current_job,
-                        "industry": result.industry,
-                        "job_service": General.get_job_from_resume(result.Resume.id, db_session).job_service if result.Resume.job_id else "SearchCV",
-                        "status": result.status,
-                        "referred_time": result.created_at
-                    } for result in results]
-            elif state == schema.CandidateStatus.declined:
-                results =  db_session.execute(select(model.ResumeVersion).where(and_(model.ResumeVersion.is_lastest == True,
-                                                            model.ResumeVersion.is_ai_matched == False))).scalars().all()
-                if not results:
-                    raise HTTPException(status_code=404, detail="Could not find any relevant candidates!")
-                return [{
-                        "id": result.cv_id,
-                        "fullname": result.name,
-                        "job_title": result.current_job,
-                        "industry": result.industry,
-                        "status": result.status,
-                        "job_service": General.get_job_from_resume(result.Resume.id, db_session).job_service if result.Resume.job_id else "SearchCV",
-                        "referred_time": result.created_at
-                    } for result in results]
-            else:
-                pass
+        def list_candidate(state: str, page: Pagination, db_session: Session):
+            #   Latest version of each resume with its job service, read from candidate_overviews by one indexed scan
+            filters = {
+                schema.CandidateStatus.all: [],
+                schema.CandidateStatus.pending: [model.CandidateOverview.status == schema.ResumeStatus.candidate_accepted],
+                schema.CandidateStatus.approved: [model.CandidateOverview.is_ai_matched == True],
+                schema.CandidateStatus.declined: [model.CandidateOverview.is_ai_matched == False],
+            }
+            if state not in filters:
+                return
+            results, total_items = paginate(db_session, select(model.CandidateOverview).where(*filters[state]), page, model.CandidateOverview, scalars=True)
+            if not total_items:
+                raise HTTPException(status_code=404, detail="Could not find any relevant candidates!")
+            return [{
+                    "id": result.cv_id,
+                    "fullname": result.name,
+                    "job_title": result.current_job,
+                    "industry": result.industry,
+                    "job_service": result.job_service,
+                    "status": result.status,
+                    "referred_time": result.created_at
+                } for result in results], total_items
             
 
         @staticmethod
         def get_detail_candidate(request: Request, cv_id: int, db_session: Session):
             
-            resume_result = General.get_detail_resume_by_id(cv_id, db_session) 
+            resume_result = CandidateDetail.load(cv_id, db_session, with_children=False)
             if not resume_result:
                 raise HTTPException(status_code=404, detail="Resume doesn't exist!")
-            job_result = General.get_job_by_id(resume_result.Resume.job_id, db_session)
+            job_result = resume_result.JobDescription
             if not job_result:
                 raise HTTPException(status_code=404, detail="Job doesn't exist!")
             
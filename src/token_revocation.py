@@ -0,0 +1,169 @@
+import math
+import asyncio
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from sqlmodel import Session
+from sqlalchemy import select, delete, func, or_
+from starlette.concurrency import run_in_threadpool
+from jose import jwt
+import model
+from config import (db,
+                    TOKEN_REVOCATION_SYNC_SECONDS,
+                    TOKEN_REVOCATION_SYNC_OVERLAP_SECONDS,
+                    TOKEN_REVOCATION_PRUNE_SECONDS,
+                    TOKEN_REVOCATION_BLOOM_CAPACITY,
+                    TOKEN_REVOCATION_BLOOM_ERROR_RATE)
+
+
+def token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
+def token_expiry(token: str) -> Optional[datetime]:
+    """UTC expiry (exp claim) of a JWT, read without verifying it"""
+    try:
+        exp = jwt.get_unverified_claims(token).get("exp")
+    except Exception:
+        return None
+    return datetime.utcfromtimestamp(exp) if exp is not None else None
+
+
+class BloomFilter:
+    """Set of token digests without false negatives: a digest that is not in it has never been added"""
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(capacity, 1)
+        self.size = max(64, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, digest: bytes):
+        #   Double hashing on two halves of the SHA-256 digest
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:16], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, digest: bytes):
+        for position in self._positions(digest):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, digest: bytes):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(digest))
+
+
+class TokenRevocations:
+    """
+    Process-local copy of blacklisted_jwt, checked by get_current_active_user instead of a query per request.
+    A Bloom filter answers for the tokens that were never revoked (nearly every request), the exact set of digests
+    confirms its positives. Loaded at startup, updated on logout, and synced every TOKEN_REVOCATION_SYNC_SECONDS
+    with the logouts of the other workers. Ids are not committed in order, so a sync also reads again the rows created
+    in the last TOKEN_REVOCATION_SYNC_OVERLAP_SECONDS, and the prune reloads the whole table. Entries past the expiry
+    of their token are pruned: jwt.decode rejects the token by itself from then on.
+    """
+    lock = threading.Lock()
+    bloom = BloomFilter(TOKEN_REVOCATION_BLOOM_CAPACITY, TOKEN_REVOCATION_BLOOM_ERROR_RATE)
+    revoked: Dict[bytes, Optional[datetime]] = {}     #   token digest -> token expiry (UTC)
+    last_id = 0                                       #   Highest blacklisted_jwt id read
+    synced_at: Optional[datetime] = None              #   Database time at the start of the last sync
+    ready = False
+
+    @classmethod
+    def _rebuild(cls):
+        #   Bloom filters can't remove: rebuilt from the exact set, and grown before it gets over capacity
+        bloom = BloomFilter(max(TOKEN_REVOCATION_BLOOM_CAPACITY, 2 * len(cls.revoked)), TOKEN_REVOCATION_BLOOM_ERROR_RATE)
+        for digest in cls.revoked:
+            bloom.add(digest)
+        cls.bloom = bloom
+
+    @classmethod
+    def _add(cls, digest: bytes, expires_at: Optional[datetime]):
+        cls.revoked[digest] = expires_at
+        cls.bloom.add(digest)
+
+    @classmethod
+    def sync(cls, db_session: Session):
+        """Read the blacklist rows written since the last sync (all of them the first time), return the new ones"""
+        #   Database clock, the one of the created_at values
+        started_at = db_session.execute(select(func.now())).scalar()
+        recent = model.JWTModel.id > cls.last_id
+        if cls.synced_at is not None:
+            #   A row committed late, with a lower id than rows already read
+            recent = or_(recent, model.JWTModel.created_at >= cls.synced_at - timedelta(seconds=TOKEN_REVOCATION_SYNC_OVERLAP_SECONDS))
+        query = select(model.JWTModel.id, model.JWTModel.token, model.JWTModel.expires_at)  \
+                    .where(recent, or_(model.JWTModel.expires_at == None, model.JWTModel.expires_at > datetime.utcnow()))   \
+                    .order_by(model.JWTModel.id)
+        rows = db_session.execute(query).all()
+        added = 0
+        with cls.lock:
+            for row in rows:
+                digest = token_digest(row.token)
+                if digest not in cls.revoked:
+                    cls._add(digest, row.expires_at)
+                    added += 1
+                cls.last_id = max(cls.last_id, row.id)
+            if len(cls.revoked) > cls.bloom.capacity:
+                cls._rebuild()
+            cls.synced_at = started_at
+            cls.ready = True
+        return added
+
+    @classmethod
+    def prune(cls, db_session: Session):
+        """Delete the entries of expired tokens, then reload the table (whatever a sync may have missed)"""
+        now = datetime.utcnow()
+        db_session.execute(delete(model.JWTModel).where(model.JWTModel.expires_at <= now))
+        db.commit_rollback(db_session)
+        rows = db_session.execute(select(model.JWTModel.token, model.JWTModel.expires_at)
+                                    .where(or_(model.JWTModel.expires_at == None, model.JWTModel.expires_at > now))).all()
+        #   Logouts of this process committed meanwhile are in memory only
+        with cls.lock:
+            revoked = {digest: expires_at for digest, expires_at in cls.revoked.items() if expires_at is None or expires_at > now}
+            revoked.update((token_digest(row.token), row.expires_at) for row in rows)
+            cls.revoked = revoked
+            cls._rebuild()
+
+    @classmethod
+    def add(cls, token: str, expires_at: Optional[datetime]):
+        """Revoke a token in this process, once its blacklist row is committed"""
+        with cls.lock:
+            cls._add(token_digest(token), expires_at)
+
+    @classmethod
+    def is_revoked(cls, token: str) -> Optional[bool]:
+        """Whether the token is revoked, None before the first sync (the caller asks the table)"""
+        if not cls.ready:
+            return None
+        digest = token_digest(token)
+        if digest not in cls.bloom:
+            return False
+        with cls.lock:
+            return digest in cls.revoked
+
+    @classmethod
+    def startup(cls):
+        with Session(db.engine) as db_session:
+            loaded = cls.sync(db_session)
+        print(f" >>> Token revocation filter ready: {loaded} revoked tokens")
+
+    @classmethod
+    def _refresh_once(cls, prune: bool):
+        #   On the primary: a logout may not be on the replica yet
+        with Session(db.engine) as db_session:
+            cls.sync(db_session)
+            if prune:
+                cls.prune(db_session)
+
+    @classmethod
+    async def run_refresher(cls):
+        elapsed = 0.0
+        while True:
+            await asyncio.sleep(TOKEN_REVOCATION_SYNC_SECONDS)
+            elapsed += TOKEN_REVOCATION_SYNC_SECONDS
+            prune = elapsed >= TOKEN_REVOCATION_PRUNE_SECONDS
+            if prune:
+                elapsed = 0.0
+            try:
+                await run_in_threadpool(cls._refresh_once, prune)
+            except Exception as e:
+                print(f" >>> Token revocation sync failed: {e}")
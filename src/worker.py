@@ -0,0 +1,25 @@
+import asyncio
+from config import db, JOBQUEUE_CONCURRENCY
+from postjob.api_service.openai_service import OpenAIService
+from postjob.api_service.pdf_service import PDFExtractionService
+from jobqueue.service import JobQueue
+#   Registers the tasks
+import jobqueue.tasks
+
+
+#   Job worker process: `python src/worker.py` from the project root (same working directory as the API),
+#   start as many as needed, they share the queue table.
+async def run():
+    db.init()
+    JobQueue.init()
+    await OpenAIService.startup()
+    PDFExtractionService.startup()
+    try:
+        await JobQueue.run_worker(JOBQUEUE_CONCURRENCY)
+    finally:
+        await OpenAIService.shutdown()
+        PDFExtractionService.shutdown()
+
+
+if __name__ == '__main__':
+    asyncio.run(run())
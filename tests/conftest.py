@@ -0,0 +1,57 @@
+import os
+import sys
+import json
+import tempfile
+import pytest
+
+#   The app runs from the project root with src/ on the path (static/, alembic.ini and the prompts are relative to it)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+os.chdir(ROOT)
+
+#   config.py reads the environment on import: tests run on a throwaway SQLite database
+TEST_DIR = tempfile.mkdtemp(prefix="sharecv-tests-")
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(TEST_DIR, "primary.db")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("SQL_LOG_MODE", "off")
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.dialects.postgresql import ARRAY
+
+
+#   Postgres ARRAY columns are stored as JSON text on SQLite
+@compiles(ARRAY, "sqlite")
+def compile_array(element, compiler, **kw):
+    return "JSON"
+
+
+def bind_array(self, dialect):
+    if dialect.name != "sqlite":
+        return None
+    return lambda value: None if value is None else json.dumps(value)
+
+
+def load_array(self, dialect, coltype):
+    if dialect.name != "sqlite":
+        return None
+    return lambda value: None if value is None else json.loads(value)
+
+
+ARRAY.bind_processor = bind_array
+ARRAY.result_processor = load_array
+
+
+@pytest.fixture(scope="session")
+def migrated_db():
+    """Primary database upgraded to the latest migration, as db.engine"""
+    from alembic import command
+    from alembic.config import Config
+    from config import db, DATABASE_URL, ALEMBIC_CONFIG
+    alembic_config = Config(ALEMBIC_CONFIG)
+    alembic_config.attributes["configure_logger"] = False
+    command.upgrade(alembic_config, "head")
+    db.engine = create_engine(DATABASE_URL)
+    yield db
+    db.engine.dispose()
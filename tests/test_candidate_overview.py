@@ -0,0 +1,50 @@
+from sqlmodel import Session, select
+import model
+from candidate_overview import track_changes
+
+
+def overview(session: Session, cv_id: int):
+    session.expire_all()
+    return session.exec(select(model.CandidateOverview).where(model.CandidateOverview.cv_id == cv_id)).first()
+
+
+def test_overview_follows_its_resume(migrated_db):
+    track_changes()
+    with Session(migrated_db.engine) as session:
+        resume = model.Resume(user_id=None)
+        session.add(resume)
+        session.commit()
+        version = model.ResumeVersion(cv_id=resume.id, name="Nguyen Van A", status="pending", is_draft=False, is_ai_matched=False)
+        session.add(version)
+        session.commit()
+        row = overview(session, resume.id)
+        assert (row.id, row.name, row.status, row.job_service) == (version.id, "Nguyen Van A", "pending", "SearchCV")
+
+        #   Updated in place by the flush of the status transition
+        version.status = "accepted"
+        session.add(version)
+        session.commit()
+        assert overview(session, resume.id).status == "accepted"
+
+        valuation = model.ValuationInfo(cv_id=resume.id, total_point=12.5)
+        session.add(valuation)
+        session.commit()
+        assert overview(session, resume.id).total_point == 12.5
+
+        #   A resume without a latest version leaves the listings
+        session.delete(valuation)
+        session.delete(version)
+        session.commit()
+        assert overview(session, resume.id) is None
+        session.delete(resume)
+        session.commit()
+
+
+def test_migration_matches_the_model(migrated_db):
+    from alembic.migration import MigrationContext
+    from alembic.autogenerate import compare_metadata
+    with migrated_db.engine.connect() as connection:
+        diff = compare_metadata(MigrationContext.configure(connection), model.SQLModel.metadata)
+    #   Changes are lists of column changes or tuples, the table name is in the tuple or in its first change
+    tables = [(change[0] if isinstance(change, list) else change) for change in diff]
+    assert [change for change in tables if "candidate_overviews" in repr(change)] == []
@@ -0,0 +1,212 @@
+import time
+import email
+import socket
+import threading
+import warnings
+from datetime import datetime, timedelta
+import pytest
+from sqlmodel import Session
+from sqlalchemy import delete, insert, select
+import model
+import email_outbox
+from email_outbox import EmailOutbox, SMTPConnection, OutboxStats
+
+
+class SMTPStandIn:
+    """Local SMTP server keeping the received messages, answering the next DATA commands with `replies` (250 when empty)"""
+    def __init__(self):
+        self.messages = []
+        self.replies = []
+
+    def receive(self, data: bytes):
+        self.messages.append(email.message_from_bytes(data))
+        return self.replies.pop(0) if self.replies else None
+
+    def start(self):
+        try:
+            from aiosmtpd.controller import Controller
+        except ImportError:
+            return self.start_smtpd()
+        stand_in = self
+
+        class Handler:
+            async def handle_DATA(self, server, session, envelope):
+                return stand_in.receive(envelope.content) or "250 OK"
+
+        #   The controller connects to its port once started: a free one, not 0
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            self.port = probe.getsockname()[1]
+        controller = Controller(Handler(), hostname="127.0.0.1", port=self.port)
+        controller.start()
+        self.stop = controller.stop
+
+    def start_smtpd(self):
+        #   Python < 3.12 without aiosmtpd
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)
+            import smtpd
+            import asyncore
+        stand_in = self
+
+        class Server(smtpd.SMTPServer):
+            def process_message(self, peer, mailfrom, rcpttos, data, **kwargs):
+                return stand_in.receive(data)
+
+        server = Server(("127.0.0.1", 0), None, decode_data=False)
+        self.port = server.socket.getsockname()[1]
+        running = threading.Event()
+        running.set()
+
+        def loop():
+            while running.is_set():
+                asyncore.loop(timeout=0.05, count=1)
+
+        thread = threading.Thread(target=loop, daemon=True)
+        thread.start()
+
+        def stop():
+            running.clear()
+            thread.join()
+            server.close()
+        self.stop = stop
+
+
+@pytest.fixture
+def smtp_server(migrated_db, monkeypatch):
+    server = SMTPStandIn()
+    server.start()
+    monkeypatch.setattr(email_outbox, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(email_outbox, "SMTP_PORT", server.port)
+    monkeypatch.setattr(email_outbox, "SMTP_USER", None)
+    monkeypatch.setattr(email_outbox, "SMTP_STARTTLS", False)
+    monkeypatch.setattr(email_outbox, "EMAIL_OUTBOX_BACKOFF_SECONDS", 30)
+    monkeypatch.setattr(email_outbox, "EMAIL_OUTBOX_BACKOFF_MAX_SECONDS", 3600)
+    monkeypatch.setattr(EmailOutbox, "connection", SMTPConnection())
+    monkeypatch.setattr(EmailOutbox, "stats", OutboxStats())
+    yield server
+    EmailOutbox.connection.close()
+    server.stop()
+    with Session(migrated_db.engine) as session:
+        session.execute(delete(model.OutboxEmail))
+        session.commit()
+
+
+def outbox_email(email_id: int) -> model.OutboxEmail:
+    with Session(email_outbox.db.engine) as session:
+        return session.execute(select(model.OutboxEmail).where(model.OutboxEmail.id == email_id)).scalar_one()
+
+
+def only_email() -> model.OutboxEmail:
+    with Session(email_outbox.db.engine) as session:
+        return session.execute(select(model.OutboxEmail)).scalar_one()
+
+
+def test_send(smtp_server):
+    EmailOutbox.enqueue_many([{"recipient": "a@sharecv.vn", "subject": "Referral", "body": "Hello"},
+                              {"recipient": "b@sharecv.vn", "subject": "Interview", "body": "Hi"}])
+    assert EmailOutbox.send_batch() == 2
+    assert [message["Subject"] for message in smtp_server.messages] == ["Referral", "Interview"]
+    assert smtp_server.messages[0]["To"] == "a@sharecv.vn"
+    with Session(email_outbox.db.engine) as session:
+        assert set(session.execute(select(model.OutboxEmail.status)).scalars()) == {"sent"}
+    #   Both went over one session, still open for the next batch
+    assert EmailOutbox.connection.server is not None
+    assert EmailOutbox.send_batch() == 0
+
+
+def test_retry_with_backoff(smtp_server):
+    EmailOutbox.enqueue("a@sharecv.vn", "Referral", "Hello")
+    smtp_server.replies = ["451 Try again later", "451 Try again later"]
+    start = datetime.utcnow()
+    EmailOutbox.send_batch()
+    queued = only_email()
+    assert (queued.status, queued.attempts) == ("queued", 1)
+    assert "451" in queued.error
+    assert timedelta(seconds=29) < queued.next_run_at - start < timedelta(seconds=40)
+    #   Not due before its backoff
+    assert EmailOutbox.send_batch() == 0
+
+    with Session(email_outbox.db.engine) as session:
+        session.execute(model.OutboxEmail.__table__.update().values(next_run_at=datetime.utcnow()))
+        session.commit()
+    start = datetime.utcnow()
+    EmailOutbox.send_batch()
+    queued = only_email()
+    assert (queued.status, queued.attempts) == ("queued", 2)
+    assert timedelta(seconds=59) < queued.next_run_at - start < timedelta(seconds=70)
+
+    with Session(email_outbox.db.engine) as session:
+        session.execute(model.OutboxEmail.__table__.update().values(next_run_at=datetime.utcnow()))
+        session.commit()
+    EmailOutbox.send_batch()
+    sent = only_email()
+    assert (sent.status, sent.attempts, sent.error) == ("sent", 3, None)
+    assert len(smtp_server.messages) == 3
+
+
+def test_permanent_failure(smtp_server):
+    EmailOutbox.enqueue("a@sharecv.vn", "Referral", "Hello")
+    smtp_server.replies = ["550 Mailbox unavailable"]
+    EmailOutbox.send_batch()
+    failed = only_email()
+    assert (failed.status, failed.attempts) == ("failed", 1)
+    assert "550" in failed.error
+    assert EmailOutbox.stats.status()["failed"] == 1
+
+
+def test_last_attempt_fails(smtp_server):
+    EmailOutbox.enqueue_many([{"recipient": "a@sharecv.vn", "subject": "Referral", "body": "Hello"}], max_attempts=1)
+    smtp_server.replies = ["451 Try again later"]
+    EmailOutbox.send_batch()
+    assert only_email().status == "failed"
+
+
+def test_missing_attachment_fails(smtp_server):
+    EmailOutbox.enqueue("a@sharecv.vn", "Referral", "Hello", attachment="static/missing.pdf")
+    EmailOutbox.send_batch()
+    assert only_email().status == "failed"
+    assert smtp_server.messages == []
+
+
+def stale_sending(session: Session, email_id: int, attempts: int, max_attempts: int = 5):
+    #   Claimed by a sender that died before finishing
+    locked_at = datetime.utcnow() - timedelta(seconds=email_outbox.EMAIL_OUTBOX_LOCK_TIMEOUT + 60)
+    session.execute(insert(model.OutboxEmail.__table__).values(
+                                id=email_id, recipient="a@sharecv.vn", subject=f"Stale {email_id}", body="Hello",
+                                status="sending", attempts=attempts, max_attempts=max_attempts,
+                                next_run_at=locked_at, locked_by="lost:1", locked_at=locked_at))
+
+
+def test_stale_claim_is_reclaimed(smtp_server):
+    with Session(email_outbox.db.engine) as session:
+        stale_sending(session, 1, attempts=2)
+        #   Still held by a live sender
+        session.execute(insert(model.OutboxEmail.__table__).values(
+                                id=2, recipient="b@sharecv.vn", subject="Held", body="Hello", status="sending",
+                                attempts=1, max_attempts=5, next_run_at=datetime.utcnow(), locked_by="live:1", locked_at=datetime.utcnow()))
+        session.commit()
+    assert EmailOutbox.send_batch() == 1
+    reclaimed = outbox_email(1)
+    assert (reclaimed.status, reclaimed.attempts) == ("sent", 3)
+    assert outbox_email(2).status == "sending"
+    assert [message["Subject"] for message in smtp_server.messages] == ["Stale 1"]
+
+
+def test_stale_claim_without_attempts_left_fails(smtp_server):
+    with Session(email_outbox.db.engine) as session:
+        stale_sending(session, 1, attempts=5, max_attempts=5)
+        session.commit()
+    assert EmailOutbox.send_batch() == 0
+    failed = outbox_email(1)
+    assert (failed.status, failed.attempts, failed.locked_by) == ("failed", 5, None)
+    assert smtp_server.messages == []
+
+
+def test_idle_connection_is_closed(smtp_server, monkeypatch):
+    EmailOutbox.enqueue("a@sharecv.vn", "Referral", "Hello")
+    EmailOutbox.send_batch()
+    monkeypatch.setattr(email_outbox, "EMAIL_OUTBOX_IDLE_SECONDS", 0)
+    time.sleep(0.01)
+    EmailOutbox.connection.close_if_idle()
+    assert EmailOutbox.connection.server is None
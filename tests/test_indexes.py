@@ -0,0 +1,32 @@
+import pytest
+from sqlalchemy import select, text
+import model
+
+
+#   Hot lookups of the handlers and the index migration 0002 (and later ones) gave each of them
+HOT_QUERIES = [
+    (select(model.User).where(model.User.email == "a@b.c"), "ix_users_email"),
+    (select(model.ResumeVersion).where(model.ResumeVersion.cv_id == 1, model.ResumeVersion.is_lastest == True), "ix_resume_versions_cv_id_is_lastest"),
+    (select(model.ResumeVersion).where(model.ResumeVersion.status == "pending", model.ResumeVersion.is_lastest == True), "ix_resume_versions_status_is_lastest"),
+    (select(model.ResumeVersion.content_hash).where(model.ResumeVersion.content_hash.in_(["a", "b"])), "ix_resume_versions_content_hash"),
+    (select(model.ResumeMatching).where(model.ResumeMatching.cv_id == 1, model.ResumeMatching.job_id == 2), "ix_matching_results_cv_id_job_id"),
+    (select(model.JobDescription).where(model.JobDescription.user_id == 1), "ix_job_descriptions_user_id"),
+    (select(model.Resume).where(model.Resume.user_id == 1), "ix_resumes_user_id"),
+    (select(model.Resume).where(model.Resume.job_id == 1), "ix_resumes_job_id"),
+    (select(model.ValuationInfo).where(model.ValuationInfo.cv_id == 1), "ix_valuation_infos_cv_id"),
+    (select(model.TransactionHistory).where(model.TransactionHistory.transaction_otp == "123456"), "ix_transaction_histories_transaction_otp"),
+    (select(model.ResumeEducation).where(model.ResumeEducation.cv_id.in_([1, 2])), "ix_resume_educations_cv_id"),
+    (select(model.ResumeExperience).where(model.ResumeExperience.cv_id == 1), "ix_resume_experiences_cv_id"),
+]
+
+
+def query_plan(connection, query):
+    sql = str(query.compile(connection, compile_kwargs={"literal_binds": True}))
+    return " ".join(row[-1] for row in connection.execute(text("EXPLAIN QUERY PLAN " + sql)))
+
+
+@pytest.mark.parametrize("query, index", HOT_QUERIES, ids=[index for _, index in HOT_QUERIES])
+def test_hot_query_uses_index(migrated_db, query, index):
+    with migrated_db.engine.connect() as connection:
+        plan = query_plan(connection, query)
+    assert index in plan, plan
@@ -0,0 +1,184 @@
+import io
+import os
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from sqlmodel import Session
+from sqlalchemy import delete, update
+from fastapi import HTTPException, UploadFile
+import model
+
+#   The queue imports the text extraction service, which needs pdftotext (poppler)
+pytest.importorskip("pdftotext")
+import jobqueue.service
+from jobqueue.service import JobQueue
+from jobqueue.schema import JobStatus, JobPriority
+
+
+@pytest.fixture
+def queue(migrated_db, monkeypatch):
+    monkeypatch.setattr(JobQueue, "engine", migrated_db.engine)
+    yield JobQueue
+    with Session(migrated_db.engine) as session:
+        session.execute(delete(model.BackgroundJob))
+        session.commit()
+
+
+def upload(content: bytes, filename: str = "CV.pdf"):
+    return UploadFile(io.BytesIO(content), filename=filename)
+
+
+def test_uploads_of_the_same_name_get_their_own_file(queue, tmp_path):
+    #   Two recruiters uploading a different CV.pdf
+    first = queue.enqueue_upload("postjob.add_candidate", {}, upload(b"%PDF first"), str(tmp_path), temporary=True)
+    second = queue.enqueue_upload("postjob.add_candidate", {}, upload(b"%PDF second"), str(tmp_path), temporary=True)
+    assert first.id != second.id
+    assert first.payload["filename"] == second.payload["filename"] == "CV.pdf"
+    assert first.payload["saved_filename"] != second.payload["saved_filename"]
+    with open(tmp_path / first.payload["saved_filename"], "rb") as file:
+        assert file.read() == b"%PDF first"
+    with open(tmp_path / second.payload["saved_filename"], "rb") as file:
+        assert file.read() == b"%PDF second"
+
+
+def test_same_upload_maps_to_the_same_job(queue, tmp_path):
+    first = queue.enqueue_upload("postjob.add_candidate", {}, upload(b"%PDF same"), str(tmp_path), temporary=True)
+    again = queue.enqueue_upload("postjob.add_candidate", {}, upload(b"%PDF same"), str(tmp_path), temporary=True)
+    assert again.id == first.id
+    #   The copy of the second upload is not left behind
+    assert sorted(os.listdir(tmp_path)) == [first.payload["saved_filename"]]
+
+
+def test_kept_uploads_are_named_after_their_content(queue, tmp_path):
+    first = queue.enqueue_upload("searchcv.cv_parsing", {"user_id": 1}, upload(b"%PDF a"), str(tmp_path), user_id=1)
+    other = queue.enqueue_upload("searchcv.cv_parsing", {"user_id": 1}, upload(b"%PDF b"), str(tmp_path), user_id=1)
+    assert first.payload["saved_filename"].endswith("_CV.pdf")
+    assert first.payload["saved_filename"] != other.payload["saved_filename"]
+    assert first.status == JobStatus.queued
+    assert len(os.listdir(tmp_path)) == 2
+
+
+def job(job_id: int) -> model.BackgroundJob:
+    with JobQueue.session() as session:
+        return session.get(model.BackgroundJob, job_id)
+
+
+def set_job(job_id: int, **values):
+    with JobQueue.session() as session:
+        session.execute(update(model.BackgroundJob).where(model.BackgroundJob.id == job_id).values(**values))
+        session.commit()
+
+
+def test_claim_by_priority_then_due_time(queue):
+    low = queue.enqueue("test.task", {}, priority=JobPriority.low)
+    high = queue.enqueue("test.task", {}, priority=JobPriority.high)
+    later = queue.enqueue("test.task", {}, priority=JobPriority.high)
+    set_job(later.id, next_run_at=datetime.utcnow() + timedelta(hours=1))
+    claimed = queue.claim("a:1")
+    assert (claimed.id, claimed.status, claimed.attempts, claimed.locked_by) == (high.id, JobStatus.running, 1, "a:1")
+    assert queue.claim("b:1").id == low.id
+    #   The other job is not due yet
+    assert queue.claim("c:1") is None
+
+
+def test_claim_skips_a_job_taken_meanwhile(queue, monkeypatch):
+    first = queue.enqueue("test.task", {})
+    second = queue.enqueue("test.task", {})
+    claimable = JobQueue._claimable
+    calls = []
+
+    def racing(now):
+        calls.append(now)
+        if len(calls) == 2:
+            #   Another worker takes the candidate between its select and the update
+            set_job(first.id, status=JobStatus.running, attempts=1, locked_by="other:1", locked_at=now)
+        return claimable(now)
+
+    monkeypatch.setattr(JobQueue, "_claimable", staticmethod(racing))
+    claimed = queue.claim("a:1")
+    assert claimed.id == second.id
+    assert (job(first.id).locked_by, job(first.id).attempts) == ("other:1", 1)
+
+
+def test_retry_with_backoff_up_to_max_attempts(queue, monkeypatch):
+    calls = []
+
+    async def flaky(payload, db_session):
+        calls.append(payload)
+        raise HTTPException(status_code=503, detail="Upstream unavailable!")
+
+    monkeypatch.setitem(JobQueue.tasks, "test.flaky", flaky)
+    queued = queue.enqueue("test.flaky", {"n": 1}, max_attempts=3)
+    for attempt, backoff in ((1, 10), (2, 20)):
+        start = datetime.utcnow()
+        asyncio.run(queue.run_job(queue.claim("a:1")))
+        retried = job(queued.id)
+        assert (retried.status, retried.attempts, retried.locked_by) == (JobStatus.queued, attempt, None)
+        assert retried.result == {"status_code": 503, "detail": "Upstream unavailable!"}
+        assert timedelta(seconds=backoff - 1) < retried.next_run_at - start < timedelta(seconds=backoff + 5)
+        #   Not due before its backoff
+        assert queue.claim("a:1") is None
+        set_job(queued.id, next_run_at=datetime.utcnow())
+    asyncio.run(queue.run_job(queue.claim("a:1")))
+    failed = job(queued.id)
+    assert (failed.status, failed.attempts, failed.error) == (JobStatus.failed, 3, "Upstream unavailable!")
+    assert failed.finished_at is not None
+    assert len(calls) == 3
+
+
+def test_client_error_is_not_retried(queue, monkeypatch):
+    async def invalid(payload, db_session):
+        raise HTTPException(status_code=400, detail="Not a PDF!")
+
+    monkeypatch.setitem(JobQueue.tasks, "test.invalid", invalid)
+    queued = queue.enqueue("test.invalid", {})
+    asyncio.run(queue.run_job(queue.claim("a:1")))
+    assert (job(queued.id).status, job(queued.id).attempts) == (JobStatus.failed, 1)
+
+
+def test_idempotency_key_dedupes_and_requeues_a_failed_job(queue):
+    first = queue.enqueue("test.task", {"n": 1}, idempotency_key="key")
+    again = queue.enqueue("test.task", {"n": 2}, idempotency_key="key")
+    assert again.id == first.id
+    assert again.payload == {"n": 1}
+    claimed = queue.claim("a:1")
+    assert queue.fail(claimed.id, "a:1", 400, "Not a PDF!", retry=False) == JobStatus.failed
+    requeued = queue.enqueue("test.task", {"n": 1}, idempotency_key="key")
+    assert requeued.id == first.id
+    assert (requeued.status, requeued.attempts, requeued.error, requeued.result) == (JobStatus.queued, 0, None, None)
+    assert queue.claim("a:1").id == first.id
+
+
+def test_stale_heartbeat_is_reclaimed(queue):
+    stale = queue.enqueue("test.task", {})
+    held = queue.enqueue("test.task", {})
+    queue.claim("lost:1")
+    queue.claim("live:1")
+    #   The first worker stopped sending heartbeats, the second one is alive
+    set_job(stale.id, locked_at=datetime.utcnow() - timedelta(seconds=jobqueue.service.JOBQUEUE_LOCK_TIMEOUT + 60))
+    assert queue.heartbeat(held.id, "live:1")
+    reclaimed = queue.claim("new:1")
+    assert (reclaimed.id, reclaimed.attempts, reclaimed.locked_by) == (stale.id, 2, "new:1")
+    assert queue.claim("other:1") is None
+    #   The lost worker may not extend, finish or fail the job anymore
+    assert not queue.heartbeat(stale.id, "lost:1")
+    assert not queue.complete(stale.id, "lost:1", {"late": True})
+    assert queue.fail(stale.id, "lost:1", 500, "Job failed!", retry=True) is None
+    assert queue.complete(stale.id, "new:1", {"done": True})
+    assert (job(stale.id).status, job(stale.id).result) == (JobStatus.succeeded, {"done": True})
+
+
+def test_stale_job_on_its_last_attempt_fails(queue, monkeypatch):
+    calls = []
+
+    async def task(payload, db_session):
+        calls.append(payload)
+
+    monkeypatch.setitem(JobQueue.tasks, "test.task", task)
+    stale = queue.enqueue("test.task", {}, max_attempts=1)
+    queue.claim("lost:1")
+    set_job(stale.id, locked_at=datetime.utcnow() - timedelta(seconds=jobqueue.service.JOBQUEUE_LOCK_TIMEOUT + 60))
+    asyncio.run(queue.run_job(queue.claim("new:1")))
+    failed = job(stale.id)
+    assert (failed.status, failed.attempts, failed.error) == (JobStatus.failed, 2, "Job was interrupted!")
+    assert calls == []
@@ -0,0 +1,58 @@
+import os
+import time
+import asyncio
+import pytest
+from postjob.api_service import cache_service
+from postjob.api_service.cache_service import LLMCache
+from postjob.api_service.openai_service import OpenAIService
+
+MATCHING = {"overall": {"score": 80, "explanation": "Good"}}
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_service, "LLM_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(LLMCache, "_inflight", {})
+    monkeypatch.setattr(LLMCache, "_last_sweep", 0.0)
+    return tmp_path
+
+
+def test_hit_is_the_last_use_of_an_entry(cache, monkeypatch):
+    monkeypatch.setattr(cache_service, "LLM_CACHE_MAX_ENTRIES", 2)
+    for key in ("first", "second"):
+        LLMCache.put(key, MATCHING)
+    #   Written first, used last
+    old = time.time() - 100
+    os.utime(cache / "first.json", (old, old))
+    os.utime(cache / "second.json", (old + 10, old + 10))
+    assert LLMCache.get("first") == MATCHING
+    LLMCache.put("third", MATCHING)
+    LLMCache.sweep(force=True)
+    assert sorted(os.listdir(cache)) == [".sweep", "first.json", "third.json"]
+    #   The age of the entry is still the one of its write
+    assert os.stat(cache / "first.json").st_mtime == pytest.approx(old)
+
+
+def test_waiters_take_over_a_cancelled_call(cache, monkeypatch):
+    calls = []
+
+    async def gpt_api(prompt):
+        calls.append(prompt)
+        await asyncio.sleep(0.05 if len(calls) == 1 else 0)
+        return MATCHING
+    monkeypatch.setattr(OpenAIService, "gpt_api", staticmethod(gpt_api))
+
+    async def run():
+        leader = asyncio.create_task(LLMCache.gpt_api("prompt", "matching"))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(LLMCache.gpt_api("prompt", "matching")) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        results = await asyncio.wait_for(asyncio.gather(*waiters), timeout=2)
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return results
+
+    assert asyncio.run(run()) == [MATCHING] * 3
+    #   One call made again for all the waiters
+    assert len(calls) == 2
@@ -0,0 +1,68 @@
+from datetime import datetime
+import pytest
+from fastapi import HTTPException
+from sqlmodel import Session, select
+from sqlalchemy import delete, insert
+import model
+from read_models import Slim
+from pagination import Pagination, paginate
+
+
+@pytest.fixture
+def schedules(migrated_db):
+    #   3 candidates, each with an interview at 3 recruiters: every version is on 3 rows
+    created_at = datetime(2026, 10, 1, 9, 30)
+    with Session(migrated_db.engine) as session:
+        for cv_id in (1, 2, 3):
+            session.execute(insert(model.Resume.__table__).values(id=cv_id, user_id=100))
+            #   Created at the same time: (created_at, id) ordering, then the recruiter of the schedule
+            session.execute(insert(model.ResumeVersion.__table__).values(id=cv_id, cv_id=cv_id, name=f"Candidate {cv_id}", status="pending", created_at=created_at,
+                                                                         is_lastest=True, is_draft=False, is_ai_matched=False, avatar=""))
+            for user_id in (10, 11, 12):
+                session.execute(insert(model.InterviewSchedule.__table__).values(user_id=user_id, candidate_id=cv_id, collaborator_id=100))
+        session.commit()
+        yield session
+        for table in (model.InterviewSchedule, model.ResumeVersion, model.Resume, model.CandidateOverview):
+            session.execute(delete(table))
+        session.commit()
+
+
+def schedule_query():
+    #   The query of the list_interview_schedule endpoints
+    return select(Slim.Resume, Slim.ResumeVersion, Slim.InterviewSchedule)  \
+                .join(model.Resume, model.Resume.id == model.ResumeVersion.cv_id)   \
+                .filter(model.InterviewSchedule.candidate_id == model.ResumeVersion.cv_id)
+
+
+def schedule_keys(rows):
+    return [(row.ResumeVersion.cv_id, row.InterviewSchedule.user_id) for row in rows]
+
+
+def test_cursor_pages_keep_every_schedule(schedules):
+    seen, cursor = [], None
+    for _ in range(10):
+        page = Pagination(limit=2, cursor=cursor)
+        rows, total_items = paginate(schedules, schedule_query(), page, model.ResumeVersion, tiebreak=(model.InterviewSchedule.user_id,))
+        seen += schedule_keys(rows)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert total_items == 9
+    assert sorted(seen) == sorted((cv_id, user_id) for cv_id in (1, 2, 3) for user_id in (10, 11, 12))
+    assert len(set(seen)) == 9
+
+
+def test_offset_pages_keep_every_schedule(schedules):
+    seen = []
+    for page_index in range(1, 6):
+        rows, _ = paginate(schedules, schedule_query(), Pagination(page_index=page_index, limit=2), model.ResumeVersion,
+                           tiebreak=(model.InterviewSchedule.user_id,))
+        seen += schedule_keys(rows)
+    assert len(seen) == len(set(seen)) == 9
+
+
+def test_cursor_of_another_keyset_is_rejected(schedules):
+    page = Pagination(limit=2, cursor=Pagination.encode_cursor(*schedules.execute(select(model.ResumeVersion.created_at, model.ResumeVersion.id)).first()))
+    with pytest.raises(HTTPException) as error:
+        paginate(schedules, schedule_query(), page, model.ResumeVersion, tiebreak=(model.InterviewSchedule.user_id,))
+    assert error.value.status_code == 400
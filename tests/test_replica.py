@@ -0,0 +1,94 @@
+import os
+import time
+import pytest
+from sqlalchemy import create_engine, text
+import replica
+from replica import ReplicaRouter, track_writes, _client_key
+from config import db
+from conftest import TEST_DIR
+
+
+def create_database(name: str):
+    #   SQLite stand-in of a server: one row telling which database answered
+    engine = create_engine("sqlite:///" + os.path.join(TEST_DIR, "routing_" + name + ".db"))
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE IF EXISTS origin"))
+        connection.execute(text("CREATE TABLE origin (name TEXT)"))
+        connection.execute(text("INSERT INTO origin (name) VALUES (:name)"), {"name": name})
+    return engine
+
+
+@pytest.fixture
+def databases(monkeypatch):
+    primary, standby = create_database("primary"), create_database("replica")
+    track_writes(primary)
+    monkeypatch.setattr(db, "engine", primary)
+    monkeypatch.setattr(db, "replica_engine", standby)
+    monkeypatch.setattr(ReplicaRouter, "recent_writes", {})
+    monkeypatch.setattr(ReplicaRouter, "down_until", 0.0)
+    token = _client_key.set("client")
+    yield primary, standby
+    _client_key.reset(token)
+    primary.dispose()
+    standby.dispose()
+
+
+def read_origin():
+    #   What a read-only handler sees through its Depends(db.get_read_session)
+    sessions = db.get_read_session()
+    session = next(sessions)
+    try:
+        return session.execute(text("SELECT name FROM origin")).scalar()
+    finally:
+        sessions.close()
+
+
+def write_on_primary():
+    sessions = db.get_session()
+    session = next(sessions)
+    session.execute(text("UPDATE origin SET name = name"))
+    session.commit()
+    sessions.close()
+
+
+def test_reads_go_to_the_replica(databases):
+    assert read_origin() == "replica"
+
+
+def test_anonymous_reads_go_to_the_replica(databases):
+    _client_key.set(None)
+    write_on_primary()
+    assert read_origin() == "replica"
+
+
+def test_reads_stay_on_the_primary_after_a_write(databases, monkeypatch):
+    monkeypatch.setattr(replica, "REPLICA_READ_YOUR_WRITES_SECONDS", 0.2)
+    write_on_primary()
+    assert read_origin() == "primary"
+    #   Other clients still read the replica
+    _client_key.set("other")
+    assert read_origin() == "replica"
+    _client_key.set("client")
+    time.sleep(0.25)
+    assert read_origin() == "replica"
+
+
+def test_rolled_back_writes_keep_the_replica(databases):
+    sessions = db.get_session()
+    session = next(sessions)
+    session.execute(text("UPDATE origin SET name = name"))
+    session.rollback()
+    sessions.close()
+    assert read_origin() == "replica"
+
+
+def test_replica_down_falls_back_to_the_primary(databases, monkeypatch):
+    monkeypatch.setattr(db, "replica_engine", create_engine("sqlite:///" + os.path.join(TEST_DIR, "missing", "replica.db")))
+    monkeypatch.setattr(replica, "REPLICA_RETRY_SECONDS", 0.2)
+    assert read_origin() == "primary"
+    assert ReplicaRouter.down_until > time.monotonic()
+    #   Skipped without another connection attempt until the retry delay is over
+    monkeypatch.setattr(db, "replica_engine", databases[1])
+    assert read_origin() == "primary"
+    time.sleep(0.25)
+    assert read_origin() == "replica"
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlmodel import Session
+from sqlalchemy import delete, insert
+import model
+from token_revocation import TokenRevocations, BloomFilter
+
+
+@pytest.fixture
+def revocations(migrated_db, monkeypatch):
+    monkeypatch.setattr(TokenRevocations, "bloom", BloomFilter(1000, 0.001))
+    monkeypatch.setattr(TokenRevocations, "revoked", {})
+    monkeypatch.setattr(TokenRevocations, "last_id", 0)
+    monkeypatch.setattr(TokenRevocations, "synced_at", None)
+    monkeypatch.setattr(TokenRevocations, "ready", False)
+    with Session(migrated_db.engine) as session:
+        yield session
+        session.execute(delete(model.JWTModel))
+        session.commit()
+
+
+def blacklist(session: Session, row_id: int, token: str, created_at: datetime = None):
+    values = {"id": row_id, "token": token, "expires_at": datetime.utcnow() + timedelta(hours=1)}
+    if created_at is not None:
+        values["created_at"] = created_at
+    session.execute(insert(model.JWTModel.__table__).values(**values))
+    session.commit()
+
+
+def test_sync_reads_new_logouts(revocations):
+    assert TokenRevocations.is_revoked("a") is None
+    blacklist(revocations, 1, "a")
+    assert TokenRevocations.sync(revocations) == 1
+    assert TokenRevocations.is_revoked("a") is True
+    assert TokenRevocations.is_revoked("b") is False
+    #   Rows already read are not counted again
+    assert TokenRevocations.sync(revocations) == 0
+
+
+def test_sync_reads_rows_committed_out_of_order(revocations):
+    blacklist(revocations, 10, "later id, committed first")
+    TokenRevocations.sync(revocations)
+    #   Lower id, committed after the previous sync
+    blacklist(revocations, 5, "earlier id, committed last")
+    assert TokenRevocations.sync(revocations) == 1
+    assert TokenRevocations.is_revoked("earlier id, committed last") is True
+
+
+def test_prune_reloads_the_table(revocations):
+    blacklist(revocations, 10, "read")
+    TokenRevocations.sync(revocations)
+    #   Committed out of order and older than the overlap of the syncs
+    blacklist(revocations, 5, "missed", created_at=datetime.utcnow() - timedelta(days=1))
+    TokenRevocations.sync(revocations)
+    assert TokenRevocations.is_revoked("missed") is False
+    TokenRevocations.prune(revocations)
+    assert TokenRevocations.is_revoked("missed") is True
+    assert TokenRevocations.is_revoked("read") is True
+
+
+def test_logout_is_read_by_another_process(revocations, monkeypatch):
+    from auth.service import OTPRepo
+    TokenRevocations.sync(revocations)
+    OTPRepo.add_to_blacklist(revocations, "logged out")
+    #   Another process, which already read rows with higher ids: only created_at (database clock) finds the logout
+    monkeypatch.setattr(TokenRevocations, "bloom", BloomFilter(1000, 0.001))
+    monkeypatch.setattr(TokenRevocations, "revoked", {})
+    monkeypatch.setattr(TokenRevocations, "last_id", 1000)
+    assert TokenRevocations.sync(revocations) == 1
+    assert TokenRevocations.is_revoked("logged out") is True